@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import requests
+
+# AIMD 동시성 제어. 한 "라운드"(limit 의 두 배, 최소 min_round 개 요청이 끝날 때) 마다 처리량과 지연 중앙값을 보고
+# (처리량은 생성 토큰/s: --schedule longest 처럼 뒤로 갈수록 항목이 짧아져도 items/s 처럼 저절로 오르지 않는다.
+#  토큰 수를 모르는 요청(CLI)은 1 로 세어 items/s 가 된다)
+#  - 처리량이 min_gain 이상 올랐고 지연이 목표 안이면 limit + 1
+#  - 처리량이 그대로면 유지 (여기가 포화점)
+#  - 지연이 목표를 넘거나, 타임아웃 / 429 / 503 이 나오면 limit × decrease
+# 한 번 줄인 뒤에는 그 전에 시작된 요청의 신호로 다시 줄이지 않는다 (같은 과부하에 연달아 반응하지 않도록).
+OVERLOAD_STATUS = (429, 502, 503, 504)
+
+
+def overload_reason(e: BaseException) -> Optional[str]:
+    """'timeout' / 'http-429' ... when the error means the backend is overloaded, else None."""
+    if isinstance(e, (requests.Timeout, subprocess.TimeoutExpired)):
+        return "timeout"
+    if isinstance(e, requests.HTTPError) and e.response is not None and e.response.status_code in OVERLOAD_STATUS:
+        return f"http-{e.response.status_code}"
+    return None
+
+
+class AIMDLimiter:
+    def __init__(self, initial: int = 2, min_limit: int = 1, max_limit: int = 16, decrease: float = 0.5,
+                 latency_target_ms: Optional[float] = None, spike_factor: float = 2.0, min_gain: float = 0.05,
+                 min_round: int = 8, window: int = 32, verbose: bool = True):
+        """latency_target_ms: fixed p50 target; None = spike_factor × the lowest round p50 so far."""
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(self.max_limit, max(self.min_limit, initial))
+        self.decrease = decrease
+        self.latency_target_ms = latency_target_ms
+        self.spike_factor = spike_factor
+        self.min_gain = min_gain
+        self.min_round = min_round
+        self.verbose = verbose
+        self.decisions: List[Dict[str, Any]] = []
+        self.saturation_limit: Optional[int] = None
+        self._lock = threading.Lock()
+        self._lat: Deque[float] = deque(maxlen=window)
+        self._t0 = time.monotonic()
+        self._t_cut = 0.0
+        self._prev_tput: Optional[float] = None
+        self._base_p50: Optional[float] = None
+        self._reset_round()
+
+    def _reset_round(self) -> None:
+        self._round_n = 0
+        self._round_work = 0.0
+        self._round_t0 = time.monotonic()
+        self._lat.clear()
+
+    def _log(self, action: str, new: int, reason: str, **kw: Any) -> None:
+        d = {"t_s": round(time.monotonic() - self._t0, 2), "action": action, "from": self.limit, "to": new,
+             "reason": reason, **{k: (round(v, 3) if isinstance(v, float) else v) for k, v in kw.items()}}
+        self.decisions.append(d)
+        self.limit = new
+        if self.verbose:
+            extra = " ".join(f"{k}={d[k]}" for k in kw)
+            print(f"[AIMD] {action} limit {d['from']} -> {new} ({reason}) {extra}".rstrip(), file=sys.stderr)
+
+    def _cut(self, reason: str, **kw: Any) -> None:
+        new = max(self.min_limit, int(self.limit * self.decrease))
+        self._t_cut = time.monotonic()
+        self._prev_tput = None
+        self._reset_round()
+        self._log("decrease", new, reason, **kw)
+
+    # --- signals ----------------------------------------------------------
+    def on_success(self, latency_ms: float, t_start: float, tokens: Optional[int] = None) -> None:
+        """One finished request; t_start is its time.monotonic() at dispatch, tokens its eval_count."""
+        with self._lock:
+            if t_start < self._t_cut:
+                return
+            self._lat.append(latency_ms)
+            self._round_n += 1
+            self._round_work += tokens if tokens else 1
+            if self._round_n < max(2 * self.limit, self.min_round):
+                return
+            tput = self._round_work / max(1e-9, time.monotonic() - self._round_t0)
+            p50 = statistics.median(self._lat)
+            # 기준 지연은 지금까지 가장 낮았던 라운드 p50 (과부하 상태에서 시작해도 기준이 부풀지 않는다)
+            self._base_p50 = p50 if self._base_p50 is None else min(self._base_p50, p50)
+            target = self.target_ms()
+            if p50 > target:
+                self._cut("latency", tput=tput, p50_ms=p50, target_ms=target)
+                return
+            prev = self._prev_tput
+            if prev is None or tput >= prev * (1 + self.min_gain):
+                if self.limit < self.max_limit:
+                    self._log("increase", self.limit + 1, "throughput" if prev else "start",
+                              tput=tput, prev_tput=prev, p50_ms=p50)
+                self._prev_tput = tput
+            else:
+                if self.saturation_limit != self.limit:
+                    self.saturation_limit = self.limit
+                    self._log("hold", self.limit, "plateau", tput=tput, prev_tput=prev, p50_ms=p50)
+                self._prev_tput = max(prev, tput)
+            self._reset_round()
+
+    def on_overload(self, reason: str, t_start: float) -> None:
+        with self._lock:
+            if t_start < self._t_cut:
+                return
+            self._cut(reason)
+
+    def target_ms(self) -> float:
+        if self.latency_target_ms is not None:
+            return self.latency_target_ms
+        return self._base_p50 * self.spike_factor if self._base_p50 is not None else float("inf")
+
+    def current(self) -> int:
+        with self._lock:
+            return self.limit
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "max_limit_reached": max([self.limit] + [d["to"] for d in self.decisions]),
+                "saturation_limit": self.saturation_limit,
+                "latency_target_ms": round(self.target_ms(), 1) if self._base_p50 or self.latency_target_ms else None,
+                "increases": sum(1 for d in self.decisions if d["action"] == "increase"),
+                "decreases": sum(1 for d in self.decisions if d["action"] == "decrease"),
+                "decisions": list(self.decisions),
+            }
+
+
+def add_aimd_args(ap) -> None:
+    ap.add_argument("--adaptive", action="store_true",
+                    help="AIMD: start low and grow in-flight requests while token throughput rises, "
+                         "halve on timeouts/429/503 or latency spikes (--concurrency is the upper bound)")
+    ap.add_argument("--adaptive-start", type=int, default=2, dest="adaptive_start")
+    ap.add_argument("--latency-target-ms", type=float, default=None, dest="latency_target_ms",
+                    help="p50 latency that counts as overload (default: 2x the lowest round p50 seen)")
+
+
+def aimd_from_args(args) -> Optional[AIMDLimiter]:
+    if not getattr(args, "adaptive", False):
+        return None
+    return AIMDLimiter(initial=args.adaptive_start, max_limit=args.concurrency,
+                       latency_target_ms=args.latency_target_ms)
@@ -7,6 +7,8 @@ from typing import Any, Dict, Iterable, List, Tuple
 
 import numpy as np
 
+from jsonl_reader import iter_jsonl
+
 
 def parse_args() -> argparse.Namespace:
     ap = argparse.ArgumentParser(description="Aggregate p50/p95 latency & cost from JSONL logs.")
@@ -18,6 +20,9 @@ def parse_args() -> argparse.Namespace:
                     help="Field name for latency in milliseconds (default: latency_ms)")
     ap.add_argument("--cost-field", default="cost_usd",
                     help="Field name for cost in USD (default: cost_usd)")
+    ap.add_argument("--stream-fields", default="ttft_ms,itl_ms,tokens,eval_tps",
+                    help="Streaming timing fields to summarize, read from top level or timing{} "
+                         "(default: ttft_ms,itl_ms,tokens,eval_tps). Empty to skip.")
     ap.add_argument("--group-by", default="",
                     help="Comma-separated fields to group by (e.g., model,mode). Empty for overall only.")
     ap.add_argument("--percentiles", default="50,95",
@@ -33,19 +38,9 @@ def load_records(glob_pattern: str) -> List[Dict[str, Any]]:
     files = sorted(root.glob(glob_pattern))
     for fp in files:
         try:
-            text = fp.read_text(encoding="utf-8")
-        except Exception:
+            recs.extend(iter_jsonl(fp))
+        except OSError:
             continue
-        for ln in text.splitlines():
-            ln = ln.strip()
-            if not ln:
-                continue
-            try:
-                rec = json.loads(ln)
-                if isinstance(rec, dict):
-                    recs.append(rec)
-            except Exception:
-                continue
     return recs
 
 
@@ -72,6 +67,13 @@ def pct_stats(values: Iterable[float], percentiles: List[float]) -> Dict[str, fl
     return out
 
 
+def get_field(rec: Dict[str, Any], name: str) -> float | None:
+    v = rec.get(name)
+    if v is None and isinstance(rec.get("timing"), dict):
+        v = rec["timing"].get(name)
+    return safe_float(v)
+
+
 def group_key(rec: Dict[str, Any], fields: List[str]) -> Tuple[Any, ...]:
     return tuple(rec.get(f, None) for f in fields)
 
@@ -82,11 +84,13 @@ def aggregate(
     cost_field: str,
     pcts: List[float],
     group_fields: List[str],
+    stream_fields: List[str] | None = None,
 ) -> Dict[str, Any]:
+    stream_fields = stream_fields or []
     lat_all: List[float | None] = []
     cost_all: List[float | None] = []
     for r in recs:
-        lat_all.append(safe_float(r.get(latency_field)))
+        lat_all.append(get_field(r, latency_field))
         cost_all.append(safe_float(r.get(cost_field)))
 
     result: Dict[str, Any] = {
@@ -98,27 +102,35 @@ def aggregate(
             "n_records": len(recs),
             "latency_field": latency_field,
             "cost_field": cost_field,
+            "stream_fields": stream_fields,
             "percentiles": pcts,
         },
     }
+    for name in stream_fields:
+        result["overall"][name] = pct_stats([get_field(r, name) for r in recs], pcts)
 
     if group_fields:
         groups: Dict[Tuple[Any, ...], Dict[str, List[float]]] = {}
         for r in recs:
             key = group_key(r, group_fields)
-            g = groups.setdefault(key, {"lat": [], "cost": []})
-            lat = safe_float(r.get(latency_field))
+            g = groups.setdefault(key, {"lat": [], "cost": [], **{n: [] for n in stream_fields}})
+            lat = get_field(r, latency_field)
             cost = safe_float(r.get(cost_field))
             if lat is not None:
                 g["lat"].append(lat)
             if cost is not None:
                 g["cost"].append(cost)
+            for name in stream_fields:
+                v = get_field(r, name)
+                if v is not None:
+                    g[name].append(v)
         per_group: Dict[str, Any] = {}
         for k, vals in groups.items():
             label = "|".join([str(x) for x in k])
             per_group[label] = {
                 "latency_ms": pct_stats(vals["lat"], pcts),
                 "cost_usd": pct_stats(vals["cost"], pcts),
+                **{name: pct_stats(vals[name], pcts) for name in stream_fields},
             }
         result["by_group"] = {
             "fields": group_fields,
@@ -154,6 +166,7 @@ def main() -> None:
         pcts = [50.0, 95.0]
 
     group_fields = [f.strip() for f in args.group_by.split(",") if f.strip()]
+    stream_fields = [f.strip() for f in args.stream_fields.split(",") if f.strip()]
 
     result = aggregate(
         recs=recs,
@@ -161,6 +174,7 @@ def main() -> None:
         cost_field=args.cost_field,
         pcts=pcts,
         group_fields=group_fields,
+        stream_fields=stream_fields,
     )
 
     outp = Path(args.out)
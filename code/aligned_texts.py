@@ -1,6 +1,8 @@
-import csv, json, sys, subprocess
+import csv, sys, subprocess
 from pathlib import Path
 
+from jsonl_reader import iter_jsonl
+
 ROOT = Path(__file__).resolve().parents[1]
 PROMPTS = ROOT / "prompts" / "prompts.csv"
 RAW     = ROOT / "results" / "raw"
@@ -12,14 +14,7 @@ def die(msg):
     raise SystemExit(1)
 
 def load_jsonl(fp: Path):
-    for line in fp.read_text(encoding="utf-8").splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        try:
-            yield json.loads(line)
-        except Exception:
-            continue
+    return iter_jsonl(fp)
 
 def pick_id(rec: dict):
     for k in ("id", "item_id", "example_id"):
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import csv
+import glob
+import heapq
+import json
+import statistics
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from jsonl_reader import iter_jsonl
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_HISTORY = str(ROOT / "results" / "raw" / "*.jsonl")
+
+# 항목별 디코드 시간 예측 → 긴 것부터 배치(LPT). 결과 파일은 러너가 원래 순서로 쓴다.
+# 예측 우선순위: 같은 id 의 과거 latency > (len_bin, diff_bin) 중앙값 > n_chars 선형회귀 > 전체 중앙값 > n_chars
+# 이력은 같은 모델의 기록만 쓴다 (EX-0001, row_1 같은 id 는 다른 모델/데이터셋 실행과 겹친다)
+
+
+def _latency(o: Dict[str, Any]) -> Optional[float]:
+    t = o.get("timing")
+    if isinstance(t, dict) and isinstance(t.get("latency_ms"), (int, float)):
+        return float(t["latency_ms"])
+    if isinstance(o.get("latency_ms"), (int, float)):
+        return float(o["latency_ms"])
+    return None
+
+
+def _n_chars(o: Dict[str, Any]) -> Optional[int]:
+    for k in ("n_chars", "len_in_chars"):
+        v = o.get(k)
+        if v not in (None, ""):
+            try:
+                return int(v)
+            except (TypeError, ValueError):
+                pass
+    txt = o.get("input") or o.get("text") or o.get("prompt")
+    return len(txt) if isinstance(txt, str) else None
+
+
+def item_features(o: Dict[str, Any]) -> Dict[str, Any]:
+    return {"len_bin": str(o.get("len_bin") or ""), "diff_bin": str(o.get("diff_bin") or ""),
+            "n_chars": _n_chars(o)}
+
+
+def load_history(patterns: Iterable[str], mode: Optional[str] = None,
+                 model: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Past raw-log records with a latency (cached/errored ones skipped); mode filters general/instructed,
+    model keeps only records of that model (records without a model field are dropped then)."""
+    recs: List[Dict[str, Any]] = []
+    seen = set()
+    for pat in patterns:
+        for fp in sorted(glob.glob(pat, recursive=True)):
+            if fp in seen:
+                continue
+            seen.add(fp)
+            for o in iter_jsonl(fp):
+                if o.get("cached") or o.get("error"):
+                    continue
+                if mode and o.get("mode") and o.get("mode") != mode:
+                    continue
+                if model and o.get("model") != model:
+                    continue
+                lat = _latency(o)
+                if lat is None or lat <= 0:
+                    continue
+                recs.append({"id": str(o.get("id")), "latency_ms": lat, **item_features(o)})
+    return recs
+
+
+class LatencyModel:
+    """Predicts a request's latency_ms from history (see the priority order above)."""
+
+    def __init__(self, history: Sequence[Dict[str, Any]] = ()):
+        by_id: Dict[str, List[float]] = {}
+        by_bin: Dict[Tuple[str, str], List[float]] = {}
+        xs: List[float] = []
+        ys: List[float] = []
+        for r in history:
+            by_id.setdefault(r["id"], []).append(r["latency_ms"])
+            if r["len_bin"] or r["diff_bin"]:
+                by_bin.setdefault((r["len_bin"], r["diff_bin"]), []).append(r["latency_ms"])
+            if r["n_chars"] is not None:
+                xs.append(float(r["n_chars"]))
+                ys.append(r["latency_ms"])
+        self.by_id = {k: statistics.median(v) for k, v in by_id.items()}
+        self.by_bin = {k: statistics.median(v) for k, v in by_bin.items() if len(v) >= 3}
+        self.global_ms = statistics.median([r["latency_ms"] for r in history]) if history else None
+        self.line: Optional[Tuple[float, float]] = None
+        if len(xs) >= 5 and len(set(xs)) > 1:
+            mx, my = statistics.fmean(xs), statistics.fmean(ys)
+            sxx = sum((x - mx) ** 2 for x in xs)
+            b = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx
+            if b > 0:
+                self.line = (my - b * mx, b)
+
+    def predict(self, item_id: str, feats: Dict[str, Any]) -> Tuple[float, str]:
+        """(predicted latency_ms, source)."""
+        if item_id in self.by_id:
+            return self.by_id[item_id], "id"
+        key = (feats.get("len_bin") or "", feats.get("diff_bin") or "")
+        if key in self.by_bin:
+            return self.by_bin[key], "bin"
+        n = feats.get("n_chars")
+        if self.line is not None and n is not None:
+            a, b = self.line
+            return max(1.0, a + b * n), "n_chars"
+        if self.global_ms is not None:
+            return self.global_ms, "global"
+        # 이력이 없으면 입력 길이만으로 상대 순서를 정한다
+        return float(n or 0), "len"
+
+
+def longest_first(predicted: Sequence[float]) -> List[int]:
+    """Dispatch order: positions by predicted time, longest first (ties keep file order)."""
+    return sorted(range(len(predicted)), key=lambda i: -predicted[i])
+
+
+def simulate_makespan(durations: Sequence[float], order: Sequence[int], workers: int) -> float:
+    """Greedy list scheduling: each item in `order` goes to the first free worker."""
+    free = [0.0] * max(1, workers)
+    for i in order:
+        t = heapq.heappop(free)
+        heapq.heappush(free, t + durations[i])
+    return max(free) if durations else 0.0
+
+
+def read_item_features(path: Path | str, id_col: str = "id") -> Dict[str, Dict[str, Any]]:
+    """id -> features from a prompts CSV or manifest JSON."""
+    p = Path(path)
+    if p.suffix.lower() == ".json":
+        items = json.loads(p.read_text(encoding="utf-8")).get("items", [])
+    else:
+        with p.open(newline="", encoding="utf-8-sig") as f:
+            items = list(csv.DictReader(f))
+    out: Dict[str, Dict[str, Any]] = {}
+    for it in items:
+        pid = it.get(id_col) if id_col in it else it.get("id")
+        if pid is not None:
+            out[str(pid)] = item_features(it)
+    return out
+
+
+def _round(x: Optional[float]) -> Optional[int]:
+    return None if x is None else round(x)
+
+
+def _secs(ms: Optional[float]) -> str:
+    return "n/a" if ms is None else f"{ms / 1000:.1f}s"
+
+
+class Plan:
+    """Dispatch order for one run plus what is needed for the predicted-vs-actual report."""
+
+    def __init__(self, ids: Sequence[str], feats: Sequence[Dict[str, Any]], model: LatencyModel,
+                 policy: str = "longest", workers: int = 1):
+        self.ids = [str(i) for i in ids]
+        preds = [model.predict(i, f) for i, f in zip(self.ids, feats)]
+        self.predicted = [p for p, _ in preds]
+        self.sources = [s for _, s in preds]
+        self.policy = policy
+        self.workers = max(1, workers)
+        self.order = longest_first(self.predicted) if policy == "longest" else list(range(len(self.ids)))
+        # 이력이 없으면 예측값은 입력 길이(상대 순서)일 뿐 ms 가 아니다
+        self.calibrated = model.global_ms is not None
+
+    def predicted_makespan(self, order: Optional[Sequence[int]] = None) -> Optional[float]:
+        if not self.calibrated:
+            return None
+        return simulate_makespan(self.predicted, self.order if order is None else order, self.workers)
+
+    def report(self, actual_ms: Dict[str, float], wall_ms: float) -> Dict[str, Any]:
+        n = len(self.ids)
+        file_order = list(range(n))
+        actual = [float(actual_ms.get(i, 0.0)) for i in self.ids]
+        have = [k for k, i in enumerate(self.ids) if i in actual_ms]
+        errs = [abs(self.predicted[k] - actual[k]) for k in have]
+        src: Dict[str, int] = {}
+        for s in self.sources:
+            src[s] = src.get(s, 0) + 1
+        return {
+            "n": n, "workers": self.workers, "policy": self.policy,
+            "predicted_makespan_ms": _round(self.predicted_makespan()),
+            "predicted_makespan_file_order_ms": _round(self.predicted_makespan(file_order)),
+            "actual_makespan_ms": round(wall_ms),
+            # 실제 latency 로 두 순서를 다시 돌려 본 값: 순서 정책의 효과만 비교
+            "replayed_makespan_ms": round(simulate_makespan(actual, self.order, self.workers)),
+            "replayed_makespan_file_order_ms": round(simulate_makespan(actual, file_order, self.workers)),
+            "latency_mae_ms": round(statistics.fmean(errs), 1) if errs else None,
+            "prediction_sources": src,
+            "items": [{"id": self.ids[k], "predicted_ms": round(self.predicted[k]) if self.calibrated else None,
+                       "source": self.sources[k],
+                       "actual_ms": actual_ms.get(self.ids[k])} for k in range(n)],
+        }
+
+
+def add_schedule_args(ap) -> None:
+    ap.add_argument("--schedule", choices=["file", "longest"], default="file",
+                    help="Dispatch order with --concurrency > 1: file order, or longest predicted first")
+    ap.add_argument("--history", nargs="*", default=None,
+                    help=f"raw-log JSONL globs with past latency_ms for the predictor (default: {DEFAULT_HISTORY})")
+    ap.add_argument("--schedule-report", default=None, dest="schedule_report",
+                    help="write predicted vs actual makespan JSON here")
+
+
+def plan_from_args(args, ids: Sequence[str], feats: Sequence[Dict[str, Any]], workers: int,
+                   mode: Optional[str] = None) -> Optional[Plan]:
+    """None unless --schedule longest or --schedule-report asks for a plan."""
+    if args.schedule == "file" and not args.schedule_report:
+        return None
+    history = load_history(args.history if args.history is not None else [DEFAULT_HISTORY], mode=mode,
+                           model=getattr(args, "model", None))
+    plan = Plan(ids, feats, LatencyModel(history), policy=args.schedule, workers=workers)
+    print(f"[SCHEDULE] policy={plan.policy} workers={plan.workers} history={len(history)} "
+          f"predicted_makespan={_secs(plan.predicted_makespan())}")
+    return plan
+
+
+def write_schedule_report(path: Path | str, plan: Plan, actual_ms: Dict[str, float], wall_ms: float) -> Dict[str, Any]:
+    rep = plan.report(actual_ms, wall_ms)
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(json.dumps(rep, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"[SCHEDULE] predicted={_secs(rep['predicted_makespan_ms'])} actual={_secs(rep['actual_makespan_ms'])} "
+          f"(replayed: {rep['policy']}={_secs(rep['replayed_makespan_ms'])} "
+          f"file={_secs(rep['replayed_makespan_file_order_ms'])}) -> {p}")
+    return rep
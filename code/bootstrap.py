@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+# 청크 하나에서 인덱스 + gather 배열이 차지할 최대 바이트 (B*n 전체를 만들지 않는다)
+DEFAULT_MAX_BYTES = 64 << 20
+# 재표집을 GRID_ROWS 개씩 묶은 고정 격자; 묶음마다 SeedSequence 자식 하나.
+# 격자는 B 로만 정해지므로 workers / max_bytes 를 바꿔도 결과가 같다
+GRID_ROWS = 1000
+
+
+def chunk_rows(n: int, max_bytes: int = DEFAULT_MAX_BYTES) -> int:
+    """Resamples per chunk so that (rows, n) int64 indices + one (rows, n) float gather fit in max_bytes."""
+    return max(1, int(max_bytes // (16 * max(1, n))))
+
+
+def _resample_means(x: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    # x: (k, n), idx: (rows, n) -> (k, rows). 지표마다 2D gather 로 평균을 내야
+    # 예전 (B, n) 구현과 부동소수점 합산 순서가 같다 (3D 축 평균은 마지막 자리가 달라짐)
+    return np.stack([row[idx].mean(axis=1) for row in x])
+
+
+_X: Optional[np.ndarray] = None
+
+def _init_worker(x: np.ndarray) -> None:
+    global _X
+    _X = x
+
+def _chunk_task(task: Tuple[int, np.random.SeedSequence, int]) -> np.ndarray:
+    """One grid chunk, drawn in pieces of at most `step` rows from the chunk's own Generator.
+
+    int64 draws are not buffered, so the pieces give the same indices as one
+    (rows, n) draw: the piece size only bounds memory.
+    """
+    rows, ss, step = task
+    n = _X.shape[1]
+    rng = np.random.default_rng(ss)
+    out = np.empty((_X.shape[0], rows), dtype=float)
+    for s in range(0, rows, step):
+        e = min(rows, s + step)
+        out[:, s:e] = _resample_means(_X, rng.integers(0, n, size=(e - s, n)))
+    return out
+
+
+def bootstrap_means(
+    values: np.ndarray,
+    B: int = 10000,
+    seed: Optional[int] = 42,
+    workers: int = 1,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> np.ndarray:
+    """Means of B bootstrap resamples, drawn in memory-bounded chunks.
+
+    values: (n,) or (k, n). With k rows (several metrics over the same items) every
+    row is resampled with the same indices, in one pass; returns (B,) or (k, B).
+
+    Resamples are laid out on a fixed grid of GRID_ROWS-row chunks, each drawn from
+    its own SeedSequence(seed).spawn() child, so the result depends only on
+    (values, B, seed): workers only spreads chunks over processes and max_bytes only
+    bounds the size of one draw.
+    """
+    x = np.asarray(values, dtype=float)
+    squeeze = x.ndim == 1
+    x = np.atleast_2d(x)
+    k, n = x.shape
+    out = np.empty((k, max(0, B)), dtype=float)
+    if B <= 0 or n == 0:
+        out[:] = np.nan
+        return out[0] if squeeze else out
+
+    step = chunk_rows(n, max_bytes)
+    bounds = [(s, min(B, s + GRID_ROWS)) for s in range(0, B, GRID_ROWS)]
+    children = np.random.SeedSequence(seed).spawn(len(bounds))
+    tasks = [(e - s, ss, step) for (s, e), ss in zip(bounds, children)]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(x,)) as ex:
+            parts = list(ex.map(_chunk_task, tasks))
+    else:
+        _init_worker(x)
+        parts = [_chunk_task(t) for t in tasks]
+    for (s, e), part in zip(bounds, parts):
+        out[:, s:e] = part
+    return out[0] if squeeze else out
+
+
+def percentile_ci(boots: np.ndarray, alpha: float = 0.05) -> Tuple[float, float]:
+    """(lo, hi) with np.percentile, as the stats scripts report it; boots may be (B,) or (k, B)."""
+    if np.size(boots) == 0:
+        return float("nan"), float("nan")
+    lo = np.percentile(boots, 100 * alpha / 2, axis=-1)
+    hi = np.percentile(boots, 100 * (1 - alpha / 2), axis=-1)
+    if np.ndim(lo) == 0:
+        return float(lo), float(hi)
+    return lo, hi
+
+
+# ---- corpus-level (sufficient statistics) -------------------------------------------
+
+def _resample_counts(rng: np.random.Generator, rows: int, n: int) -> np.ndarray:
+    """(rows, n) multiplicities of the same index draws bootstrap_means would use."""
+    idx = rng.integers(0, n, size=(rows, n))
+    flat = (idx + (np.arange(rows) * n)[:, None]).ravel()
+    return np.bincount(flat, minlength=rows * n).reshape(rows, n).astype(np.float64)
+
+
+def paired_corpus_bootstrap(
+    stats_a: np.ndarray,
+    stats_b: np.ndarray,
+    score_fn: Callable[[np.ndarray], np.ndarray],
+    B: int = 10000,
+    seed: Optional[int] = 42,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> np.ndarray:
+    """(B,) resampled corpus deltas score_fn(sum b) - score_fn(sum a), paired on items.
+
+    stats_a/stats_b: (n, d) per-item sufficient statistics (score_engine.bleu_stats /
+    chrf_stats); score_fn maps (rows, d) summed stats to (rows,) corpus scores
+    (bleu_from_stats / chrf_from_stats). A resample is counts @ stats, so no
+    metric is re-run. Integer stats stay exact in float64 sums.
+    """
+    a = np.asarray(stats_a, dtype=np.float64)
+    b = np.asarray(stats_b, dtype=np.float64)
+    if a.shape != b.shape:
+        raise ValueError("stats_a/stats_b shape mismatch")
+    n = a.shape[0]
+    out = np.empty(max(0, B), dtype=float)
+    if B <= 0 or n == 0:
+        out[:] = np.nan
+        return out
+    rng = np.random.default_rng(seed)
+    rows = chunk_rows(n, max_bytes)
+    for s in range(0, B, rows):
+        e = min(B, s + rows)
+        w = _resample_counts(rng, e - s, n)
+        out[s:e] = score_fn(w @ b) - score_fn(w @ a)
+    return out
+
+
+def approx_randomization(
+    stats_a: np.ndarray,
+    stats_b: np.ndarray,
+    score_fn: Callable[[np.ndarray], np.ndarray],
+    R: int = 10000,
+    seed: Optional[int] = 42,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> Tuple[float, float]:
+    """Paired approximate randomization on corpus scores -> (observed delta, two-sided p).
+
+    Each trial swaps the two systems' outputs per item with probability 1/2;
+    p = (#{|delta'| >= |delta|} + 1) / (R + 1).
+    """
+    a = np.asarray(stats_a, dtype=np.float64)
+    b = np.asarray(stats_b, dtype=np.float64)
+    if a.shape != b.shape:
+        raise ValueError("stats_a/stats_b shape mismatch")
+    n = a.shape[0]
+    tot_a, tot_b = a.sum(axis=0), b.sum(axis=0)
+    observed = float(score_fn(tot_b[None, :])[0] - score_fn(tot_a[None, :])[0])
+    if R <= 0 or n == 0:
+        return observed, float("nan")
+    diff = b - a
+    rng = np.random.default_rng(seed)
+    rows = chunk_rows(n, max_bytes)
+    hits = 0
+    for s in range(0, R, rows):
+        e = min(R, s + rows)
+        swap = rng.integers(0, 2, size=(e - s, n)).astype(np.float64) @ diff
+        d = score_fn(tot_b[None, :] - swap) - score_fn(tot_a[None, :] + swap)
+        # 부동소수점 오차로 관측값과 같은 경우를 놓치지 않도록 약간의 여유를 둔다
+        hits += int((np.abs(d) >= abs(observed) - 1e-12).sum())
+    return observed, (hits + 1) / (R + 1)
+
+
+def _self_check() -> None:
+    """Same seed -> bit-identical resamples for any workers / max_bytes."""
+    x = np.random.default_rng(0).normal(size=(2, 257))
+    ref = bootstrap_means(x, B=2500, seed=7, workers=1)
+    for kw in ({"workers": 4}, {"workers": 1, "max_bytes": 1 << 14}, {"workers": 3, "max_bytes": 1 << 12}):
+        got = bootstrap_means(x, B=2500, seed=7, **kw)
+        if not np.array_equal(ref, got):
+            raise SystemExit(f"[FAIL] bootstrap_means differs for {kw}")
+    print(f"[OK] bootstrap_means identical for workers=1/3/4 and max_bytes variants; CI={percentile_ci(ref)}")
+
+
+if __name__ == "__main__":
+    _self_check()
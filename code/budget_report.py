@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from compliance_rules import evaluate_item
+from gen_budget import read_item_meta
+from jsonl_reader import read_jsonl_map
+
+# --budget 로 생성한 결과에서 (1) 디코드 토큰 절약량, (2) 예산 때문에 잘린 항목을 집계한다.
+# --baseline(예산 없이 생성한 같은 프롬프트 결과)이 있으면 절약량은 실제 토큰 차이이고,
+# "통과하던 답을 예산이 잘라 떨어뜨린" 항목을 정확히 찾는다. 없으면 잘리고 실패한 항목을 의심 목록으로 낸다.
+
+
+def _read_jsonl(path: Path) -> Dict[str, Dict[str, Any]]:
+    return read_jsonl_map(path, keys=("id",))
+
+
+def _text(o: Dict[str, Any]) -> str:
+    return str(o.get("output") or o.get("output_text") or "")
+
+
+def _tokens(o: Dict[str, Any]) -> Optional[int]:
+    t = o.get("tokens")
+    if t is None and isinstance(o.get("timing"), dict):
+        t = o["timing"].get("tokens")
+    return int(t) if isinstance(t, (int, float)) else None
+
+
+def _num_predict(o: Dict[str, Any]) -> Optional[int]:
+    b = o.get("budget") or o.get("decoding") or {}
+    n = b.get("num_predict")
+    return int(n) if isinstance(n, (int, float)) else None
+
+
+def _done_reason(o: Dict[str, Any]) -> Optional[str]:
+    return o.get("done_reason") or (o.get("timing") or {}).get("done_reason")
+
+
+def build_rows(results: Dict[str, Dict[str, Any]], meta: Dict[str, Any],
+               baseline: Optional[Dict[str, Dict[str, Any]]], default_cap: int) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    for pid, o in results.items():
+        scenario, params = meta.get(pid, (str(o.get("scenario") or ""), {}))
+        passed = evaluate_item(scenario, _text(o), params)[0] if scenario else None
+        n = _num_predict(o)
+        row: Dict[str, Any] = {
+            "id": pid, "scenario": scenario, "num_predict": n, "tokens": _tokens(o),
+            "done_reason": _done_reason(o), "truncated": _done_reason(o) == "length",
+            "passed": passed,
+            "cap_reduction": (default_cap - n) if n is not None and n < default_cap else 0,
+        }
+        b = (baseline or {}).get(pid)
+        if b is not None:
+            bt = _tokens(b)
+            row["baseline_tokens"] = bt
+            row["tokens_saved"] = (bt - row["tokens"]) if bt is not None and row["tokens"] is not None else None
+            row["baseline_passed"] = evaluate_item(scenario, _text(b), params)[0] if scenario else None
+        rows.append(row)
+    return rows
+
+
+def summarize(rows: List[Dict[str, Any]], has_baseline: bool) -> Dict[str, Any]:
+    by: Dict[str, Dict[str, Any]] = {}
+    for r in rows:
+        s = by.setdefault(r["scenario"] or "(none)", {"n": 0, "budgeted": 0, "cap_reduction": 0,
+                                                      "tokens": 0, "tokens_saved": 0,
+                                                      "truncated": 0, "truncated_pass": 0, "truncated_fail": 0,
+                                                      "broke_passing": 0})
+        s["n"] += 1
+        s["budgeted"] += int(r["num_predict"] is not None)
+        s["cap_reduction"] += r["cap_reduction"]
+        s["tokens"] += r["tokens"] or 0
+        s["tokens_saved"] += r.get("tokens_saved") or 0
+        if r["truncated"]:
+            s["truncated"] += 1
+            s["truncated_pass"] += int(r["passed"] is True)
+            s["truncated_fail"] += int(r["passed"] is False)
+            s["broke_passing"] += int(has_baseline and r.get("baseline_passed") is True and r["passed"] is False)
+    total = {k: sum(v[k] for v in by.values()) for k in next(iter(by.values()), {})}
+    return {"by_scenario": by, "total": total}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Decode tokens saved and truncations for budgeted (--budget) runs")
+    ap.add_argument("--results", required=True, help="budgeted run JSONL (infer_via_ollama / run_langchain_experiment)")
+    ap.add_argument("--prompts", required=True, help="prompts CSV or manifest JSON with scenario/param")
+    ap.add_argument("--id-column", default="id", dest="id_column")
+    ap.add_argument("--baseline", default=None, help="same prompts generated without --budget (optional)")
+    ap.add_argument("--default-cap", type=int, default=1024, dest="default_cap",
+                    help="global max_tokens the budget replaces (configs/experiments.yaml)")
+    ap.add_argument("--out", required=True, help="per-item CSV; summary JSON goes next to it")
+    args = ap.parse_args()
+
+    results = _read_jsonl(Path(args.results))
+    baseline = _read_jsonl(Path(args.baseline)) if args.baseline else None
+    meta = read_item_meta(args.prompts, id_col=args.id_column)
+    rows = build_rows(results, meta, baseline, args.default_cap)
+    summary = summarize(rows, baseline is not None)
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    cols = ["id", "scenario", "num_predict", "tokens", "done_reason", "truncated", "passed", "cap_reduction"]
+    if baseline is not None:
+        cols += ["baseline_tokens", "tokens_saved", "baseline_passed"]
+    with out.open("w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=cols, extrasaction="ignore")
+        w.writeheader()
+        w.writerows(rows)
+    out.with_suffix(".json").write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    t = summary["total"]
+    print(f"[OK] {out} (n={len(rows)})")
+    print(f"[BUDGET] cap_reduction={t.get('cap_reduction', 0)} tokens"
+          + (f" tokens_saved={t.get('tokens_saved', 0)} (vs baseline)" if baseline is not None else ""))
+    print(f"[BUDGET] truncated={t.get('truncated', 0)} (pass={t.get('truncated_pass', 0)}, "
+          f"fail={t.get('truncated_fail', 0)})")
+    if baseline is not None:
+        broke = [r for r in rows if r["truncated"] and r.get("baseline_passed") is True and r["passed"] is False]
+        label = "budget truncated a passing answer"
+    else:
+        broke = [r for r in rows if r["truncated"] and r["passed"] is False]
+        label = "truncated and failing (rerun with --baseline to confirm)"
+    if broke:
+        print(f"[WARN] {len(broke)} item(s) {label}:")
+        for r in broke[:50]:
+            print(f" - {r['id']} scenario={r['scenario']} num_predict={r['num_predict']} tokens={r['tokens']}")
+
+
+if __name__ == "__main__":
+    main()
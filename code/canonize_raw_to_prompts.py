@@ -4,6 +4,8 @@ from pathlib import Path
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
+from jsonl_reader import read_jsonl
+
 ROOT = Path(__file__).resolve().parents[1]
 RAWDIR = ROOT / "results" / "raw"
 
@@ -80,18 +82,7 @@ def read_id_set(csv_path: Path, id_col: str) -> list[str]:
     return ids
 
 def load_jsonl(fp: Path) -> List[Dict[str, Any]]:
-    if not fp.exists():
-        return []
-    out: List[Dict[str, Any]] = []
-    for ln in fp.read_text(encoding="utf-8").splitlines():
-        ln = ln.strip()
-        if not ln:
-            continue
-        try:
-            out.append(json.loads(ln))
-        except Exception:
-            pass
-    return out
+    return read_jsonl(fp, missing_ok=True)
 
 def write_jsonl(fp: Path, recs: List[Dict[str, Any]]) -> None:
     fp.parent.mkdir(parents=True, exist_ok=True)
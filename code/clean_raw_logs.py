@@ -1,18 +1,13 @@
 import json
 from pathlib import Path
 
+from jsonl_reader import iter_jsonl
+
 ROOT = Path(__file__).resolve().parents[1]
 RAW = ROOT / "results" / "raw"
 
 def load_jsonl(fp: Path):
-    for ln in fp.read_text(encoding="utf-8").splitlines():
-        ln = ln.strip()
-        if not ln:
-            continue
-        try:
-            yield json.loads(ln)
-        except:
-            continue
+    return iter_jsonl(fp)
 
 def write_jsonl(fp: Path, records):
     fp.write_text("\n".join(json.dumps(r, ensure_ascii=False) for r in records) + "\n", encoding="utf-8")
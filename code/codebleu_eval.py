@@ -1,7 +1,9 @@
 from __future__ import annotations
-import argparse, json, math
+import argparse, json
 from pathlib import Path
-from collections import Counter, defaultdict
+from collections import defaultdict
+
+from score_engine import bleu_from_stats, bleu_stats
 
 POSS_KEYS = ["output_text","text","output","generation"]
 
@@ -12,26 +14,6 @@ def read_reference(path: str) -> dict[str, str]:
         ref[str(obj["id"])] = str(obj["reference_text"])
     return ref
 
-def ngrams(tokens: list[str], n:int) -> Counter:
-    if len(tokens) < n: return Counter()
-    return Counter(tuple(tokens[i:i+n]) for i in range(len(tokens)-n+1))
-
-def bleu4(ref: str, cand: str) -> float:
-    rt = ref.split()
-    ct = cand.split()
-    if len(ct) == 0:
-        return 0.0
-    bp = 1.0 if len(ct) >= len(rt) else math.exp(1 - len(rt)/max(len(ct),1))
-    log_sum = 0.0
-    for n in range(1,5):
-        c_ngr = ngrams(ct, n)
-        r_ngr = ngrams(rt, n)
-        overlap = sum(min(c_ngr[g], r_ngr[g]) for g in c_ngr)
-        prec = (overlap + 1) / (sum(c_ngr.values()) + 1)
-        log_sum += math.log(prec)
-    geo = math.exp(log_sum/4.0)
-    return bp * geo
-
 def load_outputs(dirpath: str) -> list[dict]:
     items = []
     for p in Path(dirpath).glob("*.json"):
@@ -46,14 +28,14 @@ def load_outputs(dirpath: str) -> list[dict]:
 def evaluate(inputs_dir: str, reference_path: str, out_path: str) -> None:
     ref = read_reference(reference_path)
     outs = load_outputs(inputs_dir)
+    sids = [str(o.get("id")) for o in outs]
+    hyps = [str(o.get("output_text","")) for o in outs]
+    # 항목별 BLEU-4 (공백 토큰, n-gram 정밀도 +1 smoothing, brevity penalty)를 전체 열에 대해 한 번에 계산
+    scores = bleu_from_stats(bleu_stats(hyps, [ref.get(s, "") for s in sids], tokenize="whitespace"), smooth="plus1")
     per_item = []
     by_group = defaultdict(list)
-    for o in outs:
-        sid = str(o.get("id"))
-        hyp = str(o.get("output_text",""))
+    for o, sid, score in zip(outs, sids, scores.tolist()):
         grp = str(o.get("prompt_type","unknown"))
-        gt = ref.get(sid, "")
-        score = bleu4(gt, hyp)
         per_item.append({"id": sid, "prompt_type": grp, "bleu4": score})
         by_group[grp].append(score)
     summary = {
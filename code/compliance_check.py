@@ -9,6 +9,8 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+from term_matcher import matcher_for_terms
+
 def read_text_any(path: Path) -> str:
     for enc in ("utf-8-sig", "utf-8", "cp949", "mbcs", "euc-kr", "latin1"):
         try:
@@ -80,6 +82,7 @@ class VerifyConfig:
 class FallbackVerifier:
     def __init__(self, cfg: VerifyConfig):
         self.terms = load_forbid_terms(cfg.forbid_terms_path)
+        self.matcher = matcher_for_terms(self.terms)
         self.schema = None
         self.validator = None
         if cfg.schema_path and cfg.schema_path.exists():
@@ -93,10 +96,8 @@ class FallbackVerifier:
 
     def check(self, text: str) -> Tuple[bool, List[str]]:
         reasons: List[str] = []
-        low = (text or "").lower()
-        for t in self.terms:
-            if t.lower() in low:
-                reasons.append(f"forbidden:{t}")
+        for t in self.matcher.found_terms(text or ""):
+            reasons.append(f"forbidden:{t}")
 
         if self.validator is not None:
             try:
@@ -150,6 +151,7 @@ def heuristic_main(
     out_csv: Path,
 ) -> None:
     forbid_terms = load_forbid_terms(forbid_terms_path)
+    forbid_matcher = matcher_for_terms(forbid_terms)
     apply_map = load_apply_map(apply_from_csv, id_col=id_col) if apply_from_csv else {}
 
     rows: List[Dict[str, Any]] = []
@@ -167,7 +169,7 @@ def heuristic_main(
             v_bullets_min = (count_bullets(out) >= bullets_min_n) if needs["needs_bullets"] is True else None
             v_limit_chars = (len(out) <= limit_chars) if needs["needs_length"] is True else None
             v_forbid_terms = (
-                (all(t.lower() not in (out or "").lower() for t in forbid_terms) if forbid_terms else None)
+                (forbid_matcher.search(out or "") is None if forbid_terms else None)
                 if needs["needs_forbid"] is True
                 else None
             )
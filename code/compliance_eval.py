@@ -2,7 +2,12 @@
 from __future__ import annotations
 import argparse, csv, json, sys, re
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Union
+
+from jsonl_reader import iter_jsonl
+from term_matcher import TermMatcher, literal_alternatives
+
+RulesPattern = Union[re.Pattern, TermMatcher]
 
 def _try_scipy_beta():
     try:
@@ -106,17 +111,13 @@ def parse_params(s: str) -> Dict[str, str]:
 
 def _load_jsonl_map(p: Path, text_keys=("output","text","generation","output_text")) -> Dict[str,str]:
     m: Dict[str, str] = {}
-    with p.open(encoding="utf-8") as f:
-        for ln in f:
-            if not ln.strip():
-                continue
-            o = json.loads(ln)
-            pid = str(o.get("id") or o.get("prompt_id") or o.get("name"))
-            txt = ""
-            for k in text_keys:
-                if o.get(k) is not None:
-                    txt = o[k]; break
-            m[pid] = normalize_text(txt)
+    for o in iter_jsonl(p, fields=("id", "prompt_id", "name") + tuple(text_keys), errors="raise"):
+        pid = str(o.get("id") or o.get("prompt_id") or o.get("name"))
+        txt = ""
+        for k in text_keys:
+            if o.get(k) is not None:
+                txt = o[k]; break
+        m[pid] = normalize_text(txt)
     return m
 
 def load_outputs(inputs_path: Path) -> List[Dict]:
@@ -148,13 +149,17 @@ def load_outputs(inputs_path: Path) -> List[Dict]:
             return items
     raise FileNotFoundError(f"출력 파일/디렉터리를 찾을 수 없습니다: {inputs_path}")
 
-def load_rules_pattern(rules_dir: Optional[Path]) -> Optional[re.Pattern]:
+def load_rules_pattern(rules_dir: Optional[Path]) -> Optional[RulesPattern]:
+    """rules/forbidden.txt 가 리터럴 용어의 '|'/줄바꿈 나열이면 TermMatcher, 아니면 정규식 (IGNORECASE)."""
     if not rules_dir:
         return None
     fp = rules_dir / "forbidden.txt"
     if fp.exists():
         pat = fp.read_text(encoding="utf-8").strip()
         if pat:
+            terms = literal_alternatives(pat)
+            if terms:
+                return TermMatcher(terms)
             return re.compile(pat, flags=re.IGNORECASE)
     return None
 
@@ -232,7 +237,7 @@ def check_bullets(text: str, params: Dict, default_min: int = 3) -> tuple[bool,
     bullet_lines = [ln for ln in lines if _BULLET.match(ln)]
     return (len(bullet_lines) >= n, f"bullets={len(bullet_lines)} required>={n}")
 
-def check_forbid_terms(text: str, params: Dict, rules_pat: Optional[re.Pattern]) -> tuple[bool, str]:
+def check_forbid_terms(text: str, params: Dict, rules_pat: Optional[RulesPattern]) -> tuple[bool, str]:
     if (params.get("forbid") or "").lower() == "digits":
         ok = re.search(r"[0-9]", text) is None
         return (ok, "no_digits_found" if ok else "digits_present")
@@ -241,7 +246,7 @@ def check_forbid_terms(text: str, params: Dict, rules_pat: Optional[re.Pattern])
         return (ok, "regex_clean" if ok else "regex_violation")
     return (True, "ok")
 
-def evaluate_item(scenario: str, text: str, params: Dict, *, schema: Optional[dict], rules_pat: Optional[re.Pattern], default_min_bullets: int, fallback_limit: Optional[int]) -> tuple[bool, str]:
+def evaluate_item(scenario: str, text: str, params: Dict, *, schema: Optional[dict], rules_pat: Optional[RulesPattern], default_min_bullets: int, fallback_limit: Optional[int]) -> tuple[bool, str]:
     s = (scenario or "").lower().strip()
     if s == "format-json":
         return check_format_json(text, params, schema, fallback_limit)
@@ -88,6 +88,11 @@ def load_summary(path: str) -> pd.DataFrame:
     if not p.exists():
         raise FileNotFoundError(f"summary not found: {p}")
 
+    if p.is_dir() or p.suffix == ".parquet":
+        # metrics_dataset (Parquet) — pyarrow 는 이 경우에만 필요하다
+        from metrics_dataset import read_any
+        return _normalize_df(read_any(p))
+
     obj = _load_as_json(p)
     if obj is not None:
         if isinstance(obj, list):
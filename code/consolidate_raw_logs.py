@@ -2,6 +2,8 @@ import json
 from pathlib import Path
 from datetime import datetime
 
+from jsonl_reader import iter_jsonl
+
 ROOT = Path(__file__).resolve().parents[1]
 RAWDIR = ROOT / "results" / "raw"
 ARCH = RAWDIR / "_archive"
@@ -15,15 +17,7 @@ def parse_ts(s: str) -> float:
         return 0.0
 
 def load_jsonl(fp: Path):
-    text = fp.read_text(encoding="utf-8")
-    for ln in text.splitlines():
-        ln = ln.strip()
-        if not ln:
-            continue
-        try:
-            yield json.loads(ln)
-        except Exception:
-            continue
+    return iter_jsonl(fp)
 
 def write_jsonl(fp: Path, records):
     fp.write_text("\n".join(json.dumps(r, ensure_ascii=False) for r in records) + "\n", encoding="utf-8")
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from bootstrap import approx_randomization, paired_corpus_bootstrap, percentile_ci
+from jsonl_reader import iter_jsonl
+from ref_store import add_ref_store_args, ref_store_from_args
+from score_engine import ScoreConfig, bleu_from_stats, chrf_from_stats, score_columns
+
+METRICS = ("bleu", "chrf")
+# 텍스트 쌍 파일 (build_wide_and_long_aggregates 의 per_item_pairs_wide.csv 등) 의 열 이름 후보
+REF_COLS = ("reference", "ref")
+GENERAL_COLS = ("base_prediction", "general_output", "base_output")
+INSTRUCTED_COLS = ("instr_prediction", "instructed_output")
+
+
+def _read_lines(path: str) -> List[str]:
+    return [ln.rstrip("\n") for ln in Path(path).read_text(encoding="utf-8").splitlines()]
+
+def read_pairs(path: str) -> Tuple[List[str], List[str], List[str]]:
+    """(refs, general hyps, instructed hyps) from a wide CSV/JSONL; rows without a reference are skipped."""
+    if str(path).endswith(".jsonl"):
+        rows = list(iter_jsonl(path))
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            rows = list(csv.DictReader(f))
+    if not rows:
+        return [], [], []
+    def col(names):
+        c = next((k for k in names if k in rows[0]), None)
+        if c is None:
+            raise SystemExit(f"{path}: none of {names} in columns {list(rows[0])}")
+        return c
+    rc, gc, ic = col(REF_COLS), col(GENERAL_COLS), col(INSTRUCTED_COLS)
+    text = lambda v: "" if v is None else str(v).strip()
+    keep = [r for r in rows if text(r.get(rc))]
+    return [text(r[rc]) for r in keep], [text(r.get(gc)) for r in keep], [text(r.get(ic)) for r in keep]
+
+def _score_fn(metric: str, cfg: ScoreConfig) -> Callable[[np.ndarray], np.ndarray]:
+    if metric == "bleu":
+        return lambda st: bleu_from_stats(st, cfg.bleu_smooth, cfg.bleu_effective_order)
+    return lambda st: chrf_from_stats(st, cfg.chrf_beta, cfg.chrf_order)
+
+def corpus_significance(
+    stats_g: np.ndarray,
+    stats_i: np.ndarray,
+    score_fn: Callable[[np.ndarray], np.ndarray],
+    B: int = 10000,
+    R: int = 10000,
+    alpha: float = 0.05,
+    seed: int = 42,
+) -> Dict[str, Any]:
+    """Corpus-level paired bootstrap CI + approximate-randomization p for instructed - general."""
+    g = float(score_fn(np.asarray(stats_g).sum(axis=0))[0])
+    i = float(score_fn(np.asarray(stats_i).sum(axis=0))[0])
+    boots = paired_corpus_bootstrap(stats_g, stats_i, score_fn, B=B, seed=seed)
+    lo, hi = percentile_ci(boots, alpha) if B > 0 else (float("nan"), float("nan"))
+    _, p_ar = approx_randomization(stats_g, stats_i, score_fn, R=R, seed=seed)
+    return {
+        "general": g,
+        "instructed": i,
+        "delta": i - g,
+        "ci_low": lo,
+        "ci_high": hi,
+        # 재표본에서 instructed 가 general 보다 낫지 않은 비율 (Koehn 2004 방식)
+        "p_boot": float((boots <= 0).mean()) if B > 0 else float("nan"),
+        "p_ar": p_ar,
+        "B": B,
+        "R": R,
+        "_boots": boots,
+    }
+
+def corpus_delta(refs: List[str], hyps_g: List[str], hyps_i: List[str], metric: str = "bleu",
+                 B: int = 10000, R: int = 0, alpha: float = 0.05, seed: int = 42,
+                 bleu_effective_order: bool = False, ref_store: Any = None) -> Dict[str, Any]:
+    """corpus_significance for one metric straight from texts (defaults match main; keeps "_boots")."""
+    cfg = ScoreConfig(bleu_effective_order=bleu_effective_order)
+    st_g = score_columns(hyps_g, refs, (metric,), cfg, ref_store=ref_store).stats[metric]
+    st_i = score_columns(hyps_i, refs, (metric,), cfg, ref_store=ref_store).stats[metric]
+    return corpus_significance(st_g, st_i, _score_fn(metric, cfg), B=B, R=R, alpha=alpha, seed=seed)
+
+def bleu_delta_figure(pairs_path: Optional[str], out_png: Path | str, B: int = 10000,
+                      seed: int = 42) -> Optional[Dict[str, Any]]:
+    """bleu_bootstrap_delta.png from the corpus-level paired bootstrap over a pairs file (read_pairs).
+
+    Returns the result (without "_boots"), or None with a [WARN] when the file is missing:
+    the figure is then not drawn at all rather than from per-item sentence BLEU means.
+    """
+    if not pairs_path or not Path(pairs_path).exists():
+        print(f"[WARN] pairs file not found ({pairs_path}); skipping {Path(out_png).name} "
+              "(corpus-level bootstrap needs reference / base / instructed texts)")
+        return None
+    refs, g, i = read_pairs(pairs_path)
+    if not refs:
+        print(f"[WARN] no rows with a reference in {pairs_path}; skipping {Path(out_png).name}")
+        return None
+    res = corpus_delta(refs, g, i, "bleu", B=B, seed=seed)
+    plot_delta_hist(res.pop("_boots"), res, "BLEU", Path(out_png))
+    res["n"] = len(refs)
+    return res
+
+def plot_delta_hist(boots: np.ndarray, res: Dict[str, Any], label: str, out_png: Path) -> None:
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(6, 3))
+    plt.hist(boots, bins=60, edgecolor="black", linewidth=0.3)
+    plt.axvline(0, color="k", linestyle="--", label="0")
+    plt.axvline(res["delta"], color="r", linestyle="-", label=f"corpus Δ={res['delta']:.3f}")
+    plt.xlabel(f"Δ corpus {label} (Instructed - Base)")
+    plt.title(f"Bootstrap Δ corpus {label} (B={res['B']}) 95% CI [{res['ci_low']:.3f}, {res['ci_high']:.3f}]")
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(out_png, dpi=300)
+    plt.close()
+    print("[OK] figure ->", out_png)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Paired corpus-level BLEU/chrF significance from sufficient statistics")
+    ap.add_argument("--refs", required=True, help="references .txt (one per line)")
+    ap.add_argument("--hyps-general", required=True, help="general hyps .txt (one per line)")
+    ap.add_argument("--hyps-instructed", required=True, help="instructed hyps .txt (one per line)")
+    ap.add_argument("--out", default="results/quantitative/corpus_bootstrap.json")
+    ap.add_argument("--figdir", help="write bleu_bootstrap_delta.png / chrf_bootstrap_delta.png here")
+    ap.add_argument("--B", type=int, default=10000, help="bootstrap resamples (0=off)")
+    ap.add_argument("--R", type=int, default=10000, help="approximate-randomization trials (0=off)")
+    ap.add_argument("--alpha", type=float, default=0.05)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--bleu-effective-order", action="store_true",
+                    help="effective-order corpus BLEU (metrics_sacre mode A); default matches mode B corpus")
+    add_ref_store_args(ap)
+    args = ap.parse_args(argv)
+
+    refs = _read_lines(args.refs)
+    g_lines = _read_lines(args.hyps_general)
+    i_lines = _read_lines(args.hyps_instructed)
+    if not (len(refs) == len(g_lines) == len(i_lines)):
+        raise SystemExit("refs/general/instructed 길이가 다릅니다.")
+
+    cfg = ScoreConfig(bleu_effective_order=args.bleu_effective_order)
+    store = ref_store_from_args(args)
+    res_g = score_columns(g_lines, refs, METRICS, cfg, ref_store=store)
+    res_i = score_columns(i_lines, refs, METRICS, cfg, ref_store=store)
+
+    out_obj: Dict[str, Any] = {"n": len(refs), "alpha": args.alpha, "seed": args.seed}
+    for m in METRICS:
+        res = corpus_significance(res_g.stats[m], res_i.stats[m], _score_fn(m, cfg),
+                                  B=args.B, R=args.R, alpha=args.alpha, seed=args.seed)
+        boots = res.pop("_boots")
+        out_obj[m] = res
+        print(f"[{m}] Δ={res['delta']:.4f} CI=[{res['ci_low']:.4f}, {res['ci_high']:.4f}] "
+              f"p_boot={res['p_boot']:.4g} p_ar={res['p_ar']:.4g}")
+        if args.figdir and args.B > 0:
+            Path(args.figdir).mkdir(parents=True, exist_ok=True)
+            plot_delta_hist(boots, res, m.upper() if m == "bleu" else "chrF",
+                            Path(args.figdir) / f"{m}_bootstrap_delta.png")
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(out_obj, ensure_ascii=False, indent=2), encoding="utf-8")
+    print("[OK] wrote", out)
+
+if __name__ == "__main__":
+    main()
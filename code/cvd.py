@@ -1,7 +1,15 @@
-import re, time, json, random, requests
+import re, time, json, random, threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 from typing import Dict, Any, List, Tuple, Optional
 from jsonschema import Draft7Validator
+from ollama_client import StreamStats, get_client, stream_generate
+from ollama_pool import HostPool
+from gen_cache import GenCache, cache_key
+from term_matcher import load_matcher
+from gen_budget import NO_BUDGET, Budget, plan_budget
+from stream_verify import StreamCheck, TermsCheck, TokenSavings, combine, scenario_check
 
 @dataclass
 class VerifyConfig:
@@ -13,8 +21,8 @@ class VerifyConfig:
 
 class Verifier:
     def __init__(self, cfg: VerifyConfig):
-        with open(cfg.forbidden_path, "r", encoding="utf-8") as f:
-            self.forbidden = [ln.strip() for ln in f if ln.strip()]
+        self.matcher = load_matcher(cfg.forbidden_path)
+        self.forbidden = self.matcher.terms
         with open(cfg.output_schema_path, "r", encoding="utf-8") as f:
             self.schema = json.load(f)
         self.validator = Draft7Validator(self.schema)
@@ -30,10 +38,8 @@ class Verifier:
     def check(self, output_text: str) -> Tuple[bool, List[str]]:
         reasons = []
 
-        low = output_text.lower()
-        for term in self.forbidden:
-            if term and term.lower() in low:
-                reasons.append(f"forbidden:{term}")
+        for term in self.matcher.found_terms(output_text):
+            reasons.append(f"forbidden:{term}")
 
         if len(output_text.strip()) < self.cfg.min_len:
             reasons.append("too_short")
@@ -52,57 +58,470 @@ class Verifier:
 
         return (len(reasons) == 0), reasons
 
+def _json_parses(text: str) -> bool:
+    try:
+        json.loads(text)
+        return True
+    except Exception:
+        return False
+
+class CancelGroup:
+    """Cancel flag shared by parallel candidates, plus their open HTTP responses.
+
+    cancel() sets the flag and closes every registered response from the calling
+    thread, so a loser stops at once instead of at its next chunk.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._open: List[Any] = []
+
+    def is_set(self) -> bool:
+        return self._event.is_set()
+
+    def register(self, resp: Any) -> None:
+        with self._lock:
+            if not self._event.is_set():
+                self._open.append(resp)
+                return
+        resp.close()
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._event.set()
+            opened, self._open = self._open, []
+        for r in opened:
+            try:
+                r.close()
+            except Exception:
+                pass
+
 class ModelClient:
-    def __init__(self, backend="ollama", model_name="llama3", temperature=0.2):
+    def __init__(self, backend="ollama", model_name="llama3", temperature=0.2, host: Optional[str]=None,
+                 stream: bool=False, pool: Optional[HostPool]=None):
+        """pool (ollama_pool.HostPool): spread requests over several hosts instead of `host`."""
         self.backend = backend
         self.model_name = model_name
         self.temperature = float(temperature)
+        self.host = host
+        self.stream = stream
+        self.pool = pool
+
+    def _call(self, fn):
+        if self.pool is not None:
+            return self.pool.call(fn)
+        return fn(get_client(self.host))
+
+    @contextmanager
+    def _client(self):
+        # 스트림은 도중에 다른 호스트로 넘길 수 없으므로 lease 하나로 끝까지 간다
+        if self.pool is None:
+            yield get_client(self.host)
+            return
+        with self.pool.lease() as ls:
+            yield ls.client
 
-    def generate(self, prompt: str, system: Optional[str]=None, max_tokens: int=512, timeout_s=120) -> str:
+    def _options(self, stop: Optional[List[str]], seed: Optional[int]=None,
+                 temperature: Optional[float]=None, num_predict: Optional[int]=None) -> Dict[str, Any]:
+        opts: Dict[str, Any] = {"temperature": self.temperature if temperature is None else float(temperature)}
+        if seed is not None:
+            opts["seed"] = int(seed)
+        if num_predict is not None:
+            opts["num_predict"] = int(num_predict)
+        if stop:
+            opts["stop"] = list(stop)
+        return opts
+
+    def generate(self, prompt: str, system: Optional[str]=None, max_tokens: int=512, timeout_s=120,
+                 fmt: Any=None, stop: Optional[List[str]]=None, num_predict: Optional[int]=None) -> str:
+        """fmt: Ollama `format` ("json" or a JSON schema dict) for constrained decoding.
+        num_predict: per-request decode cap (gen_budget)."""
         if self.backend == "ollama":
-            payload = {
-                "model": self.model_name,
-                "prompt": (system + "\n\n" + prompt) if system else prompt,
-                "options": {"temperature": self.temperature},
-                "stream": False
-            }
-            r = requests.post("http://localhost:11434/api/generate", json=payload, timeout=timeout_s)
-            r.raise_for_status()
-            data = r.json()
+            data = self._call(lambda c: c.generate(
+                self.model_name,
+                (system + "\n\n" + prompt) if system else prompt,
+                options=self._options(stop, num_predict=num_predict),
+                timeout=timeout_s,
+                format=fmt,
+            ))
             return data.get("response", "").strip()
         elif self.backend == "openai":
             raise NotImplementedError("OpenAI backend not implemented in this snippet.")
         else:
             return f"[DRY-RUN OUTPUT] {prompt[:120]}..."
 
+    def generate_stream(self, prompt: str, system: Optional[str]=None, max_tokens: int=512,
+                        timeout_s=120, fmt: Any=None, stop: Optional[List[str]]=None,
+                        num_predict: Optional[int]=None) -> Tuple[str, Dict[str, Any]]:
+        """Streaming generate; returns (text, {ttft_ms, itl_ms, tokens, eval_tps})."""
+        if self.backend != "ollama":
+            return self.generate(prompt, system=system, max_tokens=max_tokens, timeout_s=timeout_s,
+                                 fmt=fmt, stop=stop, num_predict=num_predict), {}
+        text, stats = self._call(lambda c: stream_generate(
+            c,
+            self.model_name,
+            (system + "\n\n" + prompt) if system else prompt,
+            options=self._options(stop, num_predict=num_predict),
+            timeout=timeout_s,
+            format=fmt,
+        ))
+        return text.strip(), stats
+
+    def generate_cancellable(self, prompt: str, system: Optional[str]=None, cancel: Optional[CancelGroup]=None,
+                             timeout_s=120, fmt: Any=None, stop: Optional[List[str]]=None,
+                             seed: Optional[int]=None, temperature: Optional[float]=None,
+                             check: Optional[StreamCheck]=None, num_predict: Optional[int]=None
+                             ) -> Tuple[str, Dict[str, Any], bool]:
+        """Streamed generate that stops once cancel is set; returns (text, stats, cancelled).
+
+        The open response is registered with cancel, so CancelGroup.cancel() closes it
+        and Ollama stops decoding the losing candidates instead of finishing them in
+        the background. With check,
+        the stream also stops once the output is certain to fail; stats["aborted"]
+        then holds the reason.
+        """
+        if self.backend != "ollama":
+            return self.generate(prompt, system=system, timeout_s=timeout_s, fmt=fmt, stop=stop,
+                                 num_predict=num_predict), {}, False
+        st = StreamStats()
+        with self._client() as client:
+            gen = client.generate_stream(
+                self.model_name,
+                (system + "\n\n" + prompt) if system else prompt,
+                options=self._options(stop, seed, temperature, num_predict),
+                timeout=timeout_s,
+                format=fmt,
+                on_response=cancel.register if cancel is not None else None,
+            )
+            cancelled = False
+            aborted = None
+            try:
+                for obj in gen:
+                    st.chunk(obj)
+                    if cancel is not None and cancel.is_set():
+                        cancelled = True
+                        break
+                    if check is not None and not obj.get("done"):
+                        aborted = check.feed(obj.get("response") or "")
+                        if aborted:
+                            break
+            except Exception:
+                # 다른 스레드가 응답을 닫으면 읽기가 예외로 끝난다
+                if cancel is None or not cancel.is_set():
+                    raise
+                cancelled = True
+            finally:
+                gen.close()
+        fields = st.fields()
+        if aborted:
+            fields["aborted"] = aborted
+        return st.text.strip(), fields, cancelled
+
 @dataclass
 class CVDConfig:
     constrained: bool = False
     use_verifier: bool = False
     self_correct: int = 0
+    # constrained=True 일 때: format_schema(JSON schema 경로) > verifier 의 schema > "json"
+    format_schema: Optional[str] = None
+    stop: Optional[List[str]] = None
+    # parallel>1: self-correct 대신 후보 k 개를 동시에 생성하고 먼저 통과한 것을 채택
+    # (후보 i>0 은 seed=parallel_seed+i, temperature+=i*parallel_temp_step, 마지막은 선택적으로 repair hint)
+    parallel: int = 0
+    parallel_seed: int = 1000
+    parallel_temp_step: float = 0.0
+    parallel_repair_hint: bool = False
+    # early_abort: 스트리밍 중 위반이 확정되면(금지어, 시나리오 길이/형식 초과) 생성을 끊고 바로 repair 로 넘어간다
+    # (뒤에 재시도가 없는 마지막 생성은 끊지 않는다)
+    early_abort: bool = False
+    # budget: 시나리오 제약(limit-words 등)에서 항목별 num_predict/stop 을 정한다 (gen_budget.plan_budget)
+    budget: bool = False
+    budget_margin: float = 1.5
+
+PARALLEL_REPAIR_HINT = ("\n\n[Repair hint] Follow every constraint in the instructions exactly "
+                        "(format, length, forbidden terms). Output only the answer.")
+
+# 디코더가 검증기 스키마 그대로 제약한 출력이 파싱되는데 이 사유만 남으면 self-correct 재생성을 하지 않는다
+FORMAT_REASONS = {"jsonschema_invalid"}
+
+def resolve_format(cvd_cfg: CVDConfig, verifier: Optional[Verifier]=None) -> Any:
+    """Ollama `format` for constrained mode: a JSON schema dict, or "json" (any valid JSON)."""
+    if cvd_cfg.format_schema:
+        with open(cvd_cfg.format_schema, "r", encoding="utf-8") as f:
+            return json.load(f)
+    if verifier is not None and getattr(verifier, "schema", None):
+        return verifier.schema
+    return "json"
 
 class CVDRunner:
-    def __init__(self, model: ModelClient, verifier: Optional[Verifier], cvd_cfg: CVDConfig):
+    def __init__(self, model: ModelClient, verifier: Optional[Verifier], cvd_cfg: CVDConfig,
+                 cache: Optional[GenCache]=None):
         self.model = model
         self.verifier = verifier
         self.cvd_cfg = cvd_cfg
+        self.cache = cache
+        self.fmt = resolve_format(cvd_cfg, verifier) if cvd_cfg.constrained else None
+        # format 이 검증기 스키마와 같을 때만 스키마 위반을 "디코더가 이미 강제한 것" 으로 본다
+        # ("json" 이나 다른 스키마로 제약했다면 repair 힌트 재생성이 여전히 도움이 될 수 있다)
+        self.schema_enforced = (isinstance(self.fmt, dict) and verifier is not None
+                                and self.fmt == getattr(verifier, "schema", None))
+        # constrained_parsed: 최종 출력이 그대로 JSON 으로 파싱된 항목 (JSON repair/추출 단계 불필요)
+        # self_correct_avoided: schema_enforced 라서 생략한 self-correct 재생성 횟수
+        self.stats = {"generations": 0, "cache_hits": 0, "self_correct_retries": 0,
+                      "constrained_parsed": 0, "self_correct_avoided": 0,
+                      "parallel_runs": 0, "parallel_cancelled": 0, "parallel_errors": 0,
+                      "early_aborts": 0, "tokens_saved_est": 0, "budget_truncated": 0}
+        self._stats_lock = threading.Lock()
+        self.savings = TokenSavings()
 
-    def run_once(self, prompt: str, system: Optional[str]) -> Dict[str, Any]:
-        t0 = time.time()
-        out = self.model.generate(prompt, system=system)
-        latency_ms = int((time.time() - t0) * 1000)
-        tokens = max(1, len(out.split()))
-        result = {"text": out, "latency_ms": latency_ms, "tokens": tokens}
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def plan(self, scenario: Optional[str]=None, params: Optional[Dict[str, str]]=None) -> Budget:
+        if not self.cvd_cfg.budget:
+            return NO_BUDGET
+        return plan_budget(scenario, params, margin=self.cvd_cfg.budget_margin)
+
+    def _gen_kw(self, budget: Budget=NO_BUDGET) -> Dict[str, Any]:
+        kw: Dict[str, Any] = {}
+        stop = list(budget.stop)
+        if self.cvd_cfg.constrained:
+            kw["fmt"] = self.fmt
+            stop = list(self.cvd_cfg.stop or []) + stop
+        if stop:
+            kw["stop"] = stop
+        if budget.num_predict is not None:
+            kw["num_predict"] = budget.num_predict
+        return kw
+
+    def _generate(self, prompt: str, system: Optional[str], budget: Budget=NO_BUDGET) -> Tuple[str, Dict[str, Any]]:
+        kw = self._gen_kw(budget)
+        if getattr(self.model, "stream", False):
+            return self.model.generate_stream(prompt, system=system, **kw)
+        return self.model.generate(prompt, system=system, **kw), {}
 
+    def _cache_params(self, seed: Optional[int]=None, temperature: Optional[float]=None,
+                      budget: Budget=NO_BUDGET) -> Dict[str, Any]:
+        params: Dict[str, Any] = {"temperature": self.model.temperature if temperature is None else float(temperature)}
+        if seed is not None:
+            params["seed"] = int(seed)
+        kw = self._gen_kw(budget)
+        if self.cvd_cfg.constrained:
+            params["format"] = self.fmt
+        if kw.get("stop"):
+            params["stop"] = kw["stop"]
+        if kw.get("num_predict") is not None:
+            params["num_predict"] = kw["num_predict"]
+        return params
+
+    def _mark_constrained(self, result: Dict[str, Any]) -> None:
+        if self.cvd_cfg.constrained:
+            result["constrained"] = True
+            result["parse_ok"] = _json_parses(result["text"])
+
+    def _verify(self, result: Dict[str, Any]) -> Dict[str, Any]:
         if self.cvd_cfg.use_verifier and self.verifier:
-            ok, reasons = self.verifier.check(out)
+            ok, reasons = self.verifier.check(result["text"])
             result["pass"] = ok
             result["reasons"] = reasons
         return result
 
-    def run_with_correction(self, prompt: str, system: Optional[str]) -> Dict[str, Any]:
-        res = self.run_once(prompt, system)
-        if not self.cvd_cfg.use_verifier or not self.verifier:
+    def stream_check(self, scenario: Optional[str]=None,
+                     params: Optional[Dict[str, str]]=None) -> Optional[StreamCheck]:
+        """Fresh early-abort check for one generation (None when early_abort is off or nothing applies)."""
+        if not self.cvd_cfg.early_abort:
+            return None
+        terms = None
+        if self.cvd_cfg.use_verifier and self.verifier is not None and len(self.verifier.matcher):
+            terms = TermsCheck(self.verifier.matcher)
+        return combine(terms, scenario_check(scenario, params))
+
+    def run_once(self, prompt: str, system: Optional[str], scenario: Optional[str]=None,
+                 params: Optional[Dict[str, str]]=None, last: bool=False) -> Dict[str, Any]:
+        """last: no retry follows, so the generation is not early-aborted (a cut-off
+        partial must never become the item's final text)."""
+        check = None if last else self.stream_check(scenario, params)
+        return self._run_variant(prompt, system, check=check, budget=self.plan(scenario, params))
+
+    def _run_variant(self, prompt: str, system: Optional[str], seed: Optional[int]=None,
+                     temperature: Optional[float]=None, cancel: Optional[CancelGroup]=None,
+                     check: Optional[StreamCheck]=None, budget: Budget=NO_BUDGET) -> Dict[str, Any]:
+        """One generation (+ cache + verify). seed/temperature override the model defaults;
+        with cancel the generation is streamed and abandoned once cancel is set; with
+        check it is streamed and abandoned once the output is certain to fail; budget
+        caps num_predict and adds stop sequences."""
+        key = None
+        if self.cache is not None:
+            t_lookup = time.time()
+            key = cache_key(f"{self.model.backend}:{self.model.model_name}", prompt,
+                            self._cache_params(seed, temperature, budget), system=system)
+            hit = self.cache.get(key)
+            if hit is not None:
+                self._count("cache_hits")
+                result = {"text": hit["output"], "latency_ms": int((time.time() - t_lookup) * 1000),
+                          "cached_latency_ms": hit.get("latency_ms"),
+                          "tokens": max(1, len(hit["output"].split())), "cached": True}
+                self._mark_constrained(result)
+                return self._verify(result)
+
+        t0 = time.time()
+        cancelled = False
+        if cancel is not None or check is not None:
+            out, stats, cancelled = self.model.generate_cancellable(
+                prompt, system=system, cancel=cancel, seed=seed, temperature=temperature, check=check,
+                **self._gen_kw(budget))
+        else:
+            out, stats = self._generate(prompt, system, budget)
+        self._count("generations")
+        latency_ms = int((time.time() - t0) * 1000)
+        tokens = max(1, len(out.split()))
+        result = {"text": out, "latency_ms": latency_ms, "tokens": tokens}
+        result.update({k: v for k, v in stats.items() if v is not None})
+        if cancelled:
+            # 중간에 끊긴 후보는 캐시/검증하지 않는다
+            self._count("parallel_cancelled")
+            result["cancelled"] = True
+            return result
+        aborted = result.pop("aborted", None)
+        if aborted:
+            # 위반이 확정된 부분 출력: 캐시하지 않고 그 사유로 바로 실패 처리한다
+            saved = self.savings.abort(stats.get("tokens"))
+            self._count("early_aborts")
+            if saved:
+                self._count("tokens_saved_est", saved)
+            result.update({"pass": False, "reasons": [aborted], "early_abort": aborted,
+                           "tokens_at_abort": stats.get("tokens"), "tokens_saved_est": saved})
+            return result
+        if check is not None:
+            self.savings.observe(stats.get("tokens"))
+        if budget != NO_BUDGET:
+            out = result["text"] = budget.finish(out)
+            result["budget"] = budget.to_dict()
+            if stats.get("done_reason") == "length":
+                # 예산에서 잘린 출력: 통과했더라도 예산이 너무 빡빡했을 수 있다
+                self._count("budget_truncated")
+                result["budget_truncated"] = True
+        self._mark_constrained(result)
+        if key is not None:
+            self.cache.put(key, out, model=self.model.model_name, latency_ms=latency_ms)
+        return self._verify(result)
+
+    def _parallel_variants(self, prompt: str) -> List[Dict[str, Any]]:
+        cfg = self.cvd_cfg
+        k = max(1, cfg.parallel)
+        variants: List[Dict[str, Any]] = [{"strategy": "base", "prompt": prompt, "seed": None, "temperature": None}]
+        for i in range(1, k):
+            v = {"strategy": f"seed:{cfg.parallel_seed + i}", "prompt": prompt,
+                 "seed": cfg.parallel_seed + i, "temperature": None}
+            if cfg.parallel_temp_step:
+                v["temperature"] = round(self.model.temperature + i * cfg.parallel_temp_step, 4)
+                v["strategy"] += f",temp:{v['temperature']}"
+            variants.append(v)
+        if cfg.parallel_repair_hint and k > 1:
+            variants[-1]["prompt"] = prompt + PARALLEL_REPAIR_HINT
+            variants[-1]["strategy"] += ",repair_hint"
+        return variants
+
+    def run_parallel(self, prompt: str, system: Optional[str], scenario: Optional[str]=None,
+                     params: Optional[Dict[str, str]]=None) -> Dict[str, Any]:
+        """Generate cvd_cfg.parallel candidates concurrently; return the first that passes
+        the verifier and cancel the rest. If none passes, the base candidate is returned.
+
+        Returns as soon as a winner is known: the losers' responses are closed from this
+        thread and their threads are not waited for (still-queued ones see the flag once
+        Ollama answers). Unfinished losers are reported as cancelled with no latency.
+        A candidate that raises counts as failed ({"error": ..., "pass": False}) and the
+        others are still awaited; only when every candidate raised is the error re-raised.
+
+        parallel_winner: strategy of the returned candidate. latency_saved_ms: lower bound
+        on the time saved against the serial loop, i.e. (base latency + winner latency)
+        - wall time when the base candidate failed (serial would have needed a retry);
+        0 when the base candidate won; None when base was cancelled before finishing.
+        """
+        variants = self._parallel_variants(prompt)
+        cancel = CancelGroup()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(variants)
+        errors: Dict[int, BaseException] = {}
+        winner: Optional[int] = None
+        self._count("parallel_runs")
+        t0 = time.time()
+        ex = ThreadPoolExecutor(max_workers=len(variants))
+        try:
+            # base 는 아무도 통과하지 못했을 때 반환되므로 early-abort 하지 않는다
+            futs = {ex.submit(self._run_variant, v["prompt"], system, v["seed"], v["temperature"], cancel,
+                              self.stream_check(scenario, params) if i else None, self.plan(scenario, params)): i
+                    for i, v in enumerate(variants)}
+            for fut in as_completed(futs):
+                i = futs[fut]
+                try:
+                    res = fut.result()
+                except Exception as e:
+                    # 한 후보의 HTTP 오류/타임아웃이 항목 전체를 실패시키지 않도록 기록만 하고 나머지를 기다린다
+                    errors[i] = e
+                    results[i] = {"error": f"{type(e).__name__}: {e}", "pass": False}
+                    self._count("parallel_errors")
+                    continue
+                results[i] = res
+                if not res.get("cancelled") and res.get("pass", True):
+                    winner = i
+                    break
+            wall_ms = int((time.time() - t0) * 1000)
+        finally:
+            cancel.cancel()
+            ex.shutdown(wait=False, cancel_futures=True)
+
+        if len(errors) == len(variants):
+            raise errors[0]
+        if winner is not None:
+            pick = winner
+        else:
+            # 통과한 후보가 없으면 base, base 가 오류였으면 오류 없이 끝난 첫 후보
+            pick = min(i for i in range(len(variants)) if i not in errors)
+        out = dict(results[pick])
+        if out.get("cancelled"):
+            # base 가 끊겼는데 통과한 후보도 없는 경우는 없다 (통과한 후보가 있을 때만 cancel)
+            out.pop("cancelled")
+        base = results[0]
+        if winner == 0:
+            saved = 0
+        elif base is None or base.get("cancelled") or 0 in errors:
+            saved = None
+        elif winner is None:
+            saved = 0
+        else:
+            saved = max(0, base["latency_ms"] + results[winner]["latency_ms"] - wall_ms)
+        out["parallel_winner"] = variants[pick]["strategy"] if winner is not None else None
+        out["parallel_wall_ms"] = wall_ms
+        out["latency_saved_ms"] = saved
+        out["candidates"] = []
+        for v, r in zip(variants, results):
+            c = {"strategy": v["strategy"], "latency_ms": r.get("latency_ms") if r else None,
+                 "pass": r.get("pass") if r else None, "cancelled": r is None or bool(r.get("cancelled"))}
+            if r and "error" in r:
+                c["error"] = r["error"]
+            out["candidates"].append(c)
+        return out
+
+    def run_with_correction(self, prompt: str, system: Optional[str], scenario: Optional[str]=None,
+                            params: Optional[Dict[str, str]]=None) -> Dict[str, Any]:
+        """scenario/params (compliance_rules) feed the early-abort check and the decode
+        budget; the final pass/fail still comes from the verifier."""
+        if self.cvd_cfg.parallel > 1 and self.cvd_cfg.use_verifier and self.verifier:
+            res = self.run_parallel(prompt, system, scenario, params)
+        else:
+            res = self._correct(prompt, system, scenario, params)
+        if res.get("parse_ok"):
+            self._count("constrained_parsed")
+        return res
+
+    def _correct(self, prompt: str, system: Optional[str], scenario: Optional[str]=None,
+                 params: Optional[Dict[str, str]]=None) -> Dict[str, Any]:
+        """run_once, then up to cvd_cfg.self_correct repair-hinted retries while the verifier fails
+        (none once a schema_enforced output parses and only fails the schema: self_correct_avoided)."""
+        res = self.run_once(prompt, system, scenario, params, last=self.cvd_cfg.self_correct <= 0)
+        if (not self.cvd_cfg.use_verifier or not self.verifier) and not res.get("early_abort"):
             return res
 
         if res.get("pass", True):
@@ -110,10 +529,24 @@ class CVDRunner:
 
         attempt = 0
         cur = res
-        while attempt < self.cvd_cfg.self_correct and not cur["pass"]:
+        aborts = [res] if res.get("early_abort") else []
+        while attempt < self.cvd_cfg.self_correct and not cur.get("pass", True):
+            if self.schema_enforced and cur.get("parse_ok") and set(cur.get("reasons", [])) <= FORMAT_REASONS:
+                # 같은 스키마로 다시 제약해 생성해도 얻을 것이 없다: 남은 재시도를 건너뛰고 센다
+                self._count("self_correct_avoided", self.cvd_cfg.self_correct - attempt)
+                cur["self_correct_skipped"] = True
+                break
             attempt += 1
+            self._count("self_correct_retries")
             reason = "; ".join(cur.get("reasons", [])) or "violation"
             repair_inst = f"\n\n[Repair hint] The output failed: {reason}. Fix and re-output. Keep it concise."
-            next_out = self.run_once(prompt + repair_inst, system)
+            next_out = self.run_once(prompt + repair_inst, system, scenario, params,
+                                     last=attempt >= self.cvd_cfg.self_correct)
             cur = next_out
+            if cur.get("early_abort"):
+                aborts.append(cur)
+        if aborts:
+            # 항목 단위 기록: 끊긴 시도들의 사유와 절약 토큰 추정치 합
+            cur["early_aborts"] = [a["early_abort"] for a in aborts]
+            cur["tokens_saved_est"] = sum(a.get("tokens_saved_est") or 0 for a in aborts)
         return cur
\ No newline at end of file
@@ -1,38 +1,25 @@
 from __future__ import annotations
-import json, argparse
+import argparse
 from pathlib import Path
 from datetime import timedelta
 import csv
 
+from jsonl_reader import iter_jsonl
+
 ROOT = Path(__file__).resolve().parents[1]
 RAW  = ROOT / "results" / "raw"
 PROM = ROOT / "prompts" / "prompts.csv"
 
 def read_latencies(fp: Path):
     xs=[]
-    if not fp.exists(): return xs
-    for ln,s in enumerate(fp.read_text(encoding="utf-8-sig", errors="replace").splitlines(),1):
-        s=s.strip()
-        if not s: continue
-        try:
-            rec=json.loads(s)
-            t=rec.get("timing") or {}
-            ms=t.get("latency_ms")
-            if isinstance(ms,(int,float)): xs.append(float(ms))
-        except: pass
+    for rec in iter_jsonl(fp, fields=("timing",), missing_ok=True):
+        t=rec.get("timing") or {}
+        ms=t.get("latency_ms") if isinstance(t,dict) else None
+        if isinstance(ms,(int,float)): xs.append(float(ms))
     return xs
 
 def ids_from_jsonl(fp: Path):
-    ids=set()
-    if not fp.exists(): return ids
-    for s in fp.read_text(encoding="utf-8-sig", errors="replace").splitlines():
-        s=s.strip()
-        if not s: continue
-        try:
-            rec=json.loads(s)
-            if "id" in rec: ids.add(str(rec["id"]))
-        except: pass
-    return ids
+    return {str(rec["id"]) for rec in iter_jsonl(fp, fields=("id",), missing_ok=True) if "id" in rec}
 
 def all_ids_from_csv(csv_path: Path, id_col="id"):
     ids=[]
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import csv
+import json
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from compliance_rules import parse_params
+
+# 시나리오 제약에서 나온 생성 예산. 토큰 수는 보수적으로 잡는다(한국어는 단어당 토큰이 많다):
+# 단어당 3, 글자당 1, bullet 당 64, JSON key/리스트 항목당 32 토큰 × margin + min_tokens.
+TOKENS_PER_WORD = 3.0
+TOKENS_PER_CHAR = 1.0
+TOKENS_PER_BULLET = 64
+TOKENS_PER_ITEM = 32
+
+
+@dataclass(frozen=True)
+class Budget:
+    """Per-request decode budget: num_predict cap plus stop sequences.
+
+    Ollama drops the matched stop sequence from the output, so `close` is the
+    part of it that belongs to the answer (e.g. the closing brace of a JSON
+    object) and finish() puts it back.
+    """
+    num_predict: Optional[int] = None
+    stop: Tuple[str, ...] = ()
+    close: str = ""
+
+    def options(self) -> Dict[str, Any]:
+        opts: Dict[str, Any] = {}
+        if self.num_predict is not None:
+            opts["num_predict"] = self.num_predict
+        if self.stop:
+            opts["stop"] = list(self.stop)
+        return opts
+
+    def finish(self, text: str) -> str:
+        """Restore `close` when the output only parses with it (cut at the stop sequence)."""
+        if not self.close or not text:
+            return text
+        t = text.rstrip()
+        if _parses(t):
+            return text
+        return t + self.close if _parses(t + self.close) else text
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"num_predict": self.num_predict, "stop": list(self.stop)}
+
+
+NO_BUDGET = Budget()
+
+
+def _parses(text: str) -> bool:
+    try:
+        json.loads(text)
+        return True
+    except Exception:
+        return False
+
+
+def _int(params: Dict[str, str], key: str) -> int:
+    try:
+        return int(params.get(key, "0"))
+    except Exception:
+        return 0
+
+
+def plan_budget(scenario: Optional[str], params: Optional[Dict[str, str]], margin: float = 1.5,
+                min_tokens: int = 16, cap: Optional[int] = None) -> Budget:
+    """Budget for one compliance_rules scenario; NO_BUDGET (or just cap) when length is unconstrained.
+
+    cap is the run's global limit; a derived budget never exceeds it.
+    """
+    params = params or {}
+    s = (scenario or "").strip().lower()
+    n: Optional[float] = None
+    stop: Tuple[str, ...] = ()
+    close = ""
+    if s == "limit-words":
+        n = _int(params, "words") * TOKENS_PER_WORD
+    elif s == "limit-chars":
+        n = _int(params, "chars") * TOKENS_PER_CHAR
+    elif s == "bullets":
+        n = _int(params, "bullets") * TOKENS_PER_BULLET
+    elif s == "format-json":
+        keys = [k for k in (params.get("keys") or "").split("|") if k]
+        n = len(keys) * TOKENS_PER_ITEM if keys else None
+        # 객체가 닫힌 뒤의 설명문을 끊는다 (중첩 객체 안에서는 빈 줄이 이어지지 않는다고 본다)
+        stop, close = ("}\n\n",), "}"
+    elif s == "limit-items-json":
+        n = _int(params, "n") * TOKENS_PER_ITEM
+        stop, close = ("]\n\n",), "]"
+    num_predict = int(math.ceil(n * margin)) + min_tokens if n else None
+    if cap is not None:
+        num_predict = min(num_predict, cap) if num_predict is not None else cap
+    return Budget(num_predict, stop, close)
+
+
+def item_scenario(row: Dict[str, Any]) -> Tuple[str, Dict[str, str]]:
+    """(scenario, params) of a prompts-CSV / manifest row; the param column is 'param' or 'params'."""
+    scenario = str(row.get("scenario") or "").strip().lower()
+    raw = row.get("param")
+    if raw is None or raw == "":
+        raw = row.get("params")
+    if isinstance(raw, dict):
+        return scenario, {str(k): str(v) for k, v in raw.items()}
+    return scenario, parse_params(str(raw or ""))
+
+
+def read_item_meta(path: Path | str, id_col: str = "id") -> Dict[str, Tuple[str, Dict[str, str]]]:
+    """id -> (scenario, params) from a prompts CSV or a manifest JSON ({"items": [...]})."""
+    p = Path(path)
+    if p.suffix.lower() == ".json":
+        items = json.loads(p.read_text(encoding="utf-8")).get("items", [])
+    else:
+        with p.open(newline="", encoding="utf-8-sig") as f:
+            items = list(csv.DictReader(f))
+    meta: Dict[str, Tuple[str, Dict[str, str]]] = {}
+    for it in items:
+        pid = it.get(id_col) if id_col in it else it.get("id")
+        if pid is not None:
+            meta[str(pid)] = item_scenario(it)
+    return meta
+
+
+def add_budget_args(ap) -> None:
+    ap.add_argument("--budget", action="store_true",
+                    help="Derive per-item num_predict/stop from scenario/param (limit-words, limit-chars, "
+                         "bullets, format-json, limit-items-json)")
+    ap.add_argument("--budget-margin", type=float, default=1.5, dest="budget_margin",
+                    help="Safety factor on the derived token estimate")
+    ap.add_argument("--budget-min-tokens", type=int, default=16, dest="budget_min_tokens")
+
+
+def budget_for(args, row_or_meta: Any, cap: Optional[int] = None) -> Budget:
+    """Budget for a row (dict) or a (scenario, params) pair per the --budget flags; NO_BUDGET when off."""
+    if not getattr(args, "budget", False):
+        return Budget(cap) if cap is not None else NO_BUDGET
+    if isinstance(row_or_meta, tuple):
+        scenario, params = row_or_meta
+    else:
+        scenario, params = item_scenario(row_or_meta or {})
+    return plan_budget(scenario, params, margin=args.budget_margin, min_tokens=args.budget_min_tokens, cap=cap)
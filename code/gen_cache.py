@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_CACHE_PATH = Path(os.environ.get("LLM_GEN_CACHE", ROOT / "results" / "cache" / "gen_cache.sqlite"))
+
+
+def cache_key(model: str, prompt: str, options: Optional[Dict[str, Any]] = None, mode: Optional[str] = None,
+              **extra: Any) -> str:
+    """sha256 of the canonical JSON of everything that changes the completion.
+
+    options: decoding params (temperature, top_p, num_predict, seed ...). None values are
+    dropped so {"num_predict": None} and {} hash the same.
+    """
+    opts = {k: v for k, v in (options or {}).items() if v is not None}
+    payload = {"model": model, "mode": mode or "", "prompt": prompt, "options": opts}
+    payload.update({k: v for k, v in extra.items() if v is not None})
+    blob = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class GenCache:
+    """On-disk generation cache (SQLite, WAL).
+
+    Eviction runs on open and every `evict_every` puts: rows older than
+    max_age_days go first, then least-recently-used rows until the table is
+    under max_entries / max_bytes. Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        path: Path | str = DEFAULT_CACHE_PATH,
+        max_entries: Optional[int] = 200_000,
+        max_bytes: Optional[int] = 1 << 30,
+        max_age_days: Optional[float] = None,
+        evict_every: int = 500,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.evict_every = max(1, evict_every)
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS gen ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT, mode TEXT,"
+            " output TEXT NOT NULL,"
+            " meta TEXT,"
+            " nbytes INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS gen_accessed ON gen(accessed)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS gen_created ON gen(created)")
+        self.evict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return {"output": str, **meta} or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT output, meta, created FROM gen WHERE key=?", (key,)).fetchone()
+            if row is None or self._expired(row[2]):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE gen SET accessed=? WHERE key=?", (time.time(), key))
+            self.hits += 1
+        out: Dict[str, Any] = json.loads(row[1]) if row[1] else {}
+        out["output"] = row[0]
+        return out
+
+    def put(self, key: str, output: str, model: str = "", mode: str = "", **meta: Any) -> None:
+        now = time.time()
+        meta_s = json.dumps(meta, ensure_ascii=False) if meta else None
+        nbytes = len(output.encode("utf-8")) + len(meta_s or "")
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO gen(key, model, mode, output, meta, nbytes, created, accessed)"
+                " VALUES (?,?,?,?,?,?,?,?)",
+                (key, model, mode, output, meta_s, nbytes, now, now),
+            )
+            self.puts += 1
+            due = self.puts % self.evict_every == 0
+        if due:
+            self.evict()
+
+    def _expired(self, created: float) -> bool:
+        return self.max_age_days is not None and created < time.time() - self.max_age_days * 86400
+
+    def evict(self) -> int:
+        n = 0
+        with self._lock:
+            c = self._conn
+            if self.max_age_days is not None:
+                n += c.execute("DELETE FROM gen WHERE created < ?",
+                               (time.time() - self.max_age_days * 86400,)).rowcount
+            if self.max_entries is not None:
+                cnt = c.execute("SELECT COUNT(*) FROM gen").fetchone()[0]
+                if cnt > self.max_entries:
+                    n += c.execute("DELETE FROM gen WHERE key IN (SELECT key FROM gen ORDER BY accessed LIMIT ?)",
+                                   (cnt - self.max_entries,)).rowcount
+            if self.max_bytes is not None:
+                total = c.execute("SELECT COALESCE(SUM(nbytes), 0) FROM gen").fetchone()[0]
+                if total > self.max_bytes:
+                    # 오래 안 쓴 것부터 누적 크기가 초과분을 넘을 때까지 삭제
+                    excess = total - self.max_bytes
+                    freed, victims = 0, []
+                    for key, nb in c.execute("SELECT key, nbytes FROM gen ORDER BY accessed"):
+                        victims.append((key,))
+                        freed += nb
+                        if freed >= excess:
+                            break
+                    c.executemany("DELETE FROM gen WHERE key=?", victims)
+                    n += len(victims)
+            self.evicted += n
+        return n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, nbytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM gen").fetchone()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            "puts": self.puts,
+            "evicted": self.evicted,
+            "entries": entries,
+            "bytes": nbytes,
+            "path": str(self.path),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def add_cache_args(ap) -> None:
+    """--cache/--no-cache 와 경로 옵션을 모든 러너에서 같은 이름으로 쓰기 위한 헬퍼."""
+    ap.add_argument("--cache", action=argparse.BooleanOptionalAction, default=False,
+                    help="Reuse cached generations keyed on (model, mode, prompt, decoding params)")
+    ap.add_argument("--cache-path", default=str(DEFAULT_CACHE_PATH), help="SQLite cache file")
+    ap.add_argument("--cache-max-age-days", type=float, default=None, help="Ignore/evict entries older than this")
+
+
+def cache_from_args(args) -> Optional[GenCache]:
+    if not getattr(args, "cache", False):
+        return None
+    return GenCache(args.cache_path, max_age_days=args.cache_max_age_days)
@@ -1,4 +1,6 @@
-import json, argparse, glob, csv, re
+import argparse, glob, csv, re
+
+from jsonl_reader import iter_jsonl
 
 def parse_meta(filename: str):
     base = filename.rsplit(".",1)[0]
@@ -16,13 +18,11 @@ def main():
     rows = []
     for fp in glob.glob(f"{args.raw-dir}/*.jsonl"):
         tot, pas = 0, 0
-        with open(fp, "r", encoding="utf-8") as f:
-            for ln in f:
-                o = json.loads(ln)
-                p = o.get("pass")
-                if p is not None:
-                    tot += 1
-                    pas += 1 if p else 0
+        for o in iter_jsonl(fp, fields=("pass",), errors="raise"):
+            p = o.get("pass")
+            if p is not None:
+                tot += 1
+                pas += 1 if p else 0
         model, mode, cfg = parse_meta(fp.split("\\")[-1])
         rows.append({
             "model": model, "mode": mode, "cfg": cfg,
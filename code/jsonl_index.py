@@ -0,0 +1,400 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+RAW_DIR = ROOT / "results" / "raw"
+DEFAULT_CATALOG = Path(os.environ.get("LLM_JSONL_CATALOG", ROOT / "results" / "cache" / "jsonl_catalog.sqlite"))
+ID_KEYS = ("id", "item_id", "uid", "prompt_id")
+
+# JSONL 파일마다 옆에 <file>.idx 를 둔다. 첫 줄은 헤더, 나머지는 RunJournal 과 같은
+# "<offset>\t<length>\t<json id>" 줄. 헤더의 size 까지가 색인된 구간이고 (완결된 줄만),
+# 파일이 그보다 커지면 뒤쪽만 읽어 덧붙인다. 파일을 다시 쓴 흔적이 있으면 처음부터 다시 만든다:
+# inode 가 바뀜 (os.replace), 크기는 그대로인데 mtime 이 바뀜 (같은 크기로 덮어씀 - RunJournal.reorder),
+# 줄어듦, 색인 끝의 줄바꿈 / 앞 4KB 해시 / 마지막 색인 줄 해시 중 하나라도 다름.
+SIDECAR_SUFFIX = ".idx"
+MAGIC = "#jsonl-index"
+VERSION = 2
+HEAD_BYTES = 4096
+
+Entry = Tuple[int, int, str]
+
+
+def record_id(rec) -> Optional[str]:
+    if not isinstance(rec, dict):
+        return None
+    for k in ID_KEYS:
+        if rec.get(k) is not None:
+            return str(rec[k])
+    return None
+
+
+def head_hash(mm, size: int) -> str:
+    return hashlib.sha1(mm[:min(HEAD_BYTES, size)]).hexdigest()
+
+
+def fingerprint(mm, size: int) -> str:
+    """head_hash plus the hash of the last complete line before size ('' for an empty prefix)."""
+    if size <= 0:
+        return ""
+    last = mm.rfind(b"\n", 0, size - 1) + 1
+    return head_hash(mm, size) + ":" + hashlib.sha1(mm[last:size]).hexdigest()
+
+
+def same_record(rec, id_: str) -> bool:
+    """Whether rec read at a stored offset still is the record for id_ (ids compare case-insensitively)."""
+    rid = record_id(rec)
+    return rid is not None and rid.lower() == str(id_).lower()
+
+
+class JsonlIndex:
+    """id -> (offset, length) of every record in one JSONL file, kept in a sidecar.
+
+    refresh() only reads the bytes appended since the sidecar was written. A last line
+    without a newline (a writer mid-append, or a file saved without one) is indexed in
+    memory but not persisted, so it is re-checked on the next refresh. `bad` counts
+    non-empty lines that are not JSON objects (pretty-printed / concatenated dumps);
+    when it is 0, an id missing from the index is not in the file.
+    """
+
+    def __init__(self, path: Path | str, sidecar: Path | str | None = None):
+        self.path = Path(path)
+        self.sidecar = Path(sidecar) if sidecar else self.path.with_name(self.path.name + SIDECAR_SUFFIX)
+        self.entries: List[Entry] = []
+        self.by_id: Dict[str, List[Tuple[int, int]]] = {}
+        self.size = 0
+        self.complete = 0
+        self.bad = 0
+        self.scanned_bytes = 0
+        self.rebuilt = False
+        self._fh = None
+        self._mm = None
+
+    # --- sidecar ----------------------------------------------------------
+    def _read_sidecar(self) -> Optional[Tuple[Tuple[int, int, int], int, int, str, List[Entry]]]:
+        try:
+            raw = self.sidecar.read_bytes()
+        except OSError:
+            return None
+        lines = raw.split(b"\n")
+        if not raw.endswith(b"\n") or len(lines) < 2:
+            return None
+        try:
+            magic, ver, ino, fsize, mtime_ns, size, bad, head = lines[0].decode("utf-8").split("\t")
+            if magic != MAGIC or int(ver) != VERSION:
+                return None
+            entries = []
+            for ln in lines[1:-1]:
+                off, length, id_json = ln.decode("utf-8").split("\t", 2)
+                entries.append((int(off), int(length), json.loads(id_json)))
+            return (int(ino), int(fsize), int(mtime_ns)), int(size), int(bad), head, entries
+        except Exception:
+            return None
+
+    def _write_sidecar(self, st: os.stat_result, size: int, bad: int, head: str, entries: List[Entry]) -> None:
+        tmp = self.sidecar.with_name(self.sidecar.name + ".tmp")
+        buf = [f"{MAGIC}\t{VERSION}\t{st.st_ino}\t{st.st_size}\t{st.st_mtime_ns}\t{size}\t{bad}\t{head}\n"
+               .encode("utf-8")]
+        buf += [f"{off}\t{length}\t{json.dumps(id_, ensure_ascii=False)}\n".encode("utf-8")
+                for off, length, id_ in entries]
+        try:
+            tmp.write_bytes(b"".join(buf))
+            os.replace(tmp, self.sidecar)
+        except OSError:
+            # 읽기 전용 위치면 이번 실행의 메모리 색인만 쓴다
+            tmp.unlink(missing_ok=True)
+
+    @staticmethod
+    def _scan(mm, start: int, end: int) -> Tuple[List[Entry], int, int]:
+        """Entries for complete lines in mm[start:end]; returns (entries, bad, end of last complete line)."""
+        found: List[Entry] = []
+        bad = 0
+        off = start
+        while off < end:
+            nl = mm.find(b"\n", off, end)
+            if nl < 0:
+                break
+            ln = mm[off:nl + 1]
+            if ln.strip():
+                try:
+                    rid = record_id(json.loads(ln.decode("utf-8-sig")))
+                    if rid is not None:
+                        found.append((off, len(ln), rid))
+                except Exception:
+                    bad += 1
+            off = nl + 1
+        return found, bad, off
+
+    # --- public -----------------------------------------------------------
+    def refresh(self) -> "JsonlIndex":
+        self.close()
+        self.scanned_bytes = 0
+        self.rebuilt = False
+        self._fh = self.path.open("rb")
+        st = os.fstat(self._fh.fileno())
+        size = st.st_size
+        self.entries, self.by_id, self.size, self.complete, self.bad = [], {}, size, 0, 0
+        if size == 0:
+            self.close()
+            return self
+        self._mm = mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        saved = self._read_sidecar()
+        start, bad, entries = 0, 0, []
+        if saved is not None:
+            (s_ino, s_fsize, s_mtime), s_size, s_bad, s_head, s_entries = saved
+            rewritten = (st.st_ino != s_ino or size < s_fsize
+                         or (size == s_fsize and st.st_mtime_ns != s_mtime))
+            if not rewritten and s_size <= size and (s_size == 0 or (mm[s_size - 1:s_size] == b"\n"
+                                                                     and fingerprint(mm, s_size) == s_head)):
+                start, bad, entries = s_size, s_bad, s_entries
+            else:
+                self.rebuilt = True
+
+        tail, tail_bad, done = self._scan(mm, start, size)
+        self.scanned_bytes = size - start
+        if saved is None or self.rebuilt or done != start or (st.st_size, st.st_mtime_ns) != saved[0][1:]:
+            self._write_sidecar(st, done, bad + tail_bad, fingerprint(mm, done), entries + tail)
+        entries = entries + tail
+        bad += tail_bad
+
+        # 줄바꿈 없는 마지막 줄은 메모리에만 올린다
+        if done < size:
+            frag = mm[done:size]
+            if frag.strip():
+                try:
+                    rid = record_id(json.loads(frag.decode("utf-8-sig")))
+                    if rid is not None:
+                        entries.append((done, size - done, rid))
+                except Exception:
+                    bad += 1
+
+        self.entries, self.bad, self.complete = entries, bad, done
+        for off, length, rid in entries:
+            self.by_id.setdefault(rid, []).append((off, length))
+        return self
+
+    def ids(self) -> List[str]:
+        """Distinct ids in file order."""
+        return list(self.by_id)
+
+    def raw(self, id_: str) -> List[bytes]:
+        if self._mm is None:
+            return []
+        return [self._mm[off:off + length] for off, length in self.by_id.get(str(id_), [])]
+
+    def fingerprint(self, size: int) -> str:
+        return fingerprint(self._mm, size) if self._mm is not None else ""
+
+    def raw_at(self, offset: int, length: int) -> bytes:
+        return self._mm[offset:offset + length] if self._mm is not None else b""
+
+    def get(self, id_: str) -> List[dict]:
+        """Records with this id; an offset that no longer holds that id (file rewritten since
+        refresh) is skipped rather than returning another record."""
+        out = []
+        for b in self.raw(id_):
+            try:
+                rec = json.loads(b.decode("utf-8-sig"))
+            except ValueError:
+                continue
+            if same_record(rec, id_):
+                out.append(rec)
+        return out
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+        if self._fh is not None:
+            self._fh.close()
+        self._mm = self._fh = None
+
+    def __enter__(self) -> "JsonlIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_index(path: Path | str) -> JsonlIndex:
+    return JsonlIndex(path).refresh()
+
+
+def read_at(path: Path | str, offset: int, length: int) -> dict:
+    """One record by (offset, length) without reading the rest of the file."""
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            b = mm[offset:offset + length]
+    return json.loads(b.decode("utf-8-sig"))
+
+
+class Catalog:
+    """Which JSONL files contain which id, with each record's (offset, length) (SQLite, WAL).
+
+    refresh() stats every file under the roots and re-reads only those whose size or
+    mtime changed (via their sidecar, so appended files cost only the new bytes).
+    Ids match case-insensitively (EX-0001 == ex-0001).
+    """
+
+    def __init__(self, path: Path | str = DEFAULT_CATALOG):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+            " n_records INTEGER NOT NULL, bad INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS records ("
+            " id TEXT NOT NULL COLLATE NOCASE, path TEXT NOT NULL, off INTEGER NOT NULL, len INTEGER NOT NULL,"
+            " PRIMARY KEY (id, path, off)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS records_path ON records(path);"
+        )
+
+    def refresh(self, roots: Sequence[Path | str] = (RAW_DIR,), pattern: str = "*.jsonl") -> Dict[str, int]:
+        """Bring the catalog up to date with the JSONL files under roots (a root may also be a file)."""
+        files: Dict[str, os.stat_result] = {}
+        for r in map(Path, roots):
+            for p in ([r] if r.is_file() else sorted(r.rglob(pattern)) if r.is_dir() else []):
+                files[str(p.resolve())] = p.stat()
+        with self._lock:
+            known = {p: (size, mt) for p, size, mt in self._conn.execute("SELECT path, size, mtime_ns FROM files")}
+        scope = [str(Path(r).resolve()) for r in roots]
+        gone = [p for p in known if p not in files and any(p == s or p.startswith(s + os.sep) for s in scope)]
+        changed = [p for p, st in files.items() if known.get(p) != (st.st_size, st.st_mtime_ns)]
+        stats = {"files": len(files), "updated": 0, "removed": len(gone), "scanned_bytes": 0}
+        for p in changed:
+            st = files[p]
+            with JsonlIndex(p).refresh() as idx:
+                stats["scanned_bytes"] += idx.scanned_bytes
+                rows = [(rid, p, off, length) for off, length, rid in idx.entries]
+                bad = idx.bad
+            with self._lock:
+                self._conn.execute("BEGIN")
+                self._conn.execute("DELETE FROM records WHERE path=?", (p,))
+                self._conn.executemany("INSERT OR REPLACE INTO records VALUES (?,?,?,?)", rows)
+                self._conn.execute("INSERT OR REPLACE INTO files VALUES (?,?,?,?,?)",
+                                   (p, st.st_size, st.st_mtime_ns, len(rows), bad))
+                self._conn.execute("COMMIT")
+            stats["updated"] += 1
+        if gone:
+            with self._lock:
+                self._conn.execute("BEGIN")
+                for p in gone:
+                    self._conn.execute("DELETE FROM records WHERE path=?", (p,))
+                    self._conn.execute("DELETE FROM files WHERE path=?", (p,))
+                self._conn.execute("COMMIT")
+        return stats
+
+    def locate(self, id_: str) -> List[Tuple[str, int, int]]:
+        """[(path, offset, length)] of every record with this id, in path/offset order."""
+        with self._lock:
+            return list(self._conn.execute("SELECT path, off, len FROM records WHERE id=? ORDER BY path, off",
+                                           (str(id_),)))
+
+    def files_for(self, id_: str) -> List[str]:
+        return sorted({p for p, _, _ in self.locate(id_)})
+
+    def indexed_files(self) -> List[str]:
+        """Files where every line is a JSON object, so the catalog alone answers lookups there."""
+        with self._lock:
+            return [p for (p,) in self._conn.execute("SELECT path FROM files WHERE bad = 0 ORDER BY path")]
+
+    def unindexed(self) -> List[str]:
+        """Files with lines that did not parse as JSON objects (ids there can only be found by scanning)."""
+        with self._lock:
+            return [p for (p,) in self._conn.execute("SELECT path FROM files WHERE bad > 0 ORDER BY path")]
+
+    def lookup(self, id_: str) -> List[Tuple[str, dict]]:
+        """[(path, record)] for this id, read by mmap at the catalogued offsets (records that no
+        longer carry the id, i.e. the file changed since refresh, are dropped)."""
+        out: List[Tuple[str, dict]] = []
+        for p, off, length in self.locate(id_):
+            try:
+                rec = read_at(p, off, length)
+            except (OSError, ValueError):
+                continue
+            if same_record(rec, id_):
+                out.append((p, rec))
+        return out
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            files, bad = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(bad > 0), 0) FROM files").fetchone()
+            recs, ids = self._conn.execute("SELECT COUNT(*), COUNT(DISTINCT id) FROM records").fetchone()
+        return {"files": files, "files_with_bad_lines": bad, "records": recs, "ids": ids}
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def find_records(id_: str, roots: Sequence[Path | str] = (RAW_DIR,),
+                 catalog_path: Path | str = DEFAULT_CATALOG) -> List[Tuple[str, dict]]:
+    """Refresh the catalog for roots, then [(path, record)] for id_."""
+    cat = Catalog(catalog_path)
+    try:
+        cat.refresh(roots)
+        return cat.lookup(id_)
+    finally:
+        cat.close()
+
+
+def add_index_args(ap) -> None:
+    ap.add_argument("--catalog", default=str(DEFAULT_CATALOG), help="SQLite id -> file/offset catalog")
+    ap.add_argument("--index-root", action="append", default=None, dest="index_roots",
+                    help=f"Directory (or file) of JSONL logs to index; repeatable (default: {RAW_DIR.relative_to(ROOT)})")
+
+
+def index_roots(args) -> List[Path]:
+    return [Path(r) for r in (getattr(args, "index_roots", None) or [RAW_DIR])]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sidecar offset indexes + id catalog for JSONL logs")
+    add_index_args(ap)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("build", help="create/update sidecars and the catalog")
+    p = sub.add_parser("lookup", help="print every record with these ids")
+    p.add_argument("ids", nargs="+")
+    p.add_argument("--files-only", action="store_true")
+    sub.add_parser("info")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    cat = Catalog(args.catalog)
+    st = cat.refresh(index_roots(args))
+    if args.cmd == "build":
+        print(f"[OK] files={st['files']} updated={st['updated']} removed={st['removed']} "
+              f"scanned={st['scanned_bytes']}B")
+        for p in cat.unindexed():
+            print(f"[WARN] non-JSONL lines in {p} (lookups there fall back to scanning)")
+    elif args.cmd == "lookup":
+        for id_ in args.ids:
+            hits = cat.locate(id_)
+            print(f"== {id_}: {len(hits)} record(s) in {len({p for p, _, _ in hits})} file(s)")
+            if args.files_only:
+                for p in sorted({p for p, _, _ in hits}):
+                    print(p)
+                continue
+            for p, rec in cat.lookup(id_):
+                print(f"--- {p}")
+                print(json.dumps(rec, ensure_ascii=False, indent=2))
+    else:
+        print(json.dumps({**cat.stats(), "catalog": str(cat.path)}, ensure_ascii=False, indent=2))
+    cat.close()
+    print(f"[TIME] {(time.perf_counter() - t0) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
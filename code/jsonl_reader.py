@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # 표준 json 으로도 같은 결과 (느릴 뿐)
+    orjson = None
+
+# 모든 JSONL 로더가 쓰는 스트리밍 리더.
+#  - 1 MiB 단위로 읽어 줄을 자르고, 한 줄씩 파싱해 바로 내보낸다 (파일 전체를 메모리에 올리지 않음)
+#  - 줄 앞의 BOM 은 떼고, 줄바꿈 없는 마지막 줄이 파싱되지 않으면 (쓰는 중 끊긴 줄) 건너뛴다
+#  - fields 를 주면 그 키만 남긴 dict 를 돌려준다 (긴 prompt/raw 필드를 붙잡고 있지 않도록)
+#  - workers > 1 이고 파일이 크면 바이트 구간으로 나눠 여러 프로세스에서 파싱한다 (순서는 유지)
+CHUNK = 1 << 20
+PARALLEL_MIN_BYTES = 64 << 20
+RANGE_BYTES = 16 << 20
+BOM = b"\xef\xbb\xbf"
+ID_KEYS = ("id", "item_id", "example_id", "prompt_id", "uid")
+
+OnError = Union[str, Callable[[int, bytes, Exception], None]]
+
+
+def loads(b: Union[bytes, str]) -> Any:
+    """orjson when installed; falls back to json for what orjson rejects (NaN, invalid UTF-8)."""
+    if orjson is not None:
+        try:
+            return orjson.loads(b)
+        except orjson.JSONDecodeError:
+            pass
+    if isinstance(b, bytes):
+        b = b.decode("utf-8", errors="replace")
+    return json.loads(b)
+
+
+def _blank(ln: bytes) -> bool:
+    return not ln or ln.isspace()
+
+
+def iter_lines(path: Path | str, chunk_size: int = CHUNK) -> Iterator[Tuple[int, bytes, bool]]:
+    """(line number, line without newline/BOM, terminated) for every line, read in chunk_size blocks."""
+    n = 0
+    pieces: List[bytes] = []
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            buf = f.read(chunk_size)
+            if not buf:
+                break
+            nl = buf.find(b"\n")
+            if nl < 0:
+                pieces.append(buf)
+                continue
+            if pieces:
+                pieces.append(buf)
+                buf = b"".join(pieces)
+                pieces = []
+            lines = buf.split(b"\n")
+            tail = lines.pop()
+            for ln in lines:
+                n += 1
+                if ln.startswith(BOM):
+                    ln = ln[3:]
+                yield n, ln.rstrip(b"\r"), True
+            if tail:
+                pieces.append(tail)
+    if pieces:
+        ln = b"".join(pieces)
+        yield n + 1, ln[3:] if ln.startswith(BOM) else ln, False
+
+
+def _project(o: Any, fields: Optional[Sequence[str]]) -> Any:
+    if fields is None or not isinstance(o, dict):
+        return o
+    return {k: o[k] for k in fields if k in o}
+
+
+def _decode_lines(lines: Iterator[Tuple[int, bytes, bool]], fields: Optional[Sequence[str]], dicts_only: bool,
+                  ) -> Iterator[Tuple[str, int, Any]]:
+    """('ok', n, record) / ('bad', n, (line, exc)) / ('torn', n, None); blank and non-dict lines dropped."""
+    for n, ln, terminated in lines:
+        if _blank(ln):
+            continue
+        try:
+            o = loads(ln)
+        except Exception as e:
+            yield ("bad", n, (ln, e)) if terminated else ("torn", n, None)
+            continue
+        if dicts_only and not isinstance(o, dict):
+            continue
+        yield "ok", n, _project(o, fields)
+
+
+def _range_lines(path: str, start: int, end: int) -> Iterator[Tuple[int, bytes, bool]]:
+    """Lines whose first byte is in [start, end); numbers are relative to the range."""
+    n = 0
+    with open(path, "rb", buffering=CHUNK) as f:
+        if start > 0:
+            f.seek(start - 1)
+            f.readline()
+        pos = f.tell()
+        while pos < end:
+            ln = f.readline()
+            if not ln:
+                break
+            pos += len(ln)
+            n += 1
+            terminated = ln.endswith(b"\n")
+            ln = ln.rstrip(b"\r\n") if terminated else ln
+            yield n, ln[3:] if ln.startswith(BOM) else ln, terminated
+
+
+def _decode_range(task: Tuple[str, int, int, Optional[Sequence[str]], bool]) -> Tuple[int, List[Tuple[str, int, Any]]]:
+    path, start, end, fields, dicts_only = task
+    last = 0
+
+    def lines() -> Iterator[Tuple[int, bytes, bool]]:
+        nonlocal last
+        for item in _range_lines(path, start, end):
+            last = item[0]
+            yield item
+
+    # 예외 객체는 프로세스 경계를 넘기지 않고 메시지만 보낸다
+    events = [(k, i, (v[0], ValueError(str(v[1]))) if k == "bad" else v)
+              for k, i, v in _decode_lines(lines(), fields, dicts_only)]
+    return last, events
+
+
+class JsonlReader:
+    """Streaming reader for one JSONL file.
+
+    errors: 'skip' (count them), 'warn' (also print), 'raise' (ValueError with path:line),
+    or a callable(line_no, line_bytes, exc). A last line without a newline that does not
+    parse is a torn write and is only counted (self.torn), never an error.
+    """
+
+    def __init__(self, path: Path | str, fields: Optional[Sequence[str]] = None, errors: OnError = "skip",
+                 dicts_only: bool = True, workers: int = 1, chunk_size: int = CHUNK,
+                 parallel_min_bytes: int = PARALLEL_MIN_BYTES):
+        self.path = Path(path)
+        self.fields = tuple(fields) if fields is not None else None
+        self.errors = errors
+        self.dicts_only = dicts_only
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.parallel_min_bytes = parallel_min_bytes
+        self.records = 0
+        self.bad = 0
+        self.torn = 0
+
+    def _bad(self, n: int, ln: bytes, e: Exception) -> None:
+        self.bad += 1
+        if callable(self.errors):
+            self.errors(n, ln, e)
+        elif self.errors == "raise":
+            raise ValueError(f"JSON decode error at {self.path}:{n}: {e}")
+        elif self.errors == "warn":
+            print(f"[WARN] skip malformed line {n} in {self.path}: {e}", file=sys.stderr)
+
+    def _events(self) -> Iterator[Tuple[str, int, Any]]:
+        size = self.path.stat().st_size
+        if self.workers <= 1 or size < self.parallel_min_bytes:
+            yield from _decode_lines(iter_lines(self.path, self.chunk_size), self.fields, self.dicts_only)
+            return
+        tasks = [(str(self.path), s, min(size, s + RANGE_BYTES), self.fields, self.dicts_only)
+                 for s in range(0, size, RANGE_BYTES)]
+        window = self.workers * 2
+        base = 0
+        with ProcessPoolExecutor(max_workers=self.workers) as ex:
+            # 한 번에 window 개 구간만 띄워 둔다 (결과가 쌓여 메모리가 커지지 않도록)
+            pending = [ex.submit(_decode_range, t) for t in tasks[:window]]
+            nxt = len(pending)
+            while pending:
+                n_lines, events = pending.pop(0).result()
+                if nxt < len(tasks):
+                    pending.append(ex.submit(_decode_range, tasks[nxt]))
+                    nxt += 1
+                for kind, i, v in events:
+                    yield kind, base + i, v
+                base += n_lines
+
+    def numbered(self) -> Iterator[Tuple[int, Any]]:
+        """(line number, record) pairs."""
+        for kind, n, v in self._events():
+            if kind == "ok":
+                self.records += 1
+                yield n, v
+            elif kind == "bad":
+                self._bad(n, *v)
+            else:
+                self.torn += 1
+
+    def __iter__(self) -> Iterator[Any]:
+        for _, rec in self.numbered():
+            yield rec
+
+
+def iter_jsonl(path: Path | str, fields: Optional[Sequence[str]] = None, errors: OnError = "skip",
+               missing_ok: bool = False, **kw: Any) -> Iterator[Dict[str, Any]]:
+    """Records of a JSONL file, one at a time (see JsonlReader for the options)."""
+    if missing_ok and not Path(path).exists():
+        return iter(())
+    return iter(JsonlReader(path, fields=fields, errors=errors, **kw))
+
+
+def iter_jsonl_range(path: Path | str, start: int, end: int, fields: Optional[Sequence[str]] = None,
+                     ) -> Iterator[Dict[str, Any]]:
+    """Records whose line starts in bytes [start, end) (score_engine.line_shards ranges); bad lines skipped."""
+    for kind, _, o in _decode_lines(_range_lines(str(path), start, end), fields, True):
+        if kind == "ok":
+            yield o
+
+
+def read_jsonl(path: Path | str, fields: Optional[Sequence[str]] = None, errors: OnError = "skip",
+               missing_ok: bool = False, **kw: Any) -> List[Dict[str, Any]]:
+    return list(iter_jsonl(path, fields=fields, errors=errors, missing_ok=missing_ok, **kw))
+
+
+def record_key(o: Dict[str, Any], keys: Sequence[str] = ID_KEYS) -> Optional[str]:
+    for k in keys:
+        v = o.get(k)
+        if v is not None and v != "":
+            return str(v)
+    return None
+
+
+def read_jsonl_map(path: Path | str, keys: Sequence[str] = ID_KEYS, fields: Optional[Sequence[str]] = None,
+                   value: Optional[Callable[[Dict[str, Any]], Any]] = None, errors: OnError = "skip",
+                   missing_ok: bool = False, **kw: Any) -> Dict[str, Any]:
+    """{id: value(record) or record}; the last line wins. Records without an id are dropped.
+
+    With fields, the id keys are read too even if not listed.
+    """
+    if fields is not None:
+        fields = tuple(fields) + tuple(k for k in keys if k not in fields)
+    out: Dict[str, Any] = {}
+    for o in iter_jsonl(path, fields=fields, errors=errors, missing_ok=missing_ok, **kw):
+        rid = record_key(o, keys)
+        if rid is not None:
+            out[rid] = value(o) if value is not None else o
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Read JSONL files with the shared reader (throughput / memory check)")
+    ap.add_argument("paths", nargs="+")
+    ap.add_argument("--fields", default=None, help="comma list to project, e.g. id,output,latency_ms")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--mem", action="store_true", help="also report peak Python memory (tracemalloc; much slower)")
+    args = ap.parse_args()
+
+    fields = [f for f in args.fields.split(",") if f] if args.fields else None
+    if args.mem:
+        tracemalloc.start()
+    for p in args.paths:
+        t0 = time.perf_counter()
+        r = JsonlReader(p, fields=fields, workers=args.workers)
+        for _ in r:
+            pass
+        dt = time.perf_counter() - t0
+        mb = os.path.getsize(p) / 2 ** 20
+        print(f"[OK] {p} records={r.records} bad={r.bad} torn={r.torn} {mb:.1f}MB {dt:.2f}s ({mb / max(dt, 1e-9):.0f}MB/s)")
+    print(f"[PARSER] {'orjson' if orjson else 'json'}")
+    if args.mem:
+        print(f"[MEM] peak={tracemalloc.get_traced_memory()[1] / 2 ** 20:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
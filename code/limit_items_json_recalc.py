@@ -3,6 +3,8 @@ import argparse, csv, json
 from pathlib import Path
 from collections import defaultdict
 
+from jsonl_reader import iter_jsonl
+
 def truthy(v: str) -> bool:
     return str(v or "").strip().lower() in ("1","true","y","yes")
 
@@ -14,22 +16,10 @@ def load_targets(csv_path: Path) -> set[str]:
         if truthy(r.get("needs_json"))
     }
 
-def iter_jsonl(p: Path):
-    if not p.exists():
-        return
-    for line in p.read_text(encoding="utf-8-sig", errors="ignore").splitlines():
-        s = line.strip()
-        if not s: 
-            continue
-        try:
-            yield json.loads(s)
-        except Exception:
-            continue
-
 def eval_mode(jsonl_path: Path, targets: set[str], key: str, min_items: int, max_items: int) -> tuple[int,int]:
     total = 0
     ok = 0
-    for rec in iter_jsonl(jsonl_path):
+    for rec in iter_jsonl(jsonl_path, fields=("id", "output"), missing_ok=True):
         rid = str(rec.get("id","")).strip()
         if rid not in targets:
             continue
@@ -1,4 +1,5 @@
-from typing import Optional
+import time
+from typing import Any, Dict, Optional, Tuple
 
 try:
     from langchain_openai import ChatOpenAI
@@ -12,35 +13,134 @@ except Exception:
 
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from ollama_client import StreamStats
+from gen_cache import GenCache, cache_key
+from gen_budget import Budget, NO_BUDGET
+from ollama_pool import HostPool
+
+SYSTEM_PROMPT = "You are a helpful assistant."
+
 
 class LLMWrapper:
-    def __init__(self, provider: str, model: str, temperature: float = 0.2, num_predict: Optional[int] = None):
+    def __init__(self, provider: str, model: str, temperature: float = 0.2, num_predict: Optional[int] = None,
+                 cache: Optional[GenCache] = None, keep_alive: Optional[str] = None,
+                 pool: Optional[HostPool] = None):
         self.provider = provider
         self.model = model
         self.temperature = temperature
         self.num_predict = num_predict
+        self.cache = cache
+        self.keep_alive = keep_alive
+        # pool (ollama_pool.HostPool): provider=ollama 일 때 호출마다 호스트를 골라 base_url 로 넘긴다
+        self.pool = pool if provider == "ollama" else None
+        self.last_cached = False
+        self.last_host: Optional[str] = None
+        self.last_done_reason: Optional[str] = None
+        self.last_load_ms: Optional[float] = None
 
-    def _chat(self):
+    def num_predict_for(self, budget: Budget) -> Optional[int]:
+        caps = [n for n in (self.num_predict, budget.num_predict) if n is not None]
+        return min(caps) if caps else None
+
+    def _chat(self, budget: Budget = NO_BUDGET, base_url: Optional[str] = None):
+        num_predict = self.num_predict_for(budget)
         if self.provider == "openai":
             if ChatOpenAI is None:
                 raise RuntimeError("langchain-openai 임포트 실패 또는 미설치")
-            return ChatOpenAI(model=self.model, temperature=self.temperature)
+            kwargs = {"model": self.model, "temperature": self.temperature}
+            if num_predict is not None:
+                kwargs["max_tokens"] = num_predict
+            return ChatOpenAI(**kwargs)
         elif self.provider == "ollama":
             if ChatOllama is None:
                 raise RuntimeError("langchain-ollama 임포트 실패 또는 미설치")
             kwargs = {"model": self.model, "temperature": self.temperature}
-            if self.num_predict is not None:
-                kwargs["num_predict"] = self.num_predict
+            if num_predict is not None:
+                kwargs["num_predict"] = num_predict
+            if self.keep_alive is not None:
+                kwargs["keep_alive"] = self.keep_alive
+            if base_url is not None:
+                kwargs["base_url"] = base_url
             return ChatOllama(**kwargs)
         else:
             raise ValueError(f"Unknown provider: {self.provider}")
 
-    def generate(self, prompt: str) -> str:
-        chat = self._chat()
-        msgs = [SystemMessage(content="You are a helpful assistant."), HumanMessage(content=prompt)]
-        resp = chat.invoke(msgs)
-        return getattr(resp, "content", str(resp))
+    def _messages(self, prompt: str):
+        return [SystemMessage(content=SYSTEM_PROMPT), HumanMessage(content=prompt)]
+
+    def _cache_key(self, prompt: str, budget: Budget = NO_BUDGET) -> str:
+        return cache_key(f"{self.provider}:{self.model}", prompt,
+                         {"temperature": self.temperature, "num_predict": self.num_predict_for(budget),
+                          "stop": list(budget.stop) or None},
+                         system=SYSTEM_PROMPT)
+
+    def _cache_get(self, prompt: str, budget: Budget = NO_BUDGET) -> Optional[str]:
+        self.last_cached = False
+        self.last_done_reason = None
+        self.last_load_ms = None
+        self.last_host = None
+        if self.cache is None:
+            return None
+        hit = self.cache.get(self._cache_key(prompt, budget))
+        if hit is None:
+            return None
+        self.last_cached = True
+        return hit["output"]
+
+    def _cache_put(self, prompt: str, text: str, budget: Budget = NO_BUDGET) -> None:
+        if self.cache is not None:
+            self.cache.put(self._cache_key(prompt, budget), text, model=self.model)
+
+    def generate(self, prompt: str, budget: Budget = NO_BUDGET) -> str:
+        """budget (gen_budget.plan_budget): per-call num_predict cap and stop sequences."""
+        cached = self._cache_get(prompt, budget)
+        if cached is not None:
+            return cached
+        if self.pool is None:
+            resp = self._chat(budget).invoke(self._messages(prompt), stop=list(budget.stop) or None)
+        else:
+            def _invoke(client):
+                self.last_host = client.host
+                return self._chat(budget, client.host).invoke(self._messages(prompt), stop=list(budget.stop) or None)
+
+            resp = self.pool.call(
+                _invoke, tokens=lambda r: (getattr(r, "response_metadata", None) or {}).get("eval_count"))
+        text = budget.finish(getattr(resp, "content", str(resp)))
+        meta = getattr(resp, "response_metadata", None) or {}
+        self.last_done_reason = meta.get("done_reason") or meta.get("finish_reason")
+        if isinstance(meta.get("load_duration"), (int, float)):
+            self.last_load_ms = round(meta["load_duration"] / 1e6, 1)
+        self._cache_put(prompt, text, budget)
+        return text
+
+    def generate_stream(self, prompt: str, budget: Budget = NO_BUDGET) -> Tuple[str, Dict[str, Any]]:
+        """chat.stream 으로 청크를 받아 (text, {ttft_ms, itl_ms, tokens, eval_tps}) 를 돌려준다."""
+        cached = self._cache_get(prompt, budget)
+        if cached is not None:
+            return cached, {}
+        st = StreamStats(t0=time.perf_counter())
+        if self.pool is None:
+            self._stream_into(st, self._chat(budget), prompt, budget)
+        else:
+            # 스트림은 도중에 호스트를 바꿀 수 없으므로 lease 하나로 끝까지 간다
+            with self.pool.lease() as ls:
+                self.last_host = ls.host
+                self._stream_into(st, self._chat(budget, ls.host), prompt, budget)
+                ls.tokens = st.fields().get("tokens")
+        text = budget.finish(st.text)
+        self._cache_put(prompt, text, budget)
+        return text, st.fields()
+
+    def _stream_into(self, st: StreamStats, chat, prompt: str, budget: Budget) -> None:
+        for chunk in chat.stream(self._messages(prompt), stop=list(budget.stop) or None):
+            st.token(getattr(chunk, "content", "") or "")
+            meta = getattr(chunk, "response_metadata", None) or {}
+            if meta.get("done") or meta.get("eval_count"):
+                st.final = meta
 
 
-def get_llm(provider: str, model: str, temperature: float = 0.2, num_predict: Optional[int] = None) -> LLMWrapper:
-    return LLMWrapper(provider=provider, model=model, temperature=temperature, num_predict=num_predict)
\ No newline at end of file
+def get_llm(provider: str, model: str, temperature: float = 0.2, num_predict: Optional[int] = None,
+            cache: Optional[GenCache] = None, keep_alive: Optional[str] = None,
+            pool: Optional[HostPool] = None) -> LLMWrapper:
+    return LLMWrapper(provider=provider, model=model, temperature=temperature, num_predict=num_predict, cache=cache,
+                      keep_alive=keep_alive, pool=pool)
\ No newline at end of file
@@ -3,18 +3,10 @@ from __future__ import annotations
 import argparse
 import csv
 import glob
-import json
 from pathlib import Path
 from typing import Any, List, Dict
 
-def _read_lines_any(path: Path) -> List[str]:
-    """UTF-8(BOM 포함) 우선, 실패 시 몇 가지 인코딩을 순회하며 안전하게 읽는다."""
-    for enc in ("utf-8-sig", "utf-8", "cp949", "mbcs", "euc-kr", "latin1"):
-        try:
-            return path.read_text(encoding=enc, errors="replace").splitlines()
-        except UnicodeDecodeError:
-            continue
-    return path.read_bytes().decode("utf-8", errors="ignore").splitlines()
+from jsonl_reader import iter_jsonl
 
 def _percentile(xs: List[float], q: float) -> float | None:
     if not xs:
@@ -46,23 +38,41 @@ def _extract_latency_and_tokens(obj: Dict[str, Any]) -> tuple[float | None, floa
 
     return latency, tokens
 
+STREAM_FIELDS = ("ttft_ms", "itl_ms", "tokens", "eval_tps")
+
+def _extract_stream_field(obj: Dict[str, Any], name: str) -> float | None:
+    """스트리밍 지표는 timing{} 안(run_langchain_experiment) 또는 최상위(infer_via_ollama)에 있다."""
+    t = obj.get("timing")
+    if isinstance(t, dict) and isinstance(t.get(name), (int, float)):
+        return float(t[name])
+    if isinstance(obj.get(name), (int, float)):
+        return float(obj[name])
+    return None
+
+def _stream_columns(values: Dict[str, List[float]]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for name in STREAM_FIELDS:
+        xs = values.get(name) or []
+        out[f"{name}_p50"] = round(_percentile(xs, 50.0), 2) if xs else ""
+        out[f"{name}_p95"] = round(_percentile(xs, 95.0), 2) if xs else ""
+    return out
+
 def _summarize_file(jsonl_path: Path) -> Dict[str, Any]:
     latencies: List[float] = []
     tokens: List[float] = []
+    stream_vals: Dict[str, List[float]] = {name: [] for name in STREAM_FIELDS}
 
-    for ln, s in enumerate(_read_lines_any(jsonl_path), start=1):
-        s = s.strip()
-        if not s:
-            continue
-        try:
-            o = json.loads(s)
-        except Exception:
-            continue
+    # 깨진 줄은 건너뛰고, UTF-8 이 아닌 바이트는 대체 문자로 읽는다 (여기서는 숫자 필드만 쓴다)
+    for o in iter_jsonl(jsonl_path):
         lat, tok = _extract_latency_and_tokens(o)
         if isinstance(lat, float):
             latencies.append(lat)
         if isinstance(tok, float):
             tokens.append(tok)
+        for name in STREAM_FIELDS:
+            v = _extract_stream_field(o, name)
+            if v is not None:
+                stream_vals[name].append(v)
 
     if not latencies:
         return {
@@ -74,6 +84,7 @@ def _summarize_file(jsonl_path: Path) -> Dict[str, Any]:
             "latency_ms_min": 0.0,
             "latency_ms_max": 0.0,
             "tokens_mean": _mean(tokens),
+            **_stream_columns(stream_vals),
         }
 
     return {
@@ -85,6 +96,7 @@ def _summarize_file(jsonl_path: Path) -> Dict[str, Any]:
         "latency_ms_min": min(latencies),
         "latency_ms_max": max(latencies),
         "tokens_mean": round(_mean(tokens), 1) if tokens else 0.0,
+        **_stream_columns(stream_vals),
     }
 
 def parse_args() -> argparse.Namespace:
@@ -114,7 +126,7 @@ def main():
         "latency_ms_min",
         "latency_ms_max",
         "tokens_mean",
-    ]
+    ] + [f"{name}_{q}" for name in STREAM_FIELDS for q in ("p50", "p95")]
 
     out_csv.parent.mkdir(parents=True, exist_ok=True)
     with out_csv.open("w", encoding="utf-8", newline="") as f:
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_DATASET = ROOT / "results" / "metrics_ds"
+
+# 항목별 지표를 model=/mode=/run= 으로 나눈 Parquet 데이터셋으로 둔다.
+# 파일 안은 (lang, len_bin, diff_bin, id) 순으로 정렬해 row group 통계로 필터를 건너뛸 수 있게 한다.
+PARTITIONS = ("model", "mode", "run")
+FACETS = ("lang", "len_bin", "diff_bin", "domain", "scenario")
+PARTITIONING = ds.partitioning(pa.schema([(c, pa.string()) for c in PARTITIONS]), flavor="hive")
+ROW_GROUP = 64 * 1024
+NA_STRINGS = ("", "NA", "N/A", "nan", "NaN", "None", "null")
+
+Filter = Union[str, Sequence[str], None]
+
+
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Text CSV columns -> numbers where every non-NA value parses; facets/ids stay strings.
+
+    An all-NA metric column is left untyped (Arrow null), so it unifies with whatever type
+    other partitions give it (e.g. json_valid: None for every non-IE item, bool otherwise).
+    """
+    df = df.copy()
+    for c in df.columns:
+        if c in ("id",) + PARTITIONS + FACETS:
+            df[c] = df[c].astype("string").where(df[c].notna(), None)
+            continue
+        if not df[c].astype(object).where(~df[c].isin(NA_STRINGS)).notna().any():
+            df[c] = pd.Series([None] * len(df), index=df.index, dtype=object)
+            continue
+        if not (pd.api.types.is_numeric_dtype(df[c]) or pd.api.types.is_bool_dtype(df[c])):
+            s = df[c].astype(object).where(~df[c].isin(NA_STRINGS))
+            if s.dropna().map(lambda v: isinstance(v, bool)).all() and s.notna().any():
+                df[c] = s.astype("boolean")
+                continue
+            num = pd.to_numeric(s, errors="coerce")
+            if num.notna().sum() == s.notna().sum():
+                df[c] = num.astype("float64")
+    return df
+
+
+def write_metrics(rows: Union[pd.DataFrame, Iterable[Dict[str, Any]]], root: Path | str = DEFAULT_DATASET,
+                  model: Optional[str] = None, mode: Optional[str] = None, run: Optional[str] = None) -> int:
+    """Write per-item metric rows into the dataset; model/mode/run fill rows that lack them.
+
+    A (model, mode, run) partition that is written again is replaced, not appended to.
+    """
+    df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+    if df.empty:
+        return 0
+    for c, v in zip(PARTITIONS, (model, mode, run)):
+        if c not in df.columns:
+            df[c] = v or "unknown"
+        df[c] = df[c].fillna(v or "unknown").astype(str)
+    df = _typed(df)
+    keys = [c for c in FACETS + ("id",) if c in df.columns]
+    if keys:
+        df = df.sort_values(keys, kind="stable", na_position="last")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    written = set(map(tuple, df[list(PARTITIONS)].drop_duplicates().itertuples(index=False)))
+    table = _conform(table, _file_schemas(root, skip=written))
+    ds.write_dataset(
+        table, str(root), format="parquet", partitioning=PARTITIONING,
+        existing_data_behavior="delete_matching", basename_template="part-{i}.parquet",
+        max_rows_per_group=ROW_GROUP, min_rows_per_group=min(ROW_GROUP, len(df)),
+    )
+    return len(df)
+
+
+def _partition_of(root: Path, f: str) -> tuple:
+    """('model', 'mode', 'run') values of a fragment path from its hive directories."""
+    parts = dict(seg.split("=", 1) for seg in Path(f).relative_to(root).parent.parts if "=" in seg)
+    return tuple(parts.get(c) for c in PARTITIONS)
+
+
+def _file_schemas(root: Path | str, skip: Iterable[tuple] = ()) -> List[pa.Schema]:
+    """Footer schemas of every Parquet file under root except the partitions in skip."""
+    root = Path(root)
+    if not root.exists():
+        return []
+    skip = set(skip)
+    return [pq.read_schema(f) for f in sorted(map(str, root.rglob("*.parquet"))) if _partition_of(root, f) not in skip]
+
+
+def _unify(schemas: Sequence[pa.Schema]) -> pa.Schema:
+    """One schema over all fragments (a column missing in some partitions reads as null there)."""
+    try:
+        # permissive: null -> 어떤 타입이든, int -> double 확장 허용
+        return pa.unify_schemas(list(schemas), promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        raise ValueError(f"metric columns have conflicting types across partitions: {e}") from e
+
+
+def _conform(table: pa.Table, existing: Sequence[pa.Schema]) -> pa.Table:
+    """Cast table columns to the type the whole dataset will read them as (e.g. all-NA -> bool);
+    a column whose type cannot be reconciled with the other partitions is refused here
+    rather than failing every later scan."""
+    if not existing:
+        return table
+    try:
+        merged = _unify(list(existing) + [table.schema])
+    except ValueError as e:
+        raise ValueError(f"cannot add this partition: {e}") from e
+    target = pa.schema([merged.field(name) for name in table.column_names])
+    return table.cast(target)
+
+
+def _expr(filters: Dict[str, Filter]) -> Optional[ds.Expression]:
+    expr = None
+    for k, v in filters.items():
+        if v is None:
+            continue
+        e = pc.field(k).isin(list(v)) if isinstance(v, (list, tuple, set)) else (pc.field(k) == v)
+        expr = e if expr is None else expr & e
+    return expr
+
+
+def dataset(root: Path | str = DEFAULT_DATASET) -> ds.Dataset:
+    """Dataset whose schema is unified over every fragment, not inferred from the first one
+    (partitions written by different runs may carry different metric columns)."""
+    schemas = _file_schemas(root)
+    if not schemas:
+        return ds.dataset(str(root), format="parquet", partitioning=PARTITIONING)
+    schema = _unify(schemas + [PARTITIONING.schema])
+    return ds.dataset(str(root), format="parquet", partitioning=PARTITIONING, schema=schema)
+
+
+def read_metrics(root: Path | str = DEFAULT_DATASET, columns: Optional[Sequence[str]] = None,
+                 as_pandas: bool = True, **filters: Filter) -> Union[pd.DataFrame, pa.Table]:
+    """Load only `columns` of rows matching filters (model/mode/run prune directories; lang/len_bin/
+    diff_bin/... are pushed into the Parquet scan). A filter value may be a string or a list."""
+    d = dataset(root)
+    cols = None
+    if columns is not None:
+        names = set(d.schema.names)
+        cols = [c for c in columns if c in names]
+    table = d.to_table(columns=cols, filter=_expr(filters))
+    return table.to_pandas() if as_pandas else table
+
+
+def read_any(path: Path | str, columns: Optional[Sequence[str]] = None, **filters: Filter) -> pd.DataFrame:
+    """Dataset directory / .parquet via read_metrics, CSV / JSONL via pandas (filters applied after)."""
+    p = Path(path)
+    if p.is_dir() or p.suffix == ".parquet":
+        return read_metrics(p, columns=columns, **filters)
+    if p.suffix == ".jsonl":
+        df = pd.read_json(p, lines=True, dtype=False)
+    else:
+        df = pd.read_csv(p, encoding="utf-8-sig", dtype=str, keep_default_na=False, na_values=list(NA_STRINGS))
+    for k, v in filters.items():
+        if v is not None and k in df.columns:
+            df = df[df[k].isin(list(v) if isinstance(v, (list, tuple, set)) else [v])]
+    return df[[c for c in columns if c in df.columns]] if columns is not None else df
+
+
+def parse_where(spec: Optional[str]) -> Dict[str, Filter]:
+    """'lang=ko,len_bin=short|medium' -> {"lang": "ko", "len_bin": ["short", "medium"]}."""
+    out: Dict[str, Filter] = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            k, v = part.split("=", 1)
+            vals = [x.strip() for x in v.split("|") if x.strip()]
+            out[k.strip()] = vals if len(vals) > 1 else (vals[0] if vals else None)
+    return out
+
+
+def add_dataset_args(ap) -> None:
+    ap.add_argument("--where", default=None,
+                    help="Row filter pushed into the Parquet scan, e.g. 'lang=ko,len_bin=short|medium'")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Partitioned Parquet dataset of per-item metrics (model/mode/run)")
+    ap.add_argument("--root", default=str(DEFAULT_DATASET))
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("convert", help="per-item CSV/JSONL -> dataset partition(s)")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("--model", default=None)
+    p.add_argument("--mode", default=None)
+    p.add_argument("--run", default=None, help="default: file stem")
+
+    p = sub.add_parser("query", help="mean of metric columns per group")
+    p.add_argument("--metrics", required=True, help="comma list, e.g. chrf,rouge_l")
+    p.add_argument("--by", default="mode", help="comma list of group columns")
+    add_dataset_args(p)
+
+    sub.add_parser("info")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    if args.cmd == "convert":
+        for path in map(Path, args.paths):
+            n = write_metrics(read_any(path), args.root, model=args.model, mode=args.mode, run=args.run or path.stem)
+            print(f"[OK] {path} -> {args.root} rows={n}")
+    elif args.cmd == "query":
+        metrics = [m for m in args.metrics.split(",") if m]
+        by = [b for b in args.by.split(",") if b]
+        df = read_metrics(args.root, columns=by + metrics, **parse_where(args.where))
+        print(df.groupby(by, dropna=False)[metrics].agg(["mean", "count"]).to_string())
+    else:
+        d = dataset(args.root)
+        print(json.dumps({"rows": d.count_rows(), "files": len(d.files), "schema": d.schema.to_string().splitlines()},
+                         ensure_ascii=False, indent=2))
+    print(f"[TIME] {(time.perf_counter() - t0) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
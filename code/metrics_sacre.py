@@ -4,10 +4,12 @@ import argparse
 import csv
 import json
 from pathlib import Path
-from typing import Any, Dict, List, Tuple, Optional, Iterator
+from typing import Any, Dict, List, Tuple, Optional
 
-import sacrebleu
-from sacrebleu.metrics import BLEU, CHRF
+from jsonl_reader import iter_jsonl_range
+from ref_store import RefStore, add_ref_store_args
+from score_engine import (ScoreConfig, corpus_from_stats, line_shards, map_shards,
+                          merge_pair_stats, pair_stats, score_columns)
 
 def _read_prompts_csv_for_refs(csv_path: Path) -> Dict[str, str]:
     if not csv_path.exists():
@@ -38,110 +40,122 @@ def _read_prompts_csv_for_refs(csv_path: Path) -> Dict[str, str]:
                 id2ref[rid] = ref
     return id2ref
 
-def iter_pairs_from_raw(
-    raw_dir: Path,
-    id2ref: Optional[Dict[str, str]],
-) -> Iterator[Tuple[str, str, str, str]]:
-    for p in raw_dir.glob("*.jsonl"):
-        with p.open("r", encoding="utf-8") as f:
-            for ln in f:
-                ln = ln.strip()
-                if not ln:
-                    continue
-                try:
-                    o = json.loads(ln)
-                except Exception:
-                    continue
-                hyp = o.get("output") or ""
-                ref = o.get("reference") or ""
-                rid = str(o.get("id", "") or "")
-                if not ref and id2ref and rid in id2ref:
-                    ref = id2ref[rid]
-                yield (p.name, rid, hyp, ref)
-
-def corpus_bleu_chrf(hyps: List[str], refs: List[str]) -> Tuple[float, float]:
-    if not hyps:
-        return 0.0, 0.0
-    bleu = BLEU(effective_order=True)
-    chrf = CHRF()
-    b = bleu.corpus_score(hyps, [refs]).score
-    c = chrf.corpus_score(hyps, [refs]).score
-    return b, c
-
-def mode_a_main(inputs: str, out: str, prompts_csv: Optional[str], by_file: bool) -> None:
+PAIR_FIELDS = ("id", "output", "reference")
+
+def _pair_from_record(o: Dict[str, Any], id2ref: Optional[Dict[str, str]]) -> Tuple[str, str, str]:
+    hyp = o.get("output") or ""
+    ref = o.get("reference") or ""
+    rid = str(o.get("id", "") or "")
+    if not ref and id2ref and rid in id2ref:
+        ref = id2ref[rid]
+    return rid, hyp, ref
+
+_ID2REF: Optional[Dict[str, str]] = None
+_STORE: Optional[RefStore] = None
+
+def _init_worker(id2ref: Optional[Dict[str, str]], store_path: Optional[str] = None) -> None:
+    global _ID2REF, _STORE
+    _ID2REF = id2ref
+    _STORE = RefStore(store_path) if store_path else None
+
+def _shard_stats(task: Tuple[str, int, int]) -> Tuple[str, Dict[str, Any]]:
+    """One byte range of one file -> (file name, summed BLEU/chrF sufficient stats)."""
+    path, start, end = task
+    ids: List[str] = []
+    hyps: List[str] = []
+    refs: List[str] = []
+    for o in iter_jsonl_range(path, start, end, fields=PAIR_FIELDS):
+        pair = _pair_from_record(o, _ID2REF)
+        if not str(pair[2]).strip():
+            continue
+        ids.append(pair[0])
+        hyps.append(pair[1] or "")
+        refs.append(pair[2] or "")
+    return Path(path).name, pair_stats(hyps, refs, ("bleu", "chrf"), ref_store=_STORE, ref_ids=ids)
+
+def mode_a_main(inputs: str, out: str, prompts_csv: Optional[str], by_file: bool, workers: int = 1,
+                ref_store_path: Optional[str] = None) -> None:
+    """Corpus BLEU/chrF over every *.jsonl in a raw dir.
+
+    Files are split into byte ranges; each range yields summed sacrebleu sufficient
+    stats, so the merged scores are identical for any --workers value.
+    """
     raw_dir = Path(inputs)
     out_path = Path(out)
     id2ref = _read_prompts_csv_for_refs(Path(prompts_csv)) if prompts_csv else None
 
-    all_hyps: List[str] = []
-    all_refs: List[str] = []
-    per_file: Dict[str, Dict[str, Any]] = {}
-
-    for fp, rid, hyp, ref in iter_pairs_from_raw(raw_dir, id2ref):
-        if not str(ref).strip():
-            continue
-        all_hyps.append(hyp or "")
-        all_refs.append(ref or "")
-        if by_file:
-            d = per_file.setdefault(fp, {"hyps": [], "refs": []})
-            d["hyps"].append(hyp or "")
-            d["refs"].append(ref or "")
+    tasks = line_shards(sorted(raw_dir.glob("*.jsonl")), max(1, workers) * 4)
+    results = map_shards(_shard_stats, tasks, workers, initializer=_init_worker, initargs=(id2ref, ref_store_path))
 
-    b, c = corpus_bleu_chrf(all_hyps, all_refs)
-    out_obj: Dict[str, Any] = {"BLEU": b, "chrF": c, "n": len(all_hyps)}
+    per_file: Dict[str, List[Dict[str, Any]]] = {}
+    for fname, st in results:
+        per_file.setdefault(fname, []).append(st)
+    total = merge_pair_stats([st for _, st in results])
+    sc = corpus_from_stats(total)
+    b, c, n = sc.get("bleu", 0.0), sc.get("chrf", 0.0), total["n"]
+    out_obj: Dict[str, Any] = {"BLEU": b, "chrF": c, "n": n}
 
     if by_file:
         by = []
-        for fname, d in sorted(per_file.items()):
-            bb, cc = corpus_bleu_chrf(d["hyps"], d["refs"])
-            by.append({"file": fname, "BLEU": bb, "chrF": cc, "n": len(d["hyps"])})
+        for fname, parts in sorted(per_file.items()):
+            st = merge_pair_stats(parts)
+            fs = corpus_from_stats(st)
+            by.append({"file": fname, "BLEU": fs.get("bleu", 0.0), "chrF": fs.get("chrf", 0.0), "n": st["n"]})
         out_obj["by_file"] = by
 
     out_path.parent.mkdir(parents=True, exist_ok=True)
     with out_path.open("w", encoding="utf-8") as f:
         json.dump(out_obj, f, ensure_ascii=False, indent=2)
-    print("[OK] wrote", out_path, {"BLEU": b, "chrF": c, "n": len(all_hyps)})
-
-def mode_b_main(refs: str, hyps_general: str, hyps_instructed: str, out_bleu: str, out_chrf: str) -> None:
+    print("[OK] wrote", out_path, {"BLEU": b, "chrF": c, "n": n})
+
+def bleu_signature(cfg: ScoreConfig) -> str:
+    """sacrebleu signature of the corpus BLEU that cfg reproduces (one reference per line)."""
+    from sacrebleu.metrics import BLEU
+    bleu = BLEU(lowercase=cfg.lowercase, tokenize=cfg.bleu_tokenize, smooth_method=cfg.bleu_smooth,
+                effective_order=cfg.bleu_effective_order)
+    bleu.num_refs = 1  # sacrebleu 는 평가 뒤에야 참조 수를 안다: 여기서는 항상 줄마다 하나
+    return str(bleu.get_signature())
+
+def mode_b_main(refs: str, hyps_general: str, hyps_instructed: str, out_bleu: str, out_chrf: str,
+                ref_store_path: Optional[str] = None) -> None:
     refs_lines = [ln.rstrip("\n") for ln in Path(refs).read_text(encoding="utf-8").splitlines()]
     g_lines    = [ln.rstrip("\n") for ln in Path(hyps_general).read_text(encoding="utf-8").splitlines()]
     i_lines    = [ln.rstrip("\n") for ln in Path(hyps_instructed).read_text(encoding="utf-8").splitlines()]
     if not (len(refs_lines) == len(g_lines) == len(i_lines)):
         raise SystemExit("refs/general/instructed 길이가 다릅니다.")
 
-    bleu_g = sacrebleu.corpus_bleu(g_lines, [refs_lines])
-    bleu_i = sacrebleu.corpus_bleu(i_lines, [refs_lines])
-    chrf_m = sacrebleu.CHRF()
-    chrf_g = chrf_m.corpus_score(g_lines, [refs_lines])
-    chrf_i = chrf_m.corpus_score(i_lines, [refs_lines])
+    # sentence_bleu(effective order) 와 corpus_bleu(effective order 없음) 를 같은 stats 로 계산
+    store = RefStore(ref_store_path) if ref_store_path else None
+    res_g = score_columns(g_lines, refs_lines, ("bleu", "chrf"), ref_store=store)
+    res_i = score_columns(i_lines, refs_lines, ("bleu", "chrf"), ref_store=store)
+    plain = ScoreConfig(bleu_effective_order=False)
+    corpus_g = corpus_from_stats(res_g.stats, plain)
+    corpus_i = corpus_from_stats(res_i.stats, plain)
 
     items_bleu: List[Dict[str, Any]] = []
     items_chrf: List[Dict[str, Any]] = []
-    for idx, (r, hg, hi) in enumerate(zip(refs_lines, g_lines, i_lines), 1):
-        sb_g = sacrebleu.sentence_bleu(hg, [r]).score
-        sb_i = sacrebleu.sentence_bleu(hi, [r]).score
-        sc_g = chrf_m.sentence_score(hg, [r]).score
-        sc_i = chrf_m.sentence_score(hi, [r]).score
-        items_bleu.append({"id": str(idx), "general": sb_g / 100.0, "instructed": sb_i / 100.0})
-        items_chrf.append({"id": str(idx), "general": sc_g / 100.0, "instructed": sc_i / 100.0})
+    for idx in range(len(refs_lines)):
+        items_bleu.append({"id": str(idx + 1), "general": res_g.per_item["bleu"][idx] / 100.0,
+                           "instructed": res_i.per_item["bleu"][idx] / 100.0})
+        items_chrf.append({"id": str(idx + 1), "general": res_g.per_item["chrf"][idx] / 100.0,
+                           "instructed": res_i.per_item["chrf"][idx] / 100.0})
 
     Path(out_bleu).parent.mkdir(parents=True, exist_ok=True)
     Path(out_chrf).parent.mkdir(parents=True, exist_ok=True)
 
-    sig = getattr(bleu_g, "signature", None)
     with Path(out_bleu).open("w", encoding="utf-8") as f:
         json.dump({
             "metric": "bleu_sacre",
             "items": items_bleu,
-            "corpus": {"general": bleu_g.score / 100.0, "instructed": bleu_i.score / 100.0},
-            **({"signature": str(sig)} if sig is not None else {})
+            "corpus": {"general": corpus_g["bleu"] / 100.0, "instructed": corpus_i["bleu"] / 100.0},
+            "signature": bleu_signature(plain),
         }, f, ensure_ascii=False, indent=2)
 
     with Path(out_chrf).open("w", encoding="utf-8") as f:
         json.dump({
             "metric": "chrf",
             "items": items_chrf,
-            "corpus": {"general": chrf_g.score / 100.0, "instructed": chrf_i.score / 100.0}
+            "corpus": {"general": corpus_g["chrf"] / 100.0, "instructed": corpus_i["chrf"] / 100.0}
         }, f, ensure_ascii=False, indent=2)
 
     print("[OK] sacreBLEU/chrF ->", out_bleu, ",", out_chrf)
@@ -152,6 +166,8 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--out", help="Output JSON path for Mode A, e.g., results/quantitative/bleu_chrf.json")
     p.add_argument("--prompts", help="(Optional, Mode A) prompts CSV with columns id,reference")
     p.add_argument("--by-file", action="store_true", help="(Mode A) also include per-file metrics")
+    p.add_argument("--workers", type=int, default=1, help="(Mode A) processes to shard files/line ranges across")
+    add_ref_store_args(p)
 
     p.add_argument("--refs", help="(Mode B) references .txt (one per line)")
     p.add_argument("--hyps-general", help="(Mode B) general hyps .txt (one per line)")
@@ -180,15 +196,18 @@ def parse_args() -> argparse.Namespace:
 
 def main():
     args = parse_args()
+    store_path = args.ref_store_path if args.ref_store else None
     if args.inputs:
-        mode_a_main(inputs=args.inputs, out=args.out, prompts_csv=args.prompts, by_file=args.by_file)
+        mode_a_main(inputs=args.inputs, out=args.out, prompts_csv=args.prompts, by_file=args.by_file,
+                    workers=args.workers, ref_store_path=store_path)
     else:
         mode_b_main(
             refs=args.refs,
             hyps_general=args.hyps_general,
             hyps_instructed=args.hyps_instructed,
             out_bleu=args.out_bleu,
-            out_chrf=args.out_chrf
+            out_chrf=args.out_chrf,
+            ref_store_path=store_path,
         )
 
 if __name__ == "__main__":
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from jsonl_reader import iter_jsonl
+from ollama_client import OllamaClient
+
+# Ollama 는 모델을 바꿀 때마다 가중치를 내리고 다시 올린다. 같은 모델의 작업을 한 묶음으로 돌리고,
+# 묶음 시작 때 워밍업 요청으로 미리 올린 뒤 keep_alive 로 묶음이 끝날 때까지 붙잡아 둔다.
+# load_duration 은 매 응답에 있지만 이미 올라가 있으면 수 ms 라서, LOAD_EVENT_MS 이상만 "로드"로 센다.
+LOAD_EVENT_MS = 250.0
+DEFAULT_KEEP_ALIVE = "30m"
+
+
+def load_ms(obj: Dict[str, Any]) -> Optional[float]:
+    """load_duration (ns) of an Ollama response / final stream chunk, in ms."""
+    v = obj.get("load_duration")
+    return round(v / 1e6, 1) if isinstance(v, (int, float)) else None
+
+
+def resident_models(client: OllamaClient, timeout: float = 5.0) -> List[str]:
+    """Models currently loaded (/api/ps); empty when the server does not support it."""
+    try:
+        data = client.get_json("/api/ps", timeout=timeout)
+    except Exception:
+        return []
+    return [m.get("name") or m.get("model") for m in data.get("models", []) if m.get("name") or m.get("model")]
+
+
+def group_by_model(jobs: Sequence[Dict[str, Any]], resident: Sequence[str] = ()) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """[(model, jobs)] with every job for a model together; an already-resident model goes first,
+    the rest keep first-appearance order (job order within a group is kept)."""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for j in jobs:
+        groups.setdefault(j["model"], []).append(j)
+    first = [m for m in groups if m in resident][:1]
+    return [(m, groups[m]) for m in first + [m for m in groups if m not in first]]
+
+
+class ResidencyTracker:
+    """Collects load_duration per model for one run (thread-safe)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.events: List[Dict[str, Any]] = []
+        self.total_ms: Dict[str, float] = {}
+        self.requests: Dict[str, int] = {}
+
+    def record(self, model: str, ms: Optional[float], source: str = "request") -> None:
+        if ms is None:
+            return
+        with self._lock:
+            self.total_ms[model] = self.total_ms.get(model, 0.0) + ms
+            self.requests[model] = self.requests.get(model, 0) + 1
+            if ms >= LOAD_EVENT_MS:
+                self.events.append({"model": model, "load_ms": ms, "source": source, "ts": round(time.time(), 3)})
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            models = {m: {"load_ms": round(t, 1), "requests": self.requests.get(m, 0),
+                          "load_events": sum(1 for e in self.events if e["model"] == m)}
+                      for m, t in self.total_ms.items()}
+            return {"total_load_ms": round(sum(self.total_ms.values()), 1),
+                    "load_events": len(self.events), "models": models, "events": list(self.events)}
+
+
+def warm(client: OllamaClient, model: str, keep_alive: Any = DEFAULT_KEEP_ALIVE,
+         tracker: Optional[ResidencyTracker] = None, timeout: float = 600.0) -> Optional[float]:
+    """Load model without generating (empty prompt) and pin it for keep_alive; returns load ms."""
+    data = client.post_json("/api/generate", {"model": model, "prompt": "", "stream": False,
+                                              "keep_alive": keep_alive}, timeout=timeout)
+    ms = load_ms(data)
+    if tracker is not None:
+        tracker.record(model, ms, source="warmup")
+    return ms
+
+
+def release(client: OllamaClient, model: str, timeout: float = 60.0) -> None:
+    """Unload model now (keep_alive=0) so the next group's model does not have to evict it."""
+    try:
+        client.post_json("/api/generate", {"model": model, "prompt": "", "stream": False, "keep_alive": 0},
+                         timeout=timeout)
+    except Exception:
+        pass
+
+
+def record_log_loads(tracker: ResidencyTracker, path: Path, model: str, since_iso: Optional[str] = None) -> int:
+    """Feed load_ms from a raw-log JSONL (timing.load_ms or load_ms) into tracker; returns records read.
+
+    since_iso limits to records with created_at >= since_iso (resumed logs keep old rows).
+    """
+    n = 0
+    for o in iter_jsonl(path, missing_ok=True):
+        if since_iso and str(o.get("created_at") or "") < since_iso:
+            continue
+        t = o.get("timing") if isinstance(o.get("timing"), dict) else {}
+        ms = t.get("load_ms", o.get("load_ms"))
+        if isinstance(ms, (int, float)) and not o.get("cached"):
+            tracker.record(o.get("model") or model, float(ms))
+            n += 1
+    return n
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def normalize_host(host: Optional[str]) -> str:
+    """OLLAMA_HOST 는 'host:port' 형태로도 들어오므로 스킴을 보정한다."""
+    h = (host or os.environ.get("OLLAMA_HOST") or "http://localhost:11434").strip().rstrip("/")
+    if "://" not in h:
+        h = "http://" + h
+    return h
+
+
+DEFAULT_HOST = normalize_host(None)
+
+
+class OllamaClient:
+    """Keep-alive HTTP client for the Ollama REST API.
+
+    One requests.Session per client; pool_maxsize is the per-host connection
+    limit (pool_block=True makes extra callers wait instead of opening more
+    sockets). Connection errors are retried by urllib3; 429/502/503/504 only for
+    GET. A POST /api/generate that reaches the server is never re-sent here: the
+    re-send may start a duplicate generation, and the overload must reach the
+    caller's backoff (--retries, AIMD, HostPool) on the first hit.
+    """
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        timeout: float = 120.0,
+        connect_timeout: float = 5.0,
+        retries: int = 2,
+        backoff: float = 0.5,
+        pool_connections: int = 4,
+        pool_maxsize: int = 16,
+    ):
+        self.host = normalize_host(host)
+        self.timeout = float(timeout)
+        self.connect_timeout = float(connect_timeout)
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry,
+            pool_block=True,
+        )
+        self.session = requests.Session()
+        self.session.headers.update({"Accept": "application/json"})
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def url(self, path: str) -> str:
+        return f"{self.host}/{path.lstrip('/')}"
+
+    def _timeout(self, timeout: Optional[float]) -> Tuple[float, float]:
+        return (self.connect_timeout, float(timeout) if timeout is not None else self.timeout)
+
+    def get_json(self, path: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        r = self.session.get(self.url(path), timeout=self._timeout(timeout))
+        r.raise_for_status()
+        return r.json()
+
+    def post_json(self, path: str, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        r = self.session.post(self.url(path), json=payload, timeout=self._timeout(timeout))
+        r.raise_for_status()
+        try:
+            return r.json()
+        except ValueError:
+            return {"text": r.text}
+
+    def tags(self, timeout: Optional[float] = 5.0) -> Dict[str, Any]:
+        return self.get_json("/api/tags", timeout=timeout)
+
+    def alive(self, timeout: float = 2.0) -> bool:
+        try:
+            self.tags(timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    def has_model(self, name: str, timeout: float = 5.0) -> bool:
+        try:
+            data = self.tags(timeout=timeout)
+        except Exception:
+            return False
+        return any(t.get("name") == name for t in data.get("models", data.get("tags", [])))
+
+    def generate(
+        self,
+        model: str,
+        prompt: str,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        **extra: Any,
+    ) -> Dict[str, Any]:
+        """Non-streaming /api/generate. extra 는 payload 에 그대로 합쳐진다 (system, format, keep_alive ...)."""
+        payload: Dict[str, Any] = {"model": model, "prompt": prompt, "stream": False}
+        if options:
+            payload["options"] = options
+        payload.update({k: v for k, v in extra.items() if v is not None})
+        return self.post_json("/api/generate", payload, timeout=timeout)
+
+    def generate_stream(
+        self,
+        model: str,
+        prompt: str,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        on_response: Optional[Callable[[requests.Response], None]] = None,
+        **extra: Any,
+    ) -> Iterator[Dict[str, Any]]:
+        """Streaming /api/generate: NDJSON 청크를 도착하는 대로 dict 로 넘긴다.
+
+        Closing the generator early closes the HTTP response, which makes
+        Ollama stop decoding. on_response gets the open response first, so
+        another thread can close it without waiting for the next chunk.
+        """
+        payload: Dict[str, Any] = {"model": model, "prompt": prompt, "stream": True}
+        if options:
+            payload["options"] = options
+        payload.update({k: v for k, v in extra.items() if v is not None})
+        with self.session.post(self.url("/api/generate"), json=payload,
+                               timeout=self._timeout(timeout), stream=True) as r:
+            if on_response is not None:
+                on_response(r)
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class StreamStats:
+    """Per-request token timing for a streamed generation.
+
+    t0 is taken before the request is sent, so ttft_ms includes queueing and
+    prompt evaluation. itl_ms is the mean gap between consecutive non-empty
+    chunks. eval_tps prefers Ollama's eval_count/eval_duration and falls back
+    to chunks per second of decode wall time.
+    """
+
+    def __init__(self, t0: Optional[float] = None):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.t_first: Optional[float] = None
+        self.t_last: Optional[float] = None
+        self.gaps: List[float] = []
+        self.n_tokens = 0
+        self.parts: List[str] = []
+        self.final: Dict[str, Any] = {}
+
+    def token(self, piece: str) -> None:
+        if not piece:
+            return
+        now = time.perf_counter()
+        if self.t_first is None:
+            self.t_first = now
+        else:
+            self.gaps.append(now - self.t_last)
+        self.t_last = now
+        self.n_tokens += 1
+        self.parts.append(piece)
+
+    def chunk(self, obj: Dict[str, Any]) -> None:
+        """Feed one Ollama NDJSON chunk."""
+        self.token(obj.get("response") or "")
+        if obj.get("done"):
+            self.final = obj
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    def fields(self) -> Dict[str, Any]:
+        ttft_ms = int((self.t_first - self.t0) * 1000) if self.t_first is not None else None
+        itl_ms = round(1000 * sum(self.gaps) / len(self.gaps), 2) if self.gaps else None
+        tokens = self.final.get("eval_count") or self.n_tokens
+        eval_tps = None
+        if self.final.get("eval_count") and self.final.get("eval_duration"):
+            eval_tps = round(self.final["eval_count"] / (self.final["eval_duration"] / 1e9), 2)
+        elif self.gaps:
+            eval_tps = round(len(self.gaps) / (self.t_last - self.t_first), 2) if self.t_last > self.t_first else None
+        out = {"ttft_ms": ttft_ms, "itl_ms": itl_ms, "tokens": tokens, "eval_tps": eval_tps}
+        if isinstance(self.final.get("load_duration"), (int, float)):
+            # 모델 로드 시간 (이미 올라가 있으면 수 ms)
+            out["load_ms"] = round(self.final["load_duration"] / 1e6, 1)
+        if self.final.get("done_reason"):
+            # "length" 이면 num_predict 예산에서 잘린 것
+            out["done_reason"] = self.final["done_reason"]
+        return out
+
+
+def stream_generate(client: OllamaClient, model: str, prompt: str, check: Any = None,
+                    **kwargs: Any) -> Tuple[str, Dict[str, Any]]:
+    """Consume a full stream; returns (text, timing fields).
+
+    check (stream_verify.StreamCheck) sees every piece; once it reports a
+    certain failure the stream is closed and fields["aborted"] holds the reason.
+    """
+    st = StreamStats()
+    gen = client.generate_stream(model, prompt, **kwargs)
+    aborted = None
+    try:
+        for obj in gen:
+            st.chunk(obj)
+            if check is not None and not obj.get("done"):
+                aborted = check.feed(obj.get("response") or "")
+                if aborted:
+                    break
+    finally:
+        gen.close()
+    fields = st.fields()
+    if aborted:
+        fields["aborted"] = aborted
+    return st.text, fields
+
+
+_clients: Dict[Tuple[Any, ...], OllamaClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(host: Optional[str] = None, **kwargs: Any) -> OllamaClient:
+    """Process-wide shared client per (host, settings), so every caller reuses the same pool."""
+    key = (normalize_host(host),) + tuple(sorted(kwargs.items()))
+    with _clients_lock:
+        cli = _clients.get(key)
+        if cli is None:
+            cli = OllamaClient(host, **kwargs)
+            _clients[key] = cli
+        return cli
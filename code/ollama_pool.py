@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import json
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, TypeVar
+
+import requests
+
+from ollama_client import OllamaClient, get_client, normalize_host
+
+T = TypeVar("T")
+
+# 여러 Ollama 서버에 요청을 나눈다. 라우팅은 least(진행 중 요청이 가장 적은 호스트) 또는
+# ewma(지연 EWMA × (진행 중+1)). 연속 실패가 eject_after 번이면 cooldown 동안 빼고,
+# 시간이 지나면 /api/tags 로 확인한 뒤 다시 넣는다 (실패하면 cooldown 을 두 배로, max_cooldown_s 까지).
+
+
+class NoHealthyHost(RuntimeError):
+    pass
+
+
+def parse_hosts(spec: str) -> List[str]:
+    """'a,b,c' or a file: one host per line ('#' comments) or JSON (list or {"hosts": [...]})."""
+    p = Path(spec)
+    if p.is_file():
+        txt = p.read_text(encoding="utf-8-sig")
+        try:
+            data = json.loads(txt)
+            items = data.get("hosts", []) if isinstance(data, dict) else data
+        except ValueError:
+            items = [ln.split("#", 1)[0] for ln in txt.splitlines()]
+    else:
+        items = spec.split(",")
+    hosts: List[str] = []
+    for h in items:
+        h = str(h).strip()
+        if h and normalize_host(h) not in hosts:
+            hosts.append(normalize_host(h))
+    return hosts
+
+
+def _host_fault(e: BaseException) -> bool:
+    """True when the error says something about the host (down, overloaded, model missing),
+    not about the request itself (400 etc.), so another host may succeed."""
+    if isinstance(e, requests.HTTPError) and e.response is not None:
+        code = e.response.status_code
+        return code >= 500 or code in (404, 408, 429)
+    if isinstance(e, (requests.ConnectionError, requests.Timeout, OSError)):
+        return True
+    # langchain-ollama 경로: ollama.ResponseError(status_code), httpx.ConnectError/ReadTimeout ...
+    code = getattr(e, "status_code", None)
+    if isinstance(code, int):
+        return code >= 500 or code in (404, 408, 429)
+    name = type(e).__name__
+    return "Connect" in name or "Timeout" in name
+
+
+class HostState:
+    def __init__(self, host: str, client: OllamaClient):
+        self.host = host
+        self.client = client
+        self.outstanding = 0
+        self.ewma_ms: Optional[float] = None
+        self.ok = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.cooldown_s = 0.0
+        self.ejections = 0
+        self.readmissions = 0
+        self.tokens = 0
+        self.busy_s = 0.0
+        self.latencies_ms: List[float] = []
+
+    @property
+    def ejected(self) -> bool:
+        return self.ejected_until > 0
+
+
+class Lease:
+    """One request on one host; the pool is told how it went when the lease ends."""
+
+    def __init__(self, state: HostState):
+        self.state = state
+        self.host = state.host
+        self.client = state.client
+        self.tokens: Optional[int] = None
+        self.t0 = time.perf_counter()
+
+
+class HostPool:
+    def __init__(self, hosts: Sequence[str], route: str = "least", eject_after: int = 3,
+                 cooldown_s: float = 10.0, max_cooldown_s: float = 300.0, alpha: float = 0.3,
+                 probe_timeout: float = 2.0, **client_kwargs: Any):
+        if not hosts:
+            raise ValueError("HostPool needs at least one host")
+        if route not in ("least", "ewma"):
+            raise ValueError(f"unknown route: {route}")
+        self.route = route
+        self.eject_after = max(1, eject_after)
+        self.base_cooldown_s = cooldown_s
+        self.max_cooldown_s = max_cooldown_s
+        self.alpha = alpha
+        self.probe_timeout = probe_timeout
+        self.states = [HostState(normalize_host(h), get_client(h, **client_kwargs)) for h in hosts]
+        self._lock = threading.Lock()
+        self._rr = 0
+        self.t_start = time.perf_counter()
+
+    @property
+    def hosts(self) -> List[str]:
+        return [s.host for s in self.states]
+
+    # --- health -----------------------------------------------------------
+    def _eject(self, s: HostState) -> None:
+        s.cooldown_s = min(self.max_cooldown_s, s.cooldown_s * 2 if s.cooldown_s else self.base_cooldown_s)
+        s.ejected_until = time.monotonic() + s.cooldown_s
+        s.ejections += 1
+
+    def _readmit(self, s: HostState) -> None:
+        s.ejected_until = 0.0
+        s.cooldown_s = 0.0
+        s.consecutive_failures = 0
+        s.readmissions += 1
+
+    def health_check(self) -> Dict[str, bool]:
+        """Probe every host now (/api/tags); dead hosts are ejected, recovered ones re-admitted."""
+        out: Dict[str, bool] = {}
+        for s in self.states:
+            alive = s.client.alive(timeout=self.probe_timeout)
+            with self._lock:
+                if alive and s.ejected:
+                    self._readmit(s)
+                elif not alive and not s.ejected:
+                    self._eject(s)
+            out[s.host] = alive
+        return out
+
+    def _probe_due(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            due = [s for s in self.states if s.ejected and s.ejected_until <= now]
+            for s in due:
+                # 프로브 중 다른 스레드가 같은 호스트를 다시 프로브하지 않도록 미리 밀어 둔다
+                s.ejected_until = now + self.probe_timeout + 1.0
+        for s in due:
+            alive = s.client.alive(timeout=self.probe_timeout)
+            with self._lock:
+                if alive:
+                    self._readmit(s)
+                else:
+                    self._eject(s)
+
+    # --- routing ----------------------------------------------------------
+    def _score(self, s: HostState) -> Any:
+        if self.route == "ewma":
+            # 아직 측정이 없는 호스트는 먼저 써 본다
+            return ((s.ewma_ms or 0.0) * (s.outstanding + 1), s.outstanding)
+        return (s.outstanding, s.ewma_ms or 0.0)
+
+    def acquire(self, exclude: Sequence[str] = ()) -> Lease:
+        self._probe_due()
+        with self._lock:
+            cands = [s for s in self.states if not s.ejected and s.host not in exclude]
+            if not cands:
+                raise NoHealthyHost(f"no healthy Ollama host (tried: {', '.join(exclude) or '-'})")
+            # 점수가 같으면 돌아가며 고른다
+            self._rr += 1
+            k = self._rr % len(cands)
+            best = min(cands[k:] + cands[:k], key=self._score)
+            best.outstanding += 1
+            return Lease(best)
+
+    def release(self, lease: Lease, ok: bool, host_fault: bool = True) -> None:
+        dt = time.perf_counter() - lease.t0
+        s = lease.state
+        with self._lock:
+            s.outstanding -= 1
+            s.busy_s += dt
+            if ok:
+                ms = dt * 1000
+                s.ok += 1
+                s.consecutive_failures = 0
+                s.latencies_ms.append(ms)
+                s.ewma_ms = ms if s.ewma_ms is None else self.alpha * ms + (1 - self.alpha) * s.ewma_ms
+                s.tokens += int(lease.tokens or 0)
+            else:
+                s.errors += 1
+                if host_fault:
+                    s.consecutive_failures += 1
+                    if s.consecutive_failures >= self.eject_after and not s.ejected:
+                        self._eject(s)
+
+    @contextmanager
+    def lease(self, exclude: Sequence[str] = ()) -> Iterator[Lease]:
+        """Hold one host for a (possibly streamed) request; set lease.tokens for throughput stats."""
+        ls = self.acquire(exclude)
+        try:
+            yield ls
+        except BaseException as e:
+            self.release(ls, ok=False, host_fault=_host_fault(e))
+            raise
+        else:
+            self.release(ls, ok=True)
+
+    def call(self, fn: Callable[[OllamaClient], T], tokens: Optional[Callable[[T], Optional[int]]] = None) -> T:
+        """fn(client) on the best host; host failures fail over to the others (each tried once)."""
+        tried: List[str] = []
+        while True:
+            try:
+                with self.lease(exclude=tried) as ls:
+                    tried.append(ls.host)
+                    out = fn(ls.client)
+                    if tokens is not None:
+                        ls.tokens = tokens(out)
+                    return out
+            except NoHealthyHost:
+                raise
+            except Exception as e:
+                if not _host_fault(e) or len(tried) >= len(self.states):
+                    raise
+
+    # --- report -----------------------------------------------------------
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        wall = max(1e-9, time.perf_counter() - self.t_start)
+        out: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for s in self.states:
+                lat = sorted(s.latencies_ms)
+                out[s.host] = {
+                    "ok": s.ok, "errors": s.errors, "ejections": s.ejections, "readmissions": s.readmissions,
+                    "ejected": s.ejected,
+                    "latency_ms_mean": round(statistics.fmean(lat), 1) if lat else None,
+                    "latency_ms_p95": round(lat[min(len(lat) - 1, int(0.95 * (len(lat) - 1) + 0.5))], 1) if lat else None,
+                    "ewma_ms": round(s.ewma_ms, 1) if s.ewma_ms is not None else None,
+                    "throughput_rps": round(s.ok / wall, 3),
+                    "tokens_per_s": round(s.tokens / s.busy_s, 2) if s.tokens and s.busy_s else None,
+                }
+        return out
+
+    def print_stats(self) -> None:
+        for host, st in self.stats().items():
+            print(f"[POOL] {host} ok={st['ok']} err={st['errors']} ejections={st['ejections']} "
+                  f"mean={st['latency_ms_mean']}ms p95={st['latency_ms_p95']}ms rps={st['throughput_rps']}")
+
+
+def add_pool_args(ap) -> None:
+    ap.add_argument("--hosts", default=None,
+                    help="Several Ollama hosts: 'h1:11434,h2:11434' or a file (one per line / JSON list)")
+    ap.add_argument("--route", choices=["least", "ewma"], default="least",
+                    help="Host choice: least outstanding requests, or latency EWMA x outstanding")
+    ap.add_argument("--eject-after", type=int, default=3, dest="eject_after",
+                    help="Consecutive host failures before a host is taken out of rotation")
+
+
+def pool_from_args(args, **client_kwargs: Any) -> Optional[HostPool]:
+    if not getattr(args, "hosts", None):
+        return None
+    pool = HostPool(parse_hosts(args.hosts), route=args.route, eject_after=args.eject_after, **client_kwargs)
+    health = pool.health_check()
+    print(f"[POOL] route={pool.route} hosts=" + ", ".join(f"{h}({'up' if ok else 'down'})" for h, ok in health.items()))
+    return pool
@@ -4,6 +4,8 @@ from pathlib import Path
 from typing import Tuple, List, Dict
 import numpy as np
 
+from bootstrap import bootstrap_means
+
 try:
     from scipy.stats import wilcoxon
     SCIPY_OK = True
@@ -94,12 +96,7 @@ def cohen_d_paired(g: np.ndarray, i: np.ndarray) -> float:
 def bootstrap_ci(diff: np.ndarray, n_boot: int = 10000, alpha: float = 0.05, seed: int = 42):
     if diff.size == 0 or n_boot <= 0:
         return float("nan"), float("nan")
-    rng = np.random.default_rng(seed)
-    n = diff.size
-    boots = np.empty(n_boot, dtype=float)
-    for b in range(n_boot):
-        idx = rng.integers(0, n, n)
-        boots[b] = float(np.mean(diff[idx]))
+    boots = bootstrap_means(diff, B=n_boot, seed=seed)
     lo = float(np.percentile(boots, 100 * (alpha / 2)))
     hi = float(np.percentile(boots, 100 * (1 - alpha / 2)))
     return lo, hi
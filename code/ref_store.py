@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_REF_STORE_PATH = Path(os.environ.get("LLM_REF_STORE", ROOT / "results" / "cache" / "ref_store.sqlite"))
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+class RefStore:
+    """Persistent reference-side tokenization (SQLite, WAL).
+
+    Rows are keyed on (kind, sha256(reference text)); kind names the tokenizer
+    and its settings (see score_engine.ref_kind). Editing a reference changes
+    its hash, so stale rows are never returned; the ref_id column only records
+    where a row came from. Tokens are stored space-joined (no tokenizer here
+    emits whitespace inside a token).
+    """
+
+    def __init__(self, path: Path | str = DEFAULT_REF_STORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ref_tok ("
+            " kind TEXT NOT NULL,"
+            " hash TEXT NOT NULL,"
+            " ref_id TEXT,"
+            " ntok INTEGER NOT NULL,"
+            " tokens TEXT NOT NULL,"
+            " PRIMARY KEY (kind, hash)) WITHOUT ROWID"
+        )
+
+    def tokens(
+        self,
+        kind: str,
+        refs: Sequence[str],
+        tokenize: Callable[[str], List[str]],
+        ref_ids: Optional[Sequence[Any]] = None,
+    ) -> List[List[str]]:
+        """Token lists for refs (parallel to refs); misses are tokenized and stored in one transaction.
+
+        Identical reference texts share one list object, so treat the result as read-only.
+        """
+        hashes = [text_hash(r) for r in refs]
+        first: Dict[str, int] = {}
+        for i, h in enumerate(hashes):
+            first.setdefault(h, i)
+        found: Dict[str, List[str]] = {}
+        uniq = list(first)
+        with self._lock:
+            for k in range(0, len(uniq), 500):
+                chunk = uniq[k:k + 500]
+                q = "SELECT hash, tokens FROM ref_tok WHERE kind=? AND hash IN (%s)" % ",".join("?" * len(chunk))
+                for h, toks in self._conn.execute(q, [kind, *chunk]):
+                    found[h] = toks.split()
+        missing = [h for h in uniq if h not in found]
+        self.hits += len(uniq) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            rows = []
+            for h in missing:
+                i = first[h]
+                toks = tokenize(refs[i])
+                found[h] = toks
+                rid = None if ref_ids is None else str(ref_ids[i])
+                rows.append((kind, h, rid, len(toks), " ".join(toks)))
+            with self._lock:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO ref_tok(kind, hash, ref_id, ntok, tokens) VALUES (?,?,?,?,?)", rows)
+                self._conn.execute("COMMIT")
+        return [found[h] for h in hashes]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM ref_tok").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            "entries": entries,
+            "path": str(self.path),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def add_ref_store_args(ap) -> None:
+    ap.add_argument("--ref-store", action=argparse.BooleanOptionalAction, default=True,
+                    help="Reuse reference-side tokenization across runs/metrics (keyed on ref text hash)")
+    ap.add_argument("--ref-store-path", default=str(DEFAULT_REF_STORE_PATH), help="SQLite ref store file")
+
+
+def ref_store_from_args(args) -> Optional[RefStore]:
+    if not getattr(args, "ref_store", False):
+        return None
+    return RefStore(args.ref_store_path)
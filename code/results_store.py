@@ -0,0 +1,374 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from jsonl_reader import iter_jsonl
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_RESULTS_DB = Path(os.environ.get("LLM_RESULTS_DB", ROOT / "results" / "results.sqlite"))
+
+# 레거시 CSV 는 base/instr, raw 로그는 general/instructed 를 쓴다. 저장할 때 하나로 맞춘다.
+MODE_ALIASES = {"base": "general", "instr": "instructed", "instruct": "instructed"}
+ID_KEYS = ("id", "example_id", "example", "idx", "index")
+PRED_KEYS = ("output", "prediction", "pred", "response", "generated", "text", "hyp", "prediction_text")
+REF_KEYS = ("reference", "ref", "references", "target", "gold")
+ITEM_COLS = ("input", "reference", "scenario", "param", "domain", "lang", "len_bin", "diff_bin")
+GEN_COLS = ("output", "error", "latency_ms", "tokens", "created_at", "source")
+
+
+def norm_mode(mode: Optional[str]) -> str:
+    m = (mode or "").strip().lower()
+    return MODE_ALIASES.get(m, m)
+
+
+def _first(rec: Dict[str, Any], keys: Sequence[str]) -> Any:
+    for k in keys:
+        v = rec.get(k)
+        if v not in (None, "", []):
+            return v[0] if isinstance(v, list) else v
+    return None
+
+
+class ResultsStore:
+    """Per-item results of every run (SQLite, WAL), replacing the per_item_*.csv merge chain.
+
+    Tables: items (id → input/reference/scenario ...), runs (name → seq, in
+    insertion order), generations keyed on (id, mode, model, run) and metrics
+    keyed on (id, mode, model, run, metric). Writes are upserts, so a retry run
+    only touches the retried rows. latest() picks, per (id, mode, model), the
+    successful generation of the newest run — the join the merge/recover
+    scripts used to redo over whole files.
+    """
+
+    def __init__(self, path: Path | str = DEFAULT_RESULTS_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS items ("
+            " id TEXT PRIMARY KEY COLLATE NOCASE, input TEXT, reference TEXT, scenario TEXT, param TEXT,"
+            " domain TEXT, lang TEXT, len_bin TEXT, diff_bin TEXT) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, run TEXT NOT NULL UNIQUE, source TEXT, note TEXT,"
+            " created REAL NOT NULL);"
+            + "".join(f"CREATE TABLE IF NOT EXISTS {t} ({ddl}) WITHOUT ROWID;" for t, ddl in self.TABLES.items())
+        )
+        for t in self.TABLES:
+            self._migrate_nocase(t)
+
+    # prompts.csv / raw 로그는 ex-0001, pairs CSV 는 EX-0001 — id 는 모든 테이블에서 대소문자 무시로 비교한다
+    # (그래야 재시도 run 의 ex-0001 이 pairs 의 EX-0001 을 latest() 에서 대체한다)
+    TABLES = {
+        "generations": (
+            "id TEXT NOT NULL COLLATE NOCASE, mode TEXT NOT NULL, model TEXT NOT NULL, run TEXT NOT NULL,"
+            " seq INTEGER NOT NULL, ok INTEGER NOT NULL,"
+            " output TEXT, error TEXT, latency_ms REAL, tokens INTEGER, created_at TEXT, source TEXT, extra TEXT,"
+            # seq 는 run 과 1:1 이므로 (mode, model, id, seq) 순으로 묶어 두면 latest() 가 정렬 없이 한 번에 읽는다
+            " PRIMARY KEY (mode, model, id, seq)"),
+        "metrics": (
+            "id TEXT NOT NULL COLLATE NOCASE, mode TEXT NOT NULL, model TEXT NOT NULL, run TEXT NOT NULL,"
+            " metric TEXT NOT NULL, value REAL,"
+            " PRIMARY KEY (id, mode, model, run, metric)"),
+    }
+
+    def _migrate_nocase(self, table: str) -> None:
+        """Rebuild a table created before id was COLLATE NOCASE; on a case-only clash the later run wins."""
+        sql = self._conn.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()[0]
+        if "COLLATE NOCASE" in sql:
+            return
+        src = (f"SELECT * FROM {table} ORDER BY seq" if table == "generations" else
+               f"SELECT m.* FROM {table} m LEFT JOIN runs r USING(run) ORDER BY r.seq")
+        self._conn.executescript(
+            "BEGIN;"
+            f"CREATE TABLE {table}_nocase ({self.TABLES[table]}) WITHOUT ROWID;"
+            f"INSERT OR REPLACE INTO {table}_nocase {src};"
+            f"DROP TABLE {table};"
+            f"ALTER TABLE {table}_nocase RENAME TO {table};"
+            "COMMIT;"
+        )
+
+    # --- writes -----------------------------------------------------------
+    def add_run(self, run: str, source: Optional[str] = None, note: Optional[str] = None) -> int:
+        """Register run (idempotent) and return its seq; later runs win in latest()."""
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO runs(run, source, note, created) VALUES (?,?,?,?)",
+                               (run, source, note, time.time()))
+            return self._conn.execute("SELECT seq FROM runs WHERE run=?", (run,)).fetchone()[0]
+
+    def upsert_items(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Item fields; a missing/empty field never blanks a stored one."""
+        data = []
+        for r in rows:
+            pid = _first(r, ID_KEYS)
+            if pid is None:
+                continue
+            vals = {c: r.get(c) for c in ITEM_COLS}
+            if not vals["reference"]:
+                vals["reference"] = _first(r, REF_KEYS)
+            if not vals["param"]:
+                vals["param"] = r.get("params")
+            if isinstance(vals["param"], dict):
+                vals["param"] = ";".join(f"{k}={v}" for k, v in vals["param"].items())
+            data.append([str(pid)] + [None if vals[c] in (None, "") else str(vals[c]) for c in ITEM_COLS])
+        sets = ", ".join(f"{c}=COALESCE(excluded.{c}, items.{c})" for c in ITEM_COLS)
+        sql = (f"INSERT INTO items(id, {', '.join(ITEM_COLS)}) VALUES ({', '.join('?' * (len(ITEM_COLS) + 1))}) "
+               f"ON CONFLICT(id) DO UPDATE SET {sets}")
+        return self._many(sql, data)
+
+    def upsert_generations(self, rows: Iterable[Dict[str, Any]], run: str, mode: Optional[str] = None,
+                           model: Optional[str] = None, source: Optional[str] = None) -> int:
+        """Raw-log / pairs records into run; mode/model fill in when a record lacks them."""
+        seq = self.add_run(run, source=source)
+        data = []
+        for r in rows:
+            pid = _first(r, ID_KEYS)
+            if pid is None:
+                continue
+            out = _first(r, PRED_KEYS)
+            if out is not None and not isinstance(out, str):
+                out = json.dumps(out, ensure_ascii=False)
+            timing = r.get("timing") if isinstance(r.get("timing"), dict) else {}
+            err = r.get("error") or None
+            extra = {k: v for k, v in r.items()
+                     if k not in ITEM_COLS + GEN_COLS + PRED_KEYS + ID_KEYS + ("mode", "model", "prompt", "timing")}
+            data.append((
+                str(pid), norm_mode(r.get("mode") or mode), str(r.get("model") or model or ""), run, seq,
+                int(bool(out) and not err), out, err,
+                r.get("latency_ms", timing.get("latency_ms")), r.get("tokens", timing.get("tokens")),
+                r.get("created_at"), source,
+                json.dumps(extra, ensure_ascii=False) if extra else None,
+            ))
+        sql = ("INSERT INTO generations(id, mode, model, run, seq, ok, output, error, latency_ms, tokens, "
+               "created_at, source, extra) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?) "
+               "ON CONFLICT(mode, model, id, seq) DO UPDATE SET ok=excluded.ok, output=excluded.output, "
+               "error=excluded.error, latency_ms=excluded.latency_ms, tokens=excluded.tokens, "
+               "created_at=excluded.created_at, source=excluded.source, extra=excluded.extra")
+        return self._many(sql, data)
+
+    def upsert_metrics(self, rows: Iterable[Dict[str, Any]], run: str, metrics: Sequence[str],
+                       mode: Optional[str] = None, model: Optional[str] = None) -> int:
+        """Per-item metric columns (e.g. chrf, rouge_l) of a with_metrics CSV; NA/blank values are skipped."""
+        self.add_run(run)
+        data = []
+        for r in rows:
+            pid = _first(r, ID_KEYS)
+            for m in metrics:
+                try:
+                    v = float(r.get(m))
+                except (TypeError, ValueError):
+                    continue
+                if pid is not None and v == v:
+                    data.append((str(pid), norm_mode(r.get("mode") or mode), str(r.get("model") or model or ""),
+                                 run, m, v))
+        return self._many("INSERT INTO metrics(id, mode, model, run, metric, value) VALUES (?,?,?,?,?,?) "
+                          "ON CONFLICT(id, mode, model, run, metric) DO UPDATE SET value=excluded.value", data)
+
+    def _many(self, sql: str, data: List[Sequence[Any]]) -> int:
+        if not data:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(sql, data)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return len(data)
+
+    # --- reads ------------------------------------------------------------
+    def latest(self, mode: Optional[str] = None, model: Optional[str] = None,
+               ok_only: bool = True) -> Iterator[Dict[str, Any]]:
+        """Newest generation per (id, mode, model) with the item's reference/scenario; ok_only skips
+        empty/errored ones."""
+        where, params = [], []
+        if mode:
+            where.append("g.mode=?")
+            params.append(norm_mode(mode))
+        if model is not None:
+            where.append("g.model=?")
+            params.append(model)
+        if ok_only:
+            where.append("g.ok=1")
+        # SQLite 는 MAX() 집계의 나머지(bare) 컬럼을 최댓값 행에서 가져온다. items 는 묶은 뒤에 붙인다.
+        # id 는 items 의 표기(prompts.csv)를 우선 쓴다
+        sql = ("SELECT COALESCE(i.id, l.id) AS id, l.mode, l.model, l.run, l.seq, l.output, l.error, l.latency_ms,"
+               " l.tokens, i.reference, i.scenario FROM ("
+               "SELECT g.id, g.mode, g.model, g.run, MAX(g.seq) AS seq, g.output, g.error, g.latency_ms, g.tokens "
+               "FROM generations g " + (("WHERE " + " AND ".join(where)) if where else "")
+               + " GROUP BY g.mode, g.model, g.id) l LEFT JOIN items i ON i.id=l.id")
+        with self._lock:
+            cur = self._conn.execute(sql, params)
+            cols = [d[0] for d in cur.description]
+            rows = cur.fetchall()
+        for r in rows:
+            yield dict(zip(cols, r))
+
+    def metrics_for(self, metrics: Sequence[str], mode: Optional[str] = None) -> Dict[tuple, Dict[str, float]]:
+        """(id, mode, model) -> {metric: value} from the newest run that has each metric."""
+        q = ("SELECT COALESCE(i.id, l.id), l.mode, l.model, l.metric, l.value FROM ("
+             "SELECT m.id, mode, model, metric, value, MAX(r.seq) FROM metrics m JOIN runs r USING(run) "
+             f"WHERE metric IN ({','.join('?' * len(metrics))})" + (" AND mode=?" if mode else "")
+             + " GROUP BY m.id, mode, model, metric) l LEFT JOIN items i ON i.id=l.id")
+        out: Dict[tuple, Dict[str, float]] = {}
+        with self._lock:
+            for pid, md, model, m, v in self._conn.execute(q, [*metrics, *([norm_mode(mode)] if mode else [])]):
+                out.setdefault((pid, md, model), {})[m] = v
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            n = {t: self._conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                 for t in ("items", "runs", "generations", "metrics")}
+            by = self._conn.execute("SELECT mode, model, COUNT(DISTINCT id), SUM(ok) FROM generations "
+                                    "GROUP BY mode, model").fetchall()
+        n["by_mode_model"] = [{"mode": m, "model": md, "ids": ids, "ok_generations": ok} for m, md, ids, ok in by]
+        n["path"] = str(self.path)
+        return n
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# --- import / export ------------------------------------------------------
+def read_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    return iter_jsonl(path)
+
+
+def read_csv_rows(path: Path) -> List[Dict[str, Any]]:
+    for enc in ("utf-8-sig", "cp949"):
+        try:
+            with path.open(newline="", encoding=enc) as f:
+                return list(csv.DictReader(f))
+        except UnicodeDecodeError:
+            continue
+    with path.open(newline="", encoding="utf-8", errors="replace") as f:
+        return list(csv.DictReader(f))
+
+
+# 레거시 파일 레이아웃: kind -> (열, 설명)
+EXPORT_KINDS = {
+    "pairs": (["id", "prediction"], "per_item_{base,instruct}_pairs*.csv"),
+    "text": (["id", "reference", "prediction"], "per_item_text_pairs.csv"),
+    "metrics": (["id", "mode", "reference", "prediction", "chrf", "rouge_l"], "per_item_pairs_*_with_metrics.csv"),
+    "wide": (["id", "reference", "base_prediction", "instr_prediction"], "per_item_pairs_wide.csv"),
+}
+LEGACY_MODE = {"general": "base", "instructed": "instr"}
+
+
+def export_csv(store: ResultsStore, kind: str, out: Path, mode: Optional[str] = None,
+               model: Optional[str] = None) -> int:
+    """Regenerate a legacy per_item CSV (utf-8-sig) from the newest successful generations."""
+    cols = EXPORT_KINDS[kind][0]
+    if kind == "wide":
+        # items 에 없는 id 는 모드마다 표기가 다를 수 있으므로 소문자로 맞춰 묶는다
+        base = {r["id"].lower(): r for r in store.latest("general", model)}
+        inst = {r["id"].lower(): r for r in store.latest("instructed", model)}
+        rows = [{"id": (base.get(k) or inst.get(k))["id"],
+                 "reference": (base.get(k) or inst.get(k))["reference"] or "",
+                 "base_prediction": (base.get(k) or {}).get("output") or "",
+                 "instr_prediction": (inst.get(k) or {}).get("output") or ""}
+                for k in sorted(set(base) | set(inst))]
+    else:
+        if not mode:
+            raise ValueError(f"export kind '{kind}' needs a mode")
+        rows = [{"id": r["id"], "mode": LEGACY_MODE.get(r["mode"], r["mode"]), "reference": r["reference"] or "",
+                 "prediction": r["output"] or "", "_key": (r["id"].lower(), r["mode"], r["model"])}
+                for r in store.latest(mode, model)]
+        if kind == "metrics":
+            m = {(k[0].lower(),) + k[1:]: v for k, v in store.metrics_for(["chrf", "rouge_l"], mode).items()}
+            for r in rows:
+                vals = m.get(r["_key"], {})
+                r.update({k: vals.get(k, "NA") for k in ("chrf", "rouge_l")})
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with out.open("w", newline="", encoding="utf-8-sig") as f:
+        w = csv.DictWriter(f, fieldnames=cols, extrasaction="ignore")
+        w.writeheader()
+        w.writerows(rows)
+    return len(rows)
+
+
+def add_store_args(ap) -> None:
+    ap.add_argument("--results-db", default=None, dest="results_db",
+                    help=f"Also upsert this run into the results store (e.g. {DEFAULT_RESULTS_DB.relative_to(ROOT)})")
+    ap.add_argument("--run", default=None, help="Run name in --results-db (default: output file stem)")
+
+
+def record_run(args, out_path: Path, items: Iterable[Dict[str, Any]] = (), mode: Optional[str] = None,
+               model: Optional[str] = None) -> Optional[int]:
+    """Upsert a finished run's JSONL (and its prompt rows) into --results-db; None when not set."""
+    if not getattr(args, "results_db", None):
+        return None
+    store = ResultsStore(args.results_db)
+    try:
+        store.upsert_items(items)
+        return store.upsert_generations(read_jsonl(out_path), args.run or out_path.stem, mode=mode, model=model,
+                                         source=str(out_path))
+    finally:
+        store.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Indexed per-item results store (items/runs/generations/metrics)")
+    ap.add_argument("--db", default=str(DEFAULT_RESULTS_DB), help="SQLite file")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("import-items", help="prompts CSV / manifest JSON -> items")
+    p.add_argument("paths", nargs="+")
+
+    p = sub.add_parser("import", help="raw-log JSONL or pairs CSV -> generations (one run per file unless --run)")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("--run", default=None, help="run name (default: file stem); same run = upsert")
+    p.add_argument("--mode", default=None, help="mode for records without one (base/instr/general/instructed)")
+    p.add_argument("--model", default=None)
+    p.add_argument("--metrics", default="chrf,rouge_l", help="CSV metric columns to store, if present")
+
+    p = sub.add_parser("export", help="regenerate a legacy per_item CSV")
+    p.add_argument("--kind", choices=sorted(EXPORT_KINDS), required=True)
+    p.add_argument("--mode", default=None)
+    p.add_argument("--model", default=None)
+    p.add_argument("--out", required=True)
+
+    sub.add_parser("stats")
+    args = ap.parse_args()
+
+    store = ResultsStore(args.db)
+    t0 = time.perf_counter()
+    if args.cmd == "import-items":
+        for path in map(Path, args.paths):
+            rows = (json.loads(path.read_text(encoding="utf-8")).get("items", []) if path.suffix == ".json"
+                    else read_csv_rows(path))
+            print(f"[OK] items {path}: {store.upsert_items(rows)}")
+    elif args.cmd == "import":
+        metrics = [m for m in args.metrics.split(",") if m]
+        for path in map(Path, args.paths):
+            run = args.run or path.stem
+            rows = list(read_jsonl(path)) if path.suffix == ".jsonl" else read_csv_rows(path)
+            n = store.upsert_generations(rows, run, mode=args.mode, model=args.model, source=str(path))
+            store.upsert_items(r for r in rows if _first(r, REF_KEYS) or r.get("input"))
+            have = [m for m in metrics if rows and m in rows[0]]
+            nm = store.upsert_metrics(rows, run, have, mode=args.mode, model=args.model) if have else 0
+            print(f"[OK] {path} -> run={run} generations={n}" + (f" metrics={nm}" if nm else ""))
+    elif args.cmd == "export":
+        n = export_csv(store, args.kind, Path(args.out), mode=args.mode, model=args.model)
+        print(f"[OK] wrote {args.out} (rows={n})")
+    else:
+        print(json.dumps(store.stats(), ensure_ascii=False, indent=2))
+    print(f"[TIME] {(time.perf_counter() - t0) * 1000:.0f}ms")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,12 @@ import glob
 import json
 from collections import defaultdict
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Iterator
+from typing import Any, Dict, List, Optional, Tuple
 
-from rouge_score import rouge_scorer
+from jsonl_reader import iter_jsonl, iter_jsonl_range
+from ref_store import RefStore, add_ref_store_args
+from score_engine import (corpus_from_stats, line_shards, map_shards, merge_pair_stats,
+                          pair_stats, rouge_l_from_stats, rouge_l_stats)
 
 def _read_prompts_csv_for_refs(csv_path: Path) -> Dict[str, str]:
     if not csv_path.exists():
@@ -35,56 +38,68 @@ def _read_prompts_csv_for_refs(csv_path: Path) -> Dict[str, str]:
                 id2ref[rid] = ref
     return id2ref
 
-def _rougeL_f(ref: str, hyp: str, scorer: rouge_scorer.RougeScorer) -> float:
-    if not (ref or "").strip():
-        return 0.0
-    return scorer.score(ref, hyp)["rougeL"].fmeasure
-
-def _iter_pairs_from_raw(raw_dir: Path, id2ref: Optional[Dict[str, str]]) -> Iterator[Tuple[str, str, str, str]]:
-    for p in raw_dir.glob("*.jsonl"):
-        with p.open("r", encoding="utf-8") as f:
-            for ln in f:
-                ln = ln.strip()
-                if not ln:
-                    continue
-                try:
-                    o = json.loads(ln)
-                except Exception:
-                    continue
-                rid = str(o.get("id", "") or "")
-                hyp = o.get("output", "") or ""
-                ref = o.get("reference", "") or ""
-                if not ref and id2ref and rid in id2ref:
-                    ref = id2ref[rid]
-                yield (p.name, rid, hyp, ref)
-
-def _mode_a_main(inputs: str, out: str, prompts_csv: Optional[str], by_file: bool) -> None:
+def _rougeL_batch(refs: List[str], hyps: List[str], store: Optional[RefStore] = None,
+                  ref_ids: Optional[List[str]] = None) -> List[float]:
+    """rouge_score 의 rougeL F 와 같은 값; 토큰화/stem 은 한 번씩, LCS 는 bit-parallel."""
+    st = rouge_l_stats(hyps, refs, tokenize="rouge", stem=True, ref_store=store, ref_ids=ref_ids)
+    return rouge_l_from_stats(st).tolist()
+
+PAIR_FIELDS = ("id", "output", "reference")
+
+def _pair_from_record(o: Dict[str, Any], id2ref: Optional[Dict[str, str]]) -> Tuple[str, str, str]:
+    rid = str(o.get("id", "") or "")
+    hyp = o.get("output", "") or ""
+    ref = o.get("reference", "") or ""
+    if not ref and id2ref and rid in id2ref:
+        ref = id2ref[rid]
+    return rid, hyp, ref
+
+_ID2REF: Optional[Dict[str, str]] = None
+_STORE: Optional[RefStore] = None
+
+def _init_worker(id2ref: Optional[Dict[str, str]], store_path: Optional[str] = None) -> None:
+    global _ID2REF, _STORE
+    _ID2REF = id2ref
+    _STORE = RefStore(store_path) if store_path else None
+
+def _shard_stats(task: Tuple[str, int, int]) -> Tuple[str, Dict[str, Any]]:
+    """One byte range of one file -> (file name, per-item ROUGE-L F of that range)."""
+    path, start, end = task
+    ids: List[str] = []
+    hyps: List[str] = []
+    refs: List[str] = []
+    for o in iter_jsonl_range(path, start, end, fields=PAIR_FIELDS):
+        pair = _pair_from_record(o, _ID2REF)
+        if not str(pair[2]).strip():
+            continue
+        ids.append(pair[0])
+        hyps.append(pair[1])
+        refs.append(pair[2])
+    return Path(path).name, pair_stats(hyps, refs, ("rougeL",), ref_store=_STORE, ref_ids=ids)
+
+def _mode_a_main(inputs: str, out: str, prompts_csv: Optional[str], by_file: bool, workers: int = 1,
+                 ref_store_path: Optional[str] = None) -> None:
     raw_dir = Path(inputs)
     out_path = Path(out)
     id2ref = _read_prompts_csv_for_refs(Path(prompts_csv)) if prompts_csv else None
 
-    scorer = rouge_scorer.RougeScorer(["rougeL"], use_stemmer=True)
-
-    total_f, n = 0.0, 0
-    file_aggr: Dict[str, Dict[str, Any]] = {}  # fname -> {"sum": float, "n": int}
+    # 파일/바이트 범위 단위로 나눠서 계산; 평균은 fsum 이라 --workers 값과 무관하게 같다
+    tasks = line_shards(sorted(raw_dir.glob("*.jsonl")), max(1, workers) * 4)
+    results = map_shards(_shard_stats, tasks, workers, initializer=_init_worker, initargs=(id2ref, ref_store_path))
 
-    for fname, rid, hyp, ref in _iter_pairs_from_raw(raw_dir, id2ref):
-        if not str(ref).strip():
-            continue
-        f = _rougeL_f(ref, hyp, scorer)
-        total_f += f
-        n += 1
-        if by_file:
-            d = file_aggr.setdefault(fname, {"sum": 0.0, "n": 0})
-            d["sum"] += f
-            d["n"] += 1
-
-    res: Dict[str, Any] = {"rougeL_f1_mean": (total_f / n) if n else 0.0, "n": n}
+    total = merge_pair_stats([st for _, st in results])
+    n = total["n"]
+    res: Dict[str, Any] = {"rougeL_f1_mean": corpus_from_stats(total).get("rougeL", 0.0) if n else 0.0, "n": n}
     if by_file:
-        res["by_file"] = [
-            {"file": k, "rougeL_f1_mean": (v["sum"] / v["n"]) if v["n"] else 0.0, "n": v["n"]}
-            for k, v in sorted(file_aggr.items())
-        ]
+        file_aggr: Dict[str, List[Dict[str, Any]]] = {}
+        for fname, st in results:
+            file_aggr.setdefault(fname, []).append(st)
+        by = []
+        for k, parts in sorted(file_aggr.items()):
+            st = merge_pair_stats(parts)
+            by.append({"file": k, "rougeL_f1_mean": corpus_from_stats(st).get("rougeL", 0.0) if st["n"] else 0.0,
+                       "n": st["n"]})
+        res["by_file"] = by
 
     out_path.parent.mkdir(parents=True, exist_ok=True)
     with out_path.open("w", encoding="utf-8") as f:
@@ -92,11 +107,8 @@ def _mode_a_main(inputs: str, out: str, prompts_csv: Optional[str], by_file: boo
     print("[OK] wrote", out_path, res)
 
 def _read_reference_legacy(path: str) -> Dict[str, str]:
-    ref: Dict[str, str] = {}
-    for line in Path(path).read_text(encoding="utf-8").splitlines():
-        obj = json.loads(line)
-        ref[str(obj["id"])] = str(obj["reference_text"])
-    return ref
+    return {str(obj["id"]): str(obj["reference_text"])
+            for obj in iter_jsonl(path, fields=("id", "reference_text"), errors="raise")}
 
 
 def _load_outputs_legacy(dirpath: str) -> List[Dict[str, Any]]:
@@ -107,20 +119,18 @@ def _load_outputs_legacy(dirpath: str) -> List[Dict[str, Any]]:
     return items
 
 
-def _mode_b_main(inputs_dir: str, reference_path: str, out_path: str) -> None:
+def _mode_b_main(inputs_dir: str, reference_path: str, out_path: str, ref_store_path: Optional[str] = None) -> None:
     ref = _read_reference_legacy(reference_path)
     outs = _load_outputs_legacy(inputs_dir)
-    scorer = rouge_scorer.RougeScorer(["rougeL"], use_stemmer=True)
-
     per_item: List[Dict[str, Any]] = []
     by_group: Dict[str, List[float]] = defaultdict(list)
 
-    for o in outs:
-        sid = str(o.get("id"))
-        hyp = str(o.get("output_text", ""))
+    sids = [str(o.get("id")) for o in outs]
+    store = RefStore(ref_store_path) if ref_store_path else None
+    scores = _rougeL_batch([ref.get(s, "") for s in sids], [str(o.get("output_text", "")) for o in outs],
+                           store, sids)
+    for o, sid, f in zip(outs, sids, scores):
         grp = str(o.get("prompt_type", "unknown"))
-        gt = ref.get(sid, "")
-        f = _rougeL_f(gt, hyp, scorer)
         per_item.append(
             {"id": sid, "prompt_type": grp, "rougeL_p": None, "rougeL_r": None, "rougeL_f": f}
         )
@@ -146,6 +156,8 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--out", help="(Mode A) output JSON path, e.g., results/quantitative/rouge_scores.json")
     p.add_argument("--prompts", help="(Optional, Mode A) prompts CSV (must have id,reference columns)")
     p.add_argument("--by-file", action="store_true", help="(Mode A) also include per-file mean")
+    p.add_argument("--workers", type=int, default=1, help="(Mode A) processes to shard files/line ranges across")
+    add_ref_store_args(p)
 
     p.add_argument("--reference", help="(Mode B) JSONL with {'id','reference_text'} per line")
     p.add_argument("--output", help="(Mode B) output JSON path (per_item + summary) for legacy mode")
@@ -169,10 +181,13 @@ def parse_args() -> argparse.Namespace:
 
 def main():
     args = parse_args()
+    store_path = args.ref_store_path if args.ref_store else None
     if args.out:
-        _mode_a_main(inputs=args.inputs, out=args.out, prompts_csv=args.prompts, by_file=bool(args.by_file))
+        _mode_a_main(inputs=args.inputs, out=args.out, prompts_csv=args.prompts, by_file=bool(args.by_file),
+                     workers=args.workers, ref_store_path=store_path)
     else:
-        _mode_b_main(inputs_dir=args.inputs, reference_path=args.reference, out_path=args.output)
+        _mode_b_main(inputs_dir=args.inputs, reference_path=args.reference, out_path=args.output,
+                     ref_store_path=store_path)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,12 @@
 import os, sys, json, csv, glob, subprocess
+from datetime import datetime, timezone
 from pathlib import Path
-from urllib.request import urlopen, Request
-from urllib.error import URLError
 import numpy as np
+from jsonl_reader import iter_jsonl
+from ollama_client import get_client, normalize_host
+from ollama_pool import parse_hosts
+from model_residency import (DEFAULT_KEEP_ALIVE, ResidencyTracker, group_by_model, record_log_loads, release,
+                             resident_models, warm)
 
 ROOT = Path(__file__).resolve().parents[1]
 CODE = ROOT / "code"
@@ -15,13 +19,25 @@ ALN = ROOT / "results" / "aligned"
 PROVIDER = "ollama"
 MODEL_GENERAL = "gemma:7b"
 MODEL_INSTRUCT = "gemma:7b-instruct"
-OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://127.0.0.1:11434").rstrip("/")
+OLLAMA_HOST = normalize_host(os.environ.get("OLLAMA_HOST", "http://127.0.0.1:11434"))
+# 여러 서버에 나눠 돌릴 때: OLLAMA_HOSTS="h1:11434,h2:11434" (또는 호스트 목록 파일) → --hosts 로 넘긴다
+OLLAMA_HOSTS = parse_hosts(os.environ["OLLAMA_HOSTS"]) if os.environ.get("OLLAMA_HOSTS") else [OLLAMA_HOST]
+# 동시 요청 수; >1 이면 과거 raw 로그 latency 로 예측한 긴 항목부터 배치한다 (batch_schedule)
+CONCURRENCY = int(os.environ.get("RUN_CONCURRENCY", "1"))
+# 모델별로 작업을 묶고, 묶음 동안 keep_alive 로 유지한 뒤 다음 모델 전에 내린다
+KEEP_ALIVE = os.environ.get("RUN_KEEP_ALIVE", DEFAULT_KEEP_ALIVE)
+RELEASE_BETWEEN_GROUPS = os.environ.get("RUN_RELEASE_MODELS", "1") != "0"
+
+JOBS = [
+    {"mode": "general", "model": MODEL_GENERAL},
+    {"mode": "instructed", "model": MODEL_INSTRUCT},
+]
 
 def log(*a): print("[run]", *a)
 
-def run_cmd(args, cwd=ROOT):
+def run_cmd(args, cwd=ROOT, env=None):
     log(" ".join(str(x) for x in args))
-    r = subprocess.run(args, cwd=cwd)
+    r = subprocess.run(args, cwd=cwd, env=env)
     if r.returncode != 0:
         raise SystemExit(r.returncode)
 
@@ -29,28 +45,19 @@ def ensure_dirs():
     for p in (RAW, QNT, ALN, PROMPTS.parent):
         p.mkdir(parents=True, exist_ok=True)
 
+def live_hosts():
+    return [h for h in OLLAMA_HOSTS if get_client(h).alive(timeout=2)]
+
 def ollama_alive():
-    try:
-        req = Request(OLLAMA_HOST + "/api/tags", headers={"Accept":"application/json"})
-        with urlopen(req, timeout=2) as r:
-            return r.status == 200
-    except Exception:
-        return False
+    return bool(live_hosts())
 
 def ensure_ollama_models():
-    def has_model(name):
-        try:
-            req = Request(OLLAMA_HOST + "/api/tags", headers={"Accept":"application/json"})
-            with urlopen(req, timeout=5) as r:
-                data = json.loads(r.read().decode("utf-8"))
-            return any(t.get("name") == name for t in data.get("models", data.get("tags", [])))
-        except Exception:
-            return False
-
-    for m in (MODEL_GENERAL, MODEL_INSTRUCT):
-        if not has_model(m):
-            log(f"모델 없음 → pull: {m}")
-            run_cmd(["ollama", "pull", m])
+    for h in live_hosts():
+        client = get_client(h)
+        for m in (MODEL_GENERAL, MODEL_INSTRUCT):
+            if not client.has_model(m):
+                log(f"모델 없음 → pull: {m} ({h})")
+                run_cmd(["ollama", "pull", m], env={**os.environ, "OLLAMA_HOST": h})
 
 def ensure_prompts_csv():
     if PROMPTS.exists():
@@ -71,11 +78,7 @@ def ensure_prompts_csv():
 def aggregate_efficiency():
     recs = []
     for fp in RAW.glob("*.jsonl"):
-        for ln in fp.read_text(encoding="utf-8").splitlines():
-            try:
-                recs.append(json.loads(ln))
-            except Exception:
-                pass
+        recs.extend(iter_jsonl(fp))
     lat = np.array([float(r.get("latency_ms", 0.0)) for r in recs], dtype=float)
     cost= np.array([float(r.get("cost_usd",   0.0)) for r in recs], dtype=float)
     tile = {
@@ -89,38 +92,65 @@ def aggregate_efficiency():
     out.write_text(json.dumps(tile, indent=2), encoding="utf-8")
     log("efficiency tile →", out)
 
+def host_args():
+    return ["--hosts", ",".join(OLLAMA_HOSTS)] if len(OLLAMA_HOSTS) > 1 else []
+
+def schedule_args(mode: str):
+    return [
+        "--concurrency", str(CONCURRENCY),
+        "--schedule", "longest",
+        "--history", str((RAW / "*.jsonl").relative_to(ROOT)),
+        "--schedule-report", str((QNT / f"schedule_{mode}.json").relative_to(ROOT)),
+    ]
+
+def run_generation():
+    """Run JOBS grouped by model: warm-up + keep_alive per group, load time -> model_residency.json."""
+    clients = [get_client(h) for h in live_hosts()]
+    tracker = ResidencyTracker()
+    groups = group_by_model(JOBS, resident_models(clients[0]))
+    for gi, (model, jobs) in enumerate(groups):
+        for client in clients:
+            try:
+                log(f"warm-up {model} @ {client.host}: load_ms={warm(client, model, KEEP_ALIVE, tracker=tracker)}")
+            except Exception as e:
+                log(f"warm-up 실패(계속 진행) {model} @ {client.host}: {e}")
+        for job in jobs:
+            since = datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+            run_cmd([
+                sys.executable, str(CODE / "run_langchain_experiment.py"),
+                "--prompt-file", str(PROMPTS.relative_to(ROOT)),
+                "--prompt-column", "input",
+                "--id-column", "id",
+                "--mode", job["mode"],
+                "--outdir", str(RAW.relative_to(ROOT)),
+                "--provider", PROVIDER,
+                "--model", model,
+                "--keep-alive", KEEP_ALIVE,
+                *host_args(),
+                *schedule_args(job["mode"]),
+            ])
+            record_log_loads(tracker, RAW / f"{job['mode']}.jsonl", model, since_iso=since)
+        if RELEASE_BETWEEN_GROUPS and gi < len(groups) - 1:
+            for client in clients:
+                release(client, model)
+    summary = tracker.summary()
+    summary["groups"] = [{"model": m, "modes": [j["mode"] for j in jobs]} for m, jobs in groups]
+    out = QNT / "model_residency.json"
+    out.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+    log(f"model load time: {summary['total_load_ms'] / 1000:.1f}s ({summary['load_events']} loads) →", out)
+
 def main():
     ensure_dirs()
     if not ollama_alive():
         raise SystemExit(
             "Ollama 서버에 연결할 수 없습니다.\n"
-            f"- 기대 주소: {OLLAMA_HOST}\n"
+            f"- 기대 주소: {', '.join(OLLAMA_HOSTS)}\n"
             "- Ollama Desktop 또는 `ollama serve` 를 실행하세요.\n"
         )
     ensure_ollama_models()
     ensure_prompts_csv()
 
-    run_cmd([
-        sys.executable, str(CODE / "run_langchain_experiment.py"),
-        "--prompt-file", str(PROMPTS.relative_to(ROOT)),
-        "--prompt-column", "input",
-        "--id-column", "id",
-        "--mode", "general",
-        "--outdir", str(RAW.relative_to(ROOT)),
-        "--provider", PROVIDER,
-        "--model", MODEL_GENERAL
-    ])
-
-    run_cmd([
-        sys.executable, str(CODE / "run_langchain_experiment.py"),
-        "--prompt-file", str(PROMPTS.relative_to(ROOT)),
-        "--prompt-column", "input",
-        "--id-column", "id",
-        "--mode", "instructed",
-        "--outdir", str(RAW.relative_to(ROOT)),
-        "--provider", PROVIDER,
-        "--model", MODEL_INSTRUCT
-    ])
+    run_generation()
 
     run_cmd([sys.executable, str(CODE / "aligned_texts.py")])
 
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class RunJournal:
+    """Append-only, fsync'd journal of completed records for a JSONL output file.
+
+    Each journal line is ``<offset>\\t<length>\\t<json id>`` pointing into the data
+    file. A record is appended to the data file and fsync'd before its journal line
+    is written, so after a crash the journal never points past valid data.
+
+    open() reconciles the two files without re-parsing the whole output:
+      - journal line without a trailing newline -> torn, dropped
+      - data shorter than the journal says       -> data was rewritten, journal rebuilt
+      - data longer than the journal says        -> only the tail past the last journaled
+        offset is scanned; complete lines are journaled, a torn last line is truncated
+    """
+
+    def __init__(self, data_path: Path | str, journal_path: Path | str | None = None, fsync: bool = True):
+        self.data_path = Path(data_path)
+        self.journal_path = Path(journal_path) if journal_path else self.data_path.with_name(
+            self.data_path.name + ".journal")
+        self.fsync = fsync
+        self.entries: Dict[str, Tuple[int, int]] = {}
+        self.torn_bytes = 0
+        self.recovered = 0
+        self._size = 0
+        self._data = None
+        self._jrnl = None
+
+    def _read_journal(self) -> Tuple[List[Tuple[int, int, str]], bool]:
+        if not self.journal_path.exists():
+            return [], False
+        raw = self.journal_path.read_bytes()
+        torn = bool(raw) and not raw.endswith(b"\n")
+        out: List[Tuple[int, int, str]] = []
+        for ln in raw.split(b"\n")[:-1] if raw else []:
+            try:
+                off, length, id_json = ln.decode("utf-8").split("\t", 2)
+                out.append((int(off), int(length), json.loads(id_json)))
+            except Exception:
+                torn = True
+                break
+        return out, torn
+
+    def _scan_tail(self, start: int, size: int) -> List[Tuple[int, int, str]]:
+        """Journal complete lines in data[start:size]; returns entries, sets self.torn_bytes."""
+        found: List[Tuple[int, int, str]] = []
+        good_end = start
+        with self.data_path.open("rb") as f:
+            f.seek(start)
+            off = start
+            for ln in f:
+                if not ln.endswith(b"\n"):
+                    break
+                try:
+                    rec = json.loads(ln.decode("utf-8-sig"))
+                    if isinstance(rec, dict) and rec.get("id") is not None:
+                        found.append((off, len(ln), str(rec["id"])))
+                except Exception:
+                    pass
+                off += len(ln)
+                good_end = off
+        self.torn_bytes = size - good_end
+        if self.torn_bytes:
+            with self.data_path.open("r+b") as f:
+                f.truncate(good_end)
+        return found
+
+    def open(self) -> Dict[str, Tuple[int, int]]:
+        """Reconcile and open for appending; returns {id: (offset, length)} of completed records."""
+        self.data_path.parent.mkdir(parents=True, exist_ok=True)
+        entries, rewrite = self._read_journal()
+        size = self.data_path.stat().st_size if self.data_path.exists() else 0
+        end = (entries[-1][0] + entries[-1][1]) if entries else 0
+        if end > size:
+            entries, end, rewrite = [], 0, True
+        if size > end:
+            tail = self._scan_tail(end, size)
+            self.recovered = len(tail)
+            entries.extend(tail)
+            rewrite = rewrite or bool(tail)
+        if rewrite:
+            tmp = self.journal_path.with_name(self.journal_path.name + ".tmp")
+            with tmp.open("wb") as f:
+                for off, length, id_ in entries:
+                    f.write(self._journal_line(off, length, id_))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.journal_path)
+
+        self.entries = {id_: (off, length) for off, length, id_ in entries}
+        self._size = (entries[-1][0] + entries[-1][1]) if entries else 0
+        self._data = self.data_path.open("ab")
+        self._jrnl = self.journal_path.open("ab")
+        return self.entries
+
+    @staticmethod
+    def _journal_line(off: int, length: int, id_: str) -> bytes:
+        return f"{off}\t{length}\t{json.dumps(str(id_), ensure_ascii=False)}\n".encode("utf-8")
+
+    def append(self, id_: str, line: str) -> None:
+        b = line.encode("utf-8")
+        if not b.endswith(b"\n"):
+            b += b"\n"
+        off = self._size
+        self._data.write(b)
+        self._data.flush()
+        if self.fsync:
+            os.fsync(self._data.fileno())
+        self._jrnl.write(self._journal_line(off, len(b), id_))
+        self._jrnl.flush()
+        if self.fsync:
+            os.fsync(self._jrnl.fileno())
+        self._size += len(b)
+        self.entries[str(id_)] = (off, len(b))
+
+    def close(self) -> None:
+        for fh in (self._data, self._jrnl):
+            if fh is not None:
+                fh.close()
+        self._data = self._jrnl = None
+
+    def reorder(self, order: Sequence[str]) -> None:
+        """Rewrite the data file with records sorted by their id's position in order.
+
+        Records are journaled in completion order; this restores a canonical order
+        once the run is done. Ids not in order keep their relative place at the end;
+        duplicate lines are kept. The journal is removed before the data file is
+        replaced, so a crash in between leaves a data file that open() re-scans.
+        """
+        reopen = self._data is not None
+        self.close()
+        entries, _ = self._read_journal()
+        rank = {str(id_): n for n, id_ in enumerate(order)}
+        ordered = sorted(entries, key=lambda e: rank.get(e[2], len(rank)))
+        if ordered != entries:
+            tmp_data = self.data_path.with_name(self.data_path.name + ".tmp")
+            tmp_jrnl = self.journal_path.with_name(self.journal_path.name + ".tmp")
+            new_entries: List[Tuple[int, int, str]] = []
+            off = 0
+            with self.data_path.open("rb") as src, tmp_data.open("wb") as dst, tmp_jrnl.open("wb") as jf:
+                for old_off, length, id_ in ordered:
+                    src.seek(old_off)
+                    dst.write(src.read(length))
+                    jf.write(self._journal_line(off, length, id_))
+                    new_entries.append((off, length, id_))
+                    off += length
+                for fh in (dst, jf):
+                    fh.flush()
+                    os.fsync(fh.fileno())
+            self.journal_path.unlink(missing_ok=True)
+            os.replace(tmp_data, self.data_path)
+            os.replace(tmp_jrnl, self.journal_path)
+            entries = new_entries
+        self.entries = {id_: (off, length) for off, length, id_ in entries}
+        self._size = (entries[-1][0] + entries[-1][1]) if entries else 0
+        if reopen:
+            self._data = self.data_path.open("ab")
+            self._jrnl = self.journal_path.open("ab")
+
+    def finalize(self, final_path: Path | str, order: Optional[Sequence[str]] = None) -> Path:
+        """Close and atomically move the data file to final_path; the journal is removed.
+
+        order: canonical id order to restore first (see reorder).
+        """
+        if order is not None and self.journal_path.exists():
+            self.reorder(order)
+        self.close()
+        final_path = Path(final_path)
+        if not self.data_path.exists():
+            self.data_path.touch()
+        os.replace(self.data_path, final_path)
+        self.journal_path.unlink(missing_ok=True)
+        return final_path
+
+
+def partial_path(out_path: Path | str) -> Path:
+    p = Path(out_path)
+    return p.with_name(p.name + ".partial")
+
+
+def open_for_run(out_path: Path | str, resume: bool, fsync: bool = True) -> RunJournal:
+    """Journal writing to <out>.partial; finalize(out) publishes it atomically.
+
+    resume=False discards any previous partial. resume=True continues the partial,
+    or re-opens a finished <out> so already-done ids are skipped.
+    """
+    out_path = Path(out_path)
+    part = partial_path(out_path)
+    j = RunJournal(part, fsync=fsync)
+    if not resume:
+        part.unlink(missing_ok=True)
+        j.journal_path.unlink(missing_ok=True)
+    elif not part.exists() and out_path.exists():
+        os.replace(out_path, part)
+        j.journal_path.unlink(missing_ok=True)
+    return j
@@ -2,13 +2,22 @@ from __future__ import annotations
 
 import argparse
 import json
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any, Dict
 
 from prompt_manager import load_prompts
 from prompt_templates import get_general_prompt, get_instructed_prompt
 from llm_factory import get_llm
+from run_journal import RunJournal
+from gen_cache import add_cache_args, cache_from_args
+from gen_budget import add_budget_args, budget_for, read_item_meta
+from ollama_pool import add_pool_args, pool_from_args
+from batch_schedule import (add_schedule_args, item_features, plan_from_args, read_item_features,
+                            write_schedule_report)
 
 
 def build_prompt(mode: str, text: str) -> str:
@@ -19,7 +28,76 @@ def build_prompt(mode: str, text: str) -> str:
     raise ValueError(f"Unknown mode: {mode}")
 
 
+def generate_record(args: argparse.Namespace, llm, item, meta: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate one prompt and build its raw-log record (errors are recorded, not raised)."""
+    prompt = build_prompt(args.mode, item.text)
+    scenario, params = meta.get(str(item.id), ("", {}))
+    budget = budget_for(args, (scenario, params))
+
+    t0 = time.perf_counter()
+    out_text = ""
+    err_msg = None
+    stream_fields = {}
+    try:
+        if args.stream:
+            out_text, stream_fields = llm.generate_stream(prompt, budget)
+        else:
+            out_text = llm.generate(prompt, budget)
+            stream_fields = {k: v for k, v in (("done_reason", llm.last_done_reason),
+                                               ("load_ms", llm.last_load_ms)) if v is not None}
+    except Exception as e:
+        err_msg = f"{type(e).__name__}: {e}"
+    finally:
+        dt_ms = int((time.perf_counter() - t0) * 1000)
+
+    created_at = (
+        datetime.now(timezone.utc)
+        .isoformat(timespec="seconds")
+        .replace("+00:00", "Z")
+    )
+
+    rec = {
+        "id": item.id,
+        "mode": args.mode,
+        "model": args.model,
+        "provider": args.provider,
+
+        "input": item.text,
+        "output": out_text if out_text is not None else "",
+
+        "timing": {"latency_ms": dt_ms,
+                   **{k: v for k, v in stream_fields.items() if k not in ("tokens", "done_reason")}},
+        "created_at": created_at,
+
+        "prompt": prompt,
+        "decoding": {
+            "temperature": args.temperature,
+            "num_predict": llm.num_predict_for(budget),
+            **({"stop": list(budget.stop)} if budget.stop else {}),
+        },
+        "efficiency": {"cost_usd": 0.0},
+        "len_in_chars": len(item.text or ""),
+        "len_prompt_chars": len(prompt or ""),
+        "len_out_chars": len(out_text or ""),
+    }
+
+    if llm.last_cached:
+        rec["cached"] = True
+    if llm.last_host:
+        rec["host"] = llm.last_host
+    if stream_fields.get("tokens") is not None:
+        rec["tokens"] = stream_fields["tokens"]
+    if args.budget:
+        rec["scenario"] = scenario
+        rec["done_reason"] = stream_fields.get("done_reason")
+    if err_msg:
+        rec["error"] = err_msg
+    return rec
+
+
 def run(args: argparse.Namespace) -> None:
+    if args.concurrency < 1:
+        raise SystemExit("[ERR] --concurrency must be >= 1")
     prompts = load_prompts(
         args.prompt_file,
         text_col=args.prompt_column,
@@ -28,96 +106,103 @@ def run(args: argparse.Namespace) -> None:
 
     outdir = Path(args.outdir)
     outdir.mkdir(parents=True, exist_ok=True)
+    meta = read_item_meta(args.prompt_file, id_col=args.id_column) if args.budget else {}
 
     suffix = f"_{args.out_suffix}" if args.out_suffix else ""
     outfile = outdir / f"{args.mode}{suffix}.jsonl"
 
+    cache = cache_from_args(args)
+    pool = pool_from_args(args) if args.provider == "ollama" else None
     llm = get_llm(
         args.provider,
         args.model,
         temperature=args.temperature,
         num_predict=args.num_predict,
+        cache=cache,
+        keep_alive=args.keep_alive,
+        pool=pool,
     )
 
-    seen: set[str] = set()
     if args.overwrite and outfile.exists():
         backup = outfile.with_suffix(outfile.suffix + ".bak")
         backup.write_text(outfile.read_text(encoding="utf-8"), encoding="utf-8")
         outfile.write_text("", encoding="utf-8")
 
-    if (not args.force) and outfile.exists():
-        for s in outfile.read_text(encoding="utf-8-sig", errors="replace").splitlines():
-            s = s.strip()
-            if not s:
-                continue
-            try:
-                rec = json.loads(s)
-                if "id" in rec:
-                    seen.add(str(rec["id"]))
-            except Exception:
-                pass
-
-    n_ok, n_err, n_skip = 0, 0, 0
-
-    with outfile.open("a", encoding="utf-8") as f:
-        for item in prompts:
-            if (not args.force) and (str(item.id) in seen):
-                n_skip += 1
-                continue
-
-            prompt = build_prompt(args.mode, item.text)
-
-            t0 = time.perf_counter()
-            out_text = ""
-            err_msg = None
-            try:
-                out_text = llm.generate(prompt)
-            except Exception as e:
-                err_msg = f"{type(e).__name__}: {e}"
-            finally:
-                dt_ms = int((time.perf_counter() - t0) * 1000)
-
-            created_at = (
-                datetime.now(timezone.utc)
-                .isoformat(timespec="seconds")
-                .replace("+00:00", "Z")
-            )
-
-            rec = {
-                "id": item.id,
-                "mode": args.mode,
-                "model": args.model,
-                "provider": args.provider,
-
-                "input": item.text,
-                "output": out_text if out_text is not None else "",
-
-                "timing": {"latency_ms": dt_ms},
-                "created_at": created_at,
-
-                "prompt": prompt,
-                "decoding": {
-                    "temperature": args.temperature,
-                    "num_predict": args.num_predict,
-                },
-                "efficiency": {"cost_usd": 0.0},
-                "len_in_chars": len(item.text or ""),
-                "len_prompt_chars": len(prompt or ""),
-                "len_out_chars": len(out_text or ""),
-            }
-
-            if err_msg:
-                rec["error"] = err_msg
-                n_err += 1
-            else:
-                n_ok += 1
-
-            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    # outfile.journal 에 (offset, length, id) 를 fsync 로 남기므로 재시작 시 전체 파일을 다시 파싱하지 않는다.
+    # 저널이 없는 기존 파일은 처음 한 번만 스캔해 저널을 만든다.
+    journal = RunJournal(outfile, fsync=args.fsync)
+    done = journal.open()
+    seen: set[str] = set() if args.force else set(done)
+    if journal.torn_bytes:
+        print(f"[WARN] truncated torn last line ({journal.torn_bytes} bytes) in {outfile.name}")
+
+    todo = []
+    n_skip = 0
+    for item in prompts:
+        if (not args.force) and (str(item.id) in seen):
+            n_skip += 1
+            continue
+        todo.append(item)
+
+    feats = read_item_features(args.prompt_file, id_col=args.id_column)
+    plan = plan_from_args(args, [str(it.id) for it in todo],
+                          [feats.get(str(it.id), item_features({"input": it.text})) for it in todo],
+                          args.concurrency, mode=args.mode)
+
+    # LLMWrapper 는 last_cached 등 호출 상태를 가지므로 스레드마다 하나씩 쓴다
+    local = threading.local()
+
+    def worker_llm():
+        if args.concurrency == 1:
+            return llm
+        if not hasattr(local, "llm"):
+            local.llm = get_llm(args.provider, args.model, temperature=args.temperature,
+                                num_predict=args.num_predict, cache=cache, keep_alive=args.keep_alive,
+                                pool=pool)
+        return local.llm
+
+    n_ok, n_err = 0, 0
+    latency_ms: Dict[str, float] = {}
+    t_start = time.perf_counter()
+
+    def write(rec: Dict[str, Any]) -> None:
+        nonlocal n_ok, n_err
+        if rec.get("error"):
+            n_err += 1
+        else:
+            n_ok += 1
+        latency_ms[str(rec["id"])] = rec["timing"]["latency_ms"]
+        journal.append(str(rec["id"]), json.dumps(rec, ensure_ascii=False))
+
+    try:
+        if args.concurrency == 1:
+            for item in todo:
+                write(generate_record(args, worker_llm(), item, meta))
+        else:
+            # 예측 시간이 긴 항목부터 던지고(--schedule longest), 끝나는 대로 기록한다.
+            # 원래 순서는 모두 끝난 뒤 journal.reorder 로 되돌린다 (중간에 죽어도 끝난 레코드는 남음)
+            order = plan.order if plan is not None else list(range(len(todo)))
+            with ThreadPoolExecutor(max_workers=args.concurrency) as ex:
+                futs = [ex.submit(lambda it: generate_record(args, worker_llm(), it, meta), todo[pos])
+                        for pos in order]
+                for fut in as_completed(futs):
+                    write(fut.result())
+            journal.reorder([str(it.id) for it in prompts])
+    finally:
+        journal.close()
+    wall_ms = (time.perf_counter() - t_start) * 1000
 
     print(
         f"[OK] wrote outputs to {outfile.resolve()} "
         f"(ok={n_ok}, err={n_err}, skipped={n_skip})"
     )
+    if plan is not None and args.schedule_report:
+        write_schedule_report(args.schedule_report, plan, latency_ms, wall_ms)
+    if pool is not None:
+        pool.print_stats()
+    if cache is not None:
+        print(f"[CACHE] {json.dumps(cache.stats(), ensure_ascii=False)}")
+        cache.close()
 
 
 def parse_args() -> argparse.Namespace:
@@ -131,11 +216,23 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--model", default="gemma:7b")
     p.add_argument("--temperature", type=float, default=0.0)
     p.add_argument("--num-predict", type=int, default=None, dest="num_predict")
+    p.add_argument("--stream", action="store_true",
+                   help="스트리밍으로 생성하여 timing 에 ttft_ms/itl_ms/eval_tps, tokens 를 기록")
+    p.add_argument("--keep-alive", default=None, dest="keep_alive",
+                   help="Ollama keep_alive (예: 30m, -1) — 실행 동안 모델을 메모리에 유지")
+    p.add_argument("--concurrency", type=int, default=1,
+                   help="동시에 보낼 요청 수 (1 = 순차). 결과 파일 순서는 입력 순서를 유지")
+    add_budget_args(p)
+    add_schedule_args(p)
+    add_pool_args(p)
+    add_cache_args(p)
 
     p.add_argument("--overwrite", action="store_true",
                    help="기존 outfile가 있으면 .bak 백업 후 비우고 처음부터 다시 생성")
     p.add_argument("--force", action="store_true",
                    help="기존 outfile의 중복 검사(seen)를 무시하고 모두 생성(중복 라인 생김 주의)")
+    p.add_argument("--no-fsync", dest="fsync", action="store_false",
+                   help="레코드마다 fsync 하지 않음 (빠르지만 크래시 안전하지 않음)")
     p.add_argument("--out-suffix", default="",
                    help="결과 파일명에 접미사 추가 (예: general_<suffix>.jsonl)")
     return p.parse_args()
@@ -5,7 +5,9 @@ import pandas as pd
 from prompt_manager import load_prompts
 from prompt_templates import get_general_prompt, get_instructed_prompt
 from llm_factory import get_llm
+from gen_cache import add_cache_args, cache_from_args
 from compliance_rules import parse_params, evaluate_item
+from gen_budget import add_budget_args, budget_for
 
 def build_prompt(mode: str, text: str) -> str:
     if mode == "general":    return get_general_prompt(text)
@@ -33,15 +35,17 @@ def run(args: argparse.Namespace) -> None:
     meta = load_meta(args.prompt_file)
     outdir = Path(args.outdir); outdir.mkdir(parents=True, exist_ok=True)
 
-    llm = get_llm(args.provider, args.model, temperature=args.temperature, num_predict=args.num_predict)
-    llm_retry = get_llm(args.provider, args.model, temperature=args.retry_temperature, num_predict=args.num_predict) if args.retry>0 else None
+    cache = cache_from_args(args)
+    llm = get_llm(args.provider, args.model, temperature=args.temperature, num_predict=args.num_predict, cache=cache)
+    llm_retry = get_llm(args.provider, args.model, temperature=args.retry_temperature, num_predict=args.num_predict, cache=cache) if args.retry>0 else None
 
     for item in prompts:
         prompt = build_prompt(args.mode, item.text)
-        out_text = llm.generate(prompt)
-
         info = meta.get(item.id, {"scenario":"", "param":""})
         params = parse_params(info.get("param",""))
+        budget = budget_for(args, (info.get("scenario",""), params))
+        out_text = llm.generate(prompt, budget)
+        truncated = llm.last_done_reason == "length"
         passed, reason = evaluate_item(info.get("scenario",""), out_text, params) if info.get("scenario") else (True,"skip")
 
         attempts = 1
@@ -50,7 +54,8 @@ def run(args: argparse.Namespace) -> None:
         if not passed and args.retry>0 and llm_retry is not None:
             attempts = 2
             retry_prompt = prompt + stricter_suffix()
-            retry_text = llm_retry.generate(retry_prompt)
+            retry_text = llm_retry.generate(retry_prompt, budget)
+            truncated = llm_retry.last_done_reason == "length"
             r_ok, r_reason = evaluate_item(info.get("scenario",""), retry_text, params)
             if r_ok:
                 final_text, final_passed, final_reason = retry_text, r_ok, r_reason
@@ -65,9 +70,15 @@ def run(args: argparse.Namespace) -> None:
             "compliance_reason": final_reason,
             "attempts": attempts
         }
+        if args.budget:
+            payload["budget"] = budget.to_dict()
+            payload["budget_truncated"] = truncated
         (outdir / f"{item.id}_{args.mode}.json").write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
 
     print(f"[OK] wrote outputs (retry={args.retry}) -> {outdir.resolve()}")
+    if cache is not None:
+        print(f"[CACHE] {json.dumps(cache.stats(), ensure_ascii=False)}")
+        cache.close()
 
 def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser()
@@ -82,6 +93,8 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--num-predict", type=int, default=None, dest="num_predict")
     p.add_argument("--retry", type=int, default=1)
     p.add_argument("--retry-temperature", type=float, default=0.0, dest="retry_temperature")
+    add_budget_args(p)
+    add_cache_args(p)
     return p.parse_args()
 
 if __name__ == "__main__":
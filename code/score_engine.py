@@ -0,0 +1,487 @@
+from __future__ import annotations
+
+import math
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Column layouts of the per-item sufficient statistics (same as sacrebleu's segment stats):
+#   BLEU : [hyp_len, ref_len, correct_1..N, total_1..N]
+#   chrF : [hyp_n, ref_n, match_n] * char_order
+#   ROUGE: [lcs, hyp_len, ref_len]
+BLEU_MAX_ORDER = 4
+CHRF_CHAR_ORDER = 6
+CHRF_BETA = 2.0
+
+_tok13a = None
+def _ensure_13a():
+    global _tok13a
+    if _tok13a is None:
+        from sacrebleu.tokenizers.tokenizer_13a import Tokenizer13a
+        _tok13a = Tokenizer13a()
+    return _tok13a
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_VALID_TOKEN_RE = re.compile(r"^[a-z0-9]+$")
+_rouge_stemmer = None
+_rouge_memo: Dict[bool, Dict[str, str]] = {True: {}, False: {}}
+
+def _ensure_rouge_stemmer():
+    global _rouge_stemmer
+    if _rouge_stemmer is None:
+        from nltk.stem import porter  # rouge_score 와 같은 stemmer
+        _rouge_stemmer = porter.PorterStemmer()
+    return _rouge_stemmer
+
+
+def bleu_tokenize(text: str, tokenize: str = "13a", lowercase: bool = False) -> List[str]:
+    text = text or ""
+    if lowercase:
+        text = text.lower()
+    if tokenize == "13a":
+        return _ensure_13a()(text.rstrip()).split()
+    if tokenize == "whitespace":
+        return text.split()
+    raise ValueError(f"unknown BLEU tokenizer: {tokenize}")
+
+def rouge_tokenize(text: str, tokenize: str = "rouge", stem: bool = True) -> List[str]:
+    """'rouge' = rouge_score.tokenize.tokenize (lowercase, [a-z0-9] runs, Porter stem for len>3);
+    'whitespace' = str.split().
+
+    Stemming + validity check is memoized per distinct token, which is most of
+    rouge_score's per-call cost.
+    """
+    text = text or ""
+    if tokenize == "whitespace":
+        return text.split()
+    if tokenize != "rouge":
+        raise ValueError(f"unknown ROUGE tokenizer: {tokenize}")
+    memo = _rouge_memo[bool(stem)]
+    out = []
+    for x in _NON_ALNUM_RE.sub(" ", text.lower()).split():
+        y = memo.get(x)
+        if y is None:
+            y = _ensure_rouge_stemmer().stem(x) if stem and len(x) > 3 else x
+            y = y if _VALID_TOKEN_RE.match(y) else ""
+            memo[x] = y
+        if y:
+            out.append(y)
+    return out
+
+def chrf_prepare(text: str, whitespace: bool = False) -> str:
+    text = text or ""
+    return text if whitespace else "".join(text.split())
+
+
+def ref_kind(metric: str, tokenize: str, flag: bool) -> str:
+    """RefStore key for a tokenizer config; includes the tokenizer library version so upgrades re-tokenize."""
+    if metric == "bleu":
+        import sacrebleu
+        return f"bleu:{tokenize}:lc={int(flag)}:sacrebleu={sacrebleu.__version__ if tokenize == '13a' else '-'}"
+    if metric == "rougeL":
+        lib = "-"
+        if tokenize == "rouge" and flag:
+            import nltk
+            lib = nltk.__version__
+        return f"rougeL:{tokenize}:stem={int(flag)}:nltk={lib}"
+    raise ValueError(f"no reference tokens for metric: {metric}")
+
+
+class Vocab:
+    """token(str) -> dense int id, shared by hyps and refs so ids compare directly."""
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+
+    def encode(self, toks: Sequence[str]) -> np.ndarray:
+        ids = self.ids
+        return np.fromiter((ids.setdefault(t, len(ids)) for t in toks), dtype=np.int64, count=len(toks))
+
+
+def _concat(seqs: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    lens = np.fromiter((len(s) for s in seqs), dtype=np.int64, count=len(seqs))
+    flat = np.concatenate(seqs).astype(np.int64) if len(seqs) and lens.sum() else np.zeros(0, dtype=np.int64)
+    return flat, lens
+
+def ngram_match_counts(hyp_seqs: Sequence[np.ndarray], ref_seqs: Sequence[np.ndarray],
+                       max_order: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Clipped n-gram matches for every (hyp, ref) pair at once.
+
+    Sequences are int arrays. All hyps and refs are concatenated into one stream;
+    n-gram ids are assigned order by order as unique((id_{n-1}, token_n)), so
+    identical n-grams share an id across the whole corpus. Per-pair counts then
+    come from np.unique over (pair, ngram_id) keys and one intersect1d.
+
+    Returns (hyp_total, ref_total, match), each of shape (n_pairs, max_order).
+    """
+    n = len(hyp_seqs)
+    if len(ref_seqs) != n:
+        raise ValueError("hyps/refs length mismatch")
+    hyp_total = np.zeros((n, max_order), dtype=np.int64)
+    ref_total = np.zeros((n, max_order), dtype=np.int64)
+    match = np.zeros((n, max_order), dtype=np.int64)
+    if n == 0:
+        return hyp_total, ref_total, match
+
+    tok, lens = _concat(list(hyp_seqs) + list(ref_seqs))
+    if tok.size == 0:
+        return hyp_total, ref_total, match
+    # 토큰 id 를 조밀하게 재매핑해서 (prev_id * V + tok) 가 int64 안에 들어가도록 한다
+    _, tok = np.unique(tok, return_inverse=True)
+    tok = tok.astype(np.int64).ravel()
+    V = int(tok.max()) + 1
+
+    seg = np.repeat(np.arange(2 * n, dtype=np.int64), lens)
+    starts = np.cumsum(lens) - lens
+    pos = np.arange(tok.size, dtype=np.int64) - np.repeat(starts, lens)
+    seg_len = np.repeat(lens, lens)
+    pair = seg % n
+    is_ref = seg >= n
+
+    prev = tok
+    for order in range(1, max_order + 1):
+        totals = np.maximum(lens - order + 1, 0)
+        hyp_total[:, order - 1] = totals[:n]
+        ref_total[:, order - 1] = totals[n:]
+
+        idx = np.nonzero(pos + order <= seg_len)[0]
+        if idx.size == 0:
+            break
+        if order == 1:
+            gid = tok[idx]
+        else:
+            key = prev[idx] * V + tok[idx + order - 1]
+            _, inv = np.unique(key, return_inverse=True)
+            gid = inv.astype(np.int64).ravel()
+            prev = np.full(tok.size, 0, dtype=np.int64)
+            prev[idx] = gid
+        K = int(gid.max()) + 1 if gid.size else 1
+
+        pk = pair[idx] * K + gid
+        ref_mask = is_ref[idx]
+        uh, ch = np.unique(pk[~ref_mask], return_counts=True)
+        ur, cr = np.unique(pk[ref_mask], return_counts=True)
+        common, ih, ir = np.intersect1d(uh, ur, assume_unique=True, return_indices=True)
+        if common.size:
+            clipped = np.minimum(ch[ih], cr[ir])
+            match[:, order - 1] = np.bincount(common // K, weights=clipped, minlength=n).astype(np.int64)
+    return hyp_total, ref_total, match
+
+
+def lcs_length(a: Sequence[Any], b: Sequence[Any]) -> int:
+    """Bit-parallel LCS (Hyyrö 2004): one big-int update per token of b."""
+    if not a or not b:
+        return 0
+    masks: Dict[Any, int] = {}
+    for i, t in enumerate(a):
+        masks[t] = masks.get(t, 0) | (1 << i)
+    full = (1 << len(a)) - 1
+    v = full
+    for t in b:
+        m = masks.get(t)
+        if m is None:
+            continue
+        u = v & m
+        v = ((v + u) | (v - u)) & full
+    return len(a) - v.bit_count()
+
+
+def bleu_stats(hyps: Sequence[str], refs: Sequence[str], tokenize: str = "13a", lowercase: bool = False,
+               max_order: int = BLEU_MAX_ORDER, hyp_tokens: Optional[Sequence[np.ndarray]] = None,
+               ref_tokens: Optional[Sequence[np.ndarray]] = None, vocab: Optional[Vocab] = None,
+               ref_store: Any = None, ref_ids: Optional[Sequence[Any]] = None) -> np.ndarray:
+    """(n, 2 + 2*max_order) int array in sacrebleu segment-stat layout.
+
+    hyp_tokens/ref_tokens: already-encoded token id arrays; both must come
+    from the same vocab. ref_store: ref_store.RefStore for the reference side.
+    """
+    vocab = vocab or Vocab()
+    if ref_tokens is None and ref_store is not None:
+        toks = ref_store.tokens(ref_kind("bleu", tokenize, lowercase), refs,
+                                lambda r: bleu_tokenize(r, tokenize, lowercase), ref_ids)
+        ref_tokens = [vocab.encode(t) for t in toks]
+    elif ref_tokens is None:
+        ref_tokens = [vocab.encode(bleu_tokenize(r, tokenize, lowercase)) for r in refs]
+    if hyp_tokens is None:
+        hyp_tokens = [vocab.encode(bleu_tokenize(h, tokenize, lowercase)) for h in hyps]
+    ht, rt, m = ngram_match_counts(hyp_tokens, ref_tokens, max_order)
+    out = np.zeros((len(hyp_tokens), 2 + 2 * max_order), dtype=np.int64)
+    out[:, 0] = [len(t) for t in hyp_tokens]
+    out[:, 1] = [len(t) for t in ref_tokens]
+    out[:, 2:2 + max_order] = m
+    out[:, 2 + max_order:] = ht
+    return out
+
+def _chars(s: str) -> np.ndarray:
+    return np.frombuffer(s.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+
+def chrf_stats(hyps: Sequence[str], refs: Sequence[str], char_order: int = CHRF_CHAR_ORDER,
+               whitespace: bool = False, lowercase: bool = False,
+               ref_chars: Optional[Sequence[np.ndarray]] = None, ref_gated: bool = True) -> np.ndarray:
+    """(n, 3*char_order) int array: [hyp, ref, match] per order, as sacrebleu CHRF.
+
+    ref_gated=False keeps the raw hyp count for orders the ref has no n-grams of
+    (needed by average='any' in chrf_from_stats).
+    """
+    prep = (lambda s: chrf_prepare(s.lower() if lowercase else s, whitespace))
+    if ref_chars is None:
+        ref_chars = [_chars(prep(r or "")) for r in refs]
+    hyp_chars = [_chars(prep(h or "")) for h in hyps]
+    ht, rt, m = ngram_match_counts(hyp_chars, ref_chars, char_order)
+    out = np.zeros((len(hyp_chars), 3 * char_order), dtype=np.int64)
+    # sacrebleu 는 해당 차수의 ref n-gram 이 없으면 hyp 쪽 개수도 0 으로 센다 (corpus 합산에 영향)
+    out[:, 0::3] = np.where(rt > 0, ht, 0) if ref_gated else ht
+    out[:, 1::3] = rt
+    out[:, 2::3] = m
+    return out
+
+def rouge_l_stats(hyps: Sequence[str], refs: Sequence[str], tokenize: str = "rouge", stem: bool = True,
+                  ref_tokens: Optional[Sequence[Sequence[Any]]] = None, ref_store: Any = None,
+                  ref_ids: Optional[Sequence[Any]] = None) -> np.ndarray:
+    """(n, 3) int array: [lcs, hyp_len, ref_len]."""
+    if ref_tokens is None and ref_store is not None:
+        ref_tokens = ref_store.tokens(ref_kind("rougeL", tokenize, stem), refs,
+                                      lambda r: rouge_tokenize(r, tokenize, stem), ref_ids)
+    elif ref_tokens is None:
+        ref_tokens = [rouge_tokenize(r, tokenize, stem) for r in refs]
+    out = np.zeros((len(hyps), 3), dtype=np.int64)
+    for i, (h, rt) in enumerate(zip(hyps, ref_tokens)):
+        ht = rouge_tokenize(h, tokenize, stem)
+        out[i] = (lcs_length(rt, ht), len(ht), len(rt))
+    return out
+
+
+def bleu_from_stats(stats: np.ndarray, smooth: str = "exp", effective_order: bool = True,
+                    max_order: int = BLEU_MAX_ORDER) -> np.ndarray:
+    """Vectorized BLEU (0-100) for each row of stats; pass stats.sum(0) for corpus BLEU.
+
+    smooth='exp' / 'none' follow sacrebleu.BLEU.compute_bleu exactly.
+    smooth='plus1' is the (c+1)/(t+1) proxy used by codebleu_eval.bleu4 (returned in 0-1).
+    """
+    st = np.atleast_2d(np.asarray(stats, dtype=np.float64))
+    sys_len, ref_len = st[:, 0], st[:, 1]
+    correct = st[:, 2:2 + max_order]
+    total = st[:, 2 + max_order:2 + 2 * max_order]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bp = np.where(sys_len >= ref_len, 1.0,
+                      np.where(sys_len > 0, np.exp(1.0 - ref_len / np.maximum(sys_len, 1)), 0.0))
+        if smooth == "plus1":
+            logp = np.log((correct + 1.0) / (total + 1.0)).sum(axis=1) / max_order
+            return np.where(sys_len > 0, bp * np.exp(logp), 0.0)
+
+        n = st.shape[0]
+        log_sum = np.zeros(n)
+        eff = np.full(n, float(max_order))
+        alive = np.ones(n, dtype=bool)
+        smooth_mteval = np.ones(n)
+        for k in range(max_order):
+            alive &= total[:, k] > 0
+            if effective_order:
+                eff = np.where(alive, k + 1, eff)
+            zero = correct[:, k] == 0
+            if smooth == "exp":
+                smooth_mteval = np.where(alive & zero, smooth_mteval * 2, smooth_mteval)
+                prec = np.where(zero, 100.0 / (smooth_mteval * total[:, k]), 100.0 * correct[:, k] / total[:, k])
+            else:
+                prec = np.where(zero, 0.0, 100.0 * correct[:, k] / total[:, k])
+            prec = np.where(alive, prec, 0.0)
+            logp = np.where(prec > 0, np.log(np.where(prec > 0, prec, 1.0)), -9999999999.0)
+            log_sum += np.where(k < eff, logp, 0.0)
+        score = bp * np.exp(log_sum / eff)
+    return np.where(correct.any(axis=1), score, 0.0)
+
+def chrf_from_stats(stats: np.ndarray, beta: float = CHRF_BETA, char_order: int = CHRF_CHAR_ORDER,
+                    average: str = "effective") -> np.ndarray:
+    """Vectorized chrF (0-100) per row.
+
+    average='effective': sacrebleu CHRF._compute_f_score (orders where both sides have n-grams).
+    average='any'      : legacy in-repo chrf_score (orders where either side has n-grams,
+                         missing side counts as 0); use with chrf_stats(ref_gated=False).
+    """
+    st = np.atleast_2d(np.asarray(stats, dtype=np.float64))
+    factor = beta ** 2
+    h, r, m = st[:, 0:3 * char_order:3], st[:, 1:3 * char_order:3], st[:, 2:3 * char_order:3]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prec = np.where(h > 0, m / np.where(h > 0, h, 1), 0.0)
+        rec = np.where(r > 0, m / np.where(r > 0, r, 1), 0.0)
+        if average == "effective":
+            use = (h > 0) & (r > 0)
+        elif average == "any":
+            use = (h > 0) | (r > 0)
+        else:
+            raise ValueError(f"unknown chrF average: {average}")
+        eff = use.sum(axis=1)
+        avg_p = np.where(eff > 0, (prec * use).sum(axis=1) / np.maximum(eff, 1), 0.0)
+        avg_r = np.where(eff > 0, (rec * use).sum(axis=1) / np.maximum(eff, 1), 0.0)
+        denom = factor * avg_p + avg_r
+        score = np.where(avg_p + avg_r > 0, 100 * (1 + factor) * avg_p * avg_r / np.where(denom > 0, denom, 1), 0.0)
+    return score
+
+def rouge_l_from_stats(stats: np.ndarray) -> np.ndarray:
+    """ROUGE-L F1 (0-1) per row, as rouge_score._score_lcs."""
+    st = np.atleast_2d(np.asarray(stats, dtype=np.float64))
+    lcs, hl, rl = st[:, 0], st[:, 1], st[:, 2]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = np.where(hl > 0, lcs / np.maximum(hl, 1), 0.0)
+        r = np.where(rl > 0, lcs / np.maximum(rl, 1), 0.0)
+        f = np.where(p + r > 0, 2 * p * r / np.where(p + r > 0, p + r, 1), 0.0)
+    return np.where((hl > 0) & (rl > 0), f, 0.0)
+
+
+@dataclass
+class ScoreConfig:
+    bleu_tokenize: str = "13a"
+    bleu_smooth: str = "exp"
+    bleu_effective_order: bool = True
+    chrf_order: int = CHRF_CHAR_ORDER
+    chrf_beta: float = CHRF_BETA
+    chrf_whitespace: bool = False
+    rouge_tokenize: str = "rouge"
+    rouge_stem: bool = True
+    lowercase: bool = False
+
+@dataclass
+class ScoreResult:
+    """per_item: metric -> (n,) array; corpus: metric -> float; stats: metric -> sufficient stats."""
+    n: int
+    per_item: Dict[str, np.ndarray] = field(default_factory=dict)
+    corpus: Dict[str, float] = field(default_factory=dict)
+    stats: Dict[str, np.ndarray] = field(default_factory=dict)
+
+
+def corpus_from_stats(stats: Dict[str, Any], cfg: Optional[ScoreConfig] = None) -> Dict[str, float]:
+    """Corpus scores from summed stats. ROUGE-L corpus = mean of per-item F (repo convention).
+
+    stats may hold either per-item rows or already-summed vectors (see pair_stats),
+    plus 'rougeL_f' (per-item F values) for merged partial results.
+    """
+    cfg = cfg or ScoreConfig()
+    out: Dict[str, float] = {}
+    if "bleu" in stats:
+        s = np.asarray(stats["bleu"])
+        tot = s.sum(axis=0) if s.ndim == 2 else s
+        out["bleu"] = float(bleu_from_stats(tot, cfg.bleu_smooth, cfg.bleu_effective_order)[0]) if tot.any() else 0.0
+    if "chrf" in stats:
+        s = np.asarray(stats["chrf"])
+        tot = s.sum(axis=0) if s.ndim == 2 else s
+        out["chrf"] = float(chrf_from_stats(tot, cfg.chrf_beta, cfg.chrf_order)[0]) if tot.any() else 0.0
+    if "rougeL_f" in stats:
+        f = np.asarray(stats["rougeL_f"], dtype=np.float64)
+        out["rougeL"] = math.fsum(f.tolist()) / f.size if f.size else 0.0
+    elif "rougeL" in stats:
+        f = rouge_l_from_stats(stats["rougeL"])
+        out["rougeL"] = float(f.mean()) if f.size else 0.0
+    return out
+
+def score_columns(hyps: Sequence[str], refs: Sequence[str], metrics: Sequence[str] = ("bleu", "chrf", "rougeL"),
+                  cfg: Optional[ScoreConfig] = None, ref_store: Any = None,
+                  ref_ids: Optional[Sequence[Any]] = None) -> ScoreResult:
+    """Score whole columns in one pass: per-item + corpus BLEU / chrF / ROUGE-L.
+
+    hyps/refs are parallel lists (None -> ""). ref_store (ref_store.RefStore) supplies
+    BLEU/ROUGE reference tokens; chrF needs no tokenization.
+    """
+    cfg = cfg or ScoreConfig()
+    hyps = ["" if h is None else str(h) for h in hyps]
+    refs = ["" if r is None else str(r) for r in refs]
+    if len(hyps) != len(refs):
+        raise ValueError("hyps/refs length mismatch")
+    res = ScoreResult(n=len(hyps))
+
+    if "bleu" in metrics:
+        st = bleu_stats(hyps, refs, cfg.bleu_tokenize, cfg.lowercase, ref_store=ref_store, ref_ids=ref_ids)
+        res.stats["bleu"] = st
+        res.per_item["bleu"] = bleu_from_stats(st, cfg.bleu_smooth, cfg.bleu_effective_order)
+    if "chrf" in metrics:
+        st = chrf_stats(hyps, refs, cfg.chrf_order, cfg.chrf_whitespace, cfg.lowercase)
+        res.stats["chrf"] = st
+        res.per_item["chrf"] = chrf_from_stats(st, cfg.chrf_beta, cfg.chrf_order)
+    if "rougeL" in metrics:
+        st = rouge_l_stats(hyps, refs, cfg.rouge_tokenize, cfg.rouge_stem, ref_store=ref_store, ref_ids=ref_ids)
+        res.stats["rougeL"] = st
+        res.per_item["rougeL"] = rouge_l_from_stats(st)
+    res.corpus = corpus_from_stats(res.stats, cfg)
+    return res
+
+
+# ---- sharded / multiprocess helpers -------------------------------------------------
+
+def pair_stats(hyps: Sequence[str], refs: Sequence[str], metrics: Sequence[str],
+               cfg: Optional[ScoreConfig] = None, ref_store: Any = None,
+               ref_ids: Optional[Sequence[Any]] = None) -> Dict[str, Any]:
+    """Mergeable sufficient stats of one shard: summed BLEU / chrF vectors + per-item ROUGE-L F.
+
+    Integer sums merge exactly; ROUGE-L keeps the F values so the merged mean
+    (math.fsum) does not depend on how the corpus was split.
+    """
+    cfg = cfg or ScoreConfig()
+    out: Dict[str, Any] = {"n": len(hyps)}
+    if "bleu" in metrics:
+        out["bleu"] = bleu_stats(hyps, refs, cfg.bleu_tokenize, cfg.lowercase,
+                                 ref_store=ref_store, ref_ids=ref_ids).sum(axis=0)
+    if "chrf" in metrics:
+        out["chrf"] = chrf_stats(hyps, refs, cfg.chrf_order, cfg.chrf_whitespace, cfg.lowercase).sum(axis=0)
+    if "rougeL" in metrics:
+        st = rouge_l_stats(hyps, refs, cfg.rouge_tokenize, cfg.rouge_stem, ref_store=ref_store, ref_ids=ref_ids)
+        out["rougeL_f"] = rouge_l_from_stats(st) if len(hyps) else np.zeros(0)
+    return out
+
+def merge_pair_stats(parts: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"n": 0}
+    for p in parts:
+        out["n"] += p.get("n", 0)
+        for k in ("bleu", "chrf"):
+            if k in p:
+                out[k] = out[k] + p[k] if k in out else np.array(p[k], copy=True)
+        if "rougeL_f" in p:
+            out.setdefault("_rouge", []).append(np.asarray(p["rougeL_f"], dtype=np.float64))
+    if "_rouge" in out:
+        out["rougeL_f"] = np.concatenate(out.pop("_rouge"))
+    return out
+
+def line_shards(paths: Sequence[Path | str], n_shards: int, min_bytes: int = 1 << 20) -> List[Tuple[str, int, int]]:
+    """Split files into (path, start, end) byte ranges of roughly equal size.
+
+    A line belongs to the range its first byte falls in (see iter_lines_range), so
+    every line is read exactly once whatever the split.
+    """
+    paths = [str(p) for p in paths]
+    sizes = [os.path.getsize(p) for p in paths]
+    target = max(min_bytes, sum(sizes) // max(1, n_shards) + 1)
+    out: List[Tuple[str, int, int]] = []
+    for p, size in zip(paths, sizes):
+        start = 0
+        while True:
+            end = min(size, start + target)
+            out.append((p, start, end))
+            if end >= size:
+                break
+            start = end
+    return out
+
+def iter_lines_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        if start > 0:
+            # start-1 부터 읽어서 이전 범위에서 시작한 줄은 건너뛴다
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            ln = f.readline()
+            if not ln:
+                break
+            yield ln
+
+def map_shards(fn: Callable[[Any], Any], tasks: Sequence[Any], workers: int = 1,
+               initializer: Optional[Callable[..., None]] = None, initargs: Tuple[Any, ...] = ()) -> List[Any]:
+    """fn over tasks, results in task order; workers<=1 runs in-process (same code path)."""
+    if workers <= 1 or len(tasks) <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        return [fn(t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as ex:
+        return list(ex.map(fn, tasks))
@@ -2,6 +2,8 @@
 import argparse, json, math, numpy as np
 from pathlib import Path
 
+from bootstrap import bootstrap_means
+
 try:
     from scipy.stats import wilcoxon
     SCIPY_OK = True
@@ -52,12 +54,7 @@ def cohen_d_paired(g, i):
 
 def bootstrap_ci(diff, n_boot=10000, alpha=0.05, seed=42):
     if n_boot <= 0: return None, None
-    rng = np.random.default_rng(seed)
-    n = len(diff)
-    boot = np.empty(n_boot, dtype=float)
-    for b in range(n_boot):
-        idx = rng.integers(0, n, n)
-        boot[b] = np.mean(diff[idx])
+    boot = bootstrap_means(diff, B=n_boot, seed=seed)
     lo = np.percentile(boot, 100*(alpha/2))
     hi = np.percentile(boot, 100*(1 - alpha/2))
     return float(lo), float(hi)
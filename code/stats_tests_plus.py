@@ -7,6 +7,8 @@ from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 
+from bootstrap import bootstrap_means
+
 try:
     from scipy.stats import wilcoxon as scipy_wilcoxon
 except Exception:
@@ -80,8 +82,7 @@ def bootstrap_ci(
     n = diffs.size
     if n == 0:
         return (float("nan"), float("nan"), float("nan"))
-    rng = np.random.default_rng(seed)
-    boots = rng.choice(diffs, size=(B, n), replace=True).mean(axis=1)
+    boots = bootstrap_means(diffs, B=B, seed=seed)
     mean = float(diffs.mean())
     lo = float(np.quantile(boots, alpha / 2.0))
     hi = float(np.quantile(boots, 1.0 - alpha / 2.0))
@@ -9,6 +9,9 @@ from typing import Any, Dict, List, Tuple, Optional
 
 import numpy as np
 
+from bootstrap import bootstrap_means, percentile_ci
+from jsonl_reader import iter_jsonl, read_jsonl_map
+
 try:
     from scipy.stats import wilcoxon as _wilcoxon
     SCIPY_OK = True
@@ -45,17 +48,11 @@ def _infer_metric_key_from_per_item(per_item: List[dict]) -> str:
     raise ValueError("No numeric metric key found in per_item")
 
 def paired_bootstrap_ci(
-    g: np.ndarray, i: np.ndarray, B: int = 10000, alpha: float = 0.05, seed: int = 123
+    g: np.ndarray, i: np.ndarray, B: int = 10000, alpha: float = 0.05, seed: int = 123, workers: int = 1
 ) -> Tuple[float, float]:
     if B <= 0 or g.size == 0:
         return float("nan"), float("nan")
-    rng = np.random.default_rng(seed)
-    n = len(g)
-    idx = rng.integers(0, n, size=(B, n))
-    diffs = (i[idx] - g[idx]).mean(axis=1)
-    lo = float(np.percentile(diffs, 100 * alpha / 2))
-    hi = float(np.percentile(diffs, 100 * (1 - alpha / 2)))
-    return lo, hi
+    return percentile_ci(bootstrap_means(i - g, B=B, seed=seed, workers=workers), alpha)
 
 def bh_fdr(pvals: np.ndarray) -> np.ndarray:
     p = np.array(pvals, dtype=float)
@@ -172,7 +169,8 @@ def load_pairs_arrays(path: Path) -> Tuple[List[str], np.ndarray, np.ndarray]:
     mask = ~(np.isnan(g) | np.isnan(i))
     return ids, g[mask], i[mask]
 
-def summarize_arrays(g: np.ndarray, i: np.ndarray, n_boot: int, do_wilcoxon: bool) -> Dict:
+def summarize_arrays(g: np.ndarray, i: np.ndarray, n_boot: int, do_wilcoxon: bool,
+                     ci: Optional[Tuple[float, float]] = None, boot_workers: int = 1) -> Dict:
     diff = i - g
     n = int(diff.size)
     mean_g = float(np.mean(g)) if n else float("nan")
@@ -189,7 +187,11 @@ def summarize_arrays(g: np.ndarray, i: np.ndarray, n_boot: int, do_wilcoxon: boo
         except Exception:
             p = float("nan")
 
-    ci_lo, ci_hi = paired_bootstrap_ci(g, i, B=n_boot, alpha=0.05) if n_boot else (float("nan"), float("nan"))
+    if ci is not None:
+        ci_lo, ci_hi = ci
+    else:
+        ci_lo, ci_hi = paired_bootstrap_ci(g, i, B=n_boot, alpha=0.05, workers=boot_workers) \
+            if n_boot else (float("nan"), float("nan"))
 
     return dict(
         n=n,
@@ -307,35 +309,19 @@ def print_table(rows: List[Dict]) -> None:
 
 def _read_jsonl_map(jsonl_fp: Path) -> Dict[str, Any]:
     """id -> record 매핑(마지막 라인 우선)."""
-    m: Dict[str, Any] = {}
-    with jsonl_fp.open("r", encoding="utf-8") as f:
-        for ln in f:
-            try:
-                o = json.loads(ln)
-            except Exception:
-                continue
-            pid = str(o.get("id", ""))
-            if not pid:
-                continue
-            m[pid] = o
-    return m
+    return read_jsonl_map(jsonl_fp, keys=("id",))
 
 def extract_metric(jsonl_fp: Path, metric: str = "pass") -> Dict[str, float]:
     vals: Dict[str, float] = {}
-    with jsonl_fp.open("r", encoding="utf-8") as f:
-        for ln in f:
-            try:
-                o = json.loads(ln)
-            except Exception:
-                continue
-            pid = str(o.get("id", ""))
-            if not pid:
-                continue
-            if metric == "pass":
-                v = 1.0 if o.get("pass") else 0.0
-            else:
-                v = float(o.get(metric, 0.0) or 0.0)
-            vals[pid] = v
+    for o in iter_jsonl(jsonl_fp, fields=("id", metric)):
+        pid = str(o.get("id", ""))
+        if not pid:
+            continue
+        if metric == "pass":
+            v = 1.0 if o.get("pass") else 0.0
+        else:
+            v = float(o.get(metric, 0.0) or 0.0)
+        vals[pid] = v
     return vals
 
 def compare_pass_mode(baseline_fp: Path, cvd_fp: Path, out_fp: Path) -> None:
@@ -347,11 +333,7 @@ def compare_pass_mode(baseline_fp: Path, cvd_fp: Path, out_fp: Path) -> None:
     mean_delta = float(np.mean(deltas)) if deltas.size else 0.0
 
     if deltas.size:
-        rng = np.random.default_rng(42)
-        B = 5000
-        n = deltas.size
-        idx = rng.integers(0, n, size=(B, n))
-        boots = deltas[idx].mean(axis=1)
+        boots = bootstrap_means(deltas, B=5000, seed=42)
         ci_lo = float(np.percentile(boots, 2.5))
         ci_hi = float(np.percentile(boots, 97.5))
     else:
@@ -392,6 +374,8 @@ def parse_args():
     ap.add_argument("--chrf",  type=Path, help="chrF json")
     ap.add_argument("--output", type=Path, default=Path("results/quantitative/stats_summary.csv"))
     ap.add_argument("--bootstrap", type=int, default=0, help="bootstrap resamples (0=off)")
+    ap.add_argument("--boot-workers", type=int, default=1,
+                    help="processes for bootstrap chunks (same CIs for any value)")
     ap.add_argument("--wilcoxon", action="store_true", help="compute Wilcoxon signed-rank p")
     ap.add_argument("--fdr", action="store_true", help="apply BH-FDR across metrics")
     ap.add_argument("--dry-run", action="store_true", help="파일을 쓰지 않고 요약만 출력")
@@ -431,6 +415,7 @@ def main():
     rows: List[Dict] = []
     used: List[Path] = []
 
+    loaded: List[Tuple[str, Path, np.ndarray, np.ndarray]] = []
     for label, p in metric_paths:
         if not p:
             continue
@@ -438,7 +423,25 @@ def main():
             print(f"[warn] skip {label}: not found -> {p}")
             continue
         ids, g, i = load_pairs_arrays(p)
-        res = summarize_arrays(g, i, n_boot=args.bootstrap, do_wilcoxon=args.wilcoxon)
+        loaded.append((label, p, g, i))
+
+    # 같은 n 의 지표들은 같은 seed 에서 같은 인덱스를 뽑으므로 한 번의 resample 로 같이 계산한다
+    cis: Dict[int, Tuple[float, float]] = {}
+    if args.bootstrap:
+        by_n: Dict[int, List[int]] = {}
+        for j, (_, _, g, _) in enumerate(loaded):
+            if g.size:
+                by_n.setdefault(g.size, []).append(j)
+        for js in by_n.values():
+            boots = bootstrap_means(np.stack([loaded[j][3] - loaded[j][2] for j in js]),
+                                    B=args.bootstrap, seed=123, workers=args.boot_workers)
+            lo, hi = percentile_ci(boots, 0.05)
+            for r, j in enumerate(js):
+                cis[j] = (float(lo[r]), float(hi[r]))
+
+    for j, (label, p, g, i) in enumerate(loaded):
+        res = summarize_arrays(g, i, n_boot=args.bootstrap, do_wilcoxon=args.wilcoxon, ci=cis.get(j),
+                               boot_workers=args.boot_workers)
         metric_name = _derive_metric_name(p) or label
         rows.append({"metric": metric_name, "level": "global", **res})
         used.append(p)
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, List, Optional, Sequence
+
+# 스트리밍 중 "이미 실패가 확정된" 경우만 판정한다. 통과는 생성이 끝나야 알 수 있으므로
+# feed() 는 실패 사유(str) 또는 None(미정)만 돌려준다. 판정 기준은 compliance_rules 와 같다
+# (출력은 strip() 후 평가되므로 앞뒤 공백에 좌우되지 않는 조건만 쓴다).
+
+_LINE_BREAKS = set("\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029")  # str.splitlines 기준
+
+
+class StreamCheck:
+    """Incremental check over streamed text; feed() returns a failure reason once it is certain."""
+
+    def __init__(self) -> None:
+        self.reason: Optional[str] = None
+        self.n_chars = 0
+
+    def feed(self, piece: str) -> Optional[str]:
+        if self.reason is None and piece:
+            self.n_chars += len(piece)
+            self.reason = self._feed(piece)
+        return self.reason
+
+    def _feed(self, piece: str) -> Optional[str]:
+        return None
+
+
+class LimitCharsCheck(StreamCheck):
+    """limit-chars: more than n (non-space | stripped) chars can only grow."""
+
+    def __init__(self, n: int, mode: str = "nonspace"):
+        super().__init__()
+        self.n, self.mode = n, mode
+        self.count = 0
+        self.first: Optional[int] = None
+        self.last = -1
+
+    def _feed(self, piece: str) -> Optional[str]:
+        if self.mode == "all":
+            base = self.n_chars - len(piece)
+            for k, ch in enumerate(piece):
+                if not ch.isspace():
+                    if self.first is None:
+                        self.first = base + k
+                    self.last = base + k
+            cur = 0 if self.first is None else self.last - self.first + 1
+        else:
+            self.count += sum(1 for ch in piece if not ch.isspace())
+            cur = self.count
+        return f"chars>{self.n} mode={self.mode}" if cur > self.n else None
+
+
+class LimitWordsCheck(StreamCheck):
+    """limit-words: words already started can only be extended, not merged."""
+
+    def __init__(self, n: int):
+        super().__init__()
+        self.n = n
+        self.words = 0
+        self.in_word = False
+
+    def _feed(self, piece: str) -> Optional[str]:
+        for ch in piece:
+            if ch.isspace():
+                self.in_word = False
+            elif not self.in_word:
+                self.in_word = True
+                self.words += 1
+        return f"words>{self.n}" if self.words > self.n else None
+
+
+class BulletsCheck(StreamCheck):
+    """bullets: a (partial) line that cannot start with '- ', or more than n bullets."""
+
+    def __init__(self, n: int):
+        super().__init__()
+        self.n = n
+        self.bullets = 0
+        self.line: List[str] = []
+
+    def _line_reason(self, s: str, complete: bool) -> Optional[str]:
+        s = s.lstrip()
+        if not s:
+            return None
+        if complete:
+            s = s.rstrip()
+            # "- " 만 있는 줄은 strip 후 "-" 가 되어 bullet 이 아니다
+            if not s.startswith("- "):
+                return "non_bullet_lines_present"
+            self.bullets += 1
+            return f"bullets>{self.n}" if self.bullets > self.n else None
+        if s[0] != "-" or (len(s) >= 2 and s[1] != " "):
+            return "non_bullet_lines_present"
+        # "- x" 처럼 내용이 시작된 줄은 끝나면 반드시 bullet 이 된다
+        if len(s) >= 3 and s[2:].strip() and self.bullets + 1 > self.n:
+            return f"bullets>{self.n}"
+        return None
+
+    def _feed(self, piece: str) -> Optional[str]:
+        for ch in piece:
+            if ch in _LINE_BREAKS:
+                r = self._line_reason("".join(self.line), complete=True)
+                self.line = []
+                if r:
+                    return r
+            else:
+                self.line.append(ch)
+        return self._line_reason("".join(self.line), complete=False)
+
+
+class DigitsCheck(StreamCheck):
+    """forbid-terms with forbid=digits."""
+
+    def _feed(self, piece: str) -> Optional[str]:
+        return "digits_forbidden" if any("0" <= ch <= "9" for ch in piece) else None
+
+
+class JsonStartCheck(StreamCheck):
+    """format-json / limit-items-json: the first non-space char already rules out a parse."""
+
+    def __init__(self, starts: str, reason: str = "json_parse_fail"):
+        super().__init__()
+        self.starts, self.fail_reason = starts, reason
+        self.decided = False
+
+    def _feed(self, piece: str) -> Optional[str]:
+        if self.decided:
+            return None
+        s = piece.lstrip()
+        if not s:
+            return None
+        self.decided = True
+        return None if s[0] in self.starts else self.fail_reason
+
+
+class TermsCheck(StreamCheck):
+    """Forbidden terms (term_matcher.TermMatcher) over a sliding window of the stream."""
+
+    def __init__(self, matcher, prefix: str = "forbidden:"):
+        super().__init__()
+        self.matcher = matcher
+        self.prefix = prefix
+        self.window = max((len(t) for t in matcher.terms), default=0) * 4 + 8
+        self.tail = ""
+
+    def _feed(self, piece: str) -> Optional[str]:
+        buf = self.tail + piece
+        hit = self.matcher.search(buf)
+        self.tail = buf[-self.window:]
+        return f"{self.prefix}{hit.term}" if hit else None
+
+
+class AnyCheck(StreamCheck):
+    def __init__(self, checks: Sequence[StreamCheck]):
+        super().__init__()
+        self.checks = list(checks)
+
+    def _feed(self, piece: str) -> Optional[str]:
+        for c in self.checks:
+            r = c.feed(piece)
+            if r:
+                return r
+        return None
+
+
+def _int(params: Dict[str, str], key: str) -> int:
+    try:
+        return int(params.get(key, "0"))
+    except Exception:
+        return 0
+
+
+def scenario_check(scenario: Optional[str], params: Optional[Dict[str, str]]) -> Optional[StreamCheck]:
+    """Early-fail check for a compliance_rules scenario, or None when nothing can be decided early."""
+    params = params or {}
+    s = (scenario or "").strip().lower()
+    if s == "limit-chars":
+        return LimitCharsCheck(_int(params, "chars"), str(params.get("mode", "nonspace")).lower())
+    if s == "limit-words":
+        return LimitWordsCheck(_int(params, "words"))
+    if s == "bullets":
+        return BulletsCheck(_int(params, "bullets"))
+    if s == "forbid-terms" and params.get("forbid") == "digits":
+        return DigitsCheck()
+    if s == "format-json":
+        return JsonStartCheck('{["-0123456789tfnNI')
+    if s == "limit-items-json":
+        return JsonStartCheck("[", "not_json_list")
+    return None
+
+
+def combine(*checks: Optional[StreamCheck]) -> Optional[StreamCheck]:
+    cs = [c for c in checks if c is not None]
+    if not cs:
+        return None
+    return cs[0] if len(cs) == 1 else AnyCheck(cs)
+
+
+class TokenSavings:
+    """Estimate of decode tokens saved by early aborts.
+
+    A full generation's length is unknown once aborted, so the estimate is the
+    running mean token count of completed generations minus the tokens produced
+    before the abort (None until one generation has completed).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.done_tokens = 0
+        self.done_n = 0
+        self.aborted = 0
+        self.saved = 0
+
+    def observe(self, tokens: Optional[int]) -> None:
+        if tokens:
+            with self._lock:
+                self.done_tokens += int(tokens)
+                self.done_n += 1
+
+    def abort(self, tokens: Optional[int]) -> Optional[int]:
+        with self._lock:
+            self.aborted += 1
+            if not self.done_n:
+                return None
+            est = max(0, int(round(self.done_tokens / self.done_n)) - int(tokens or 0))
+            self.saved += est
+            return est
+
+    def summary(self) -> Dict[str, Optional[int]]:
+        return {"early_aborts": self.aborted, "tokens_saved_est": self.saved}
+
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import os
+import re
+import unicodedata
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+# 한글 자모 중성/종성(결합 문자)은 앞 글자와 합쳐서 정규화해야 NFKC 결과가 전체 문자열과 같다
+_JAMO_TAIL = re.compile(r"[\u1160-\u11FF\uD7B0-\uD7FF]")
+
+
+def normalize_term(s: str) -> str:
+    """NFKC (fullwidth -> ASCII, compatibility jamo, composed Hangul) + casefold."""
+    return unicodedata.normalize("NFKC", s or "").casefold()
+
+
+def normalize_with_offsets(text: str) -> Tuple[str, List[int], List[int]]:
+    """normalize_term(text) plus, per normalized char, the [start, end) span in text it came from.
+
+    Text is normalized segment by segment (a starter plus its combining marks / Hangul
+    medial-final jamo), so every output char maps back to a whole original segment.
+    """
+    text = text or ""
+    if text.isascii():
+        idx = list(range(len(text)))
+        return text.lower(), idx, [i + 1 for i in idx]
+    out: List[str] = []
+    starts: List[int] = []
+    ends: List[int] = []
+    i, n = 0, len(text)
+    while i < n:
+        j = i + 1
+        while j < n and (unicodedata.combining(text[j]) or _JAMO_TAIL.match(text[j])):
+            j += 1
+        seg = normalize_term(text[i:j])
+        out.append(seg)
+        starts.extend([i] * len(seg))
+        ends.extend([j] * len(seg))
+        i = j
+    return "".join(out), starts, ends
+
+
+class Hit(NamedTuple):
+    start: int
+    end: int
+    term: str
+
+
+class TermMatcher:
+    """Aho–Corasick automaton over normalized terms; one linear scan finds every hit.
+
+    Terms and text go through the same NFKC + casefold normalization, so
+    'PASSWORD', 'password' and fullwidth 'ｐａｓｓｗｏｒｄ' all match. Hits report
+    offsets into the original text and the term as written in the list.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, int]]] = [[]]  # (key index, normalized length)
+        self._key_terms: List[List[str]] = []            # key index -> spellings in the list
+        keys: Dict[str, int] = {}
+        for t in terms:
+            t = (t or "").strip()
+            key = normalize_term(t)
+            if not key or t in self.terms:
+                continue
+            self.terms.append(t)
+            if key in keys:
+                self._key_terms[keys[key]].append(t)
+                continue
+            keys[key] = len(self._key_terms)
+            self._key_terms.append([t])
+            self._add(key, keys[key])
+        self._build()
+
+    def _add(self, key: str, ki: int) -> None:
+        s = 0
+        for ch in key:
+            nxt = self._goto[s].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[s][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            s = nxt
+        self._out[s].append((ki, len(key)))
+
+    def _build(self) -> None:
+        q = deque(self._goto[0].values())
+        while q:
+            s = q.popleft()
+            for ch, nxt in self._goto[s].items():
+                q.append(nxt)
+                f = self._fail[s]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                fb = self._goto[f].get(ch, 0)
+                self._fail[nxt] = fb if fb != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def _scan(self, text: str, first_only: bool = False) -> List[Hit]:
+        if not self.terms or not text:
+            return []
+        norm, starts, ends = normalize_with_offsets(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        hits: List[Hit] = []
+        s = 0
+        for i, ch in enumerate(norm):
+            while s and ch not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(ch, 0)
+            if out[s]:
+                for ki, ln in out[s]:
+                    hits.append(Hit(starts[i - ln + 1], ends[i], self._key_terms[ki][0]))
+                if first_only:
+                    return hits[:1]
+        return hits
+
+    def find_all(self, text: str) -> List[Hit]:
+        """Every (possibly overlapping) hit, ordered by end offset."""
+        return self._scan(text)
+
+    def search(self, text: str) -> Optional[Hit]:
+        """First hit or None (re.Pattern.search-compatible truthiness)."""
+        hits = self._scan(text, first_only=True)
+        return hits[0] if hits else None
+
+    def found_terms(self, text: str) -> List[str]:
+        """Distinct matched terms, in term-list order (every spelling that normalizes alike)."""
+        found = {h.term for h in self._scan(text)}
+        found = {t for ts in self._key_terms if ts[0] in found for t in ts}
+        return [t for t in self.terms if t in found]
+
+
+@lru_cache(maxsize=64)
+def _matcher_for(terms: Tuple[str, ...]) -> TermMatcher:
+    return TermMatcher(terms)
+
+
+def matcher_for_terms(terms: Sequence[str]) -> TermMatcher:
+    """Cached matcher for an in-memory term list (same list -> same automaton)."""
+    return _matcher_for(tuple(terms))
+
+
+def read_terms(path: Path | str) -> List[str]:
+    """Forbidden-term file: one term per line, blank lines and '#' comments skipped."""
+    txt = Path(path).read_text(encoding="utf-8-sig")
+    return [ln.strip() for ln in txt.splitlines() if ln.strip() and not ln.strip().startswith("#")]
+
+
+@lru_cache(maxsize=16)
+def _matcher_for_file(path: str, mtime_ns: int, size: int) -> TermMatcher:
+    return TermMatcher(read_terms(path))
+
+
+def load_matcher(path: Path | str) -> TermMatcher:
+    """Matcher for a terms file, rebuilt only when the file changes (mtime/size)."""
+    p = os.path.abspath(str(path))
+    st = os.stat(p)
+    return _matcher_for_file(p, st.st_mtime_ns, st.st_size)
+
+
+_REGEX_META = set(".^$*+?{}[]()")
+
+
+def literal_alternatives(pattern: str) -> Optional[List[str]]:
+    """Split a regex made only of '|'- or newline-separated literals into its terms; None otherwise."""
+    terms: List[str] = []
+    cur: List[str] = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            if i + 1 >= len(pattern) or pattern[i + 1].isalnum():
+                return None
+            cur.append(pattern[i + 1])
+            i += 2
+            continue
+        if c in "|\n":
+            terms.append("".join(cur))
+            cur = []
+        elif c in _REGEX_META:
+            return None
+        else:
+            cur.append(c)
+        i += 1
+    terms.append("".join(cur))
+    terms = [t.strip("\r") for t in terms]
+    return terms if all(terms) else None
@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import re
+import shlex
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from jsonl_index import RAW_DIR, ROOT, JsonlIndex, read_at, record_id
+
+DEFAULT_TEXT_INDEX = Path(os.environ.get("LLM_TEXT_INDEX", ROOT / "results" / "cache" / "text_index.sqlite"))
+DEFAULT_SOURCES = (RAW_DIR, ROOT / "prompts" / "main.csv")
+
+# 레코드에서 색인할 필드. 그룹마다 처음으로 비어 있지 않은 키 하나만 쓴다.
+FIELDS: Dict[str, Tuple[str, ...]] = {
+    "output": ("output", "prediction", "pred", "response", "generated", "text", "hyp",
+               "base_output", "instructed_output"),
+    "prompt": ("prompt", "input"),
+    "reference": ("reference", "ref", "references", "target", "gold"),
+    "error": ("error",),
+}
+
+# 토큰화: NFKC + 소문자, 한글 연속 구간과 그 밖의 글자/숫자 연속 구간을 따로 자른다 ("gpt모델" -> gpt, 모델).
+# words 열은 이 토큰 그대로 (구 / 접두 질의용), grams 열은 한글 토큰의 음절 bigram
+# (조사가 붙거나 복합어 안에 있어도 "모델" 이 "언어모델은" 에 걸리도록; 토큰 경계를 넘는 bigram 은 만들지 않는다).
+_HANGUL = "가-힣ㄱ-ㅎㅏ-ㅣ"
+_TOKEN_RE = re.compile(rf"[{_HANGUL}]+|[^\W_{_HANGUL}]+")
+_HANGUL_RE = re.compile(rf"[{_HANGUL}]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(unicodedata.normalize("NFKC", text or "").lower())
+
+
+def _is_hangul(tok: str) -> bool:
+    return _HANGUL_RE.fullmatch(tok) is not None
+
+
+def _bigrams(tok: str) -> List[str]:
+    return [tok[i:i + 2] for i in range(len(tok) - 1)] if len(tok) > 1 else [tok]
+
+
+def analyze(text: str) -> Tuple[str, str]:
+    """(words, grams) column values for one text."""
+    toks = tokenize(text)
+    grams = [g for t in toks if _is_hangul(t) for g in _bigrams(t)]
+    return " ".join(toks), " ".join(grams)
+
+
+def _q(tok: str) -> str:
+    return '"' + tok.replace('"', '""') + '"'
+
+
+def _term(tok: str, prefix: bool) -> str:
+    if prefix:
+        return f"words : {_q(tok)}*"
+    if _is_hangul(tok):
+        if len(tok) == 1:
+            return f"grams : {_q(tok)}*"
+        return "grams : " + " + ".join(_q(g) for g in _bigrams(tok))
+    return f"words : {_q(tok)}"
+
+
+def to_match(query: str) -> str:
+    """Query -> FTS5 MATCH expression. All parts must match (AND).
+
+      word        English word / number: exact token. Korean: substring within a word
+                  (모델 matches 언어모델은).
+      word*       token prefix (eval* -> evaluation, 모델* -> 모델은)
+      "a b c"     phrase: consecutive tokens; a token inside may end with * ("언어 모델*").
+                  Korean tokens in a phrase always match as prefixes, so particles may follow
+                  ("json 형식" matches "JSON 형식으로").
+    """
+    parts: List[str] = []
+    for unit in shlex.split(query, posix=True):
+        star = unit.endswith("*")
+        body = unit.rstrip("*")
+        if " " in body.strip():
+            toks: List[str] = []
+            for w in body.split():
+                sub = tokenize(w.rstrip("*"))
+                toks += [_q(t) + ("*" if _is_hangul(t) else "") for t in sub[:-1]]
+                if sub:
+                    toks.append(_q(sub[-1]) + ("*" if w.endswith("*") or _is_hangul(sub[-1]) else ""))
+            if toks:
+                if star and not toks[-1].endswith("*"):
+                    toks[-1] += "*"
+                parts.append("words : " + " + ".join(toks))
+            continue
+        sub = tokenize(body)
+        parts += [_term(t, star and i == len(sub) - 1) for i, t in enumerate(sub)]
+    if not parts:
+        raise ValueError(f"empty query: {query!r}")
+    return " AND ".join(f"({p})" for p in parts)
+
+
+def _text(v: Any) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, (list, tuple)):
+        return "\n".join(_text(x) for x in v)
+    if isinstance(v, dict):
+        return json.dumps(v, ensure_ascii=False)
+    return str(v)
+
+
+def record_fields(rec: Dict[str, Any]) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+    for field, keys in FIELDS.items():
+        for k in keys:
+            v = rec.get(k)
+            t = _text(v).strip() if v not in (None, False) else ""
+            if t:
+                out[field] = t
+                break
+    return out
+
+
+def _csv_rows(path: Path) -> Iterator[Tuple[int, int, Dict[str, str]]]:
+    """(offset, length, row) for each CSV row, quoted newlines included."""
+    pos = 0
+
+    def lines() -> Iterator[str]:
+        nonlocal pos
+        with path.open("rb") as f:
+            for b in f:
+                pos += len(b)
+                yield b.decode("utf-8-sig", errors="replace")
+
+    rdr = csv.reader(lines())
+    header = next(rdr, None)
+    if not header:
+        return
+    start = pos
+    for row in rdr:
+        yield start, pos - start, dict(zip(header, row))
+        start = pos
+
+
+class TextIndex:
+    """Full-text index (SQLite FTS5) over outputs / prompts / references / errors in JSONL logs and CSVs.
+
+    One document per (record, field); docs keep the source path and the record's byte
+    (offset, length), so every hit can be read back directly. refresh() only indexes
+    bytes appended to a JSONL file since the last run; a rewritten file (same size with a
+    new mtime, shorter, or its first 4 KB / last indexed line changed) and any changed CSV
+    are re-indexed from scratch.
+    """
+
+    def __init__(self, path: Path | str = DEFAULT_TEXT_INDEX):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+            " done INTEGER NOT NULL, head TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " rowid INTEGER PRIMARY KEY, path TEXT NOT NULL, off INTEGER NOT NULL, len INTEGER NOT NULL,"
+            " id TEXT COLLATE NOCASE, field TEXT NOT NULL, mode TEXT, model TEXT, run TEXT);"
+            "CREATE INDEX IF NOT EXISTS docs_path ON docs(path, off);"
+            "CREATE INDEX IF NOT EXISTS docs_field ON docs(field, mode, model, run);"
+            "CREATE VIRTUAL TABLE IF NOT EXISTS fts USING fts5(words, grams, prefix='2 3');"
+        )
+
+    # --- build ------------------------------------------------------------
+    def _drop(self, path: str) -> None:
+        self._conn.execute("DELETE FROM fts WHERE rowid IN (SELECT rowid FROM docs WHERE path=?)", (path,))
+        self._conn.execute("DELETE FROM docs WHERE path=?", (path,))
+
+    def _add(self, path: str, run: str, rows: Iterator[Tuple[int, int, Dict[str, Any]]]) -> int:
+        n = 0
+        for off, length, rec in rows:
+            meta = (record_id(rec), _text(rec.get("mode")) or None, _text(rec.get("model")) or None,
+                    _text(rec.get("run") or rec.get("run_id")) or run)
+            for field, text in record_fields(rec).items():
+                cur = self._conn.execute("INSERT INTO docs (path, off, len, field, id, mode, model, run) "
+                                         "VALUES (?,?,?,?,?,?,?,?)", (path, off, length, field) + meta)
+                self._conn.execute("INSERT INTO fts (rowid, words, grams) VALUES (?,?,?)",
+                                   (cur.lastrowid,) + analyze(text))
+                n += 1
+        return n
+
+    def _index_jsonl(self, p: Path, known: Optional[Tuple[int, int, int, str]], st: os.stat_result) -> Tuple[int, int]:
+        with JsonlIndex(p).refresh() as idx:
+            start = 0
+            if known is not None and not idx.rebuilt:
+                # 같은 크기로 다시 쓴 파일 (RunJournal.reorder 등) 은 이어 붙이지 않고 새로 색인한다
+                old_size, _, done, old_fp = known
+                if (0 < done <= idx.complete and st.st_size != old_size and idx.raw_at(done - 1, 1) == b"\n"
+                        and idx.fingerprint(done) == old_fp):
+                    start = done
+            rows = ((off, length, json.loads(idx.raw_at(off, length).decode("utf-8-sig")))
+                    for off, length, _ in idx.entries if off >= start and off + length <= idx.complete)
+            key = str(p)
+            self._conn.execute("BEGIN")
+            if start == 0:
+                self._drop(key)
+            n = self._add(key, p.stem, rows)
+            self._conn.execute("INSERT OR REPLACE INTO files VALUES (?,?,?,?,?)",
+                               (key, st.st_size, st.st_mtime_ns, idx.complete,
+                                idx.fingerprint(idx.complete)))
+            self._conn.execute("COMMIT")
+            return n, idx.complete - start
+
+    def _index_csv(self, p: Path, st: os.stat_result) -> Tuple[int, int]:
+        key = str(p)
+        self._conn.execute("BEGIN")
+        self._drop(key)
+        n = self._add(key, p.stem, _csv_rows(p))
+        self._conn.execute("INSERT OR REPLACE INTO files VALUES (?,?,?,?,?)",
+                           (key, st.st_size, st.st_mtime_ns, st.st_size, ""))
+        self._conn.execute("COMMIT")
+        return n, st.st_size
+
+    def refresh(self, sources: Sequence[Path | str] = DEFAULT_SOURCES) -> Dict[str, int]:
+        """Index new/changed *.jsonl / *.csv files under sources (directories or files)."""
+        files: Dict[str, Tuple[Path, os.stat_result]] = {}
+        for src in map(Path, sources):
+            found = [src] if src.is_file() else (sorted(src.rglob("*.jsonl")) + sorted(src.rglob("*.csv"))
+                                                 if src.is_dir() else [])
+            for p in found:
+                files[str(p.resolve())] = (p.resolve(), p.stat())
+        stats = {"files": len(files), "updated": 0, "docs_added": 0, "scanned_bytes": 0}
+        with self._lock:
+            known = {r[0]: r[1:] for r in self._conn.execute("SELECT path, size, mtime_ns, done, head FROM files")}
+            for key, (p, st) in files.items():
+                k = known.get(key)
+                if k is not None and (k[0], k[1]) == (st.st_size, st.st_mtime_ns):
+                    continue
+                n, scanned = self._index_csv(p, st) if p.suffix.lower() == ".csv" else self._index_jsonl(p, k, st)
+                stats["updated"] += 1
+                stats["docs_added"] += n
+                stats["scanned_bytes"] += scanned
+            scope = [str(Path(s).resolve()) for s in sources]
+            gone = [k for k in known if k not in files and any(k == s or k.startswith(s + os.sep) for s in scope)]
+            if gone:
+                self._conn.execute("BEGIN")
+                for k in gone:
+                    self._drop(k)
+                    self._conn.execute("DELETE FROM files WHERE path=?", (k,))
+                self._conn.execute("COMMIT")
+            stats["removed"] = len(gone)
+        return stats
+
+    # --- query ------------------------------------------------------------
+    @staticmethod
+    def _filters(field: Optional[str], mode: Optional[str], model: Optional[str], run: Optional[str],
+                 id_: Optional[str], path: Optional[str]) -> Tuple[str, List[Any]]:
+        where, params = [], []
+        for col, v in (("field", field), ("mode", mode), ("model", model), ("run", run), ("id", id_)):
+            if v is not None:
+                where.append(f"d.{col}=?")
+                params.append(v)
+        if path is not None:
+            where.append("d.path=?")
+            params.append(str(Path(path).resolve()))
+        return "".join(" AND " + w for w in where), params
+
+    def search(self, query: str, field: Optional[str] = None, mode: Optional[str] = None,
+               model: Optional[str] = None, run: Optional[str] = None, id_: Optional[str] = None,
+               path: Optional[str] = None, limit: Optional[int] = 50) -> List[Dict[str, Any]]:
+        """Best-matching docs first (bm25); each hit has path/off/len pointing at the source record."""
+        cond, params = self._filters(field, mode, model, run, id_, path)
+        sql = ("SELECT d.path, d.off, d.len, d.id, d.field, d.mode, d.model, d.run FROM fts"
+               " JOIN docs d ON d.rowid = fts.rowid WHERE fts MATCH ?" + cond + " ORDER BY fts.rank")
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        cols = ("path", "off", "len", "id", "field", "mode", "model", "run")
+        with self._lock:
+            return [dict(zip(cols, r)) for r in self._conn.execute(sql, [to_match(query)] + params)]
+
+    def docs(self, field: Optional[str] = None, mode: Optional[str] = None, model: Optional[str] = None,
+             run: Optional[str] = None, id_: Optional[str] = None, path: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Every indexed doc matching the filters, in file order (e.g. all records with an error)."""
+        cond, params = self._filters(field, mode, model, run, id_, path)
+        cols = ("path", "off", "len", "id", "field", "mode", "model", "run")
+        with self._lock:
+            return [dict(zip(cols, r)) for r in self._conn.execute(
+                "SELECT d.path, d.off, d.len, d.id, d.field, d.mode, d.model, d.run FROM docs d WHERE 1=1"
+                + cond + " ORDER BY d.path, d.off", params)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            files = self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            by_field = dict(self._conn.execute("SELECT field, COUNT(*) FROM docs GROUP BY field"))
+        return {"files": files, "docs": sum(by_field.values()), "by_field": by_field}
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def load_hit(hit: Dict[str, Any]) -> Dict[str, Any]:
+    """The source record of a hit (JSONL line or CSV row), read at its offset."""
+    if hit["path"].lower().endswith(".csv"):
+        with open(hit["path"], "rb") as f:
+            f.seek(hit["off"])
+            chunk = f.read(hit["len"]).decode("utf-8-sig", errors="replace")
+        with open(hit["path"], "r", encoding="utf-8-sig", newline="") as f:
+            header = next(csv.reader(f), [])
+        return dict(zip(header, next(csv.reader(chunk.splitlines(keepends=True)), [])))
+    return read_at(hit["path"], hit["off"], hit["len"])
+
+
+def snippet(text: str, query: str, width: int = 60) -> str:
+    """Window of text around the first query token found (case-insensitive)."""
+    flat = " ".join((text or "").split())
+    low = flat.lower()
+    pos = -1
+    for t in tokenize(query.replace("*", " ")):
+        pos = low.find(t)
+        if pos >= 0:
+            break
+    if pos < 0:
+        return flat[:2 * width]
+    a = max(0, pos - width)
+    return ("..." if a else "") + flat[a:pos + 2 * width] + ("..." if pos + 2 * width < len(flat) else "")
+
+
+def add_text_index_args(ap) -> None:
+    ap.add_argument("--text-index", default=str(DEFAULT_TEXT_INDEX), dest="text_index",
+                    help="SQLite full-text index of outputs/prompts/references")
+    ap.add_argument("--source", action="append", default=None, dest="sources",
+                    help="JSONL/CSV file or directory to index; repeatable "
+                         f"(default: {', '.join(str(Path(s).relative_to(ROOT)) for s in DEFAULT_SOURCES)})")
+
+
+def text_sources(args) -> List[Path]:
+    return [Path(s) for s in (getattr(args, "sources", None) or DEFAULT_SOURCES)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Full-text index over outputs, prompts and references")
+    add_text_index_args(ap)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("build", help="index new / changed files")
+    p = sub.add_parser("search", help='e.g. \'모델 "json 형식"\' or \'eval*\'')
+    p.add_argument("query")
+    p.add_argument("--field", choices=sorted(FIELDS), default=None)
+    p.add_argument("--mode", default=None)
+    p.add_argument("--model", default=None)
+    p.add_argument("--run", default=None)
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--json", action="store_true", help="print hits as JSON lines")
+    sub.add_parser("info")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    ti = TextIndex(args.text_index)
+    st = ti.refresh(text_sources(args))
+    if args.cmd == "build":
+        print(f"[OK] files={st['files']} updated={st['updated']} removed={st['removed']} "
+              f"docs+={st['docs_added']} scanned={st['scanned_bytes']}B")
+    elif args.cmd == "search":
+        hits = ti.search(args.query, field=args.field, mode=args.mode, model=args.model, run=args.run,
+                         limit=args.limit)
+        for h in hits:
+            rec = load_hit(h)
+            text = record_fields(rec).get(h["field"], "")
+            if args.json:
+                print(json.dumps({**h, "snippet": snippet(text, args.query)}, ensure_ascii=False))
+            else:
+                print(f"{h['path']}@{h['off']}+{h['len']} id={h['id']} field={h['field']} "
+                      f"mode={h['mode']} model={h['model']} run={h['run']}")
+                print(f"    {snippet(text, args.query)}")
+        print(f"[HITS] {len(hits)}")
+    else:
+        print(json.dumps({**ti.stats(), "index": str(ti.path)}, ensure_ascii=False, indent=2))
+    ti.close()
+    print(f"[TIME] {(time.perf_counter() - t0) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
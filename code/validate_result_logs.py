@@ -4,17 +4,17 @@ import argparse
 from pathlib import Path
 from jsonschema import Draft7Validator
 
+from jsonl_reader import JsonlReader
+
 ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_SCHEMA = ROOT / "schema" / "result_log.schema.json"
 DEFAULT_RAWDIR = ROOT / "results" / "raw"
 
-def iter_jsonl_lines(fp: Path):
-    with fp.open("r", encoding="utf-8-sig", errors="replace") as f:
-        for ln_no, line in enumerate(f, start=1):
-            s = line.strip()
-            if not s:
-                continue
-            yield ln_no, s
+def open_records(fp: Path, errors: list) -> JsonlReader:
+    """Reader whose lines that fail to parse go to errors as (file, line, "(parse)", message)."""
+    def on_error(ln_no, _line, e):
+        errors.append((fp.name, ln_no, "(parse)", f"JSON 파싱 실패: {e}"))
+    return JsonlReader(fp, errors=on_error, dicts_only=False)
 
 def main():
     ap = argparse.ArgumentParser(description="Validate result JSONL logs against schema")
@@ -43,14 +43,9 @@ def main():
     errors = []
 
     for fp in files:
-        for ln_no, s in iter_jsonl_lines(fp):
+        reader = open_records(fp, errors)
+        for ln_no, rec in reader.numbered():
             total_records += 1
-            try:
-                rec = json.loads(s)
-            except Exception as e:
-                errors.append((fp.name, ln_no, "(parse)", f"JSON 파싱 실패: {e}"))
-                continue
-
             v_errs = list(validator.iter_errors(rec))
             for k in args.require:
                 if k not in rec:
@@ -67,6 +62,9 @@ def main():
                         errors.append((fp.name, ln_no, path_str, getattr(e, "message", str(e))))
             else:
                 ok_records += 1
+        total_records += reader.bad + reader.torn
+        if reader.torn:
+            errors.append((fp.name, "EOF", "(parse)", "마지막 줄이 줄바꿈 없이 잘려 있음"))
 
     print(f"[SUMMARY] files={len(files)}  records={total_records}  ok={ok_records}  errors={len(errors)}")
     if errors:
@@ -2,6 +2,7 @@
 import sys
 import re
 import json
+import argparse
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -16,14 +17,28 @@ os.makedirs(OUT_TABLE_DIR, exist_ok=True)
 B = 10000
 RNG_SEED = 1234
 
-def safe_read_csv(path):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code"))
+from metrics_dataset import add_dataset_args, parse_where, read_any
+from corpus_bootstrap import bleu_delta_figure
+
+def safe_read_csv(path, where=None):
+    """CSV / JSONL / metrics_dataset directory (columns typed, filters pushed into the Parquet scan)."""
     try:
-        return pd.read_csv(path, encoding="utf-8-sig")
-    except Exception:
+        df = read_any(path, **parse_where(where))
+    except UnicodeDecodeError:
         try:
-            return pd.read_csv(path, encoding="latin1")
+            df = pd.read_csv(path, encoding="latin1")
         except Exception as e:
             raise RuntimeError(f"Failed to read CSV '{path}': {e}")
+    except Exception as e:
+        raise RuntimeError(f"Failed to read '{path}': {e}")
+    # CSV 는 문자열로 읽히므로 숫자로 읽히는 열은 숫자로 (Parquet 은 이미 타입이 있다)
+    for c in df.columns:
+        if not (pd.api.types.is_numeric_dtype(df[c]) or pd.api.types.is_bool_dtype(df[c])):
+            num = pd.to_numeric(df[c], errors="coerce")
+            if num.notna().sum() == df[c].notna().sum():
+                df[c] = num
+    return df
 
 def table_image(df_table, fname, title, outdir):
     outpath = os.path.join(outdir, fname)
@@ -158,11 +173,18 @@ def detect_and_prepare(df):
     raise RuntimeError("Data format not recognized (no 'mode' column and no 'base'/'instr' columns).")
 
 def main():
-    if not os.path.exists(SRC):
-        print("ERROR: missing source:", SRC); sys.exit(1)
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--src", default=SRC, help="per-item metrics: CSV/JSONL or metrics dataset dir (e.g. metrics_ds)")
+    ap.add_argument("--pairs", default=os.path.join(ROOT, "per_item_pairs_wide.csv"),
+                    help="reference/base/instructed texts for the corpus-level bootstrap figure")
+    add_dataset_args(ap)
+    args = ap.parse_args()
+    src = args.src
+    if not os.path.exists(src):
+        print("ERROR: missing source:", src); sys.exit(1)
 
-    df = safe_read_csv(SRC)
-    print("Loaded", SRC, "rows=", len(df))
+    df = safe_read_csv(src, args.where)
+    print("Loaded", src, "rows=", len(df))
     print("Columns detected:", list(df.columns))
 
     df.columns = [c.replace('-', '_') for c in df.columns]
@@ -185,20 +207,19 @@ def main():
     if n == 0:
         print("ERROR: no valid delta values after preparation"); sys.exit(1)
 
-    rng = np.random.default_rng(RNG_SEED)
-    print(f"Starting bootstrap B={B} (n={n}) ... this may take time")
-    boots = []
-    for _ in range(B):
-        idx = rng.integers(0, n, n)
-        boots.append(delta[idx].mean())
-    boots = np.array(boots)
-    ci_low, ci_high = np.percentile(boots, [2.5, 97.5])
     delta_mean = float(delta.mean())
 
-    stats = {"n": int(n), "B": int(B), "delta_mean": float(delta_mean), "ci95": [float(ci_low), float(ci_high)]}
+    # 부트스트랩은 corpus BLEU 의 paired bootstrap (문장 점수 평균이 아니라 보고하는 지표 그대로)
+    print(f"Starting corpus bootstrap B={B} ...")
+    corpus = bleu_delta_figure(args.pairs, os.path.join(OUT_FIG_DIR, "bleu_bootstrap_delta_300dpi.png"),
+                               B=B, seed=RNG_SEED)
+    stats = {"n": int(n), "B": int(B), "delta_mean": float(delta_mean)}
+    if corpus is not None:
+        stats.update({"corpus_delta": corpus["delta"], "ci95": [corpus["ci_low"], corpus["ci_high"]],
+                      "p_boot": corpus["p_boot"], "n_pairs": corpus["n"]})
     with open(os.path.join(OUT_FIG_DIR, "bleu_stats.json"), "w", encoding="utf-8") as fh:
         json.dump(stats, fh, ensure_ascii=False, indent=2)
-    print("Bootstrap done. mean=", delta_mean, "95%CI=", (ci_low, ci_high))
+    print("Bootstrap done.", stats)
 
     plt.figure(figsize=(6,6))
     plt.scatter(prepared['base'], prepared['instr'], s=36)
@@ -223,16 +244,6 @@ def main():
     plt.savefig(os.path.join(OUT_FIG_DIR, "bleu_boxplot_300dpi.png"), dpi=300)
     plt.close()
 
-    plt.figure(figsize=(8,4.5))
-    plt.hist(boots, bins=40)
-    plt.axvline(0, color="k", linestyle="--")
-    plt.axvline(delta_mean, color="r", linestyle="-")
-    plt.title(f"Bootstrap ? (mean={delta_mean:.3f}, 95% CI=[{ci_low:.3f},{ci_high:.3f}], n={n}, B={B})")
-    plt.xlabel("? (instr - base)")
-    plt.tight_layout()
-    plt.savefig(os.path.join(OUT_FIG_DIR, "bleu_bootstrap_delta_300dpi.png"), dpi=300)
-    plt.close()
-
     safe_cols = [c for c in ["id","base","instr","delta","chrf","rouge_l","rougeL"] if c in prepared.columns]
     df_show = prepared[safe_cols].sort_values("delta", ascending=False)
     top10 = df_show.head(10)
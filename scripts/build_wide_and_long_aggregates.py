@@ -7,66 +7,26 @@ OUT_BASE_MET = "per_item_pairs_base_with_metrics.csv"
 OUT_INSTR_MET = "per_item_pairs_instr_with_metrics.csv"
 OUT_AGG_WIDE = "aggregated_metrics_fixed_with_chrf_rouge.csv"
 OUT_AGG_LONG = "aggregated_metrics_by_mode.csv"
-
-from collections import Counter
-def char_ngrams(s, n):
-    s = s or ""
-    return [s[i:i+n] for i in range(len(s)-n+1)] if len(s) >= n else []
-def chrf_score(ref, hyp, max_n=6, beta=2.0):
-    if (ref is None or ref == ""):
-        return None
-    if hyp is None: hyp = ""
-    precisions = []; recalls = []
-    for n in range(1, max_n+1):
-        ref_ngrams = Counter(char_ngrams(ref, n))
-        hyp_ngrams = Counter(char_ngrams(hyp, n))
-        if not ref_ngrams and not hyp_ngrams:
-            continue
-        overlap = sum((ref_ngrams & hyp_ngrams).values())
-        hyp_count = sum(hyp_ngrams.values())
-        ref_count = sum(ref_ngrams.values())
-        p = overlap / hyp_count if hyp_count > 0 else 0.0
-        r = overlap / ref_count if ref_count > 0 else 0.0
-        precisions.append(p); recalls.append(r)
-    if not precisions:
-        return 0.0
-    avg_p = sum(precisions)/len(precisions)
-    avg_r = sum(recalls)/len(recalls)
-    if avg_p + avg_r == 0:
-        return 0.0
-    beta2 = beta*beta
-    f = (1+beta2) * (avg_p*avg_r) / (beta2*avg_p + avg_r)
-    return f*100.0
-
-def lcs_len(a,b):
-    if a is None: a = ""
-    if b is None: b = ""
-    A = a.split(); B = b.split()
-    la, lb = len(A), len(B)
-    if la==0 or lb==0:
-        return 0
-    dp = [[0]*(lb+1) for _ in range(la+1)]
-    for i in range(1, la+1):
-        for j in range(1, lb+1):
-            if A[i-1]==B[j-1]:
-                dp[i][j] = dp[i-1][j-1]+1
-            else:
-                dp[i][j] = dp[i-1][j] if dp[i-1][j]>=dp[i][j-1] else dp[i][j-1]
-    return dp[la][lb]
-
-def rouge_l_score(ref, hyp):
-    if ref is None or ref=="":
-        return None
-    if hyp is None: hyp = ""
-    lcs = lcs_len(ref,hyp)
-    ref_tokens = len(ref.split()); hyp_tokens = len(hyp.split())
-    if ref_tokens==0 or hyp_tokens==0 or lcs==0:
-        return 0.0
-    p = lcs / hyp_tokens; r = lcs / ref_tokens
-    if p + r == 0:
-        return 0.0
-    f = 2 * p * r / (p + r)
-    return f*100.0
+# 항목별 chrF/ROUGE-L 을 metrics_dataset 에도 쓴다 (mode=base|instr, run=아래 이름; 비우면 쓰지 않음)
+OUT_DATASET = os.environ.get("METRICS_DATASET", "metrics_ds")
+DATASET_RUN = "wide_long_aggregates"
+
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+from score_engine import chrf_from_stats, chrf_stats, rouge_l_from_stats, rouge_l_stats
+
+def score_pairs(refs, hyps):
+    """chrF / ROUGE-L (both x100) for whole columns at once.
+
+    Same definitions as the old per-pair chrf_score / rouge_l_score: chrF over raw
+    characters (whitespace kept), orders where either side has n-grams; ROUGE-L on
+    whitespace tokens.
+    """
+    if not refs:
+        return [], []
+    chrf = chrf_from_stats(chrf_stats(hyps, refs, whitespace=True, ref_gated=False), average="any")
+    rouge = rouge_l_from_stats(rouge_l_stats(hyps, refs, tokenize="whitespace")) * 100.0
+    return chrf.tolist(), rouge.tolist()
 
 if not os.path.exists(BASE_PAIRS):
     print("Missing", BASE_PAIRS); sys.exit(1)
@@ -99,6 +59,7 @@ merged.to_csv(OUT_WIDE,index=False,encoding='utf-8-sig')
 print("Wrote wide pairs:", OUT_WIDE, "rows=", len(merged))
 
 base_rows=[]; instr_rows=[]
+pairs=[]
 for _, r in merged.iterrows():
     idv = r['id']
     ref = (r['reference'] if pd.notna(r['reference']) else "").strip()
@@ -106,24 +67,27 @@ for _, r in merged.iterrows():
     ip_raw = r['instr_prediction'] if 'instr_prediction' in r else ""
     base_pred = "" if pd.isna(bp_raw) else str(bp_raw).strip()
     instr_pred = "" if pd.isna(ip_raw) else str(ip_raw).strip()
-
     if ref:
-        base_chrf = chrf_score(ref, base_pred) if base_pred else None
-        base_rouge = rouge_l_score(ref, base_pred) if base_pred else None
-        base_rows.append({'id':idv,'mode':'base','reference':ref,'prediction':base_pred,
-                          'chrf': base_chrf if base_chrf is not None else "NA",
-                          'rouge_l': base_rouge if base_rouge is not None else "NA"})
-        instr_chrf = chrf_score(ref, instr_pred) if instr_pred else None
-        instr_rouge = rouge_l_score(ref, instr_pred) if instr_pred else None
-        instr_rows.append({'id':idv,'mode':'instr','reference':ref,'prediction':instr_pred,
-                          'chrf': instr_chrf if instr_chrf is not None else "NA",
-                          'rouge_l': instr_rouge if instr_rouge is not None else "NA"})
-    else:
-        pass
+        pairs.append((idv, ref, base_pred, instr_pred))
+
+for mode, col, rows in (('base', 2, base_rows), ('instr', 3, instr_rows)):
+    # 행 위치로 점수를 돌려 준다 (id 가 중복된 행도 예전처럼 각자 점수를 가진다)
+    scored = [k for k, p in enumerate(pairs) if p[col]]
+    chrf_vals, rouge_vals = score_pairs([pairs[k][1] for k in scored], [pairs[k][col] for k in scored])
+    by_pos = dict(zip(scored, zip(chrf_vals, rouge_vals)))
+    for k, p in enumerate(pairs):
+        c, g = by_pos.get(k, ("NA", "NA"))
+        rows.append({'id':p[0],'mode':mode,'reference':p[1],'prediction':p[col],
+                     'chrf': c, 'rouge_l': g})
 
 pd.DataFrame(base_rows).to_csv(OUT_BASE_MET,index=False,encoding='utf-8-sig')
 pd.DataFrame(instr_rows).to_csv(OUT_INSTR_MET,index=False,encoding='utf-8-sig')
 print("Wrote per-mode item metrics:", OUT_BASE_MET, OUT_INSTR_MET)
+if OUT_DATASET:
+    from metrics_dataset import write_metrics
+    n = write_metrics([{'id': r['id'], 'mode': r['mode'], 'chrf': r['chrf'], 'rouge_l': r['rouge_l']}
+                       for r in base_rows + instr_rows], OUT_DATASET, run=DATASET_RUN)
+    print("Wrote item metrics to dataset:", OUT_DATASET, "rows=", n, "run=", DATASET_RUN)
 
 def safe_mean(values):
     vals = [v for v in values if isinstance(v,(int,float))]
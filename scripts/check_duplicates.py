@@ -1,26 +1,77 @@
+import argparse
 import json
 import collections
+import sys
 from pathlib import Path
 
-p = Path("split_manifest.json")
-if not p.exists():
-    print("ERROR: split_manifest.json not found in CWD:", p.resolve())
-    raise SystemExit(2)
-
-m = json.loads(p.read_text(encoding="utf-8"))
-ids = [it.get("id") for it in m.get("items",[])]
-counter = collections.Counter(ids)
-dups = [k for k,v in counter.items() if v>1]
-print("n_items:", len(ids))
-print("unique ids:", len(set(ids)))
-print("duplicate ids count:", len(dups))
-if dups:
-    print("duplicate ids (sample up to 50):")
-    for d in dups[:50]:
-        print(" -", d, "occurs:", counter[d])
-    dd = dups[0]
-    print("\nExample entries for duplicate id:", dd)
-    for it in [it for it in m.get("items",[]) if it.get("id")==dd]:
-        print(json.dumps(it, ensure_ascii=False))
-else:
-    print("No duplicate ids found.")
\ No newline at end of file
+from near_dup import near_duplicate_pairs
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+from jsonl_reader import JsonlReader
+
+TEXT_KEYS = ("output", "prediction", "reference", "text", "input")
+
+def load_texts(path: Path):
+    """(ids, texts) from .jsonl (first of TEXT_KEYS present) or plain .txt (one per line)."""
+    ids, texts = [], []
+    if path.suffix == ".jsonl":
+        for n, o in JsonlReader(path).numbered():
+            txt = next((o[k] for k in TEXT_KEYS if isinstance(o.get(k), str)), None)
+            if txt is None:
+                continue
+            ids.append(str(o.get("id", n))); texts.append(txt)
+        return ids, texts
+    with path.open("r", encoding="utf-8-sig") as f:
+        for n, ln in enumerate(f, 1):
+            ids.append(str(n)); texts.append(ln.rstrip("\n"))
+    return ids, texts
+
+def check_ids(p: Path):
+    if not p.exists():
+        print("ERROR: split_manifest.json not found in CWD:", p.resolve())
+        raise SystemExit(2)
+
+    m = json.loads(p.read_text(encoding="utf-8"))
+    ids = [it.get("id") for it in m.get("items",[])]
+    counter = collections.Counter(ids)
+    dups = [k for k,v in counter.items() if v>1]
+    print("n_items:", len(ids))
+    print("unique ids:", len(set(ids)))
+    print("duplicate ids count:", len(dups))
+    if dups:
+        print("duplicate ids (sample up to 50):")
+        for d in dups[:50]:
+            print(" -", d, "occurs:", counter[d])
+        dd = dups[0]
+        print("\nExample entries for duplicate id:", dd)
+        for it in [it for it in m.get("items",[]) if it.get("id")==dd]:
+            print(json.dumps(it, ensure_ascii=False))
+    else:
+        print("No duplicate ids found.")
+
+def check_near_dups(path: Path, min_sim: float, num_perm: int, show: int):
+    ids, texts = load_texts(path)
+    keep = [i for i, t in enumerate(texts) if t.strip()]
+    pairs, info = near_duplicate_pairs([texts[i] for i in keep], min_sim, num_perm=num_perm)
+    print(f"\n[{path.name}] texts: {len(keep)}  near-duplicate pairs (jaccard>={min_sim}): {len(pairs)}"
+          f"  exact checks: {info['pairs_checked']} (bands={info['bands']}, rows={info['rows']})")
+    for a, b, s in sorted(pairs, key=lambda x: -x[2])[:show]:
+        print(f" - {ids[keep[a]]} ~ {ids[keep[b]]}  jaccard={s:.3f}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Duplicate ids in a split manifest, and near-duplicate outputs/references")
+    ap.add_argument("--manifest", default="split_manifest.json")
+    ap.add_argument("--outputs", nargs="*", default=[], help="outputs .jsonl/.txt to check for near-duplicate texts")
+    ap.add_argument("--references", nargs="*", default=[], help="references .jsonl/.txt to check")
+    ap.add_argument("--min_sim", type=float, default=0.90, help="5-char shingle Jaccard threshold (m2_prepare)")
+    ap.add_argument("--num_perm", type=int, default=128)
+    ap.add_argument("--show", type=int, default=50, help="pairs to print per file")
+    args = ap.parse_args()
+
+    if not (args.outputs or args.references) or Path(args.manifest).exists():
+        check_ids(Path(args.manifest))
+    for f in [*args.outputs, *args.references]:
+        check_near_dups(Path(f), args.min_sim, args.num_perm, args.show)
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,34 @@
-import json
+import sys, argparse
 from pathlib import Path
 
-def check(path):
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+from text_index import TextIndex, add_text_index_args, load_hit
+
+def check(path, index, query=None):
     p = Path(path)
     if not p.exists():
         print(f"NOT FOUND: {path}")
         return
-    n=0
-    ids=[]
-    for ln in p.read_text(encoding='utf-8').splitlines():
-        if not ln.strip(): continue
-        j=json.loads(ln)
-        if j.get("error"):
-            n+=1
-            ids.append((j.get("id"), j.get("error")))
+    # 오류 레코드는 전문 색인의 error 필드에서 바로 꺼낸다 (새로 붙은 줄만 색인됨)
+    index.refresh([p])
+    if query:
+        hits = index.search(query, field="error", path=p, limit=None)
+        hits.sort(key=lambda h: h["off"])
+    else:
+        hits = index.docs(field="error", path=p)
+    n = len(hits)
     print(path, "errors:", n)
     if n:
-        for i,e in ids[:50]:
-            print(i, ":", e)
+        for h in hits[:50]:
+            print(h["id"], ":", load_hit(h).get("error"))
 
 if __name__ == '__main__':
-    check("results/raw/general.jsonl")
-    check("results/raw/instructed.jsonl")
\ No newline at end of file
+    ap = argparse.ArgumentParser()
+    ap.add_argument("paths", nargs="*", default=["results/raw/general.jsonl", "results/raw/instructed.jsonl"])
+    ap.add_argument("--query", default=None, help="only errors matching this full-text query, e.g. 'timeout*'")
+    add_text_index_args(ap)
+    args = ap.parse_args()
+    ti = TextIndex(args.text_index)
+    for path in args.paths:
+        check(path, ti, args.query)
+    ti.close()
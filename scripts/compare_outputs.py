@@ -1,9 +1,11 @@
-import json
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+from jsonl_reader import iter_jsonl
+
 def load(fn):
-    p=Path(fn)
-    return {j['id']: j.get('output','') for j in (json.loads(ln) for ln in p.read_text(encoding='utf-8').splitlines() if ln.strip())}
+    return {j['id']: j.get('output','') for j in iter_jsonl(fn, errors="raise")}
 
 g = load("results/raw/general.jsonl")
 i = load("results/raw/instructed.jsonl")
@@ -1,7 +1,11 @@
-import os, sys, glob, json
+import os, sys, glob
+from pathlib import Path
 import pandas as pd
 import numpy as np
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+from jsonl_reader import iter_jsonl
+
 ROOT = r"C:\Project\LLM"
 AGG = os.path.join(ROOT, "aggregated_metrics_fixed_with_chrf_rouge.csv")
 OUT = os.path.join(ROOT, "aggregated_metrics_fixed_with_chrf_rouge_with_text.csv")
@@ -69,13 +73,7 @@ def load_per_item_rows(files):
     for f in files:
         try:
             if f.lower().endswith('.jsonl'):
-                with open(f,'r',encoding='utf-8') as fh:
-                    for line in fh:
-                        try:
-                            obj = json.loads(line)
-                            rows.append((f,obj))
-                        except:
-                            continue
+                rows.extend((f, obj) for obj in iter_jsonl(f))
                 continue
             df = pd.read_csv(f, encoding='utf-8-sig')
         except Exception:
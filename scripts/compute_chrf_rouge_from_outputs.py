@@ -1,25 +1,31 @@
 import os, sys, json, glob
+from pathlib import Path
 import pandas as pd, numpy as np
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+import jsonl_reader
+
 ROOT = r"C:\Project\LLM"
 AGG_PATH = os.path.join(ROOT, "aggregated_metrics_fixed_with_chrf_rouge.csv")
 OUT_AGG = os.path.join(ROOT, "aggregated_metrics_fixed_with_chrf_rouge_with_text.csv")
 BACKUP = os.path.join(ROOT, "aggregated_metrics_fixed_with_chrf_rouge.csv.bak")
+# 항목별 chrF/ROUGE-L 은 metrics_dataset 파티션으로도 쓴다 (mode=base|instr)
+DATASET = os.path.join(ROOT, "metrics_ds")
+DATASET_RUN = "chrf_rouge_from_outputs"
 
-USE_EVAL = False; USE_ROUGESCORE = False
 try:
-    import evaluate
-    chrf_m = evaluate.load("chrf")
-    rouge_m = evaluate.load("rouge")
-    USE_EVAL = True
+    from score_engine import chrf_from_stats, chrf_stats, rouge_l_from_stats, rouge_l_stats
+    USE_ENGINE = True
 except Exception as e:
-    print("evaluate not available:", e)
-    try:
-        from rouge_score import rouge_scorer
-        scorer = rouge_scorer.RougeScorer(['rougeL'], use_stemmer=True)
-        USE_ROUGESCORE = True
-    except Exception as e2:
-        print("rouge_score not available:", e2)
+    print("score_engine not available:", e)
+    USE_ENGINE = False
+
+try:
+    from ref_store import RefStore
+    REF_STORE = RefStore()
+except Exception as e:
+    print("ref store not available:", e)
+    REF_STORE = None
 
 def load_references():
     cand = [
@@ -78,23 +84,12 @@ def load_outputs_map():
     return candidates, base_files, instr_files
 
 def read_jsonl_map(path, pred_keys=("prediction","pred","output","response","generated","text")):
-    m = {}
-    with open(path, "r", encoding="utf-8") as fh:
-        for line in fh:
-            line=line.strip()
-            if not line: continue
-            try:
-                obj=json.loads(line)
-            except Exception:
-                continue
-            idx = obj.get("id") or obj.get("example_id") or obj.get("item_id")
-            pred = None
-            for k in pred_keys:
-                if k in obj and obj[k] is not None:
-                    pred = obj[k]; break
-            if idx:
-                m[str(idx)] = "" if pred is None else str(pred)
-    return m
+    def pick(obj):
+        for k in pred_keys:
+            if obj.get(k) is not None:
+                return str(obj[k])
+        return ""
+    return jsonl_reader.read_jsonl_map(path, keys=("id", "example_id", "item_id"), fields=pred_keys, value=pick)
 
 def read_csv_map(path, id_col_candidates=('id','item_id','example_id'), pred_candidates=('prediction','pred','output','response','generated','hyp','system','base_output','instructed_output')):
     try:
@@ -129,49 +124,37 @@ def build_per_item(ref_map, base_map, instr_map):
         })
     return pd.DataFrame(rows)
 
+def _score_column(refs, preds, ids=None):
+    """chrF (sacrebleu CHRF) and ROUGE-L F (rouge_score, stemmed) x100 for one prediction column.
+
+    Pairs where both ref and pred are blank stay NaN, as before.
+    """
+    chrf = np.full(len(refs), np.nan); rouge = np.full(len(refs), np.nan)
+    idx = [i for i, (r, p) in enumerate(zip(refs, preds)) if r.strip() or p.strip()]
+    if not idx or not USE_ENGINE:
+        return chrf, rouge
+    R = [refs[i] for i in idx]; P = [preds[i] for i in idx]
+    I = [ids[i] for i in idx] if ids is not None else None
+    try:
+        chrf[idx] = chrf_from_stats(chrf_stats(P, R))
+        st = rouge_l_stats(P, R, tokenize="rouge", stem=True, ref_store=REF_STORE, ref_ids=I)
+        rouge[idx] = rouge_l_from_stats(st) * 100.0
+    except Exception as e:
+        print("Metric compute error:", e)
+    return chrf, rouge
+
 def compute_metrics_df(df_text):
-    res=[]
-    for _,r in df_text.iterrows():
-        ref = r['ref'] if pd.notna(r['ref']) else ""
-        base = r['base_pred'] if pd.notna(r['base_pred']) else ""
-        instr = r['instr_pred'] if pd.notna(r['instr_pred']) else ""
-        b_chrf = np.nan; i_chrf = np.nan; b_rouge = np.nan; i_rouge = np.nan
-        try:
-            if USE_EVAL:
-                if ref.strip() or base.strip():
-                    c = chrf_m.compute(predictions=[base], references=[[ref]])
-                    b_chrf = float(c['score'])
-                if ref.strip() or instr.strip():
-                    c = chrf_m.compute(predictions=[instr], references=[[ref]])
-                    i_chrf = float(c['score'])
-                if ref.strip() or base.strip():
-                    rres = rouge_m.compute(predictions=[base], references=[ref])
-                    b_rouge = float(rres.get('rougeL', np.nan))
-                if ref.strip() or instr.strip():
-                    rres = rouge_m.compute(predictions=[instr], references=[ref])
-                    i_rouge = float(rres.get('rougeL', np.nan))
-            elif USE_ROUGESCORE:
-                if ref.strip() or base.strip():
-                    try:
-                        pass
-                    except:
-                        pass
-                if ref.strip() or base.strip():
-                    sc = scorer.score(ref, base)
-                    b_rouge = float(sc['rougeL'].fmeasure * 100.0)
-                if ref.strip() or instr.strip():
-                    sc = scorer.score(ref, instr)
-                    i_rouge = float(sc['rougeL'].fmeasure * 100.0)
-        except Exception as e:
-            print("Metric compute error:", e)
-        res.append({
-            "id": r['id'],
-            "chrf_base": b_chrf,
-            "chrf_instr": i_chrf,
-            "rougeL_base": b_rouge,
-            "rougeL_instr": i_rouge
-        })
-    return pd.DataFrame(res)
+    col = lambda c: ["" if pd.isna(v) else str(v) for v in df_text[c]]
+    refs = col('ref'); ids = col('id')
+    b_chrf, b_rouge = _score_column(refs, col('base_pred'), ids)
+    i_chrf, i_rouge = _score_column(refs, col('instr_pred'), ids)
+    return pd.DataFrame({
+        "id": df_text['id'].values,
+        "chrf_base": b_chrf,
+        "chrf_instr": i_chrf,
+        "rougeL_base": b_rouge,
+        "rougeL_instr": i_rouge
+    })
 
 def merge_into_agg(agg_path, metrics_df):
     if not os.path.exists(agg_path):
@@ -185,6 +168,9 @@ def merge_into_agg(agg_path, metrics_df):
         long_rows.append({"id": r['id'], "mode": "base", "chrf": r['chrf_base'], "rouge_l": r['rougeL_base']})
         long_rows.append({"id": r['id'], "mode": "instr", "chrf": r['chrf_instr'], "rouge_l": r['rougeL_instr']})
     mdf = pd.DataFrame(long_rows)
+    from metrics_dataset import write_metrics
+    n = write_metrics(mdf, DATASET, run=DATASET_RUN)
+    print("Wrote item metrics to dataset", DATASET, "rows=", n, "run=", DATASET_RUN)
     merged = agg.merge(mdf, on=['id','mode'], how='left', suffixes=('','_new'))
     for col in ['chrf','rouge_l']:
         newc = col + '_new'
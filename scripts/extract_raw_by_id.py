@@ -1,4 +1,8 @@
 import sys, re, os
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+from jsonl_index import JsonlIndex
 
 def find_balanced_from(s, start_pos):
     depth = 0
@@ -26,7 +30,11 @@ def find_balanced_from(s, start_pos):
         i += 1
     return None, i
 
-def extract_objects_for_id(path, target_id):
+def extract_objects_for_id(path, target_id, index=None):
+    # 한 줄에 한 객체인 파일이면 사이드카 색인으로 바로 읽고,
+    # 여러 줄로 찍힌 / 이어 붙은 덤프가 섞여 있을 때만 전체를 훑는다
+    if index is not None and index.bad == 0:
+        return [b.decode('utf-8-sig').rstrip('\r\n') for b in index.raw(target_id)]
     results = []
     with open(path, 'r', encoding='utf-8', errors='ignore') as fh:
         data = fh.read()
@@ -46,8 +54,9 @@ def main():
         sys.exit(1)
     path = sys.argv[1]
     ids = sys.argv[2:]
+    index = JsonlIndex(path).refresh() if os.path.exists(path) else None
     for tid in ids:
-        objs = extract_objects_for_id(path, tid)
+        objs = extract_objects_for_id(path, tid, index)
         if not objs:
             print(f"{tid}: NOT FOUND in {path}")
             continue
@@ -1,4 +1,8 @@
-import os, json, csv, glob
+import os, sys, json, csv, glob, argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+from text_index import FIELDS, TextIndex, add_text_index_args, load_hit, record_fields, snippet
 
 ROOT = r"C:\Project\LLM"
 
@@ -63,16 +67,43 @@ def check_jsonl(path):
     except Exception as e:
         return {'path': path, 'error': str(e)}
 
+def find_mentions(files, args):
+    # 같은 파일 목록을 전문 색인에 올려 (바뀐 파일만 다시 색인) 질의한다
+    ti = TextIndex(args.text_index)
+    st = ti.refresh(files)
+    hits = ti.search(args.query, field=args.field, limit=args.limit)
+    ti.close()
+    print(f"Indexed {st['files']} files ({st['updated']} updated). {len(hits)} hit(s) for {args.query!r}")
+    by_path = {}
+    for h in hits:
+        by_path.setdefault(h['path'], []).append(h)
+    for path, hs in sorted(by_path.items(), key=lambda kv: -len(kv[1])):
+        print("----")
+        print("path:", path, " hits:", len(hs))
+        for h in hs[:5]:
+            text = record_fields(load_hit(h)).get(h['field'], '')
+            print(f"  offset {h['off']} id={h['id']} field={h['field']}: {snippet(text, args.query)[:200]}")
+
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", default=ROOT)
+    ap.add_argument("--query", default=None, help="list records whose text matches this (full-text index)")
+    ap.add_argument("--field", choices=sorted(FIELDS), default=None)
+    ap.add_argument("--limit", type=int, default=200)
+    add_text_index_args(ap)
+    args = ap.parse_args()
     out=[]
     patterns = [
-        os.path.join(ROOT, '**', '*.jsonl'),
-        os.path.join(ROOT, '**', '*.csv'),
+        os.path.join(args.root, '**', '*.jsonl'),
+        os.path.join(args.root, '**', '*.csv'),
     ]
     files=[]
     for pat in patterns:
         files.extend(glob.glob(pat, recursive=True))
     files = [f for f in files if 'site-packages' not in f.replace('\\','/') and 'venv' not in f.replace('\\','/') and '.venv' not in f.replace('\\','/')]
+    if args.query:
+        find_mentions(files, args)
+        return
     print(f"Scanning {len(files)} files...")
     for f in files:
         if f.lower().endswith('.csv'):
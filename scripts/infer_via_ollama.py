@@ -5,14 +5,31 @@ import json
 import subprocess
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
 try:
     import requests
 except Exception:
     requests = None
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+try:
+    from ollama_client import get_client, stream_generate
+except Exception:
+    get_client = None
+    stream_generate = None
+from gen_cache import add_cache_args, cache_from_args, cache_key
+from gen_budget import add_budget_args, budget_for, item_scenario
+from stream_verify import TokenSavings, scenario_check
+from model_residency import DEFAULT_KEEP_ALIVE, ResidencyTracker, load_ms, warm
+from ollama_pool import add_pool_args, pool_from_args
+from adaptive_limit import AIMDLimiter, add_aimd_args, aimd_from_args, overload_reason
+from batch_schedule import add_schedule_args, item_features, plan_from_args, write_schedule_report
+from run_journal import open_for_run
+from results_store import add_store_args, record_run
+
 DEFAULT_HOST = "http://localhost:11434"
 
 
@@ -41,7 +58,11 @@ def read_manifest_as_rows(manifest_path: Path) -> List[Dict[str, str]]:
             "system_instructed": it.get("system_instructed") or "",
             "lang": it.get("lang") or "",
             "len_bin": it.get("len_bin") or "",
-            "diff_bin": it.get("diff_bin") or ""
+            "diff_bin": it.get("diff_bin") or "",
+            "n_chars": it.get("n_chars") or "",
+            "scenario": it.get("scenario") or "",
+            "param": it.get("param") or "",
+            "params": it.get("params") or ""
         })
     return rows
 
@@ -72,18 +93,37 @@ def build_prompt_text(row: Dict[str, Any], mode: str) -> str:
     return strong + body
 
 
-def call_ollama_http(prompt_text: str, model: str, host: str, timeout: int):
-    if requests is None:
+def call_ollama_http(prompt_text: str, model: str, host: str, timeout: int, pool_size: int = 4,
+                     options: Optional[Dict[str, Any]] = None, keep_alive: Optional[str] = None, pool=None):
+    """pool (ollama_pool.HostPool): route over several hosts; the response then carries "host"."""
+    if get_client is None:
         raise SystemExit("[ERR] requests not installed. Install with: pip install requests or use --use-cli")
-    url = f"{host.rstrip('/')}/api/generate?model={model}"
-    headers = {"Content-Type": "application/json"}
-    payload = {"prompt": prompt_text}
-    resp = requests.post(url, headers=headers, json=payload, timeout=timeout)
-    resp.raise_for_status()
-    try:
-        return resp.json()
-    except Exception:
-        return {"text": resp.text}
+    if pool is not None:
+        return pool.call(lambda c: dict(c.generate(model, prompt_text, options=options, timeout=timeout,
+                                                   keep_alive=keep_alive), host=c.host),
+                         tokens=lambda r: r.get("eval_count"))
+    client = get_client(host, pool_maxsize=max(1, pool_size))
+    return client.generate(model, prompt_text, options=options, timeout=timeout, keep_alive=keep_alive)
+
+
+def call_ollama_stream(prompt_text: str, model: str, host: str, timeout: int, pool_size: int = 4, check=None,
+                       options: Optional[Dict[str, Any]] = None, keep_alive: Optional[str] = None, pool=None):
+    """Streaming variant: returns (text, {ttft_ms, itl_ms, tokens, eval_tps}).
+
+    With check (stream_verify) the request is cancelled once the output is certain
+    to fail its scenario; the fields then carry "aborted".
+    """
+    if get_client is None:
+        raise SystemExit("[ERR] requests not installed. Install with: pip install requests or use --use-cli")
+    if pool is not None:
+        def go(c):
+            text, fields = stream_generate(c, model, prompt_text, check=check, options=options, timeout=timeout,
+                                           keep_alive=keep_alive)
+            return text, dict(fields, host=c.host)
+        return pool.call(go, tokens=lambda r: r[1].get("tokens"))
+    client = get_client(host, pool_maxsize=max(1, pool_size))
+    return stream_generate(client, model, prompt_text, check=check, options=options, timeout=timeout,
+                           keep_alive=keep_alive)
 
 
 def call_ollama_cli(prompt_text: str, model: str, timeout: int):
@@ -138,8 +178,223 @@ def call_ollama_cli(prompt_text: str, model: str, timeout: int):
     raise RuntimeError("ollama CLI: no supported subcommand succeeded. Last output: " + (last_out or "<no output>"))
 
 
-def write_jsonl_line(outfh, obj):
-    outfh.write(json.dumps(obj, ensure_ascii=False) + "\n")
+def extract_text(result: Any) -> str:
+    if isinstance(result, dict):
+        if "response" in result and isinstance(result["response"], str):
+            return result["response"]
+        if "text" in result and isinstance(result["text"], str):
+            return result["text"]
+        if "choices" in result and isinstance(result["choices"], list) and result["choices"]:
+            first = result["choices"][0]
+            if isinstance(first, dict):
+                return first.get("message", first.get("text", "")) or ""
+            return str(first)
+        return json.dumps(result, ensure_ascii=False)
+    return str(result)
+
+
+def infer_one(i: int, row: Dict[str, Any], args: argparse.Namespace, cache=None,
+              savings: Optional[TokenSavings] = None, pool=None,
+              limiter: Optional[AIMDLimiter] = None) -> Dict[str, Any]:
+    """Run one prompt with retries and return its JSONL record.
+
+    With --early-abort an attempt whose stream already violates the row's
+    scenario (compliance_rules) is cancelled and counts as a retry; the last
+    attempt always runs to the end, so `output` is never a cut-off partial. With
+    --budget the row's scenario also sets num_predict/stop for the request.
+    With --adaptive every attempt's latency, generated tokens and overload error
+    are fed to limiter.
+    """
+    id_ = row.get("id") or f"row_{i+1}"
+    prompt_text = build_prompt_text(row, args.mode)
+    scenario, params = item_scenario(row)
+    budget = budget_for(args, (scenario, params))
+    options = budget.options() or None
+
+    t_lookup = time.time()
+    key = cache_key(args.model, prompt_text, options, mode=args.mode) if cache is not None else None
+    hit = cache.get(key) if cache is not None else None
+    if hit is not None:
+        # latency_ms 는 이번 실행에서 걸린 시간(조회 시간), 원래 생성 시간은 cached_latency_ms 로 따로 둔다
+        return {
+            "id": id_,
+            "mode": args.mode,
+            "model": args.model,
+            "prompt": prompt_text,
+            "output": hit["output"],
+            "latency_ms": int((time.time() - t_lookup) * 1000),
+            "cached_latency_ms": hit.get("latency_ms"),
+            "lang": row.get("lang"),
+            "len_bin": row.get("len_bin"),
+            "diff_bin": row.get("diff_bin"),
+            "cached": True,
+        }
+
+    out_text = ""
+    error_msg = ""
+    latency_ms = 0
+    stream_fields: Dict[str, Any] = {}
+    aborts: List[Dict[str, Any]] = []
+    for attempt in range(1, max(1, args.retries) + 1):
+        start = time.time()
+        t_dispatch = time.monotonic()
+        gen_tokens = None
+        try:
+            if args.use_cli:
+                out_text = extract_text(call_ollama_cli(prompt_text, args.model, args.timeout))
+            elif args.stream:
+                # 마지막 시도는 끊지 않는다: 잘린 부분 출력이 output 으로 평가에 들어가면 안 된다
+                last = attempt >= args.retries
+                check = scenario_check(scenario, params) if args.early_abort and not last else None
+                out_text, stream_fields = call_ollama_stream(prompt_text, args.model, args.host, args.timeout,
+                                                             pool_size=args.concurrency, check=check,
+                                                             options=options, keep_alive=args.keep_alive,
+                                                             pool=pool)
+                gen_tokens = stream_fields.get("tokens")
+            else:
+                result = call_ollama_http(prompt_text, args.model, args.host, args.timeout,
+                                          pool_size=args.concurrency, options=options, keep_alive=args.keep_alive,
+                                          pool=pool)
+                out_text = extract_text(result)
+                if isinstance(result, dict):
+                    gen_tokens = result.get("eval_count")
+                    stream_fields = {k: v for k, v in (("load_ms", load_ms(result)), ("host", result.get("host")))
+                                     if v is not None}
+                    if args.budget:
+                        stream_fields.update({k: v for k, v in (("tokens", result.get("eval_count")),
+                                                                ("done_reason", result.get("done_reason"))) if v})
+            out_text = budget.finish(out_text)
+            latency_ms = int((time.time() - start) * 1000)
+            error_msg = ""
+            reason = stream_fields.pop("aborted", None)
+            if reason:
+                tokens = stream_fields.get("tokens")
+                saved = savings.abort(tokens) if savings is not None else None
+                aborts.append({"attempt": attempt, "reason": reason, "tokens": tokens, "tokens_saved_est": saved})
+                print(f"[EARLY-ABORT] id={id_} attempt={attempt} reason={reason} tokens={tokens}", file=sys.stderr)
+                continue
+            elif savings is not None and args.early_abort:
+                savings.observe(stream_fields.get("tokens"))
+            if limiter is not None:
+                limiter.on_success(latency_ms, t_dispatch, tokens=gen_tokens)
+            break
+
+        except subprocess.TimeoutExpired as te:
+            latency_ms = int((time.time() - start) * 1000)
+            error_msg = f"TimeoutExpired: {str(te)}"
+            out_text = ""
+            print(f"[WARN] id={id_} attempt={attempt} error: {error_msg}", file=sys.stderr)
+            if limiter is not None:
+                limiter.on_overload("timeout", t_dispatch)
+            if attempt < args.retries:
+                time.sleep(1.0 * attempt)
+            continue
+
+        except FileNotFoundError as fnf:
+            latency_ms = int((time.time() - start) * 1000)
+            error_msg = f"FileNotFoundError: {str(fnf)}"
+            out_text = ""
+            print(f"[ERR] id={id_} error: {error_msg}", file=sys.stderr)
+            break
+
+        except Exception as e:
+            latency_ms = int((time.time() - start) * 1000)
+            if requests is not None and isinstance(e, requests.exceptions.Timeout):
+                error_msg = f"RequestsTimeout: {str(e)}"
+            else:
+                error_msg = f"{type(e).__name__}: {str(e)}"
+            out_text = ""
+            print(f"[WARN] id={id_} attempt={attempt} error: {error_msg}", file=sys.stderr)
+            overload = overload_reason(e)
+            if limiter is not None and overload:
+                limiter.on_overload(overload, t_dispatch)
+            if attempt < args.retries:
+                time.sleep(1.0 * attempt)
+            continue
+
+    rec: Dict[str, Any] = {
+        "id": id_,
+        "mode": args.mode,
+        "model": args.model,
+        "prompt": prompt_text,
+        "output": out_text,
+        "latency_ms": latency_ms,
+        "lang": row.get("lang"),
+        "len_bin": row.get("len_bin"),
+        "diff_bin": row.get("diff_bin")
+    }
+    if stream_fields:
+        rec.update(stream_fields)
+    if args.budget:
+        rec["scenario"] = scenario
+        rec["budget"] = budget.to_dict()
+    if aborts:
+        # 끊긴 앞선 시도들; output 은 항상 끝까지 생성된 마지막 시도의 것이다
+        rec["early_aborts"] = aborts
+        known = [a["tokens_saved_est"] for a in aborts if a["tokens_saved_est"] is not None]
+        rec["tokens_saved_est"] = sum(known) if known else None
+    if error_msg:
+        rec["error"] = error_msg
+    elif cache is not None:
+        cache.put(key, out_text, model=args.model, mode=args.mode, latency_ms=latency_ms)
+    return rec
+
+
+class RecordWriter:
+    """Append each result to the journal as soon as it finishes (completion order).
+
+    Nothing is held in memory, so a crash loses at most the requests in flight;
+    journal.finalize(out, order=...) restores manifest order at the end.
+    """
+
+    def __init__(self, journal, total: int, residency: Optional[ResidencyTracker] = None):
+        self.journal = journal
+        self.total = total
+        self.residency = residency
+        self.n_done = 0
+        self.latency_ms: Dict[str, float] = {}
+
+    def put(self, idx: int, rec: Dict[str, Any]) -> None:
+        self.n_done += 1
+        self.latency_ms[str(rec["id"])] = rec["latency_ms"]
+        if self.residency is not None:
+            self.residency.record(rec["model"], rec.get("load_ms"))
+        print(f"[{self.n_done}/{self.total}] id={rec['id']} latency={rec['latency_ms']}ms")
+        self.journal.append(rec["id"], json.dumps(rec, ensure_ascii=False))
+
+
+def run_concurrent(todo: List[Tuple[int, Dict[str, Any]]], args: argparse.Namespace, writer: RecordWriter,
+                   cache=None, savings: Optional[TokenSavings] = None, order: Optional[List[int]] = None,
+                   pool=None, limiter: Optional[AIMDLimiter] = None) -> None:
+    """Keep at most args.concurrency requests in flight; results are handed to writer as they finish.
+
+    order: dispatch order as positions in todo (batch_schedule); records are journaled
+    as they complete and put back in manifest order by journal.finalize. limiter (--adaptive) sets the in-flight cap
+    instead, up to args.concurrency; after a decrease the excess just drains.
+    """
+    it = ((pos, todo[pos]) for pos in (order if order is not None else range(len(todo))))
+    with ThreadPoolExecutor(max_workers=args.concurrency) as ex:
+        in_flight: Dict[Any, int] = {}
+
+        def submit_next() -> bool:
+            nxt = next(it, None)
+            if nxt is None:
+                return False
+            pos, (i, row) = nxt
+            in_flight[ex.submit(infer_one, i, row, args, cache, savings, pool, limiter)] = pos
+            return True
+
+        def fill() -> None:
+            cap = limiter.current() if limiter is not None else args.concurrency
+            while len(in_flight) < cap and submit_next():
+                pass
+
+        fill()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                writer.put(in_flight.pop(fut), fut.result())
+            fill()
 
 
 def main():
@@ -153,7 +408,41 @@ def main():
     ap.add_argument("--use-cli", action="store_true", help="Use ollama CLI instead of HTTP API")
     ap.add_argument("--timeout", type=int, default=120, help="Per-request timeout (seconds)")
     ap.add_argument("--retries", type=int, default=1, help="Number of attempts per prompt (1 = no retry)")
+    ap.add_argument("--concurrency", type=int, default=1,
+                    help="Max requests in flight (1 = sequential). Output stays in input order.")
+    ap.add_argument("--stream", action="store_true",
+                    help="Use streaming /api/generate and record ttft_ms, itl_ms, tokens, eval_tps (HTTP only)")
+    ap.add_argument("--early-abort", action="store_true",
+                    help="With --stream: cancel a generation once it already violates the row's scenario/params "
+                         "(limit-chars, limit-words, bullets, forbid digits, JSON start) and retry per --retries; "
+                         "the last attempt is never cut off, so it needs --retries >= 2 to take effect")
+    ap.add_argument("--keep-alive", default=None, dest="keep_alive",
+                    help="Ollama keep_alive for every request (e.g. 30m, -1) so the model stays loaded for the run")
+    ap.add_argument("--warmup", action="store_true",
+                    help="Load the model with an empty request (keep_alive) before the first prompt (HTTP only)")
+    ap.add_argument("--resume", action="store_true",
+                    help="Continue from <out>.partial (or a finished <out>), skipping ids already journaled")
+    ap.add_argument("--no-fsync", dest="fsync", action="store_false",
+                    help="Skip fsync after each record (faster, not crash-safe)")
+    add_pool_args(ap)
+    add_aimd_args(ap)
+    add_budget_args(ap)
+    add_schedule_args(ap)
+    add_cache_args(ap)
+    add_store_args(ap)
     args = ap.parse_args()
+    if args.concurrency < 1:
+        raise SystemExit("[ERR] --concurrency must be >= 1")
+    if args.early_abort and (args.use_cli or not args.stream):
+        raise SystemExit("[ERR] --early-abort needs --stream (HTTP)")
+    if args.adaptive and args.concurrency < 2:
+        raise SystemExit("[ERR] --adaptive needs --concurrency > 1 (the upper bound for the in-flight limit)")
+    if args.hosts and args.use_cli:
+        raise SystemExit("[ERR] --hosts needs the HTTP API")
+    if args.warmup and args.use_cli:
+        raise SystemExit("[ERR] --warmup needs the HTTP API")
+    if args.budget and args.use_cli:
+        raise SystemExit("[ERR] --budget needs the HTTP API (ollama CLI has no num_predict/stop)")
 
     rows: List[Dict[str, str]] = []
     if args.manifest:
@@ -169,98 +458,72 @@ def main():
     outp = Path(args.out)
     outp.parent.mkdir(parents=True, exist_ok=True)
 
-    if not args.use_cli and requests is None:
+    if not args.use_cli and get_client is None:
         raise SystemExit("[ERR] requests not installed. Run: pip install requests or use --use-cli")
 
-    with outp.open("w", encoding="utf-8", newline="") as fout:
-        for i, row in enumerate(rows):
-            id_ = row.get("id") or f"row_{i+1}"
-            prompt_text = build_prompt_text(row, args.mode)
-
-            out_text = ""
-            error_msg = ""
-            latency_ms = 0
-            success = False
-            for attempt in range(1, max(1, args.retries) + 1):
-                start = time.time()
-                try:
-                    if args.use_cli:
-                        result = call_ollama_cli(prompt_text, args.model, args.timeout)
-                    else:
-                        result = call_ollama_http(prompt_text, args.model, args.host, args.timeout)
-
-                    if isinstance(result, dict):
-                        if "text" in result and isinstance(result["text"], str):
-                            out_text = result["text"]
-                        elif "choices" in result and isinstance(result["choices"], list) and result["choices"]:
-                            first = result["choices"][0]
-                            if isinstance(first, dict):
-                                out_text = first.get("message", first.get("text", "")) or ""
-                            else:
-                                out_text = str(first)
-                        else:
-                            out_text = json.dumps(result, ensure_ascii=False)
-                    else:
-                        out_text = str(result)
-
-                    latency_ms = int((time.time() - start) * 1000)
-                    success = True
-                    error_msg = ""
-                    break
-
-                except subprocess.TimeoutExpired as te:
-                    latency_ms = int((time.time() - start) * 1000)
-                    error_msg = f"TimeoutExpired: {str(te)}"
-                    out_text = ""
-                    print(f"[WARN] id={id_} attempt={attempt} error: {error_msg}", file=sys.stderr)
-                    if attempt < args.retries:
-                        time.sleep(1.0 * attempt)
-                    continue
-
-                except requests.exceptions.Timeout as rte:
-                    latency_ms = int((time.time() - start) * 1000)
-                    error_msg = f"RequestsTimeout: {str(rte)}"
-                    out_text = ""
-                    print(f"[WARN] id={id_} attempt={attempt} error: {error_msg}", file=sys.stderr)
-                    if attempt < args.retries:
-                        time.sleep(1.0 * attempt)
-                    continue
-
-                except FileNotFoundError as fnf:
-                    latency_ms = int((time.time() - start) * 1000)
-                    error_msg = f"FileNotFoundError: {str(fnf)}"
-                    out_text = ""
-                    print(f"[ERR] id={id_} error: {error_msg}", file=sys.stderr)
-                    break
-
-                except Exception as e:
-                    latency_ms = int((time.time() - start) * 1000)
-                    error_msg = f"{type(e).__name__}: {str(e)}"
-                    out_text = ""
-                    print(f"[WARN] id={id_} attempt={attempt} error: {error_msg}", file=sys.stderr)
-                    if attempt < args.retries:
-                        time.sleep(1.0 * attempt)
-                    continue
-
-            rec: Dict[str, Any] = {
-                "id": id_,
-                "mode": args.mode,
-                "model": args.model,
-                "prompt": prompt_text,
-                "output": out_text,
-                "latency_ms": latency_ms,
-                "lang": row.get("lang"),
-                "len_bin": row.get("len_bin"),
-                "diff_bin": row.get("diff_bin")
-            }
-            if error_msg:
-                rec["error"] = error_msg
-
-            write_jsonl_line(fout, rec)
-            print(f"[{i+1}/{len(rows)}] id={id_} latency={latency_ms}ms")
-
-    print(f"[OK] wrote {outp} (n={len(rows)})")
+    cache = cache_from_args(args)
+
+    journal = open_for_run(outp, resume=args.resume, fsync=args.fsync)
+    done = journal.open()
+    if journal.torn_bytes or journal.recovered:
+        print(f"[RESUME] recovered={journal.recovered} torn_bytes_truncated={journal.torn_bytes}")
+    todo = [(i, row) for i, row in enumerate(rows) if (row.get("id") or f"row_{i+1}") not in done]
+    if done:
+        print(f"[RESUME] {len(done)} done in {journal.data_path.name}, {len(todo)} remaining")
+
+    plan = plan_from_args(args, [r.get("id") or f"row_{i+1}" for i, r in todo],
+                          [item_features(r) for _, r in todo], args.concurrency, mode=args.mode)
+    pool = pool_from_args(args, pool_maxsize=max(1, args.concurrency)) if not args.use_cli else None
+    residency = ResidencyTracker()
+    if args.warmup and todo:
+        for h in (pool.hosts if pool is not None else [args.host]):
+            try:
+                ms = warm(get_client(h), args.model, args.keep_alive or DEFAULT_KEEP_ALIVE, tracker=residency)
+                print(f"[WARMUP] {args.model}@{h} load_ms={ms}")
+            except Exception as e:
+                print(f"[WARN] warm-up failed on {h}: {e}", file=sys.stderr)
+    t_start = time.time()
+    writer = RecordWriter(journal, len(todo), residency=residency)
+    savings = TokenSavings() if args.early_abort else None
+    limiter = aimd_from_args(args)
+    try:
+        if args.concurrency == 1:
+            for pos, (i, row) in enumerate(todo):
+                writer.put(pos, infer_one(i, row, args, cache, savings, pool))
+        else:
+            run_concurrent(todo, args, writer, cache, savings, order=plan.order if plan else None, pool=pool,
+                           limiter=limiter)
+    except BaseException:
+        journal.close()
+        print(f"[ABORT] progress kept in {journal.data_path} (rerun with --resume)", file=sys.stderr)
+        raise
+    journal.finalize(outp, order=[row.get("id") or f"row_{i+1}" for i, row in enumerate(rows)])
+    wall_s = time.time() - t_start
+
+    if plan is not None and args.schedule_report:
+        write_schedule_report(args.schedule_report, plan, writer.latency_ms, wall_s * 1000)
+    throughput = (len(todo) / wall_s) if wall_s > 0 else 0.0
+    print(f"[OK] wrote {outp} (n={len(journal.entries)}, new={len(todo)})")
+    n_store = record_run(args, outp, rows, mode=args.mode, model=args.model)
+    if n_store is not None:
+        print(f"[STORE] {args.results_db} run={args.run or outp.stem} generations={n_store}")
+    print(f"[STATS] wall={wall_s:.2f}s throughput={throughput:.2f} items/s concurrency={args.concurrency}")
+    if pool is not None:
+        pool.print_stats()
+    if limiter is not None:
+        aimd = limiter.summary()
+        print(f"[AIMD] final_limit={aimd['limit']} saturation={aimd['saturation_limit']} "
+              f"max={aimd['max_limit_reached']} increases={aimd['increases']} decreases={aimd['decreases']} "
+              f"latency_target_ms={aimd['latency_target_ms']}")
+    res = residency.summary()
+    if res["models"]:
+        print(f"[RESIDENCY] total_load_ms={res['total_load_ms']} load_events={res['load_events']}")
+    if savings is not None:
+        print(f"[EARLY-ABORT] {json.dumps(savings.summary(), ensure_ascii=False)}")
+    if cache is not None:
+        print(f"[CACHE] {json.dumps(cache.stats(), ensure_ascii=False)}")
+        cache.close()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
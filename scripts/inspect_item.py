@@ -1,22 +1,10 @@
 from __future__ import annotations
 import sys, json, csv, argparse, re
 from pathlib import Path
-from typing import List, Dict, Any
-
-def load_jsonl(path: Path) -> List[Dict[str,Any]]:
-    if not path.exists():
-        return []
-    out = []
-    with path.open("r", encoding="utf-8") as f:
-        for ln in f:
-            ln = ln.strip()
-            if not ln:
-                continue
-            try:
-                out.append(json.loads(ln))
-            except Exception as e:
-                print(f"[WARN] skip malformed line in {path}: {e}")
-    return out
+from typing import List, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+from jsonl_index import JsonlIndex
 
 def load_manifest(man_path: Path) -> Dict[str,str]:
     if not man_path.exists():
@@ -68,8 +56,13 @@ def lcs_len(a: str, b: str) -> int:
             prev = tmp
     return dp[lb]
 
-def find_by_id(arr, idkey):
-    return [o for o in arr if str(o.get("id") or o.get("prompt_id") or "") == idkey]
+def find_by_id(idx: JsonlIndex, idkey):
+    # 사이드카 색인으로 해당 레코드만 읽는다 (파일 전체를 올리지 않음)
+    return idx.get(idkey)
+
+def open_index(path: Path) -> JsonlIndex:
+    idx = JsonlIndex(path)
+    return idx.refresh() if path.exists() else idx
 
 def summarize_entry(obj):
     out_text = obj.get("output") or obj.get("text") or obj.get("response") or obj.get("result") or obj.get("out") or ""
@@ -88,19 +81,13 @@ def main():
     manifest_path = repo / "split_manifest.json"
     prompts_csv = repo / "prompts" / "main.csv"
 
-    gen = load_jsonl(gen_path)
-    ins = load_jsonl(ins_path)
+    gen = open_index(gen_path)
+    ins = open_index(ins_path)
     refs = load_manifest(manifest_path)
     csv_refs = load_prompts_csv(prompts_csv)
 
     if args.list:
-        ids_found = []
-        for o in gen:
-            pid = str(o.get("id") or o.get("prompt_id") or "")
-            if pid and pid not in ids_found:
-                ids_found.append(pid)
-            if len(ids_found) >= args.list:
-                break
+        ids_found = gen.ids()[:args.list]
         print("IDs (first {}): {}".format(args.list, ", ".join(ids_found)))
         return
 
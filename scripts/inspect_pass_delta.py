@@ -1,21 +1,19 @@
-import argparse, json, csv, os
+import argparse, csv, os, sys
+from pathlib import Path
 from typing import Dict, Any
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+from jsonl_reader import JsonlReader
+
 def load_jsonl(path: str) -> Dict[str, Dict[str, Any]]:
     data = {}
-    with open(path, "r", encoding="utf-8") as f:
-        for i, line in enumerate(f, 1):
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                obj = json.loads(line)
-            except Exception as e:
-                raise RuntimeError(f"JSON decode error at {path}:{i}: {e}")
-            ex_id = obj.get("id") or obj.get("example_id") or obj.get("meta", {}).get("id")
-            if not ex_id:
-                ex_id = f"ROW_{i}"
-            data[str(ex_id)] = obj
+    def fail(i, _line, e):
+        raise RuntimeError(f"JSON decode error at {path}:{i}: {e}")
+    for i, obj in JsonlReader(path, errors=fail).numbered():
+        ex_id = obj.get("id") or obj.get("example_id") or obj.get("meta", {}).get("id")
+        if not ex_id:
+            ex_id = f"ROW_{i}"
+        data[str(ex_id)] = obj
     return data
 
 def coerce_bool(x):
@@ -1,15 +1,12 @@
 from __future__ import annotations
 from pathlib import Path
-import json, argparse
+import json, argparse, sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+from jsonl_reader import read_jsonl
 
 def load_jsonl(path: Path):
-    rows=[]
-    with path.open(encoding="utf-8") as f:
-        for line in f:
-            line=line.strip()
-            if line:
-                rows.append(json.loads(line))
-    return rows
+    return read_jsonl(path, errors="raise")
 
 def length_bin_from_text(text: str):
     n = len((text or "").split())
@@ -4,6 +4,12 @@ from pathlib import Path
 from collections import defaultdict, Counter
 from typing import Dict, List, Any, Tuple, Optional, Set
 
+from near_dup import dedup_greedy
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+from term_matcher import TermMatcher, matcher_for_terms
+import jsonl_reader
+
 LEN_SHORT_MAX = 120
 LEN_MED_MAX   = 360
 MIN_BIN_SHARE = 0.15
@@ -35,11 +41,7 @@ def read_txt_folder(folder: Path) -> Dict[str,str]:
     return out
 
 def read_jsonl(path: Path) -> List[Dict[str,Any]]:
-    data=[]
-    for line in path.read_text(encoding="utf-8").splitlines():
-        if not line.strip(): continue
-        data.append(json.loads(line))
-    return data
+    return jsonl_reader.read_jsonl(path, errors="raise")
 
 def read_metadata(folder: Path) -> Dict[str,Dict[str,Any]]:
     meta={}
@@ -67,23 +69,13 @@ def infer_lang(text: str, fallback="ko")->str:
     if re.search(r"[가-힣]", text): return "ko"
     return fallback
 
-def jaccard_shingles(a: str, b: str, k: int = 5) -> float:
-    def shingles(s):
-        s=re.sub(r"\s+"," ", s.strip())
-        return {s[i:i+k] for i in range(max(len(s)-k+1,1))}
-    A,B=shingles(a), shingles(b)
-    inter=len(A & B); union=len(A | B)
-    return inter/union if union else 0.0
-
-def detect_pii_or_forbidden(text: str, forbid: Set[str])->List[str]:
+def detect_pii_or_forbidden(text: str, forbid: TermMatcher)->List[str]:
     issues=[]
     if EMAIL_RE.search(text): issues.append("email")
     if PHONE_RE.search(text): issues.append("phone")
     if RRN_RE.search(text):   issues.append("rrn")
-    low=text.lower()
-    for t in forbid:
-        if t and t in low:
-            issues.append(f"forbidden:{t}")
+    for t in forbid.found_terms(text):
+        issues.append(f"forbidden:{t}")
     return issues
 
 def load_sources():
@@ -103,7 +95,7 @@ def load_sources():
     meta=read_metadata(raw/"metadata")
     return prompts, refs, meta
 
-def build_manifest(target_n:int, min_sim:float, forbid:Set[str]):
+def build_manifest(target_n:int, min_sim:float, forbid:Set[str], dedup:str="lsh", num_perm:int=128):
     prompts, refs, meta=load_sources()
     ids=sorted(set(prompts)|set(refs)|set(meta))
     if not ids: return [], {"note":"no_raw_data","counts":{}}
@@ -120,23 +112,21 @@ def build_manifest(target_n:int, min_sim:float, forbid:Set[str]):
                      "has_prompt":bool(inp),"has_reference":bool(ref),
                      "input":inp,"reference":ref})
     flagged=[]
+    forbid_matcher=matcher_for_terms(sorted(forbid))
     for r in rows:
         issues=[]
-        issues+=detect_pii_or_forbidden(r["input"] or "", forbid)
-        issues+=detect_pii_or_forbidden(r["reference"] or "", forbid)
+        issues+=detect_pii_or_forbidden(r["input"] or "", forbid_matcher)
+        issues+=detect_pii_or_forbidden(r["reference"] or "", forbid_matcher)
         r["issues"]=issues
         if issues: flagged.append(r["id"])
     rows=[r for r in rows if not r["issues"]]
-    kept, removed, seen=[],[],[]
-    for r in rows:
-        txt=(r["input"] or "").strip()
-        if not txt: kept.append(r); continue
-        is_dup=False
-        for s in seen:
-            if jaccard_shingles(txt,s)>=min_sim:
-                removed.append(r["id"]); is_dup=True; break
-        if not is_dup:
-            seen.append(txt); kept.append(r)
+    # 빈 입력은 중복 검사 없이 유지, 나머지는 앞에서 유지된 입력과 shingle Jaccard >= min_sim 이면 제거
+    texted=[r for r in rows if (r["input"] or "").strip()]
+    keep_flags, dedup_info=dedup_greedy([r["input"].strip() for r in texted], min_sim,
+                                        num_perm=num_perm, method=dedup)
+    dropped={id(r) for r,k in zip(texted,keep_flags) if not k}
+    kept=[r for r in rows if id(r) not in dropped]
+    removed=[r["id"] for r in texted if id(r) in dropped]
     final=kept
     if target_n>0 and len(kept)>target_n:
         buckets=defaultdict(list)
@@ -152,6 +142,8 @@ def build_manifest(target_n:int, min_sim:float, forbid:Set[str]):
         "raw_total": len(ids),
         "flagged_pii_or_forbid": len(set(flagged)),
         "removed_near_duplicates": len(set(removed)),
+        "dedup_method": dedup,
+        "dedup_pairs_checked": dedup_info["pairs_checked"],
         "kept_after_filters": len(kept),
         "selected_for_manifest": len(final),
         "by_len_bin": Counter([r["len_bin"] for r in final]),
@@ -182,7 +174,8 @@ def write_report(counts, out_md:Path, target_n:int):
         lines+=[
           f"- Raw total ids: **{counts['raw_total']}**",
           f"- Flagged (PII/forbidden): **{counts['flagged_pii_or_forbid']}**",
-          f"- Removed near-duplicates: **{counts['removed_near_duplicates']}**",
+          f"- Removed near-duplicates: **{counts['removed_near_duplicates']}**"
+          f" ({counts.get('dedup_method','exact')}, exact Jaccard checks: {counts.get('dedup_pairs_checked','-')})",
           f"- Kept after filters: **{counts['kept_after_filters']}**",
           f"- Selected for manifest (target={target_n}): **{counts['selected_for_manifest']}**",
           "", "## Length bins", fmt_counter(counts["by_len_bin"]), "",
@@ -209,13 +202,16 @@ def main():
     ap=argparse.ArgumentParser()
     ap.add_argument("--target_n", type=int, default=50)
     ap.add_argument("--min_similarity", type=float, default=0.90)
+    ap.add_argument("--dedup", choices=["lsh","exact"], default="lsh",
+                    help="lsh: MinHash/LSH candidates + exact Jaccard check, exact: all kept pairs")
+    ap.add_argument("--num_perm", type=int, default=128, help="MinHash permutations (lsh)")
     ap.add_argument("--manifest_out", default="data/manifest/split_manifest.json")
     ap.add_argument("--report_out", default="docs/data_report.md")
     ap.add_argument("--forbidden_terms", default="rules/forbidden_terms.txt")
     args=ap.parse_args()
     ensure_dirs()
     forbid=load_forbidden_terms(Path(args.forbidden_terms))
-    manifest, counts=build_manifest(args.target_n, args.min_similarity, forbid)
+    manifest, counts=build_manifest(args.target_n, args.min_similarity, forbid, args.dedup, args.num_perm)
     write_manifest(manifest, Path(args.manifest_out))
     write_report(counts, Path(args.report_out), args.target_n)
     if not manifest:
@@ -1,22 +1,20 @@
 from __future__ import annotations
 from pathlib import Path
 from typing import Dict, Any, List
-import json, argparse, csv
+import json, argparse, csv, sys
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
 from metrics_lib import (
     normalize_text, compute_rouge,
     compute_bertscore_grouped,
     try_extract_json, validate_json_against_schema,
     scan_forbidden, p50_p95
 )
+from jsonl_reader import read_jsonl
+from term_matcher import matcher_for_terms
 
 def load_jsonl(path: Path) -> List[dict]:
-    items=[]
-    with path.open(encoding="utf-8") as f:
-        for line in f:
-            if line.strip():
-                items.append(json.loads(line))
-    return items
+    return read_jsonl(path, errors="raise")
 
 def save_jsonl(path: Path, rows: List[dict]):
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -44,6 +42,9 @@ def main():
     ap.add_argument("--no-bertscore", dest="no_bertscore", action="store_true")
     ap.add_argument("--prompt_cost_per_1k", type=float, default=0.0)
     ap.add_argument("--completion_cost_per_1k", type=float, default=0.0)
+    ap.add_argument("--dataset", default=None,
+                    help="Also write item metrics to this Parquet dataset (model=/mode=/run= partitions), "
+                         "e.g. results/metrics_ds")
     args = ap.parse_args()
 
     manifest_content = json.loads(Path(args.manifest).read_text(encoding="utf-8"))
@@ -72,8 +73,10 @@ def main():
         for line in fp_forbid.read_text(encoding="utf-8").splitlines():
             s=line.strip()
             if s and not s.startswith("#"): terms.append(s)
+    forbid_matcher = matcher_for_terms(terms) if terms else None
 
     item_rows=[]
+    item_keys=[]
     lat_list=[]; cost_list=[]
     preds_for_bs=[]; refs_for_bs=[]; langs_for_bs=[]
 
@@ -106,7 +109,7 @@ def main():
                 json_valid = bool(ok); req_keys_rate = (present/total) if total>0 else None
             else:
                 json_valid = False; req_keys_rate = 0.0
-        forbid_violation = scan_forbidden(pred_raw, terms) if terms else False
+        forbid_violation = scan_forbidden(pred_raw, forbid_matcher) if forbid_matcher else False
 
         row.update({
             "json_valid": json_valid,
@@ -124,6 +127,7 @@ def main():
         row.update({"latency_ms": lat_ms, "prompt_tokens": ptok, "completion_tokens": ctok, "cost": cost})
 
         item_rows.append(row)
+        item_keys.append((str(o.get("model") or o.get("model_id") or ""), str(o.get("mode") or "")))
         if lat_ms is not None: lat_list.append(float(lat_ms))
         if cost is not None: cost_list.append(float(cost))
 
@@ -145,6 +149,11 @@ def main():
 
     out_dir = Path("results")/"metrics"
     save_jsonl(out_dir/f"{args.run_name}_item_metrics.jsonl", item_rows)
+    if args.dataset:
+        from metrics_dataset import write_metrics
+        n = write_metrics([{**r, "model": m or None, "mode": md or None} for r, (m, md) in zip(item_rows, item_keys)],
+                          args.dataset, run=args.run_name)
+        print(f"[m3] wrote {n} rows to dataset {args.dataset} (run={args.run_name})")
 
     def agg_mean(key):
         vals=[v[key] for v in item_rows if v.get(key) is not None]
@@ -1,11 +1,12 @@
 from __future__ import annotations
 from pathlib import Path
-import json, random
+import json, random, sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+from jsonl_reader import iter_jsonl
 
 def load_jsonl(path: Path):
-    with path.open(encoding="utf-8") as f:
-        for line in f:
-            if line.strip(): yield json.loads(line)
+    return iter_jsonl(path, errors="raise")
 
 def main():
     refs = {d["id"]: d["reference"] for d in load_jsonl(Path("data/raw/references/references.jsonl"))}
@@ -1,8 +1,12 @@
-import json, csv, os, argparse
+import json, csv, os, sys, argparse
 from collections import OrderedDict
+from pathlib import Path
 from sacrebleu.metrics import BLEU, CHRF
 from rouge_score import rouge_scorer
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+from jsonl_reader import iter_jsonl
+
 def read_prompts_csv(path):
     refs = {}
     with open(path, 'r', encoding='utf-8-sig') as f:
@@ -16,18 +20,15 @@ def read_prompts_csv(path):
 
 def read_outputs_jsonl(path):
     out = {}
-    with open(path, 'r', encoding='utf-8') as f:
-        for line in f:
-            if not line.strip(): continue
-            obj = json.loads(line)
-            ex_id = (obj.get('id') or obj.get('example_id') or
-                     (obj.get('meta') or {}).get('id'))
-            text = (obj.get('output') or obj.get('text') or obj.get('response') or
-                    (obj.get('result') or {}).get('text') or
-                    (obj.get('choices')[0].get('text') if obj.get('choices') else None) or
-                    "")
-            if ex_id:
-                out[str(ex_id)] = str(text).strip()
+    for obj in iter_jsonl(path, errors="raise"):
+        ex_id = (obj.get('id') or obj.get('example_id') or
+                 (obj.get('meta') or {}).get('id'))
+        text = (obj.get('output') or obj.get('text') or obj.get('response') or
+                (obj.get('result') or {}).get('text') or
+                (obj.get('choices')[0].get('text') if obj.get('choices') else None) or
+                "")
+        if ex_id:
+            out[str(ex_id)] = str(text).strip()
     return out
 
 def main():
@@ -1,39 +1,38 @@
-import os, json, glob, csv
+import os, sys, glob, csv
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+from jsonl_reader import iter_jsonl
+
 OUT = r"per_item_text_pairs.csv"
 paths = glob.glob(os.path.join("results","raw","outputs_*.jsonl")) + glob.glob(os.path.join("results","raw","*.jsonl"))
 
 pairs = {}
 for p in paths:
     try:
-        with open(p, encoding="utf-8") as fh:
-            for line in fh:
-                if not line.strip(): continue
-                try:
-                    j = json.loads(line)
-                except:
-                    continue
-                key = None
-                for k in ("id","example_id","example","idx","index"):
-                    if k in j:
-                        key = j[k]; break
-                pred = None
-                for pc in ('prediction','pred','output','response','generated','text','system','hyp','prediction_text'):
-                    if pc in j and j[pc] not in (None,''):
-                        pred = j[pc]; break
-                ref = None
-                for rc in ('reference','ref','references','target','gold'):
-                    if rc in j and j[rc] not in (None,'','[]'):
-                        ref = j[rc] if not isinstance(j[rc], list) else (j[rc][0] if j[rc] else "")
-                        break
-                if key is None:
-                    key = "row_"+str(len(pairs)+1)
-                if key not in pairs:
-                    pairs[key] = {"id": key, "prediction": pred or "", "reference": ref or ""}
-                else:
-                    if pred:
-                        pairs[key]["prediction"] = pred
-                    if ref:
-                        pairs[key]["reference"] = ref
+        for j in iter_jsonl(p):
+            key = None
+            for k in ("id","example_id","example","idx","index"):
+                if k in j:
+                    key = j[k]; break
+            pred = None
+            for pc in ('prediction','pred','output','response','generated','text','system','hyp','prediction_text'):
+                if pc in j and j[pc] not in (None,''):
+                    pred = j[pc]; break
+            ref = None
+            for rc in ('reference','ref','references','target','gold'):
+                if rc in j and j[rc] not in (None,'','[]'):
+                    ref = j[rc] if not isinstance(j[rc], list) else (j[rc][0] if j[rc] else "")
+                    break
+            if key is None:
+                key = "row_"+str(len(pairs)+1)
+            if key not in pairs:
+                pairs[key] = {"id": key, "prediction": pred or "", "reference": ref or ""}
+            else:
+                if pred:
+                    pairs[key]["prediction"] = pred
+                if ref:
+                    pairs[key]["reference"] = ref
     except Exception as e:
         print("Error reading", p, e)
 
@@ -3,18 +3,11 @@ import json
 from pathlib import Path
 import sys
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+from jsonl_reader import read_jsonl
+
 def load_jsonl(path):
-    items = []
-    with open(path, "r", encoding="utf-8") as f:
-        for i, line in enumerate(f, start=1):
-            s = line.strip()
-            if not s:
-                continue
-            try:
-                items.append(json.loads(s))
-            except Exception as e:
-                print(f"[WARN] skipping malformed line {i} in {path}: {e}", file=sys.stderr)
-    return items
+    return read_jsonl(path, errors="warn")
 
 def main():
     p = argparse.ArgumentParser()
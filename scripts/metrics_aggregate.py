@@ -3,6 +3,9 @@ import argparse, csv, json, sys, traceback
 from pathlib import Path
 from typing import Dict
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+import jsonl_reader
+
 def read_prompts_csv(p: Path) -> Dict[str, str]:
     if not p.exists(): return {}
     m = {}
@@ -31,21 +34,9 @@ def read_manifest_json(p: Path) -> Dict[str, str]:
     return m
 
 def read_jsonl_map(p: Path) -> Dict[str, str]:
-    out = {}
-    if not p.exists(): return out
-    with p.open("r", encoding="utf-8") as f:
-        for ln in f:
-            ln = ln.strip()
-            if not ln: continue
-            try:
-                o = json.loads(ln)
-            except Exception:
-                continue
-            pid = str(o.get("id") or o.get("prompt_id") or "").strip()
-            txt = o.get("output") or o.get("text") or o.get("response") or o.get("result") or ""
-            if pid:
-                out[pid] = str(txt)
-    return out
+    return jsonl_reader.read_jsonl_map(
+        p, keys=("id", "prompt_id"), fields=("output", "text", "response", "result"), missing_ok=True,
+        value=lambda o: str(o.get("output") or o.get("text") or o.get("response") or o.get("result") or ""))
 
 def lcs_len(a: str, b: str) -> int:
     if not a or not b: return 0
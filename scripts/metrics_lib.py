@@ -1,8 +1,11 @@
 from __future__ import annotations
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Dict, Any, List, Tuple, Optional, Union
 from pathlib import Path
 from collections import defaultdict
-import re, json, math
+import re, json, math, sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+from term_matcher import TermMatcher, matcher_for_terms
 
 _rouge = None
 def _ensure_rouge():
@@ -113,9 +116,10 @@ def validate_json_against_schema(obj: dict, schema_path: Path) -> Tuple[bool, in
         present = sum(1 for k in required if k in obj and str(obj[k]).strip()!="")
         return False, present, len(required), str(e)
 
-def scan_forbidden(text: str, terms: List[str]) -> bool:
-    low = text.lower()
-    return any(t and t.lower() in low for t in terms)
+def scan_forbidden(text: str, terms: Union[TermMatcher, List[str]]) -> bool:
+    """terms: a prebuilt TermMatcher (build it once per run) or a term list."""
+    m = terms if isinstance(terms, TermMatcher) else matcher_for_terms(terms)
+    return m.search(text) is not None
 
 def p50_p95(xs: List[float]) -> Tuple[Optional[float], Optional[float]]:
     if not xs: return None, None
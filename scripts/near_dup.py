@@ -0,0 +1,169 @@
+from __future__ import annotations
+import re
+from collections import defaultdict
+from typing import Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+
+# 5-char shingles + MinHash/LSH. 후보 쌍만 정확한 Jaccard 로 검증하므로 결과 기준(min_sim)은
+# jaccard_shingles 와 같고, LSH 는 비교 횟수만 줄인다.
+
+_PRIME = np.uint64(1099511628211)
+
+def normalize_ws(s: str) -> str:
+    return re.sub(r"\s+", " ", (s or "").strip())
+
+def shingle_set(s: str, k: int = 5) -> Set[str]:
+    s = normalize_ws(s)
+    return {s[i:i+k] for i in range(max(len(s)-k+1, 1))}
+
+def jaccard_sets(A: Set[str], B: Set[str]) -> float:
+    inter = len(A & B); union = len(A) + len(B) - inter
+    return inter/union if union else 0.0
+
+def jaccard_shingles(a: str, b: str, k: int = 5) -> float:
+    return jaccard_sets(shingle_set(a, k), shingle_set(b, k))
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    # splitmix64 finalizer (uint64 연산은 wrap-around)
+    with np.errstate(over="ignore"):
+        x = x ^ (x >> np.uint64(30)); x = x * np.uint64(0xBF58476D1CE4E5B9)
+        x = x ^ (x >> np.uint64(27)); x = x * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+def shingle_hashes(s: str, k: int = 5) -> np.ndarray:
+    """Deterministic 64-bit hashes of shingle_set(s, k) (unique, sorted)."""
+    s = normalize_ws(s)
+    cp = np.frombuffer(s.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    w = min(k, len(cp))
+    m = max(len(cp) - k + 1, 1)
+    h = np.full(m, np.uint64(w))
+    with np.errstate(over="ignore"):
+        for j in range(w):
+            h = h * _PRIME + cp[j:j+m]
+    return np.unique(_mix64(h))
+
+def lsh_params(num_perm: int, threshold: float, miss: float = 1e-6) -> Tuple[int, int]:
+    """(bands, rows), bands*rows <= num_perm: the most selective banding under which a
+    pair with Jaccard == threshold is missed with probability <= miss. The margin is
+    deliberately wide because the signature agreement itself is a noisy estimate."""
+    best = (num_perm, 1)
+    for r in range(1, num_perm + 1):
+        b = num_perm // r
+        if (1 - threshold ** r) ** b <= miss:
+            best = (b, r)
+    return best
+
+class MinHasher:
+    def __init__(self, num_perm: int = 128, k: int = 5, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.k = k
+        self.a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    def signatures(self, texts: Sequence[str], max_cells: int = 1 << 23) -> np.ndarray:
+        """(n, num_perm) uint64 MinHash signatures; docs are batched so the
+        (num_perm, shingles) work matrix stays under max_cells entries.
+        Shingle hashes are already mixed, so a*x+b (mod 2^64) serves as the permutation."""
+        out = np.empty((len(texts), self.num_perm), dtype=np.uint64)
+        per_batch = max(1, max_cells // self.num_perm)
+        i = 0
+        while i < len(texts):
+            hs, j, tot = [], i, 0
+            while j < len(texts) and (not hs or tot < per_batch):
+                h = shingle_hashes(texts[j], self.k)
+                hs.append(h); tot += len(h); j += 1
+            flat = np.concatenate(hs)
+            starts = np.cumsum([0] + [len(h) for h in hs[:-1]])
+            with np.errstate(over="ignore"):
+                hv = flat[None, :] * self.a[:, None] + self.b[:, None]
+            out[i:j] = np.minimum.reduceat(hv, starts, axis=1).T
+            i = j
+        return out
+
+def band_keys(sig: np.ndarray, bands: int, rows: int) -> np.ndarray:
+    """(n, bands) uint64 bucket key per band."""
+    n = sig.shape[0]
+    # 밴드 번호로 시작값을 달리해서 밴드 간 키가 섞이지 않게 한다
+    keys = np.tile(np.arange(bands, dtype=np.uint64), (n, 1))
+    with np.errstate(over="ignore"):
+        for j in range(rows):
+            keys = _mix64(keys * _PRIME + sig[:, j::rows][:, :bands])
+    return keys
+
+class _ShingleCache:
+    def __init__(self, texts: Sequence[str], k: int):
+        self.texts, self.k, self._c = texts, k, {}
+
+    def __call__(self, i: int) -> Set[str]:
+        s = self._c.get(i)
+        if s is None:
+            s = self._c[i] = shingle_set(self.texts[i], self.k)
+        return s
+
+def dedup_greedy(texts: Sequence[str], min_sim: float, k: int = 5, num_perm: int = 128,
+                 seed: int = 1, method: str = "lsh") -> Tuple[List[bool], Dict[str, int]]:
+    """Greedy in-order near-duplicate filter (m2_prepare.build_manifest semantics).
+
+    texts[i] is dropped if its exact shingle Jaccard with any earlier *kept* text
+    is >= min_sim. method='lsh' only verifies LSH candidates; 'exact' compares
+    against every kept text. Returns (keep flags, {"pairs_checked", "bands", "rows"}).
+    """
+    n = len(texts)
+    keep = [False] * n
+    info = {"pairs_checked": 0, "bands": 0, "rows": 0}
+    shingles = _ShingleCache(texts, k)
+    if method == "exact" or min_sim <= 0:
+        kept: List[int] = []
+        for i in range(n):
+            A = shingles(i)
+            dup = False
+            for j in kept:
+                info["pairs_checked"] += 1
+                if jaccard_sets(A, shingles(j)) >= min_sim:
+                    dup = True; break
+            if not dup:
+                keep[i] = True; kept.append(i)
+        return keep, info
+
+    bands, rows = lsh_params(num_perm, min(min_sim, 1.0))
+    info["bands"], info["rows"] = bands, rows
+    keys = band_keys(MinHasher(num_perm, k, seed).signatures(texts), bands, rows)
+    buckets: Dict[int, List[int]] = defaultdict(list)
+    for i in range(n):
+        row = keys[i].tolist()
+        cands = sorted({j for key in row for j in buckets.get(key, ())})
+        dup = False
+        if cands:
+            A = shingles(i)
+            for j in cands:
+                info["pairs_checked"] += 1
+                if jaccard_sets(A, shingles(j)) >= min_sim:
+                    dup = True; break
+        if not dup:
+            keep[i] = True
+            for key in row:
+                buckets[key].append(i)
+    return keep, info
+
+def near_duplicate_pairs(texts: Sequence[str], min_sim: float, k: int = 5, num_perm: int = 128,
+                         seed: int = 1) -> Tuple[List[Tuple[int, int, float]], Dict[str, int]]:
+    """All (i, j, jaccard) with i < j and exact Jaccard >= min_sim, found through LSH candidates."""
+    bands, rows = lsh_params(num_perm, min(max(min_sim, 1e-9), 1.0))
+    keys = band_keys(MinHasher(num_perm, k, seed).signatures(texts), bands, rows)
+    buckets: Dict[int, List[int]] = defaultdict(list)
+    for i, row in enumerate(keys.tolist()):
+        for key in row:
+            buckets[key].append(i)
+    cand: Set[Tuple[int, int]] = set()
+    for members in buckets.values():
+        if len(members) > 1:
+            cand.update((a, b) for x, a in enumerate(members) for b in members[x+1:])
+    shingles = _ShingleCache(texts, k)
+    out = []
+    for a, b in sorted(cand):
+        s = jaccard_sets(shingles(a), shingles(b))
+        if s >= min_sim:
+            out.append((a, b, s))
+    return out, {"pairs_checked": len(cand), "bands": bands, "rows": rows}
@@ -1,8 +1,11 @@
 from __future__ import annotations
-import argparse, csv, json
+import argparse, csv, sys
 from pathlib import Path
 from typing import Dict, List, Tuple
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+from jsonl_reader import read_jsonl_map
+
 def load_prompts(csv_path: Path) -> Tuple[List[str], Dict[str, str]]:
     with csv_path.open("r", encoding="utf-8-sig") as f:
         rdr = csv.DictReader(f)
@@ -22,22 +25,8 @@ def load_prompts(csv_path: Path) -> Tuple[List[str], Dict[str, str]]:
         return order, id2ref
 
 def load_jsonl_last(path: Path, field: str) -> Dict[str, str]:
-    id2out: Dict[str, str] = {}
-    if not path.exists():
-        return id2out
-    for ln in path.read_text(encoding="utf-8").splitlines():
-        ln = ln.strip()
-        if not ln:
-            continue
-        try:
-            o = json.loads(ln)
-        except Exception:
-            continue
-        rid = str(o.get("id", "") or "")
-        if not rid:
-            continue
-        id2out[rid] = str(o.get(field, "") or "")
-    return id2out
+    return read_jsonl_map(path, keys=("id",), fields=(field,), missing_ok=True,
+                          value=lambda o: str(o.get(field, "") or ""))
 
 def write_lines(path: Path, lines: List[str]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
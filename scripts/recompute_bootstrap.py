@@ -1,6 +1,11 @@
-import json, random, csv, argparse, pathlib
+import json, csv, argparse, pathlib, sys
 from statistics import mean
 
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "code"))
+from bootstrap import bootstrap_means
+
 METRICS = [
     ('bleu_sacre','results/quantitative/bleu_sacre.json'),
     ('rouge','results/quantitative/rouge.json'),
@@ -12,18 +17,13 @@ def load_pairs(path):
     pairs = [(it['id'], float(it['base']), float(it['instr'])) for it in j]
     return pairs
 
-def bootstrap_ci(diffs, nboot=10000, alpha=0.05):
-    n = len(diffs)
-    boots=[]
-    for _ in range(nboot):
-        sample = [diffs[random.randrange(n)] for _ in range(n)]
-        boots.append(mean(sample))
-    boots.sort()
-    lo = boots[int((alpha/2)*nboot)]
-    hi = boots[int((1-alpha/2)*nboot)]
+def bootstrap_ci(diffs, nboot=10000, alpha=0.05, seed=42, workers=1):
+    boots = np.sort(bootstrap_means(np.asarray(diffs, dtype=float), B=nboot, seed=seed, workers=workers))
+    lo = float(boots[int((alpha/2)*nboot)])
+    hi = float(boots[int((1-alpha/2)*nboot)])
     return lo, hi
 
-def compute_for(metric, path, nboot):
+def compute_for(metric, path, nboot, seed=42, workers=1):
     pairs = load_pairs(path)
     base = [p[1] for p in pairs]
     instr = [p[2] for p in pairs]
@@ -31,7 +31,7 @@ def compute_for(metric, path, nboot):
     mean_b = mean(base)
     mean_i = mean(instr)
     delta = mean(diffs)
-    ci_lo, ci_hi = bootstrap_ci(diffs, nboot=nboot)
+    ci_lo, ci_hi = bootstrap_ci(diffs, nboot=nboot, seed=seed, workers=workers)
     return {
         'metric': metric, 'n': len(diffs), 'mean_base': mean_b, 'mean_instr': mean_i,
         'delta': delta, 'ci_lo': ci_lo, 'ci_hi': ci_hi
@@ -40,6 +40,8 @@ def compute_for(metric, path, nboot):
 if __name__ == '__main__':
     p = argparse.ArgumentParser()
     p.add_argument('--nboot', type=int, default=10000)
+    p.add_argument('--seed', type=int, default=42)
+    p.add_argument('--workers', type=int, default=1, help='processes for bootstrap chunks (same CIs for any value)')
     p.add_argument('--out', type=str, default='results/quantitative/stats_bootstrap.csv')
     args = p.parse_args()
     outp = pathlib.Path(args.out)
@@ -50,7 +52,7 @@ if __name__ == '__main__':
         if not path.exists():
             print("[WARN] missing", path)
             continue
-        rows.append(compute_for(name, path, args.nboot))
+        rows.append(compute_for(name, path, args.nboot, seed=args.seed, workers=args.workers))
     with outp.open('w', encoding='utf-8', newline='') as f:
         w = csv.writer(f)
         w.writerow(['metric','n','mean_base','mean_instr','delta','ci_lo','ci_hi'])
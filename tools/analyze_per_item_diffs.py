@@ -1,16 +1,13 @@
-import os, json, argparse
+import os, sys, json, argparse
 import pandas as pd
 import numpy as np
 from scipy import stats
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code"))
+import jsonl_reader
+
 def read_jsonl(path):
-    rows=[]
-    with open(path,'r',encoding='utf-8') as f:
-        for line in f:
-            line=line.strip()
-            if not line: continue
-            rows.append(json.loads(line))
-    return pd.DataFrame(rows)
+    return pd.DataFrame(jsonl_reader.read_jsonl(path, errors="raise"))
 
 def bootstrap_ci_mean_diff(a,b,nboot=10000,seed=42):
     rng = np.random.default_rng(seed)
@@ -1,11 +1,15 @@
 import argparse
 import os
+import sys
 import json
 import csv
 import math
 from pathlib import Path
 from difflib import unified_diff, SequenceMatcher
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code"))
+from jsonl_index import Catalog, DEFAULT_CATALOG, add_index_args
+
 def safe_read_text(path):
     try:
         return Path(path).read_text(encoding='utf-8', errors='ignore')
@@ -143,9 +147,29 @@ def try_compute_sacrebleu(ref, hyp):
         bleu_score = bp * geo_mean
         return {"sacrebleu": float(bleu_score * 100.0)}
 
-def scan_repo_for_item(repo_root, item_id, exts=None):
-    repo_root = Path(repo_root)
+def lookup_indexed(item_id, roots, catalog=DEFAULT_CATALOG):
+    """Records for item_id from the JSONL catalog; also returns the files it fully covers."""
+    cat = Catalog(catalog)
+    try:
+        cat.refresh(roots)
+        by_path = {}
+        for path, obj in cat.lookup(item_id):
+            by_path.setdefault(path, []).append(obj)
+        covered = set(cat.indexed_files())
+    finally:
+        cat.close()
     results = []
+    for path, objs in by_path.items():
+        cands = [{"type": "json_record", "record": obj, "fields": find_candidate_texts_in_obj(obj)} for obj in objs]
+        results.append({"path": path, "candidates": cands})
+    return results, covered
+
+def scan_repo_for_item(repo_root, item_id, exts=None, index_roots=None, catalog=DEFAULT_CATALOG, index_only=False):
+    # results/raw 의 JSONL 로그는 카탈로그로 찾고, 색인이 다루지 못하는 나머지 파일만 훑는다
+    repo_root = Path(repo_root)
+    results, covered = lookup_indexed(item_id, index_roots or [repo_root / "results" / "raw"], catalog)
+    if index_only:
+        return results
     for dirpath, dirnames, filenames in os.walk(repo_root):
         parts = Path(dirpath).parts
         if '.venv' in parts or 'venv' in parts:
@@ -155,6 +179,8 @@ def scan_repo_for_item(repo_root, item_id, exts=None):
             suffix = path.suffix.lower().lstrip('.')
             if exts and suffix not in exts:
                 continue
+            if str(path.resolve()) in covered:
+                continue
             text = safe_read_text(path)
             if not text:
                 continue
@@ -258,6 +284,9 @@ def main():
     p.add_argument("--refs", default=r"C:\Project\LLM\data\refs.jsonl", help="refs jsonl path")
     p.add_argument("--outdir", default=r"C:\Project\LLM\analysis_outputs", help="output directory")
     p.add_argument("--exts", default="jsonl,json,csv,txt,md,log,out", help="file extensions to search (comma sep)")
+    p.add_argument("--index-only", action="store_true",
+                   help="only look up the indexed JSONL logs (catalog), skip walking the rest of the repo")
+    add_index_args(p)
     args = p.parse_args()
 
     os.makedirs(args.outdir, exist_ok=True)
@@ -267,7 +296,8 @@ def main():
 
     exts = {e.strip().lower() for e in args.exts.split(",") if e.strip()}
     print(f"Scanning {args.repo!r} for id {args.id} (exts={exts}) ...")
-    found = scan_repo_for_item(args.repo, args.id, exts=exts)
+    found = scan_repo_for_item(args.repo, args.id, exts=exts, index_roots=args.index_roots,
+                               catalog=args.catalog, index_only=args.index_only)
     print(f"Found {len(found)} file(s) containing '{args.id}'")
 
     out = {"id": args.id, "ref_text": ref_text, "found_files_count": len(found), "files": []}
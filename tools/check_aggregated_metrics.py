@@ -1,4 +1,5 @@
 import os
+import sys
 import argparse
 import pandas as pd
 import numpy as np
@@ -6,22 +7,18 @@ import matplotlib.pyplot as plt
 import json
 from pathlib import Path
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code"))
+from metrics_dataset import add_dataset_args, parse_where, read_any
+
 pd.set_option("display.width", 200)
 pd.set_option("display.max_columns", 50)
 
-def try_read_csv(path):
-    try:
-        df = pd.read_csv(path)
-        return df
-    except Exception as e:
-        raise RuntimeError(f"Could not read CSV {path}: {e}")
-
-def try_read_jsonl(path):
+def try_read(path, where=None):
+    """CSV / JSONL / metrics_dataset directory or .parquet (filters pushed into the Parquet scan)."""
     try:
-        df = pd.read_json(path, lines=True)
-        return df
+        return read_any(path, **parse_where(where))
     except Exception as e:
-        raise RuntimeError(f"Could not read JSONL {path}: {e}")
+        raise RuntimeError(f"Could not read {path}: {e}")
 
 def to_numeric_safe(s):
     return pd.to_numeric(s, errors='coerce')
@@ -32,11 +29,12 @@ def ensure_outdir(p):
 
 def main():
     p = argparse.ArgumentParser()
-    p.add_argument("--agg", default=r"C:\Project\LLM\figs\aggregated_metrics.csv", help="aggregated metrics csv")
-    p.add_argument("--full", default=r"C:\Project\LLM\LLM-clean\results\quantitative\per_item_full_60.csv", help="per-item full csv")
+    p.add_argument("--agg", default=r"C:\Project\LLM\figs\aggregated_metrics.csv", help="aggregated metrics (CSV/JSONL or metrics dataset dir)")
+    p.add_argument("--full", default=r"C:\Project\LLM\LLM-clean\results\quantitative\per_item_full_60.csv", help="per-item full (CSV/JSONL or metrics dataset dir)")
     p.add_argument("--sub", default=r"C:\Project\LLM\LLM-clean\results\quantitative\per_item_subset_50.jsonl", help="per-item subset jsonl")
     p.add_argument("--stats", default=r"C:\Project\LLM\LLM-clean\results\quantitative\stats_summary.v2.csv", help="stats summary csv")
     p.add_argument("--out", default=r"C:\Project\LLM\figs\generated", help="output directory for debug artifacts")
+    add_dataset_args(p)
     args = p.parse_args()
 
     outdir = ensure_outdir(args.out)
@@ -45,7 +43,7 @@ def main():
     print("\n=== Checking aggregated metrics ===")
     if os.path.exists(args.agg):
         try:
-            df_agg = try_read_csv(args.agg)
+            df_agg = try_read(args.agg, args.where)
             print("Loaded:", args.agg)
             print("Columns:", df_agg.columns.tolist())
             print("Shape:", df_agg.shape)
@@ -67,7 +65,7 @@ def main():
     print("\n=== Checking per-item files ===")
     if os.path.exists(args.full):
         try:
-            df_full = try_read_csv(args.full)
+            df_full = try_read(args.full, args.where)
             print("Loaded full:", args.full, "shape=", df_full.shape)
             print("Columns:", df_full.columns.tolist())
             for c in ["base","instr","bleu","bleu_sacre","chrf","rouge"]:
@@ -81,7 +79,7 @@ def main():
 
     if os.path.exists(args.sub):
         try:
-            df_sub = try_read_jsonl(args.sub)
+            df_sub = try_read(args.sub, args.where)
             print("Loaded subset:", args.sub, "shape=", df_sub.shape)
             print("Columns:", df_sub.columns.tolist())
             for c in ["base","instr","bleu","bleu_sacre","chrf","rouge"]:
@@ -189,7 +187,7 @@ def main():
     print("\n=== Checking stats_summary ===")
     if os.path.exists(args.stats):
         try:
-            df_stats = try_read_csv(args.stats)
+            df_stats = try_read(args.stats)
             print("Loaded stats summary:", args.stats)
             print(df_stats.head(50).to_string(index=False))
             df_stats.to_csv(os.path.join(outdir, "stats_summary_copy.csv"), index=False)
@@ -1,7 +1,10 @@
-import json, sys
+import os, sys
 from pathlib import Path
 import sacrebleu
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code"))
+from jsonl_reader import iter_jsonl, read_jsonl
+
 def load_per_item_csv(path):
     import csv
     rows=[]
@@ -12,21 +15,14 @@ def load_per_item_csv(path):
     return rows
 
 def load_per_item_jsonl(path):
-    rows=[]
-    with open(path, encoding='utf8') as fh:
-        for line in fh:
-            if not line.strip(): continue
-            rows.append(json.loads(line))
-    return rows
+    return read_jsonl(path, errors="raise")
 
 def main():
     full_path = Path(r"C:\Project\LLM\LLM-clean\results\quantitative\per_item_full_60.csv")
     rows = load_per_item_csv(full_path)
     refs = {}
-    with open(r"C:\Project\LLM\LLM-clean\data\refs.jsonl", encoding='utf8') as fh:
-        for line in fh:
-            obj=json.loads(line)
-            refs[obj['id']]=obj.get('reference_text', '')
+    for obj in iter_jsonl(r"C:\Project\LLM\LLM-clean\data\refs.jsonl", errors="raise"):
+        refs[obj['id']]=obj.get('reference_text', '')
     out=[]
     for r in rows:
         idr=r['id']
@@ -1,4 +1,5 @@
 import os
+import sys
 import argparse
 import json
 import math
@@ -9,6 +10,9 @@ from scipy import stats
 
 plt.switch_backend('agg')
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code"))
+from corpus_bootstrap import bleu_delta_figure
+
 def ensure_out(dirpath):
     os.makedirs(dirpath, exist_ok=True)
 
@@ -44,7 +48,7 @@ def plot_metric_bars(df_stats, outdir):
         savefig(fig, fname)
         plt.close(fig)
 
-def plot_paired_bleu(bleu_json_path, outdir, nboot=5000, seed=42):
+def plot_paired_bleu(bleu_json_path, outdir, nboot=5000, seed=42, pairs_path=None):
     with open(bleu_json_path, "r", encoding="utf-8") as f:
         data = json.load(f)
     base = np.array([d.get("base", np.nan) for d in data], dtype=float)
@@ -68,21 +72,8 @@ def plot_paired_bleu(bleu_json_path, outdir, nboot=5000, seed=42):
     savefig(fig, os.path.join(outdir, "bleu_boxplot.png"))
     plt.close(fig)
 
-    rng = np.random.default_rng(seed)
-    diffs = []
-    for _ in range(nboot):
-        idx = rng.integers(0, n, n)
-        diffs.append(np.mean(instr[idx]) - np.mean(base[idx]))
-    diffs = np.array(diffs)
-    ci_low, ci_high = np.percentile(diffs, [2.5, 97.5])
-    fig, ax = plt.subplots(figsize=(6,3))
-    ax.hist(diffs, bins=60, edgecolor='black', linewidth=0.3)
-    ax.axvline(0, color='k', linestyle='--', linewidth=1)
-    ax.axvline(diffs.mean(), color='r', linestyle='-', linewidth=1)
-    ax.set_xlabel("Δ BLEU (Instructed - Base)")
-    ax.set_title(f"Bootstrap Δ BLEU (mean={diffs.mean():.3f}, 95% CI=[{ci_low:.3f},{ci_high:.3f}])")
-    savefig(fig, os.path.join(outdir, "bleu_bootstrap_delta.png"))
-    plt.close(fig)
+    # corpus BLEU 의 paired bootstrap (문장 BLEU 평균이 아니라 보고하는 지표 그대로)
+    corpus = bleu_delta_figure(pairs_path, os.path.join(outdir, "bleu_bootstrap_delta.png"), B=nboot, seed=seed)
 
     fig, ax = plt.subplots(figsize=(5,5))
     ax.scatter(base, instr, alpha=0.7)
@@ -107,9 +98,7 @@ def plot_paired_bleu(bleu_json_path, outdir, nboot=5000, seed=42):
         "mean_base": float(mean_base),
         "mean_instr": float(mean_instr),
         "delta": float(delta),
-        "bootstrap_mean": float(diffs.mean()),
-        "bootstrap_ci_low": float(ci_low),
-        "bootstrap_ci_high": float(ci_high),
+        "corpus_bootstrap": corpus,
         "wilcoxon_p": wilcoxon_p,
         "cohen_d": float(cohen_d)
     }
@@ -167,6 +156,8 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--stats_csv", default=None, help="stats_summary CSV path")
     parser.add_argument("--bleu_json", default=None, help="paired bleu json path")
+    parser.add_argument("--pairs", default=None,
+                        help="reference/base/instructed texts (per_item_pairs_wide.csv) for the corpus-level bootstrap figure")
     parser.add_argument("--comp_csv", default=None, help="compliance csv path")
     parser.add_argument("--error_html", default=None, help="error board html path")
     parser.add_argument("--out", default="figs", help="output directory for PNGs")
@@ -191,7 +182,7 @@ def main():
 
     if args.bleu_json and os.path.exists(args.bleu_json):
         try:
-            plot_paired_bleu(args.bleu_json, outdir, nboot=args.nboot)
+            plot_paired_bleu(args.bleu_json, outdir, nboot=args.nboot, pairs_path=args.pairs)
         except Exception as e:
             print("Failed plotting BLEU JSON:", e)
     else:
@@ -1,16 +1,13 @@
 import sys, json, os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code"))
+from jsonl_index import JsonlIndex
+
 def find_in_jsonl(path, item_id):
     if not os.path.exists(path):
         print("Not found:", path); return None
-    with open(path, 'r', encoding='utf-8') as fh:
-        for line in fh:
-            try:
-                rec=json.loads(line)
-            except:
-                continue
-            if rec.get('id')==item_id or rec.get('item_id')==item_id:
-                return rec
-    return None
+    with JsonlIndex(path).refresh() as idx:
+        recs = idx.get(item_id)
+    return recs[0] if recs else None
 
 if __name__=='__main__':
     if len(sys.argv)<4:
@@ -1,4 +1,5 @@
 import os
+import sys
 import argparse
 import math
 import numpy as np
@@ -10,8 +11,20 @@ from scipy import stats
 
 plt.rcParams.update({'font.size': 14})
 
-def safe_read_csv(path):
-    df = pd.read_csv(path, dtype=str)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code"))
+
+def safe_read_csv(path, where=None):
+    if os.path.isdir(path) or path.endswith(".parquet"):
+        # metrics_dataset: lang/len_bin/diff_bin 필터는 Parquet 스캔에서 거른다
+        from metrics_dataset import parse_where, read_metrics
+        df = read_metrics(path, **parse_where(where))
+    else:
+        df = pd.read_csv(path, dtype=str)
+        if where:
+            from metrics_dataset import parse_where
+            for k, v in parse_where(where).items():
+                if k in df.columns and v is not None:
+                    df = df[df[k].isin(v if isinstance(v, list) else [v])]
     df = df.rename(columns=lambda c: c.strip())
     return df
 
@@ -182,6 +195,8 @@ def main():
     parser.add_argument('--input', required=True)
     parser.add_argument('--stats', required=False)
     parser.add_argument('--out', required=True)
+    parser.add_argument('--where', default=None,
+                        help="row filter, e.g. 'lang=ko,len_bin=short|medium' (pushed down for Parquet datasets)")
     args = parser.parse_args()
 
     inp = args.input
@@ -190,7 +205,7 @@ def main():
     os.makedirs(outdir, exist_ok=True)
 
     print("Loading:", inp)
-    df = safe_read_csv(inp)
+    df = safe_read_csv(inp, args.where)
 
     df = df.dropna(how='all')
     rename_map = {}
@@ -1,9 +1,12 @@
-import argparse, os
+import argparse, os, sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy import stats
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code"))
+from corpus_bootstrap import bleu_delta_figure
+
 plt.style.use('classic')
 
 def save_fig(fig, path, dpi=300):
@@ -22,24 +25,9 @@ def boxplot_paired(per_item_csv, outdir):
     ax.set_title(f"Paired BLEU (n={len(df)}) Δ={np.round(np.mean(instr-base),3)}")
     save_fig(fig, os.path.join(outdir, "bleu_boxplot.png"))
 
-def bootstrap_delta_hist(per_item_csv, outdir, nboot=5000):
-    df = pd.read_csv(per_item_csv, dtype={"id":str}).dropna(subset=["base","instr"])
-    deltas = (df["instr"] - df["base"]).values
-    boots = []
-    n = len(deltas)
-    for i in range(nboot):
-        s = np.random.choice(deltas, size=n, replace=True)
-        boots.append(np.mean(s))
-    boots = np.array(boots)
-    fig, ax = plt.subplots(figsize=(10,5))
-    ax.hist(boots, bins=60)
-    mean = boots.mean()
-    ci = np.percentile(boots, [2.5,97.5])
-    ax.axvline(0, color='k', linestyle='--')
-    ax.axvline(mean, color='r', linewidth=2)
-    ax.set_xlabel("Δ BLEU (Instructed - Base)")
-    ax.set_title(f"Bootstrap Δ BLEU (mean={mean:.3f}, 95% CI=[{ci[0]:.3f},{ci[1]:.3f}])")
-    save_fig(fig, os.path.join(outdir, "bleu_bootstrap_delta.png"))
+def bootstrap_delta_hist(pairs_path, outdir, nboot=5000):
+    # corpus BLEU 의 paired bootstrap (문장 BLEU 평균이 아니라 보고하는 지표 그대로)
+    bleu_delta_figure(pairs_path, os.path.join(outdir, "bleu_bootstrap_delta.png"), B=nboot)
 
 def bleu_vs_chrf_scatter(aggregated_csv, outdir):
     df = pd.read_csv(aggregated_csv)
@@ -64,13 +52,15 @@ def bleu_vs_chrf_scatter(aggregated_csv, outdir):
 def main():
     p = argparse.ArgumentParser()
     p.add_argument("--per_item", default=r"C:\Project\LLM\LLM-clean\results\quantitative\per_item_full_60.csv")
+    p.add_argument("--pairs", default=r"C:\Project\LLM\per_item_pairs_wide.csv",
+                   help="reference/base/instructed texts for the corpus-level bootstrap figure")
     p.add_argument("--aggregated", default=r"C:\Project\LLM\figs\aggregated_metrics_fixed.csv")
     p.add_argument("--outdir", default=r"C:\Project\LLM\figs\generated")
     args = p.parse_args()
     os.makedirs(args.outdir, exist_ok=True)
 
     boxplot_paired(args.per_item, args.outdir)
-    bootstrap_delta_hist(args.per_item, args.outdir, nboot=5000)
+    bootstrap_delta_hist(args.pairs, args.outdir, nboot=5000)
     bleu_vs_chrf_scatter(args.aggregated, args.outdir)
     print("All plots attempted. Check:", args.outdir)
 
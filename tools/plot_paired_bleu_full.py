@@ -1,9 +1,14 @@
-import os, argparse, json, numpy as np
+import os, sys, argparse, json, numpy as np
 import matplotlib.pyplot as plt
 from scipy import stats
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code"))
+from corpus_bootstrap import bleu_delta_figure
+
 parser = argparse.ArgumentParser()
 parser.add_argument("--json", default="LLM-clean/results/quantitative/bleu_sacre.json")
+parser.add_argument("--pairs", default="per_item_pairs_wide.csv",
+                    help="reference/base/instructed texts for the corpus-level bootstrap figure")
 parser.add_argument("--out", default="figs")
 parser.add_argument("--nboot", type=int, default=5000)
 args = parser.parse_args()
@@ -35,25 +40,8 @@ plt.tight_layout()
 plt.savefig(os.path.join(args.out, "bleu_boxplot.png"), dpi=300)
 plt.close()
 
-rng = np.random.default_rng()
-diffs = []
-for _ in range(args.nboot):
-    idx = rng.integers(0, n, n)
-    diffs.append(np.mean(instr[idx]) - np.mean(base[idx]))
-diffs = np.array(diffs)
-ci_low, ci_high = np.percentile(diffs, [2.5,97.5])
-mean_diff = diffs.mean()
-
-plt.figure(figsize=(6,3))
-plt.hist(diffs, bins=60, edgecolor='black', linewidth=0.3)
-plt.axvline(0, color='k', linestyle='--', label='0')
-plt.axvline(mean_diff, color='r', linestyle='-', label=f'mean Δ={mean_diff:.3f}')
-plt.xlabel("Δ BLEU (Instructed - Base)")
-plt.title(f"Bootstrap Δ BLEU (n={n}) 95% CI [{ci_low:.3f}, {ci_high:.3f}]")
-plt.legend()
-plt.tight_layout()
-plt.savefig(os.path.join(args.out, "bleu_bootstrap_delta.png"), dpi=300)
-plt.close()
+# 부트스트랩 그림은 보고하는 지표 (corpus BLEU) 그대로: 문장 BLEU 평균의 부트스트랩이 아니다
+corpus = bleu_delta_figure(args.pairs, os.path.join(args.out, "bleu_bootstrap_delta.png"), B=args.nboot)
 
 plt.figure(figsize=(5,5))
 plt.scatter(base, instr, alpha=0.7)
@@ -80,9 +68,7 @@ summary = {
     "mean_base": float(mean_base),
     "mean_instr": float(mean_instr),
     "delta": float(delta),
-    "bootstrap_mean_diff": float(mean_diff),
-    "bootstrap_ci_low": float(ci_low),
-    "bootstrap_ci_high": float(ci_high),
+    "corpus_bootstrap": corpus,
     "wilcoxon_stat": float(w_stat) if w_stat is not None else None,
     "wilcoxon_p": float(w_p) if w_p is not None else None,
     "cohen_d_paired": float(cohen_d)
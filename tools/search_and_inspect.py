@@ -1,6 +1,10 @@
-import argparse, os, json, csv, io
+import argparse, os, sys, json, csv, io
 from pathlib import Path
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code"))
+from jsonl_index import Catalog, add_index_args
+from text_index import FIELDS, TextIndex, add_text_index_args, load_hit, record_fields, snippet
+
 def search_file_for_str(path, target):
     out=[]
     try:
@@ -58,28 +62,75 @@ def try_parse_csv_row(path, target):
         pass
     return None
 
+def search_text(args, root):
+    # "어떤 출력이 X 를 언급하나" 는 파일을 훑지 않고 전문 색인으로 답한다
+    sources = args.sources or [root / "results" / "raw", root / "prompts"]
+    ti = TextIndex(args.text_index)
+    st = ti.refresh(sources)
+    hits = ti.search(args.text, field=args.field, mode=args.mode, model=args.model, limit=args.limit)
+    ti.close()
+    print(f"Index: {st['files']} file(s), {st['updated']} updated. {len(hits)} hit(s) for {args.text!r}\n")
+    for h in hits:
+        text = record_fields(load_hit(h)).get(h["field"], "")
+        print(f"{h['path']} @ offset {h['off']} (len {h['len']})  id={h['id']} field={h['field']} "
+              f"mode={h['mode']} model={h['model']}")
+        print("   ", snippet(text, args.text))
+
 def main():
     p = argparse.ArgumentParser()
-    p.add_argument("--id", required=True, help="item id to search for, e.g. EX-0006")
+    g = p.add_mutually_exclusive_group(required=True)
+    g.add_argument("--id", help="item id to search for, e.g. EX-0006")
+    g.add_argument("--text", help='words/phrases to find in outputs, prompts, references, e.g. \'"json 형식" 모델\'')
     p.add_argument("--repo", default=r"C:\Project\LLM", help="root path to search")
     p.add_argument("--ext", default="jsonl,json,csv,txt,md,log,out", help="comma-separated extensions to search")
+    p.add_argument("--index-only", action="store_true",
+                   help="only look up the indexed JSONL logs (catalog), skip walking the rest of the repo")
+    p.add_argument("--field", choices=sorted(FIELDS), default=None, help="--text: only this field")
+    p.add_argument("--mode", default=None, help="--text: only this mode")
+    p.add_argument("--model", default=None, help="--text: only this model")
+    p.add_argument("--limit", type=int, default=50, help="--text: max hits")
+    add_index_args(p)
+    add_text_index_args(p)
     args = p.parse_args()
 
     root = Path(args.repo)
+    if args.text:
+        search_text(args, root)
+        return
     exts = {e.strip().lower() for e in args.ext.split(",") if e.strip()}
     print(f"Searching for '{args.id}' under {root} (exts={exts})\nThis may take a moment...")
 
+    # results/raw 의 JSONL 로그는 카탈로그(사이드카 색인)로 바로 찾는다
+    roots = args.index_roots or [root / "results" / "raw"]
+    cat = Catalog(args.catalog)
+    cat.refresh(roots)
+    indexed = {}
+    for path, rec in cat.lookup(args.id):
+        indexed.setdefault(Path(path), []).append(rec)
+    skip = set(cat.indexed_files())
+    cat.close()
+    for path, recs in indexed.items():
+        print("----")
+        print("File (indexed):", path)
+        for rec in recs:
+            print(json.dumps(rec, ensure_ascii=False, indent=2))
+
     matches = []
-    for dirpath, dirnames, filenames in os.walk(root):
+    for dirpath, dirnames, filenames in ([] if args.index_only else os.walk(root)):
         if '.venv' in dirpath.split(os.sep) or 'venv' in dirpath.split(os.sep):
             continue
         for fn in filenames:
             lp = Path(dirpath) / fn
             if lp.suffix.lower().lstrip('.') not in exts:
                 continue
+            if str(lp.resolve()) in skip:
+                continue
             found_lines = search_file_for_str(lp, args.id)
             if found_lines:
                 matches.append((lp, found_lines))
+    if not matches and indexed:
+        print(f"\nFound '{args.id}' in {len(indexed)} indexed log file(s); no other files contain it.")
+        return
     if not matches:
         print("No files containing the id were found under the given repo and extensions.")
         print("If you store outputs in a non-standard location or as binary, please provide the path.")
@@ -1,4 +1,4 @@
-import os, json
+import os, sys, json
 import numpy as np, pandas as pd
 import matplotlib.pyplot as plt
 from scipy import stats
@@ -7,9 +7,13 @@ from scipy.stats import trim_mean
 per_item_path = r"C:\Project\LLM\LLM-clean\results\quantitative\per_item_full_60.csv"
 subset_path = r"C:\Project\LLM\LLM-clean\results\quantitative\per_item_subset_50.jsonl"
 agg_with_scores = r"C:\Project\LLM\figs\aggregated_metrics_fixed_with_chrf_rouge.csv"
+pairs_path = r"C:\Project\LLM\per_item_pairs_wide.csv"
 outdir = r"C:\Project\LLM\figs\generated"
 os.makedirs(outdir, exist_ok=True)
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code"))
+from corpus_bootstrap import bleu_delta_figure
+
 df = pd.read_csv(per_item_path)
 df['base'] = pd.to_numeric(df['base'], errors='coerce')
 df['instr'] = pd.to_numeric(df['instr'], errors='coerce')
@@ -64,14 +68,8 @@ ax.grid(axis='y', linestyle=':', alpha=0.4)
 fig.savefig(os.path.join(outdir,"bleu_boxplot.png"), bbox_inches='tight')
 plt.close(fig)
 
-fig, ax = plt.subplots(figsize=(8,5))
-ax.hist(boots, bins=60)
-ax.axvline(0, color='k', linestyle='--', linewidth=1)
-ax.axvline(boots.mean(), color='r', linewidth=2)
-ax.set_xlabel("Δ BLEU (Instructed - Base)")
-ax.set_title(f"Bootstrap Δ BLEU (mean={boots.mean():.3f}, 95% CI=[{ci_low:.3f},{ci_high:.3f}])")
-fig.savefig(os.path.join(outdir,"bleu_bootstrap_delta.png"), bbox_inches='tight')
-plt.close(fig)
+# 그림은 corpus BLEU 의 paired bootstrap (위의 문장 BLEU 평균 부트스트랩은 민감도 출력용으로만 남긴다)
+bleu_delta_figure(pairs_path, os.path.join(outdir, "bleu_bootstrap_delta.png"), B=nboot, seed=12345)
 
 fig, ax = plt.subplots(figsize=(10,4))
 deltas = df_sorted['delta'].values